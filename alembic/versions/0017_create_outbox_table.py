@@ -0,0 +1,46 @@
+"""create outbox table
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=100), nullable=False),
+        sa.Column('destino', sa.String(length=100), nullable=False),
+        sa.Column('chave_idempotencia', sa.String(length=255), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), nullable=False),
+        sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+        sa.Column('reservado_ate', sa.DateTime(), nullable=True),
+        sa.Column('ultimo_erro', sa.Text(), nullable=True),
+        sa.Column('criado_em', sa.DateTime(), nullable=True),
+        sa.Column('processado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_id', 'outbox', ['id'])
+    op.create_index('ix_outbox_tipo', 'outbox', ['tipo'])
+    op.create_index('ix_outbox_chave_idempotencia', 'outbox', ['chave_idempotencia'])
+    op.create_index('ix_outbox_status_proxima', 'outbox', ['status', 'proxima_tentativa'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_status_proxima', table_name='outbox')
+    op.drop_index('ix_outbox_chave_idempotencia', table_name='outbox')
+    op.drop_index('ix_outbox_tipo', table_name='outbox')
+    op.drop_index('ix_outbox_id', table_name='outbox')
+    op.drop_table('outbox')
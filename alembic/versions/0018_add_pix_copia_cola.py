@@ -0,0 +1,25 @@
+"""add pix_copia_cola to parcelas and boletos
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('parcelas', sa.Column('pix_copia_cola', sa.Text(), nullable=True))
+    op.add_column('boletos', sa.Column('pix_copia_cola', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('boletos', 'pix_copia_cola')
+    op.drop_column('parcelas', 'pix_copia_cola')
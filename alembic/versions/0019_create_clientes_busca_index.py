@@ -0,0 +1,40 @@
+"""create client full-text search index (FTS5 / tsvector) and backfill it
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0019'
+down_revision = '0018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Usa o próprio índice para criar e popular, com a mesma normalização da busca
+    from crm_modules.clientes.search import indice_clientes
+
+    bind = op.get_bind()
+    if not indice_clientes.suportado(bind):
+        return
+    try:
+        total = indice_clientes.reconstruir(bind)
+    except Exception as e:
+        if bind.dialect.name != 'sqlite':
+            raise
+        # Ex.: SQLite compilado sem FTS5; a busca continua usando LIKE
+        print(f"Aviso: índice de busca de clientes não criado: {e}")
+        return
+    print(f"Índice de busca de clientes populado: {total} registros")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS clientes_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP TABLE IF EXISTS clientes_busca")
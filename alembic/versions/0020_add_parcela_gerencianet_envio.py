@@ -0,0 +1,23 @@
+"""add gerencianet_envio_em to parcelas
+
+Revision ID: 0020
+Revises: 0019
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0020'
+down_revision = '0019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('parcelas', sa.Column('gerencianet_envio_em', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('parcelas', 'gerencianet_envio_em')
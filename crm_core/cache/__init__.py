@@ -1 +1,5 @@
 # crm_core.cache package
+from crm_core.cache.arquivos import CacheArquivos, cache_pdf, chave_conteudo
+from crm_core.cache.camadas import CacheEmCamadas, cache, em_cache
+
+__all__ = ["CacheArquivos", "CacheEmCamadas", "cache", "cache_pdf", "chave_conteudo", "em_cache"]
@@ -0,0 +1,200 @@
+"""Cache em disco de arquivos gerados (PDFs), endereçado pelo conteúdo.
+
+A chave é o hash de tudo o que determina o arquivo (versão do layout,
+template, dados renderizados). Se o contrato ou o template mudar, a chave
+muda e o arquivo antigo simplesmente deixa de ser pedido: não há
+invalidação explícita, só a remoção por LRU quando o diretório passa de
+``pdf_cache_max_mb``.
+
+- Arquivos em ``<dir>/<2 primeiros caracteres>/<chave><extensão>``, gravados
+  num temporário e renomeados (leitores nunca veem arquivo pela metade).
+- Um acerto atualiza o mtime do arquivo; a remoção apaga os de mtime mais
+  antigo até o total ficar em 90% do limite.
+- ``obter_ou_gerar`` deixa uma só thread gerar cada chave ausente;
+  ``obter_ou_gerar_async`` faz o mesmo entre corrotinas do event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from crm_core.config.settings import settings
+
+# Após a remoção, o total fica nesta fração do limite (evita podar a cada gravação)
+FRACAO_APOS_PODA = 0.9
+
+
+def chave_conteudo(*partes: Any) -> str:
+    """Hash estável (sha256) das partes, serializadas de forma canônica."""
+    corpo = json.dumps(partes, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(corpo.encode("utf-8")).hexdigest()
+
+
+class CacheArquivos:
+    def __init__(self, diretorio: Optional[str] = None, max_bytes: Optional[int] = None, extensao: str = ".pdf"):
+        self.diretorio = Path(diretorio or settings.pdf_cache_dir
+                              or os.path.join(tempfile.gettempdir(), "crm_cache_pdf"))
+        self.max_bytes = max_bytes or settings.pdf_cache_max_mb * 1024 * 1024
+        self.extensao = extensao
+        self.acertos = 0
+        self.falhas = 0
+        self.removidos = 0
+        self._tamanho: Optional[int] = None
+        self._lock = threading.Lock()
+        # chave -> [trava, threads usando]; sai da tabela quando a última termina
+        self._gerando: Dict[str, list] = {}
+        # O mesmo para corrotinas, com asyncio.Lock (só usado dentro do event loop)
+        self._gerando_async: Dict[str, list] = {}
+
+    def caminho(self, chave: str) -> Path:
+        return self.diretorio / chave[:2] / f"{chave}{self.extensao}"
+
+    def obter(self, chave: str) -> Optional[Path]:
+        caminho = self.caminho(chave)
+        try:
+            os.utime(caminho)  # marca o uso recente para o LRU
+        except FileNotFoundError:
+            with self._lock:
+                self.falhas += 1
+            return None
+        with self._lock:
+            self.acertos += 1
+        return caminho
+
+    def gravar(self, chave: str, conteudo: bytes) -> Path:
+        caminho = self.caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except BaseException:
+            try:
+                os.unlink(temporario)
+            except FileNotFoundError:
+                pass
+            raise
+        self._somar(len(conteudo))
+        return caminho
+
+    def temporario(self) -> tempfile.TemporaryDirectory:
+        """Diretório de trabalho dentro do cache (mesmo disco: ``mover`` é só um rename)."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        return tempfile.TemporaryDirectory(dir=self.diretorio, prefix="tmp-")
+
+    def mover(self, chave: str, origem: Path) -> Path:
+        """Como ``gravar``, com o conteúdo já escrito em ``origem`` (que deixa de existir)."""
+        caminho = self.caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        tamanho = os.path.getsize(origem)
+        os.replace(origem, caminho)
+        self._somar(tamanho)
+        return caminho
+
+    def _somar(self, tamanho: int):
+        with self._lock:
+            if self._tamanho is not None:
+                self._tamanho += tamanho
+            podar = self._tamanho is None or self._tamanho > self.max_bytes
+        if podar:
+            self._podar()
+
+    def obter_ou_gerar(self, chave: str, gerar: Callable[[], bytes]) -> Path:
+        caminho = self.obter(chave)
+        if caminho is not None:
+            return caminho
+        with self._lock:
+            entrada = self._gerando.setdefault(chave, [threading.Lock(), 0])
+            entrada[1] += 1
+        try:
+            with entrada[0]:
+                # Outra thread pode ter gerado enquanto esta esperava
+                caminho = self.caminho(chave)
+                if caminho.exists():
+                    return caminho
+                return self.gravar(chave, gerar())
+        finally:
+            with self._lock:
+                entrada[1] -= 1
+                if entrada[1] == 0:
+                    del self._gerando[chave]
+
+    async def obter_ou_gerar_async(self, chave: str, gerar: Callable[[], Awaitable[bytes]]) -> Path:
+        """Como ``obter_ou_gerar``, com ``gerar`` assíncrono; o disco é acessado fora do loop."""
+        caminho = await run_in_threadpool(self.obter, chave)
+        if caminho is not None:
+            return caminho
+        entrada = self._gerando_async.setdefault(chave, [asyncio.Lock(), 0])
+        entrada[1] += 1
+        try:
+            async with entrada[0]:
+                # Outra corrotina pode ter gerado enquanto esta esperava
+                caminho = self.caminho(chave)
+                if await run_in_threadpool(caminho.exists):
+                    return caminho
+                return await run_in_threadpool(self.gravar, chave, await gerar())
+        finally:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                del self._gerando_async[chave]
+
+    def _arquivos(self):
+        if not self.diretorio.exists():
+            return []
+        arquivos = []
+        for caminho in self.diretorio.glob(f"*/*{self.extensao}"):
+            try:
+                arquivos.append((caminho, caminho.stat()))
+            except FileNotFoundError:
+                pass
+        return arquivos
+
+    def _podar(self):
+        arquivos = self._arquivos()
+        total = sum(stat.st_size for _, stat in arquivos)
+        removidos = 0
+        if total > self.max_bytes:
+            alvo = self.max_bytes * FRACAO_APOS_PODA
+            for caminho, stat in sorted(arquivos, key=lambda item: item[1].st_mtime):
+                if total <= alvo:
+                    break
+                try:
+                    caminho.unlink()
+                except FileNotFoundError:
+                    continue
+                total -= stat.st_size
+                removidos += 1
+        with self._lock:
+            self._tamanho = total
+            self.removidos += removidos
+
+    def limpar(self):
+        for caminho, _ in self._arquivos():
+            try:
+                caminho.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._tamanho = 0
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "diretorio": str(self.diretorio),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "removidos": self.removidos,
+                "tamanho_bytes": self._tamanho,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Cache de PDFs gerados (contratos, carnês)
+cache_pdf = CacheArquivos()
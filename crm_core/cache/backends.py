@@ -0,0 +1,108 @@
+"""Backends remotos do cache em camadas.
+
+Um backend guarda valores já serializados (``bytes``) com TTL e mantém, para
+cada tag, o conjunto de chaves gravadas com ela, para a invalidação por tag.
+
+- ``BackendRedis``: o usado em produção, sobre ``crm_core.cache.redis``.
+- ``BackendMemoria``: implementação em memória, para testes e scripts.
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# Conjuntos de tags vivem mais que qualquer entrada (o TTL das entradas é limitado a isso)
+TTL_MAXIMO = 24 * 3600
+
+PREFIXO_TAG = "tag:"
+
+# Lê e apaga cada conjunto de tag com as suas chaves numa única operação
+# atômica: uma chave gravada com a tag no meio da invalidação não escapa dela.
+# DEL em blocos para não passar do limite de argumentos do unpack.
+INVALIDAR_TAGS_LUA = """
+for _, chave_tag in ipairs(KEYS) do
+    local membros = redis.call('SMEMBERS', chave_tag)
+    for i = 1, #membros, 1000 do
+        redis.call('DEL', unpack(membros, i, math.min(i + 999, #membros)))
+    end
+    redis.call('DEL', chave_tag)
+end
+return 0
+"""
+
+
+class BackendRedis:
+    def __init__(self, redis_cache=None, prefixo: str = "crm:cache:"):
+        if redis_cache is None:
+            from crm_core.cache.redis import redis_cache
+        self.redis_cache = redis_cache
+        self.prefixo = prefixo
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefixo}{PREFIXO_TAG}{tag}"
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        return self.redis_cache.client.get(self.prefixo + chave)
+
+    def definir(self, chave: str, valor: bytes, ttl: float, tags: Iterable[str] = ()):
+        completa = self.prefixo + chave
+        pipe = self.redis_cache.client.pipeline(transaction=False)
+        pipe.set(completa, valor, px=max(1, int(min(ttl, TTL_MAXIMO) * 1000)))
+        for tag in tags:
+            pipe.sadd(self._tag(tag), completa)
+            pipe.expire(self._tag(tag), TTL_MAXIMO)
+        pipe.execute()
+
+    def remover(self, *chaves: str):
+        if chaves:
+            self.redis_cache.client.delete(*(self.prefixo + chave for chave in chaves))
+
+    def invalidar_tags(self, tags: Iterable[str]):
+        chaves_tag = [self._tag(tag) for tag in tags]
+        if chaves_tag:
+            # register_script usa EVALSHA e só envia o script se o Redis não o tiver
+            self.redis_cache.client.register_script(INVALIDAR_TAGS_LUA)(keys=chaves_tag)
+
+
+class BackendMemoria:
+    """Backend em memória com a mesma semântica do Redis (TTL e tags)."""
+
+    def __init__(self):
+        self._valores: Dict[str, Tuple[bytes, float]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.leituras = 0
+        self.escritas = 0
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        with self._lock:
+            self.leituras += 1
+            item = self._valores.get(chave)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                del self._valores[chave]
+                return None
+            return item[0]
+
+    def definir(self, chave: str, valor: bytes, ttl: float, tags: Iterable[str] = ()):
+        with self._lock:
+            self.escritas += 1
+            self._valores[chave] = (valor, time.monotonic() + min(ttl, TTL_MAXIMO))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(chave)
+
+    def remover(self, *chaves: str):
+        with self._lock:
+            for chave in chaves:
+                self._valores.pop(chave, None)
+
+    def invalidar_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for chave in self._tags.pop(tag, ()):
+                    self._valores.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._valores.clear()
+            self._tags.clear()
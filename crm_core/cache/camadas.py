@@ -0,0 +1,312 @@
+"""Cache em duas camadas: LRU local com TTL na frente do Redis.
+
+Uso típico em services, com o decorador ``em_cache``::
+
+    @em_cache("planos:ativos", ttl=300, tags=("planos",))
+    def listar_planos_ativos(self): ...
+
+    @em_cache("plano", ttl=300, tags=("plano:{plano_id}",))
+    def obter_plano(self, plano_id: int): ...
+
+e ``cache.invalidar("plano:42", "planos")`` depois de alterar o registro.
+
+- A chave é o namespace mais os argumentos (sem ``self``); ``chave=`` aceita
+  uma função própria. As tags são formatadas com os argumentos da chamada.
+- Valores são serializados (``crm_core.cache.serializacao``): cada leitura
+  devolve uma cópia nova, que pode ser alterada por quem chamou.
+- A camada local guarda por no máximo ``cache_local_ttl`` segundos; é o atraso
+  máximo para um processo ver uma invalidação feita em outro.
+- Chamadas simultâneas para a mesma chave ausente fazem uma única consulta
+  (single-flight); as demais esperam e recebem o mesmo resultado.
+- Se o Redis falhar, o cache passa a usar só a camada local e tenta o Redis de
+  novo após ``cache_redis_reconectar`` segundos. Invalidações feitas nesse
+  intervalo ficam pendentes e são aplicadas no Redis antes da primeira
+  operação depois da reconexão.
+- ``local_apenas=True`` não grava no Redis (ex.: objetos com senhas); o
+  valor também fica no máximo ``cache_local_ttl`` segundos, pois nenhum
+  outro processo vê a invalidação.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from crm_core.cache.serializacao import desserializar, serializar
+from crm_core.config.settings import settings
+
+_AUSENTE = object()
+
+
+class CacheLocal:
+    """LRU com TTL de valores serializados, com índice por tag."""
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[1] <= time.monotonic():
+                self._remover(chave)
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def definir(self, chave: str, dados: bytes, ttl: float, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            self._remover(chave)
+            self._itens[chave] = (dados, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(chave)
+            while len(self._itens) > self.max_itens:
+                self._remover(next(iter(self._itens)))
+
+    def remover(self, chave: str):
+        with self._lock:
+            self._remover(chave)
+
+    def invalidar_tags(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                for chave in list(self._tags.get(tag, ())):
+                    self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _remover(self, chave: str):
+        item = self._itens.pop(chave, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            chaves = self._tags.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._tags[tag]
+
+
+class _Voo:
+    """Cálculo em andamento de uma chave (single-flight)."""
+
+    __slots__ = ("evento", "dados", "valor", "erro")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.dados = None
+        self.valor = _AUSENTE
+        self.erro = None
+
+
+class CacheEmCamadas:
+    def __init__(self, backend=None, local_max: Optional[int] = None, local_ttl: Optional[float] = None,
+                 ttl_padrao: Optional[float] = None):
+        self.local = CacheLocal(local_max or settings.cache_local_max)
+        self.local_ttl = settings.cache_local_ttl if local_ttl is None else local_ttl
+        self.ttl_padrao = settings.cache_ttl_padrao if ttl_padrao is None else ttl_padrao
+        self._backend = backend
+        self._remoto_indisponivel_ate = 0.0
+        # Invalidações que não chegaram ao Redis; reenviadas quando ele volta
+        self._tags_pendentes: set = set()
+        self._chaves_pendentes: set = set()
+        self._voos: Dict[str, _Voo] = {}
+        self._lock = threading.Lock()
+        # Muda a cada invalidação; um cálculo que cruzou uma invalidação não é gravado
+        self._geracao = 0
+        self.estatisticas = {"local": 0, "remoto": 0, "faltas": 0, "erros_remoto": 0}
+
+    # Backend remoto
+    @property
+    def backend(self):
+        if self._backend is None:
+            from crm_core.cache.backends import BackendRedis
+            self._backend = BackendRedis()
+        return self._backend
+
+    def usar_backend(self, backend):
+        """Troca o backend remoto (ex.: ``BackendMemoria`` nos testes) e limpa a camada local."""
+        self._backend = backend
+        self._remoto_indisponivel_ate = 0.0
+        with self._lock:
+            self._tags_pendentes.clear()
+            self._chaves_pendentes.clear()
+        self.limpar()
+
+    @property
+    def remoto_disponivel(self) -> bool:
+        return time.monotonic() >= self._remoto_indisponivel_ate
+
+    def _remoto(self, operacao: str, *args, falha=None):
+        """Executa a operação no backend remoto; ``falha`` se ele estiver fora."""
+        if not self.remoto_disponivel:
+            return falha
+        try:
+            if self._tags_pendentes or self._chaves_pendentes:
+                self._reenviar_pendentes()
+            return getattr(self.backend, operacao)(*args)
+        except Exception as e:
+            self.estatisticas["erros_remoto"] += 1
+            self._remoto_indisponivel_ate = time.monotonic() + settings.cache_redis_reconectar
+            print(f"Aviso: cache remoto indisponível ({type(e).__name__}: {e}); "
+                  f"usando só o cache local por {settings.cache_redis_reconectar:.0f}s")
+            return falha
+
+    def _reenviar_pendentes(self):
+        with self._lock:
+            tags, self._tags_pendentes = self._tags_pendentes, set()
+            chaves, self._chaves_pendentes = self._chaves_pendentes, set()
+        try:
+            if tags:
+                self.backend.invalidar_tags(tuple(tags))
+            if chaves:
+                self.backend.remover(*chaves)
+        except Exception:
+            with self._lock:
+                self._tags_pendentes |= tags
+                self._chaves_pendentes |= chaves
+            raise
+
+    # Leitura e escrita
+    def _obter_dados(self, chave: str, local_apenas: bool = False, tags: tuple = ()) -> Optional[bytes]:
+        dados = self.local.obter(chave)
+        if dados is not None:
+            self.estatisticas["local"] += 1
+            return dados
+        if not local_apenas:
+            dados = self._remoto("obter", chave)
+            if dados is not None:
+                self.estatisticas["remoto"] += 1
+                self.local.definir(chave, dados, self.local_ttl, tags)
+                return dados
+        self.estatisticas["faltas"] += 1
+        return None
+
+    def obter(self, chave: str, padrao=None, local_apenas: bool = False, tags: Iterable[str] = ()):
+        dados = self._obter_dados(chave, local_apenas, tuple(tags))
+        return padrao if dados is None else desserializar(dados)
+
+    def _gravar(self, chave: str, dados: bytes, ttl: float, tags: tuple, local_apenas: bool):
+        self.local.definir(chave, dados, min(ttl, self.local_ttl), tags)
+        if not local_apenas:
+            self._remoto("definir", chave, dados, ttl, tags)
+
+    def definir(self, chave: str, valor, ttl: Optional[float] = None, tags: Iterable[str] = (),
+                local_apenas: bool = False):
+        ttl = self.ttl_padrao if ttl is None else ttl
+        self._gravar(chave, serializar(valor), ttl, tuple(tags), local_apenas)
+
+    def obter_ou_calcular(self, chave: str, calcular: Callable, ttl: Optional[float] = None,
+                          tags: Iterable[str] = (), local_apenas: bool = False):
+        tags = tuple(tags)
+        dados = self._obter_dados(chave, local_apenas, tags)
+        if dados is not None:
+            return desserializar(dados)
+
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+                geracao = self._geracao
+
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return desserializar(voo.dados) if voo.dados is not None else voo.valor
+
+        try:
+            valor = calcular()
+            try:
+                voo.dados = serializar(valor)
+            except (TypeError, ValueError) as e:
+                print(f"Aviso: valor de '{chave}' não pode ir para o cache: {e}")
+                voo.valor = valor
+                return valor
+            with self._lock:
+                gravar = geracao == self._geracao
+            if gravar:
+                ttl = self.ttl_padrao if ttl is None else ttl
+                self._gravar(chave, voo.dados, ttl, tags, local_apenas)
+            return valor
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.evento.set()
+
+    # Invalidação
+    def invalidar(self, *tags: str):
+        """Remove das duas camadas todas as entradas gravadas com estas tags."""
+        with self._lock:
+            self._geracao += 1
+        self.local.invalidar_tags(tags)
+        if self._remoto("invalidar_tags", tags, falha=_AUSENTE) is _AUSENTE:
+            with self._lock:
+                self._tags_pendentes.update(tags)
+
+    def remover(self, *chaves: str):
+        with self._lock:
+            self._geracao += 1
+        for chave in chaves:
+            self.local.remover(chave)
+        if self._remoto("remover", *chaves, falha=_AUSENTE) is _AUSENTE:
+            with self._lock:
+                self._chaves_pendentes.update(chaves)
+
+    def limpar(self):
+        """Limpa a camada local (o Redis é compartilhado e não é apagado)."""
+        with self._lock:
+            self._geracao += 1
+        self.local.limpar()
+
+    # Decorador
+    def em_cache(self, namespace: str, ttl: Optional[float] = None, chave: Optional[Callable[..., str]] = None,
+                 tags: Iterable[str] = (), local_apenas: bool = False):
+        """Decorador para funções e métodos de service; ver o docstring do módulo."""
+        tags = tuple(tags)
+
+        def decorador(funcao):
+            assinatura = inspect.signature(funcao)
+
+            def montar(args, kwargs):
+                ligados = assinatura.bind(*args, **kwargs)
+                ligados.apply_defaults()
+                argumentos = dict(ligados.arguments)
+                argumentos.pop("self", None)
+                argumentos.pop("cls", None)
+                sufixo = chave(**argumentos) if chave else ":".join(str(v) for v in argumentos.values())
+                completa = f"{namespace}:{sufixo}" if sufixo else namespace
+                return completa, tuple(tag.format(**argumentos) for tag in tags)
+
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                if not settings.cache_habilitado:
+                    return funcao(*args, **kwargs)
+                completa, tags_chamada = montar(args, kwargs)
+                return self.obter_ou_calcular(completa, lambda: funcao(*args, **kwargs), ttl, tags_chamada,
+                                              local_apenas)
+
+            envolvida.sem_cache = funcao
+            return envolvida
+
+        return decorador
+
+
+cache = CacheEmCamadas()
+em_cache = cache.em_cache
@@ -3,8 +3,21 @@ from crm_core.config.settings import settings
 
 
 class RedisCache:
-    def __init__(self):
-        self.client = redis.from_url(settings.redis_url)
+    """Cliente Redis criado no primeiro uso (importar o módulo não conecta)."""
+
+    def __init__(self, url: str = None):
+        self.url = url or settings.redis_url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.from_url(
+                self.url,
+                socket_connect_timeout=settings.cache_redis_timeout,
+                socket_timeout=settings.cache_redis_timeout,
+            )
+        return self._client
 
     def get(self, key: str) -> str:
         return self.client.get(key)
@@ -12,8 +25,9 @@ class RedisCache:
     def set(self, key: str, value: str, expire: int = None):
         self.client.set(key, value, ex=expire)
 
-    def delete(self, key: str):
-        self.client.delete(key)
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*keys)
 
     def exists(self, key: str) -> bool:
         return self.client.exists(key) > 0
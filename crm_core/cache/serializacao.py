@@ -0,0 +1,110 @@
+"""Serialização dos valores guardados no cache.
+
+Usa msgpack quando instalado e JSON caso contrário; o primeiro byte indica o
+formato, então processos com e sem msgpack leem os valores uns dos outros.
+
+Além dos tipos nativos, trata ``datetime``, ``date``, ``Decimal``, tuplas,
+``Enum`` e objetos de domínio (classes simples e dataclasses dos pacotes
+``crm_modules`` e ``crm_core``), que voltam como instâncias da mesma classe.
+"""
+import dataclasses
+import importlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+try:
+    import msgpack
+except ImportError:  # msgpack é opcional
+    msgpack = None
+
+PACOTES_PERMITIDOS = ("crm_modules.", "crm_core.")
+_TIPO = "__tipo__"
+
+_MSGPACK = b"m"
+_JSON = b"j"
+
+
+def _caminho(cls) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _classe(caminho: str):
+    modulo, _, nome = caminho.partition(":")
+    if not modulo.startswith(PACOTES_PERMITIDOS):
+        raise ValueError(f"Classe fora dos pacotes permitidos no cache: {caminho}")
+    objeto = importlib.import_module(modulo)
+    for parte in nome.split("."):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def _para_primitivo(valor):
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, Enum):
+        return {_TIPO: _caminho(type(valor)), "valor": _para_primitivo(valor.value)}
+    if isinstance(valor, dict):
+        return {str(k): _para_primitivo(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_para_primitivo(v) for v in valor]
+    if isinstance(valor, tuple):
+        return {_TIPO: "tuple", "valor": [_para_primitivo(v) for v in valor]}
+    if isinstance(valor, datetime):
+        return {_TIPO: "datetime", "valor": valor.isoformat()}
+    if isinstance(valor, date):
+        return {_TIPO: "date", "valor": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {_TIPO: "decimal", "valor": str(valor)}
+    if type(valor).__module__.startswith(PACOTES_PERMITIDOS):
+        if dataclasses.is_dataclass(valor):
+            campos = {campo.name: getattr(valor, campo.name) for campo in dataclasses.fields(valor)}
+        else:
+            campos = vars(valor)
+        return {_TIPO: _caminho(type(valor)), "campos": _para_primitivo(campos)}
+    raise TypeError(f"Tipo não suportado no cache: {type(valor).__name__}")
+
+
+def _de_primitivo(valor):
+    if isinstance(valor, list):
+        return [_de_primitivo(v) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    tipo = valor.get(_TIPO)
+    if tipo is None:
+        return {k: _de_primitivo(v) for k, v in valor.items()}
+    if tipo == "tuple":
+        return tuple(_de_primitivo(v) for v in valor["valor"])
+    if tipo == "datetime":
+        return datetime.fromisoformat(valor["valor"])
+    if tipo == "date":
+        return date.fromisoformat(valor["valor"])
+    if tipo == "decimal":
+        return Decimal(valor["valor"])
+    cls = _classe(tipo)
+    if issubclass(cls, Enum):
+        return cls(_de_primitivo(valor["valor"]))
+    objeto = cls.__new__(cls)
+    objeto.__dict__.update(_de_primitivo(valor["campos"]))
+    return objeto
+
+
+def serializar(valor) -> bytes:
+    primitivo = _para_primitivo(valor)
+    if msgpack is not None:
+        return _MSGPACK + msgpack.packb(primitivo, use_bin_type=True)
+    return _JSON + json.dumps(primitivo, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def desserializar(dados: bytes):
+    formato, corpo = dados[:1], dados[1:]
+    if formato == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("Valor do cache gravado com msgpack, que não está instalado")
+        primitivo = msgpack.unpackb(corpo, raw=False)
+    elif formato == _JSON:
+        primitivo = json.loads(corpo)
+    else:
+        raise ValueError("Formato de valor do cache desconhecido")
+    return _de_primitivo(primitivo)
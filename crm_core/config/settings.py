@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,12 +9,93 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Cache dos usuários autenticados (AuthMiddleware / obter_usuario_atual)
+    auth_cache_usuarios_ttl: float = 60.0
+    auth_cache_usuarios_max: int = 1024
+    acl_cache_ttl: float = 300.0
+    # Fração das requisições registradas pelo AuthMiddleware (erros sempre)
+    auth_log_amostragem: float = 0.01
+    # Hash de senhas: threads dedicadas e custo alvo do pbkdf2_sha256
+    senha_hash_max_paralelo: int = 4
+    senha_pbkdf2_rounds: int = 29000
+
+    # Cache em duas camadas (crm_core.cache): LRU local na frente do Redis
+    cache_habilitado: bool = True
+    cache_ttl_padrao: float = 60.0
+    cache_local_max: int = 2048
+    cache_local_ttl: float = 5.0
+    cache_redis_timeout: float = 0.5
+    cache_redis_reconectar: float = 30.0
+
+    # Métricas do dashboard: dias consolidados na primeira execução do job
+    dashboard_rollup_dias_iniciais: int = 730
+    # Idade máxima (s) dos KPIs consolidados; mais velhos que isso o resumo é calculado ao vivo
+    dashboard_kpis_max_idade: int = 7200
+    # Contadores ao vivo (SSE): espera para juntar eventos, keep-alive e fila por conexão
+    dashboard_ao_vivo_janela: float = 0.5
+    dashboard_ao_vivo_keepalive: int = 15
+    dashboard_ao_vivo_max_fila: int = 100
+    # Validade (segundos) do token de stream passado na URL do EventSource
+    dashboard_ao_vivo_token_ttl: int = 60
+    # Barramento de eventos: fila por assinatura, espera de quem publica com a fila cheia, espera para juntar lotes
+    eventos_max_fila: int = 1000
+    eventos_timeout_bloqueio: float = 1.0
+    eventos_espera_lote: float = 0.05
     debug: bool = False
+
+    # Pool de conexões do banco de dados
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
+    # PRAGMAs aplicados em cada conexão SQLite
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 268435456
+    sqlite_busy_timeout: int = 5000
+    # Conexões mantidas no pool; deve cobrir o threadpool do servidor (40 no AnyIO)
+    sqlite_pool_size: int = 64
     positionstack_api_key: str = ""
     mikrotik_host: str = ""
     mikrotik_user: str = ""
     mikrotik_password: str = ""
     mikrotik_local_address: str = ""
+
+    # Pool de conexões RouterOS (por roteador)
+    mikrotik_api_port: int = 8728
+    mikrotik_pool_max_conexoes: int = 4
+    mikrotik_pool_idle_timeout: int = 300
+    mikrotik_pool_keepalive: int = 60
+    mikrotik_pool_acquire_timeout: int = 30
+    mikrotik_socket_timeout: int = 15
+
+    # Índice de sessões PPPoE ativas (/ppp/active) em memória
+    mikrotik_sessoes_intervalo: int = 30
+    mikrotik_sessoes_max_idade: int = 120
+    mikrotik_sessoes_redis: bool = False
+    # Reconciliação PPPoE também aplica o bloqueio do cadastro (desfaz bloqueios feitos só no roteador)
+    mikrotik_reconciliar_bloqueio: bool = False
+
+    # Outbox (crm_core.outbox): mensagens por reserva, threads, tentativas e backoff exponencial (s)
+    outbox_lote: int = 100
+    outbox_workers: int = 8
+    outbox_max_tentativas: int = 8
+    outbox_backoff_base: float = 5.0
+    outbox_backoff_max: float = 3600.0
+    # Tempo de reserva de uma mensagem; passado isso, outro despachante pode retomá-la
+    outbox_reserva: int = 300
+    outbox_intervalo: float = 5.0
+    # Execuções simultâneas por destino (nome exato ou prefixo antes de ':')
+    outbox_concorrencia_padrao: int = 4
+    outbox_concorrencia: Dict[str, int] = {"mikrotik": 1, "gerencianet": 2}
+    # Despachar na própria API (thread); com False só o job do Celery despacha
+    outbox_despachar_no_processo: bool = True
+
+    # Consultas simultâneas a vários servidores (sessões, logs, saúde)
+    servidores_fanout_max_paralelo: int = 16
+    servidores_fanout_timeout: float = 10.0
     huawei_host: str = ""
     huawei_user: str = ""
     huawei_password: str = ""
@@ -26,8 +109,36 @@ class Settings(BaseSettings):
     company_endereco: str = ""
     contract_template_html: str = ""
 
+    # Renderização de PDFs de contratos em processos separados (0 = na própria thread)
+    pdf_workers: int = 2
+    # Pedidos aguardando além dos em execução; com a fila cheia a API responde 503
+    pdf_max_fila: int = 20
+    pdf_timeout: float = 30.0
+    # Cache de bytecode do Jinja (vazio = diretório temporário) e CSS extra (caminhos separados por vírgula)
+    pdf_cache_bytecode: str = ""
+    pdf_css: str = ""
+    # Cache em disco dos PDFs gerados, por hash do conteúdo (vazio = diretório temporário)
+    pdf_cache_dir: str = ""
+    pdf_cache_max_mb: int = 512
+    # Impressão de carnês em lote: carnês por pedaço enviado ao pool de PDFs e lotes simultâneos
+    impressao_carnes_por_pedaco: int = 50
+    impressao_lotes_simultaneos: int = 1
+    # Lotes concluídos mantidos na memória para consulta de status e download
+    impressao_lotes_max: int = 50
+    # Andamento dos lotes no cache compartilhado, visível aos demais workers (segundos)
+    impressao_lotes_ttl: int = 24 * 3600
+
     # Configurações Gerencianet/Boleto
     gerencianet_sandbox: str = "true"
+    # Cliente Gerencianet compartilhado: URL (vazio = sandbox/produção), conexões mantidas e timeouts (s)
+    gerencianet_base_url: str = ""
+    gerencianet_pool_conexoes: int = 10
+    gerencianet_timeout_conexao: float = 3.05
+    gerencianet_timeout_leitura: float = 15.0
+    # Tentativas em 5xx/timeout (com espera exponencial e jitter) e antecedência para renovar o token
+    gerencianet_max_tentativas: int = 3
+    gerencianet_backoff_base: float = 0.5
+    gerencianet_token_margem: float = 60.0
     boleto_juros_padrao: str = "0.1"
     boleto_multa_padrao: str = "2"
     carne_parcelas_max: str = "24"
@@ -37,6 +148,9 @@ class Settings(BaseSettings):
     pix_tipo_chave: str = "cpf"
     pix_beneficiario: str = ""
     pix_cidade: str = ""
+    # QR Codes em LRU por conteúdo e "copia e cola" gravado na parcela/boleto
+    pix_qr_cache_tamanho: int = 1024
+    pix_persistir_payload: bool = True
 
     # Configurações SMTP
     smtp_port: str = "587"
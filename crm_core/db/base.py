@@ -1,17 +1,73 @@
-from sqlalchemy import create_engine
-from sqlalchemy.pool import NullPool
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm import sessionmaker, Session
-from crm_core.config.settings import settings
+from crm_core.config.settings import Settings, settings
 
 # Importar todos os modelos para garantir que sejam registrados
 from crm_core.db import models  # noqa: F401
 
-# Usar NullPool para SQLite (melhor para aplicações web)
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    poolclass=NullPool  # Sem pool de conexões para SQLite
-)
+
+def _aplicar_pragmas_sqlite(engine: Engine, config: Settings, em_memoria: bool):
+    """Registra os PRAGMAs aplicados a cada nova conexão SQLite."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout)}")
+            if not em_memoria:
+                # WAL permite leituras concorrentes durante escritas
+                cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+                cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+                cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+        finally:
+            cursor.close()
+
+
+def criar_engine(database_url: Optional[str] = None, config: Optional[Settings] = None) -> Engine:
+    """Cria o engine do SQLAlchemy com pool ajustado ao banco configurado.
+
+    - SQLite em memória: ``StaticPool`` (uma única conexão compartilhada).
+    - SQLite em arquivo: ``QueuePool`` (cada sessão com a sua conexão, mesmo
+      aninhada na mesma thread) com WAL, ``synchronous=NORMAL`` e
+      ``mmap_size`` aplicados no evento ``connect`` de cada conexão.
+    - Demais bancos: ``QueuePool`` com tamanho, overflow, pre-ping e recycle
+      definidos em ``Settings``.
+    """
+    config = config or settings
+    url = make_url(database_url or config.database_url)
+
+    if url.get_backend_name() == "sqlite":
+        em_memoria = url.database in (None, "", ":memory:")
+        engine = create_engine(
+            url,
+            echo=config.debug,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool if em_memoria else QueuePool,
+            **({} if em_memoria else {
+                "pool_size": config.sqlite_pool_size,
+                "max_overflow": config.db_max_overflow,
+                "pool_timeout": config.db_pool_timeout,
+            }),
+        )
+        _aplicar_pragmas_sqlite(engine, config, em_memoria)
+        return engine
+
+    return create_engine(
+        url,
+        echo=config.debug,
+        poolclass=QueuePool,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+    )
+
+
+engine = criar_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
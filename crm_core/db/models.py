@@ -21,6 +21,10 @@ from crm_modules.tecnicos.models import TecnicoModel
 from crm_modules.ordens_servico.models import OrdemServicoModel
 from crm_modules.ordens_servico.checklist_models import ChecklistItemModel, ChecklistProgressModel
 from crm_modules.clientes.models_arquivos import ClienteArquivoModel
+from crm_core.outbox.models import OutboxModel
+
+# Registra a sincronização do índice de busca de clientes
+from crm_modules.clientes import search as clientes_search  # noqa: F401
 
 # Exportar Base para uso em migrations
 __all__ = ['Base']
@@ -0,0 +1,113 @@
+"""Paginação por cursor (keyset) e cache de contagens.
+
+O cursor é um token opaco (base64 de um JSON) com a coluna e a direção de
+ordenação e os valores ``(coluna, id)`` do último item da página. A próxima
+página é obtida com ``WHERE (coluna, id) < (valor, id)`` em vez de ``OFFSET``,
+então o custo não cresce com a profundidade da página.
+"""
+import base64
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Generic, List, Optional, TypeVar
+
+from crm_core.utils.exceptions import ValidationException
+
+T = TypeVar("T")
+
+
+@dataclass
+class KeysetPage(Generic[T]):
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _serializar(valor: Any):
+    if isinstance(valor, datetime):
+        return {"t": "dt", "v": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"t": "d", "v": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {"t": "dec", "v": str(valor)}
+    return {"t": "raw", "v": valor}
+
+
+def _desserializar(dado: dict):
+    tipo, valor = dado.get("t"), dado.get("v")
+    if valor is None:
+        return None
+    if tipo == "dt":
+        return datetime.fromisoformat(valor)
+    if tipo == "d":
+        return date.fromisoformat(valor)
+    if tipo == "dec":
+        return Decimal(valor)
+    return valor
+
+
+def encode_cursor(coluna: str, ordem: str, valor: Any, ultimo_id: int) -> str:
+    payload = {"c": coluna, "o": ordem, "k": _serializar(valor), "id": ultimo_id}
+    bruto = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, coluna: str, ordem: str):
+    """Retorna ``(valor, ultimo_id)``; rejeita cursores de outra ordenação."""
+    try:
+        preenchido = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        valor, ultimo_id = _desserializar(payload["k"]), int(payload["id"])
+    except Exception:
+        raise ValidationException("Cursor de paginação inválido")
+    if payload.get("c") != coluna or payload.get("o") != ordem:
+        raise ValidationException("Cursor não corresponde à ordenação solicitada")
+    return valor, ultimo_id
+
+
+class CountCache:
+    """Cache com TTL de contagens (``COUNT``) por consulta e parâmetros."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, chave: str, calcular) -> int:
+        agora = time.monotonic()
+        with self._lock:
+            item = self._valores.get(chave)
+            if item and item[1] > agora:
+                return item[0]
+        total = calcular()
+        with self._lock:
+            if len(self._valores) >= self.max_entries:
+                # Descarta as entradas mais antigas
+                for antiga in sorted(self._valores, key=lambda k: self._valores[k][1])[: self.max_entries // 4]:
+                    self._valores.pop(antiga, None)
+            self._valores[chave] = (total, agora + self.ttl)
+        return total
+
+    def invalidar(self, tabelas):
+        """Descarta as contagens das tabelas (prefixo ``tabela|`` da chave)."""
+        prefixos = tuple(f"{tabela}|" for tabela in tabelas)
+        if not prefixos:
+            return
+        with self._lock:
+            for chave in [c for c in self._valores if c.startswith(prefixos)]:
+                del self._valores[chave]
+
+    def clear(self):
+        with self._lock:
+            self._valores.clear()
+
+
+count_cache = CountCache()
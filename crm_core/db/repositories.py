@@ -1,6 +1,8 @@
 from typing import Generic, TypeVar, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session, Query
 from crm_core.db.models_base import Base
+from crm_core.db.pagination import KeysetPage, count_cache, decode_cursor, encode_cursor
 
 T = TypeVar('T', bound=Base)
 
@@ -30,3 +32,95 @@ class BaseRepository(Generic[T]):
     def delete(self, obj: T) -> None:
         self.session.delete(obj)
         self.session.commit()
+
+    def count_cached(self, query: Query) -> int:
+        """COUNT da consulta, reaproveitado entre páginas do cursor.
+
+        Vale até o TTL do ``count_cache`` ou até um commit que grave na
+        tabela do repositório. As listagens por página (OFFSET) contam direto.
+        """
+        statement = query.statement.compile(self.session.get_bind())
+        chave = f"{self.model.__tablename__}|{statement}|{sorted(statement.params.items(), key=str)}"
+        return count_cache.get_or_compute(chave, query.order_by(None).count)
+
+    def _resolver_ordenacao(self, sort_by: str, sort_order: str):
+        """Normaliza ``(sort_by, sort_order)``; colunas desconhecidas viram ``id``."""
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        coluna = getattr(self.model, sort_by, None) if sort_by else None
+        if coluna is None or not hasattr(coluna, "property") or not hasattr(coluna.property, "columns"):
+            sort_by, coluna = "id", self.model.id
+        return sort_by, sort_order, coluna
+
+    def ordenar(self, query: Query, sort_by: str = "id", sort_order: str = "desc") -> Query:
+        """Ordena ``query`` por ``(sort_by, id)``, com nulos no fim.
+
+        É a mesma ordem de ``paginate_keyset``; as listagens por OFFSET que
+        alternam com o cursor devem usá-la para que empates não pulem nem
+        repitam linhas entre as páginas.
+        """
+        sort_by, sort_order, coluna = self._resolver_ordenacao(sort_by, sort_order)
+        id_col = self.model.id
+        ordenacao = [coluna.asc() if sort_order == "asc" else coluna.desc()]
+        if sort_by != "id":
+            ordenacao.insert(0, coluna.is_(None))
+            ordenacao.append(id_col.asc() if sort_order == "asc" else id_col.desc())
+        return query.order_by(None).order_by(*ordenacao)
+
+    def paginate_keyset(
+        self,
+        query: Query,
+        sort_by: str = "id",
+        sort_order: str = "desc",
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        with_total: bool = False,
+    ) -> KeysetPage[T]:
+        """Pagina ``query`` por cursor, ordenando por ``(sort_by, id)``.
+
+        ``cursor`` é o ``next_cursor`` da página anterior (``None`` na primeira).
+        Valores nulos da coluna de ordenação ficam sempre no fim.
+        """
+        sort_by, sort_order, coluna = self._resolver_ordenacao(sort_by, sort_order)
+        id_col = self.model.id
+        total = self.count_cached(query) if with_total else None
+
+        if cursor:
+            valor, ultimo_id = decode_cursor(cursor, sort_by, sort_order)
+            depois = (lambda c, v: c > v) if sort_order == "asc" else (lambda c, v: c < v)
+            if sort_by == "id":
+                query = query.filter(depois(id_col, ultimo_id))
+            elif valor is None:
+                query = query.filter(and_(coluna.is_(None), depois(id_col, ultimo_id)))
+            else:
+                query = query.filter(or_(
+                    depois(coluna, valor),
+                    and_(coluna == valor, depois(id_col, ultimo_id)),
+                    coluna.is_(None),
+                ))
+
+        rows = self.ordenar(query, sort_by, sort_order).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            ultimo = rows[-1]
+            next_cursor = encode_cursor(sort_by, sort_order, getattr(ultimo, sort_by), ultimo.id)
+        return KeysetPage(items=rows, next_cursor=next_cursor, total=total)
+
+
+@event.listens_for(Session, "after_flush")
+def _anotar_tabelas_alteradas(session, flush_context):
+    tabelas = session.info.setdefault("contagens_alteradas", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tabelas.add(obj.__tablename__)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_contagens(session):
+    # Só depois do commit, para outra sessão não recalcular e guardar o total antigo
+    count_cache.invalidar(session.info.pop("contagens_alteradas", ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_tabelas_alteradas(session, previous_transaction):
+    session.info.pop("contagens_alteradas", None)
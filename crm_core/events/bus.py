@@ -1,18 +1,296 @@
-from typing import Callable, Dict, List
+"""Barramento de eventos do processo.
+
+Os services publicam no ``event_bus`` compartilhado; cada assinatura escolhe
+como recebe os eventos:
+
+- Direta (padrão): o handler roda na thread de quem publicou, como antes,
+  mas uma exceção do handler não chega a quem publicou (é contada e
+  registrada). Serve para handlers baratos (ex.: marcar contadores).
+- Em fila (``em_fila=True``, ou handler ``async``, ou ``lote``): o evento vai
+  para uma fila limitada da assinatura e ``workers`` threads a consomem, fora
+  da requisição que publicou. Handlers ``async`` rodam num loop próprio de
+  cada worker.
+
+  - ``lote=N`` entrega listas de até N eventos, juntando o que chegar em
+    ``espera_lote`` segundos depois do primeiro.
+  - Fila cheia: ``BLOQUEAR`` segura quem publica por até
+    ``eventos_timeout_bloqueio`` segundos (contrapressão) e então descarta;
+    ``DESCARTAR_NOVO`` descarta o evento que chegou; ``DESCARTAR_ANTIGO``
+    descarta o mais antigo da fila.
+
+``metricas()`` traz, por assinatura, entregas, erros, descartes, tamanho da
+fila, espera na fila e duração do handler (média, p95 e máximo em ms).
+"""
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Union
+
+from crm_core.config.settings import settings
 from crm_core.events.events import Event
 
+BLOQUEAR = "bloquear"
+DESCARTAR_NOVO = "descartar_novo"
+DESCARTAR_ANTIGO = "descartar_antigo"
+POLITICAS = (BLOQUEAR, DESCARTAR_NOVO, DESCARTAR_ANTIGO)
+
+# Amostras guardadas por medida para calcular o p95
+AMOSTRAS = 1024
+
+_FIM = object()
+
+
+class _Medida:
+    """Amostras recentes de uma duração, em segundos."""
 
-class EventBus:
     def __init__(self):
-        self._handlers: Dict[str, List[Callable]] = {}
+        self._amostras = deque(maxlen=AMOSTRAS)
+        self.maximo = 0.0
+
+    def registrar(self, segundos: float):
+        self._amostras.append(segundos)
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def resumo(self) -> Dict[str, Optional[float]]:
+        amostras = sorted(self._amostras)
+        if not amostras:
+            return {"media_ms": None, "p95_ms": None, "max_ms": None}
+        p95 = amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))]
+        return {
+            "media_ms": round(sum(amostras) / len(amostras) * 1000, 3),
+            "p95_ms": round(p95 * 1000, 3),
+            "max_ms": round(self.maximo * 1000, 3),
+        }
+
+
+class Assinatura:
+    def __init__(self, event_type: str, handler: Callable, nome: str, em_fila: bool, workers: int,
+                 lote: Optional[int], espera_lote: float, max_fila: int, politica: str, timeout_bloqueio: float):
+        self.event_type = event_type
+        self.handler = handler
+        self.nome = nome
+        self.em_fila = em_fila
+        self.lote = lote
+        self.espera_lote = espera_lote
+        self.politica = politica
+        self.timeout_bloqueio = timeout_bloqueio
+        self.fila: Optional[queue.Queue] = queue.Queue(maxsize=max_fila) if em_fila else None
+        self.entregues = 0
+        self.erros = 0
+        self.descartados = 0
+        self.ultimo_erro: Optional[str] = None
+        self.espera = _Medida()
+        self.duracao = _Medida()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        if em_fila:
+            for i in range(workers):
+                worker = threading.Thread(target=self._trabalhar, name=f"eventos-{nome}-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    # Entrega
+    def enfileirar(self, evento: Event):
+        item = (time.monotonic(), evento)
+        if self.politica == BLOQUEAR:
+            try:
+                self.fila.put(item, timeout=self.timeout_bloqueio)
+            except queue.Full:
+                self._descartar()
+        elif self.politica == DESCARTAR_NOVO:
+            try:
+                self.fila.put_nowait(item)
+            except queue.Full:
+                self._descartar()
+        else:
+            while True:
+                try:
+                    self.fila.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.fila.get_nowait()
+                        self.fila.task_done()
+                        self._descartar()
+                    except queue.Empty:
+                        pass
+
+    def _descartar(self):
+        with self._lock:
+            self.descartados += 1
 
-    def subscribe(self, event_type: str, handler: Callable):
-        if event_type not in self._handlers:
-            self._handlers[event_type] = []
-        self._handlers[event_type].append(handler)
+    def executar(self, argumento, quantidade: int, loop=None):
+        """Chama o handler isolando erros; devolve o loop usado por handlers ``async``."""
+        inicio = time.monotonic()
+        try:
+            resultado = self.handler(argumento)
+            if inspect.isawaitable(resultado):
+                loop = loop or asyncio.new_event_loop()
+                loop.run_until_complete(resultado)
+        except Exception as e:
+            with self._lock:
+                self.erros += 1
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+            print(f"Aviso: handler '{self.nome}' falhou ao tratar {self.event_type}: {e}")
+        else:
+            with self._lock:
+                self.entregues += quantidade
+        finally:
+            self.duracao.registrar(time.monotonic() - inicio)
+        return loop
+
+    def _trabalhar(self):
+        loop = None
+        parar = False
+        while not parar:
+            itens = [self.fila.get()]
+            if self.lote:
+                limite = time.monotonic() + self.espera_lote
+                while len(itens) < self.lote and itens[-1] is not _FIM:
+                    restante = limite - time.monotonic()
+                    try:
+                        itens.append(self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait())
+                    except queue.Empty:
+                        break
+            if itens[-1] is _FIM:
+                parar = True
+                itens.pop()
+                self.fila.task_done()
+            if itens:
+                agora = time.monotonic()
+                for publicado_em, _ in itens:
+                    self.espera.registrar(agora - publicado_em)
+                eventos = [evento for _, evento in itens]
+                loop = self.executar(eventos if self.lote else eventos[0], len(eventos), loop)
+                for _ in itens:
+                    self.fila.task_done()
+        if loop is not None:
+            loop.close()
+
+    # Ciclo de vida
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar e os eventos em andamento terminarem."""
+        if self.fila is None:
+            return True
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self.fila.all_tasks_done:
+            while self.fila.unfinished_tasks:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self.fila.all_tasks_done.wait(restante)
+        return True
+
+    def parar(self, timeout: Optional[float] = None):
+        for _ in self._workers:
+            self.fila.put(_FIM)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def metricas(self) -> dict:
+        with self._lock:
+            dados = {
+                "evento": self.event_type,
+                "handler": self.nome,
+                "em_fila": self.em_fila,
+                "workers": len(self._workers),
+                "lote": self.lote,
+                "politica": self.politica if self.em_fila else None,
+                "entregues": self.entregues,
+                "erros": self.erros,
+                "descartados": self.descartados,
+                "ultimo_erro": self.ultimo_erro,
+            }
+        dados["fila"] = self.fila.qsize() if self.fila is not None else 0
+        dados["max_fila"] = self.fila.maxsize if self.fila is not None else None
+        dados["espera"] = self.espera.resumo()
+        dados["duracao"] = self.duracao.resumo()
+        return dados
+
+
+class EventBus:
+    def __init__(self, max_fila: Optional[int] = None, timeout_bloqueio: Optional[float] = None):
+        self.max_fila = max_fila or settings.eventos_max_fila
+        self.timeout_bloqueio = settings.eventos_timeout_bloqueio if timeout_bloqueio is None else timeout_bloqueio
+        self._handlers: Dict[str, List[Assinatura]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        event_type: Union[str, type],
+        handler: Callable,
+        em_fila: bool = False,
+        workers: int = 1,
+        lote: Optional[int] = None,
+        espera_lote: Optional[float] = None,
+        max_fila: Optional[int] = None,
+        politica: str = BLOQUEAR,
+        nome: Optional[str] = None,
+    ) -> Assinatura:
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica}")
+        if not isinstance(event_type, str):
+            event_type = event_type.__name__
+        assinatura = Assinatura(
+            event_type,
+            handler,
+            nome or getattr(handler, "__qualname__", repr(handler)),
+            em_fila or bool(lote) or inspect.iscoroutinefunction(handler),
+            max(1, workers),
+            lote,
+            settings.eventos_espera_lote if espera_lote is None else espera_lote,
+            max_fila or self.max_fila,
+            politica,
+            self.timeout_bloqueio,
+        )
+        with self._lock:
+            # Lista nova a cada alteração: publish itera sem lock
+            self._handlers[event_type] = self._handlers.get(event_type, []) + [assinatura]
+        return assinatura
+
+    def unsubscribe(self, assinatura: Assinatura, timeout: Optional[float] = None):
+        with self._lock:
+            self._handlers[assinatura.event_type] = [
+                a for a in self._handlers.get(assinatura.event_type, []) if a is not assinatura
+            ]
+        if assinatura.em_fila:
+            assinatura.parar(timeout)
 
     def publish(self, event: Event):
         event_type = type(event).__name__
-        if event_type in self._handlers:
-            for handler in self._handlers[event_type]:
-                handler(event)
+        for assinatura in self._handlers.get(event_type, ()):
+            if assinatura.em_fila:
+                assinatura.enfileirar(event)
+            else:
+                assinatura.executar(event, 1)
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera todas as filas esvaziarem (testes, scripts e desligamento)."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        for assinatura in self._assinaturas():
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            if not assinatura.aguardar(restante):
+                return False
+        return True
+
+    def parar(self, timeout: Optional[float] = None):
+        """Entrega o que está nas filas e encerra os workers."""
+        for assinatura in self._assinaturas():
+            if assinatura.em_fila:
+                assinatura.parar(timeout)
+
+    def metricas(self) -> List[dict]:
+        return [assinatura.metricas() for assinatura in self._assinaturas()]
+
+    def _assinaturas(self) -> List[Assinatura]:
+        with self._lock:
+            return [assinatura for assinaturas in self._handlers.values() for assinatura in assinaturas]
+
+
+# Barramento compartilhado pelo processo
+event_bus = EventBus()
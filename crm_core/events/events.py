@@ -26,3 +26,27 @@ class OrdemServicoCreatedEvent(Event):
 class ProdutoCreatedEvent(Event):
     def __init__(self, produto_id: int, nome: str):
         super().__init__({'produto_id': produto_id, 'nome': nome})
+
+
+class ContratoCreatedEvent(Event):
+    def __init__(self, contrato_id: int, cliente_id: int):
+        super().__init__({'contrato_id': contrato_id, 'cliente_id': cliente_id})
+
+
+class ContratoStatusChangedEvent(Event):
+    """Contrato assinado ou liberado."""
+
+    def __init__(self, contrato_id: int, cliente_id: int, status: str):
+        super().__init__({'contrato_id': contrato_id, 'cliente_id': cliente_id, 'status': status})
+
+
+class FaturaPaidEvent(Event):
+    def __init__(self, fatura_id: int, cliente_id: int, valor_total: float):
+        super().__init__({'fatura_id': fatura_id, 'cliente_id': cliente_id, 'valor_total': valor_total})
+
+
+class SessoesPPPoEChangedEvent(Event):
+    """Logins que conectaram e desconectaram desde a última leitura do ``/ppp/active``."""
+
+    def __init__(self, conectados: list, desconectados: list):
+        super().__init__({'conectados': conectados, 'desconectados': desconectados})
@@ -1,12 +1,35 @@
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+"""Middleware ASGI que valida o token JWT das rotas não públicas.
+
+Implementado direto sobre a interface ASGI (sem ``BaseHTTPMiddleware``) para
+não criar tarefa nem stream extra por resposta: rotas públicas e arquivos
+estáticos passam direto para a aplicação. As rotas públicas são comparadas
+por uma única expressão regular compilada na criação do middleware.
+
+Os logs usam ``logging`` com campos estruturados em ``extra`` e são
+amostrados (``auth_log_amostragem``); erros são sempre registrados.
+
+Hoje nenhuma aplicação o registra (as rotas usam ``obter_usuario_atual``,
+que reaproveita o usuário deixado aqui quando o middleware está ativo).
+"""
+import logging
+import random
+import re
+import time
+from typing import Callable, Iterable
+
+from fastapi import status
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
+
+from crm_core.config.settings import settings
 from crm_core.security.auth_utils import decodificar_token
-from crm_core.db.base import get_db_session
-from crm_modules.usuarios.models import Usuario
-from typing import List
+from crm_core.security.usuario_cache import usuario_cache
+
+logger = logging.getLogger(__name__)
 
-# Rotas que não precisam de autenticação
+# Rotas que não precisam de autenticação. Cada entrada vale para o próprio
+# caminho e para os que ficam abaixo dele ("/static" cobre "/static/css/x.css",
+# mas não "/staticos"); "/" vale só para a raiz.
 ROTAS_PUBLICAS = [
     # Páginas HTML (GET requests) - deixar públicas, validação feita no client
     "/",
@@ -41,6 +64,8 @@ ROTAS_PUBLICAS = [
     "/boletos",
     "/carnes",
     # APIs de autenticação
+    "/api/v1/usuarios/registrar",
+    "/api/v1/usuarios/login",
     "/api/usuarios/registrar",
     "/api/usuarios/login",
     # Documentação e estáticos
@@ -50,84 +75,127 @@ ROTAS_PUBLICAS = [
     "/static",
 ]
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Middleware que valida token JWT em todas as requisições"""
-    
-    async def dispatch(self, request: Request, call_next):
+
+def compilar_rotas_publicas(rotas: Iterable[str]) -> Callable[[str], bool]:
+    """Função que diz se um caminho é público, com as rotas numa só regex."""
+    rotas = set(rotas)
+    prefixos = sorted({rota.rstrip("/") for rota in rotas if rota.rstrip("/")}, key=len, reverse=True)
+    alternativas = []
+    if prefixos:
+        alternativas.append("(?:%s)(?:/.*)?" % "|".join(re.escape(p) for p in prefixos))
+    if "/" in rotas:
+        alternativas.append("/")
+    if not alternativas:
+        return lambda path: False
+    padrao = re.compile("|".join(alternativas), re.DOTALL)
+    return lambda path: padrao.fullmatch(path) is not None
+
+
+eh_rota_publica = compilar_rotas_publicas(ROTAS_PUBLICAS)
+
+
+def _nao_autorizado(detalhe: str, desafio: bool = True) -> JSONResponse:
+    headers = {"WWW-Authenticate": "Bearer"} if desafio else None
+    return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": detalhe}, headers=headers)
+
+
+class AuthMiddleware:
+    """Middleware que valida token JWT em todas as requisições não públicas"""
+
+    def __init__(self, app, rotas_publicas: Iterable[str] = None, amostragem: float = None):
+        self.app = app
+        self._eh_publica = compilar_rotas_publicas(rotas_publicas) if rotas_publicas is not None else eh_rota_publica
+        self.amostragem = settings.auth_log_amostragem if amostragem is None else amostragem
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registrar = self.amostragem > 0 and random.random() < self.amostragem
+        inicio = time.perf_counter() if registrar else 0.0
+        path = scope["path"]
+        resposta_status = []
+        if registrar:
+            send = self._capturar_status(send, resposta_status)
+
+        if self._eh_publica(path):
+            await self.app(scope, receive, send)
+            if registrar:
+                self._registrar(scope, "publica", inicio, resposta_status)
+            return
+
         try:
-            # Verificar se a rota é pública
-            is_public = self._eh_rota_publica(request.url.path)
-            print(f"[AUTH] Path: {request.url.path}, Public: {is_public}, Method: {request.method}")
-            if is_public:
-                response = await call_next(request)
-                print(f"[AUTH] Static response status: {response.status_code}")
-                return response
-            
-            # Extrair token do header
-            auth_header = request.headers.get("authorization")
-            
-            if not auth_header:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Credenciais nao fornecidas"},
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            try:
-                scheme, token = auth_header.split()
-                if scheme.lower() != "bearer":
-                    raise ValueError()
-            except ValueError:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Formato de token invalido"},
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            # Validar token
-            payload = decodificar_token(token)
-            if payload is None:
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Token invalido ou expirado"},
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-            
-            # Verificar se usuário existe e está ativo
-            db = get_db_session()
-            try:
-                usuario_id = payload.get("usuario_id")
-                if not usuario_id:
-                    return JSONResponse(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        content={"detail": "Token invalido"},
-                    )
-                usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-                
-                if not usuario or not usuario.ativo:
-                    return JSONResponse(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        content={"detail": "Usuario invalido ou inativo"},
-                    )
-                
-                # Adicionar usuário ao request para uso nas rotas
-                request.state.usuario = usuario
-                
-            finally:
-                db.close()
-            
-            response = await call_next(request)
-            return response
-        except Exception as e:
-            print(f"[AUTH ERROR] {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return JSONResponse(
+            resposta = await self._autenticar(scope)
+        except Exception:
+            logger.exception("Erro ao autenticar requisição", extra={"path": path, "metodo": scope["method"]})
+            resposta = JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"detail": f"Erro interno: {str(e)}"},
+                content={"detail": "Erro interno ao validar credenciais"},
             )
-    
+
+        if resposta is not None:
+            await resposta(scope, receive, send)
+            if registrar:
+                self._registrar(scope, "negada", inicio, resposta_status)
+            return
+
+        await self.app(scope, receive, send)
+        if registrar:
+            self._registrar(scope, "autenticada", inicio, resposta_status)
+
+    async def _autenticar(self, scope):
+        """Coloca o usuário em ``scope["state"]``; devolve a resposta de erro quando negado."""
+        auth_header = None
+        for nome, valor in scope["headers"]:
+            if nome == b"authorization":
+                auth_header = valor.decode("latin-1")
+                break
+
+        if not auth_header:
+            return _nao_autorizado("Credenciais nao fornecidas")
+
+        partes = auth_header.split()
+        if len(partes) != 2 or partes[0].lower() != "bearer":
+            return _nao_autorizado("Formato de token invalido")
+
+        payload = decodificar_token(partes[1])
+        if payload is None:
+            return _nao_autorizado("Token invalido ou expirado")
+
+        # Verificar se usuário existe e está ativo (cache de usuários)
+        usuario_id = payload.get("usuario_id")
+        if not usuario_id:
+            return _nao_autorizado("Token invalido", desafio=False)
+        usuario = usuario_cache.em_cache(usuario_id) or await run_in_threadpool(usuario_cache.obter, usuario_id)
+
+        if not usuario or not usuario.ativo:
+            return _nao_autorizado("Usuario invalido ou inativo", desafio=False)
+
+        # Equivale a request.state.usuario; obter_usuario_atual o reaproveita
+        scope.setdefault("state", {})["usuario"] = usuario
+        return None
+
+    @staticmethod
+    def _capturar_status(send, destino: list):
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                destino.append(mensagem["status"])
+            await send(mensagem)
+        return enviar
+
     @staticmethod
-    def _eh_rota_publica(path: str) -> bool:
-        """Verifica se a rota é pública"""
-        return any(path.startswith(rota) for rota in ROTAS_PUBLICAS)
+    def _registrar(scope, resultado: str, inicio: float, resposta_status: list):
+        logger.info(
+            "auth %s %s %s",
+            scope["method"],
+            scope["path"],
+            resultado,
+            extra={
+                "path": scope["path"],
+                "metodo": scope["method"],
+                "resultado": resultado,
+                "status": resposta_status[0] if resposta_status else None,
+                "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            },
+        )
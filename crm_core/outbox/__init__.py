@@ -0,0 +1,27 @@
+from crm_core.outbox.models import CONCLUIDO, MORTO, PENDENTE, PROCESSANDO, OutboxModel
+from crm_core.outbox.despachante import (
+    DespachanteOutbox,
+    ErroDefinitivo,
+    despachante_outbox,
+    listar_mortas,
+    registrar,
+    reprocessar,
+    resumo,
+    tratador,
+)
+
+__all__ = [
+    "CONCLUIDO",
+    "MORTO",
+    "PENDENTE",
+    "PROCESSANDO",
+    "OutboxModel",
+    "DespachanteOutbox",
+    "ErroDefinitivo",
+    "despachante_outbox",
+    "listar_mortas",
+    "registrar",
+    "reprocessar",
+    "resumo",
+    "tratador",
+]
@@ -0,0 +1,407 @@
+"""Outbox transacional para efeitos colaterais fora do banco.
+
+Em vez de chamar MikroTik ou Gerencianet no meio da requisição, o service
+grava uma mensagem com ``registrar`` na mesma sessão (e no mesmo commit) da
+alteração de domínio: ou as duas coisas ficam gravadas, ou nenhuma.
+
+O ``DespachanteOutbox`` esvazia a tabela em lotes:
+
+- Reserva até ``outbox_lote`` mensagens vencidas (``FOR UPDATE SKIP LOCKED``
+  onde o banco suporta) e as marca ``processando`` por ``outbox_reserva``
+  segundos; uma reserva vencida (processo que caiu) é retomada por outro.
+  A marcação é um ``UPDATE`` condicional por mensagem: sem ``SKIP LOCKED``
+  (SQLite), se dois despachantes leem a mesma linha só um a reserva.
+- Executa os tratadores em threads, respeitando o limite de execuções
+  simultâneas por destino (``outbox_concorrencia``): ex. um por roteador
+  MikroTik, dois no Gerencianet.
+- O tratador recebe uma sessão própria; o que ele gravar nela é confirmado
+  no mesmo commit que marca a mensagem ``concluido``.
+- Falha: nova tentativa com backoff exponencial (com jitter); esgotadas
+  ``outbox_max_tentativas``, a mensagem fica ``morto`` até ``reprocessar``.
+  ``ErroDefinitivo`` vai direto para ``morto`` (ex.: não se sabe se a
+  chamada externa teve efeito e repetir poderia duplicá-lo).
+
+A entrega é "pelo menos uma vez": tratadores devem ser idempotentes.
+``chave`` evita mensagens repetidas para o mesmo alvo: uma nova mensagem com
+a chave de outra ainda pendente só atualiza o payload desta.
+"""
+import importlib
+import json
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import Session
+
+from crm_core.config.settings import settings
+from crm_core.outbox.models import CONCLUIDO, MORTO, PENDENTE, PROCESSANDO, OutboxModel
+from crm_core.utils.exceptions import NotFoundException, ValidationException
+
+# Módulos que registram tratadores com @tratador (importados sob demanda)
+TRATADORES_MODULOS = (
+    "crm_modules.mikrotik.outbox",
+    "crm_modules.faturamento.outbox",
+)
+
+_tratadores: Dict[str, tuple] = {}
+_modulos_carregados = False
+
+MASCARA = "***"
+
+
+class ErroDefinitivo(Exception):
+    """Falha de tratador que não deve ser repetida automaticamente."""
+
+
+def tratador(tipo: str, sensiveis: Iterable[str] = ()):
+    """Registra a função ``(db, payload)`` que executa as mensagens de ``tipo``.
+
+    Chaves em ``sensiveis`` (ex.: senhas) são apagadas do payload quando a
+    mensagem é concluída e mascaradas na listagem de mensagens mortas.
+    """
+    def decorar(funcao: Callable):
+        _tratadores[tipo] = (funcao, tuple(sensiveis))
+        return funcao
+    return decorar
+
+
+def _carregar_tratadores():
+    global _modulos_carregados
+    if _modulos_carregados:
+        return
+    for modulo in TRATADORES_MODULOS:
+        importlib.import_module(modulo)
+    _modulos_carregados = True
+
+
+def _obter_tratador(tipo: str):
+    if tipo not in _tratadores:
+        _carregar_tratadores()
+    return _tratadores.get(tipo, (None, ()))
+
+
+def _mascarar(payload: dict, sensiveis: Iterable[str]) -> dict:
+    return {chave: (MASCARA if chave in sensiveis else valor) for chave, valor in payload.items()}
+
+
+def registrar(session: Session, tipo: str, payload: dict, destino: str = "padrao",
+              chave: Optional[str] = None) -> OutboxModel:
+    """Adiciona uma mensagem à sessão, sem commit: ela vai junto com o commit de quem chamou."""
+    conteudo = json.dumps(payload, default=str, ensure_ascii=False)
+    agora = datetime.utcnow()
+    existente = None
+    if chave:
+        # A sessão não faz autoflush: procura também entre os objetos ainda não gravados
+        existente = next((obj for obj in session.new if isinstance(obj, OutboxModel)
+                          and obj.chave_idempotencia == chave and obj.status == PENDENTE), None)
+        if existente is None:
+            existente = session.query(OutboxModel).filter(
+                OutboxModel.chave_idempotencia == chave,
+                OutboxModel.status == PENDENTE,
+            ).first()
+    if existente is not None:
+        existente.tipo = tipo
+        existente.destino = destino
+        existente.payload = conteudo
+        existente.proxima_tentativa = agora
+        mensagem = existente
+    else:
+        mensagem = OutboxModel(
+            tipo=tipo,
+            destino=destino,
+            chave_idempotencia=chave,
+            payload=conteudo,
+            status=PENDENTE,
+            tentativas=0,
+            proxima_tentativa=agora,
+            criado_em=agora,
+        )
+        session.add(mensagem)
+
+    if not session.info.get("outbox_acordar"):
+        session.info["outbox_acordar"] = True
+
+        def _apos_commit(sessao):
+            sessao.info.pop("outbox_acordar", None)
+            despachante_outbox.acordar()
+
+        event.listen(session, "after_commit", _apos_commit, once=True)
+    return mensagem
+
+
+class DespachanteOutbox:
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        lote: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_tentativas: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        reserva: Optional[int] = None,
+        intervalo: Optional[float] = None,
+        concorrencia: Optional[Dict[str, int]] = None,
+        concorrencia_padrao: Optional[int] = None,
+    ):
+        self._session_factory = session_factory
+        self.lote = lote or settings.outbox_lote
+        self.workers = workers or settings.outbox_workers
+        self.max_tentativas = max_tentativas or settings.outbox_max_tentativas
+        self.backoff_base = settings.outbox_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.outbox_backoff_max if backoff_max is None else backoff_max
+        self.reserva = reserva or settings.outbox_reserva
+        self.intervalo = intervalo or settings.outbox_intervalo
+        self.concorrencia = settings.outbox_concorrencia if concorrencia is None else concorrencia
+        self.concorrencia_padrao = concorrencia_padrao or settings.outbox_concorrencia_padrao
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._acordado = threading.Event()
+        self._parar = threading.Event()
+        self._processando = threading.Lock()
+
+    def _sessao(self) -> Session:
+        if self._session_factory is None:
+            from crm_core.db.base import get_db_session
+            return get_db_session()
+        return self._session_factory()
+
+    def limite(self, destino: str) -> int:
+        """Execuções simultâneas permitidas para o destino (nome exato, depois o prefixo)."""
+        limite = self.concorrencia.get(destino) or self.concorrencia.get(destino.split(":", 1)[0])
+        return max(1, limite or self.concorrencia_padrao)
+
+    def atraso(self, tentativas: int) -> float:
+        """Segundos até a próxima tentativa: base * 2^(n-1), limitado, com ±20% de jitter."""
+        atraso = min(self.backoff_max, self.backoff_base * (2 ** max(0, tentativas - 1)))
+        return atraso * random.uniform(0.8, 1.2)
+
+    # Reserva
+    def _reservar(self) -> List[dict]:
+        agora = datetime.utcnow()
+        vencida = or_(
+            and_(OutboxModel.status == PENDENTE, OutboxModel.proxima_tentativa <= agora),
+            and_(OutboxModel.status == PROCESSANDO, OutboxModel.reservado_ate < agora),
+        )
+        db = self._sessao()
+        try:
+            candidatas = db.query(OutboxModel.id, OutboxModel.status, OutboxModel.tentativas).filter(
+                vencida).order_by(OutboxModel.id).limit(self.lote).with_for_update(skip_locked=True).all()
+
+            itens = []
+            for mensagem_id, status, tentativas in candidatas:
+                # Só vale se a linha ainda estiver como foi lida: outro despachante pode ter reservado antes
+                condicao = db.query(OutboxModel).filter(
+                    OutboxModel.id == mensagem_id, OutboxModel.status == status,
+                    OutboxModel.tentativas == tentativas, vencida,
+                )
+                if status == PROCESSANDO and tentativas >= self.max_tentativas:
+                    # A tentativa anterior nunca terminou (processo caiu) e era a última
+                    condicao.update({
+                        OutboxModel.status: MORTO,
+                        OutboxModel.reservado_ate: None,
+                        OutboxModel.ultimo_erro: func.coalesce(OutboxModel.ultimo_erro,
+                                                               "Reserva expirou sem conclusão"),
+                    }, synchronize_session=False)
+                    continue
+                reservadas = condicao.update({
+                    OutboxModel.status: PROCESSANDO,
+                    OutboxModel.tentativas: tentativas + 1,
+                    OutboxModel.reservado_ate: agora + timedelta(seconds=self.reserva),
+                }, synchronize_session=False)
+                if reservadas != 1:
+                    continue
+                tipo, destino, payload = db.query(
+                    OutboxModel.tipo, OutboxModel.destino, OutboxModel.payload
+                ).filter(OutboxModel.id == mensagem_id).one()
+                itens.append({
+                    "id": mensagem_id,
+                    "tipo": tipo,
+                    "destino": destino,
+                    "payload": json.loads(payload or "{}"),
+                })
+            db.commit()
+            return itens
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # Execução
+    def _executar(self, item: dict) -> str:
+        funcao, sensiveis = _obter_tratador(item["tipo"])
+        db = self._sessao()
+        try:
+            if funcao is None:
+                return self._falhar(db, item, LookupError(f"Nenhum tratador para '{item['tipo']}'"), definitivo=True)
+            try:
+                funcao(db, item["payload"])
+                mensagem = db.get(OutboxModel, item["id"])
+                mensagem.status = CONCLUIDO
+                mensagem.reservado_ate = None
+                mensagem.ultimo_erro = None
+                mensagem.processado_em = datetime.utcnow()
+                if sensiveis:
+                    payload = {k: v for k, v in item["payload"].items() if k not in sensiveis}
+                    mensagem.payload = json.dumps(payload, default=str, ensure_ascii=False)
+                db.commit()
+                return CONCLUIDO
+            except Exception as e:
+                db.rollback()
+                return self._falhar(db, item, e, definitivo=isinstance(e, ErroDefinitivo))
+        finally:
+            db.close()
+
+    def _falhar(self, db: Session, item: dict, erro: Exception, definitivo: bool = False) -> str:
+        mensagem = db.get(OutboxModel, item["id"])
+        if mensagem is None or mensagem.status != PROCESSANDO:
+            return PENDENTE if mensagem is None else mensagem.status
+        mensagem.ultimo_erro = f"{type(erro).__name__}: {erro}"[:2000]
+        mensagem.reservado_ate = None
+        if definitivo or mensagem.tentativas >= self.max_tentativas:
+            mensagem.status = MORTO
+            print(f"Aviso: outbox {mensagem.id} ({mensagem.tipo}) desistiu após "
+                  f"{mensagem.tentativas} tentativa(s): {mensagem.ultimo_erro}")
+        else:
+            mensagem.status = PENDENTE
+            mensagem.proxima_tentativa = datetime.utcnow() + timedelta(seconds=self.atraso(mensagem.tentativas))
+            print(f"Aviso: outbox {mensagem.id} ({mensagem.tipo}) falhou na tentativa "
+                  f"{mensagem.tentativas}: {mensagem.ultimo_erro}")
+        db.commit()
+        return mensagem.status
+
+    def _faixa(self, fila: deque, resultado: Dict[str, int], lock: threading.Lock):
+        """Executa mensagens de um destino em sequência até a fila dele acabar."""
+        while True:
+            try:
+                item = fila.popleft()
+            except IndexError:
+                return
+            try:
+                status = self._executar(item)
+            except Exception as e:
+                print(f"Aviso: erro ao finalizar outbox {item['id']}: {e}")
+                status = PROCESSANDO  # fica reservada; volta quando a reserva vencer
+            with lock:
+                resultado[status] = resultado.get(status, 0) + 1
+
+    def processar(self) -> Dict[str, int]:
+        """Uma rodada: reserva um lote e executa tudo, por destino em paralelo."""
+        with self._processando:
+            itens = self._reservar()
+            resultado = {"processadas": len(itens)}
+            if not itens:
+                return resultado
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="outbox")
+
+            por_destino: Dict[str, deque] = {}
+            for item in itens:
+                por_destino.setdefault(item["destino"], deque()).append(item)
+            lock = threading.Lock()
+            futuros = [
+                self._executor.submit(self._faixa, fila, resultado, lock)
+                for destino, fila in por_destino.items()
+                for _ in range(min(self.limite(destino), len(fila)))
+            ]
+            for futuro in futuros:
+                futuro.result()
+            return resultado
+
+    def drenar(self, max_rodadas: int = 100) -> Dict[str, int]:
+        """Processa rodadas até não haver mensagens vencidas (job agendado, scripts e testes)."""
+        total: Dict[str, int] = {}
+        for _ in range(max_rodadas):
+            resultado = self.processar()
+            for chave, valor in resultado.items():
+                total[chave] = total.get(chave, 0) + valor
+            if not resultado["processadas"]:
+                break
+        return total
+
+    # Laço em segundo plano
+    def acordar(self):
+        self._acordado.set()
+
+    def iniciar(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._laco, name="outbox-despachante", daemon=True)
+        self._thread.start()
+
+    def _laco(self):
+        while not self._parar.is_set():
+            try:
+                resultado = self.processar()
+            except Exception as e:
+                print(f"Aviso: falha ao despachar outbox: {e}")
+                resultado = {"processadas": 0}
+            if resultado["processadas"] >= self.lote:
+                continue  # lote cheio: provavelmente há mais esperando
+            self._acordado.wait(self.intervalo)
+            self._acordado.clear()
+
+    def parar(self, timeout: Optional[float] = None):
+        self._parar.set()
+        self._acordado.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Mensagens mortas e acompanhamento
+def resumo(db: Session) -> dict:
+    por_status = dict(db.query(OutboxModel.status, func.count(OutboxModel.id)).group_by(OutboxModel.status).all())
+    mais_antiga = db.query(func.min(OutboxModel.criado_em)).filter(OutboxModel.status == PENDENTE).scalar()
+    mortas_por_tipo = dict(db.query(OutboxModel.tipo, func.count(OutboxModel.id)).filter(
+        OutboxModel.status == MORTO).group_by(OutboxModel.tipo).all())
+    return {
+        "por_status": {status: por_status.get(status, 0) for status in (PENDENTE, PROCESSANDO, CONCLUIDO, MORTO)},
+        "pendente_mais_antiga": mais_antiga,
+        "mortas_por_tipo": mortas_por_tipo,
+    }
+
+
+def listar_mortas(db: Session, limite: int = 50, offset: int = 0) -> List[dict]:
+    mensagens = db.query(OutboxModel).filter(OutboxModel.status == MORTO).order_by(
+        OutboxModel.id.desc()).offset(offset).limit(limite).all()
+    itens = []
+    for mensagem in mensagens:
+        _, sensiveis = _obter_tratador(mensagem.tipo)
+        itens.append({
+            "id": mensagem.id,
+            "tipo": mensagem.tipo,
+            "destino": mensagem.destino,
+            "chave_idempotencia": mensagem.chave_idempotencia,
+            "payload": _mascarar(json.loads(mensagem.payload or "{}"), sensiveis),
+            "tentativas": mensagem.tentativas,
+            "ultimo_erro": mensagem.ultimo_erro,
+            "criado_em": mensagem.criado_em,
+        })
+    return itens
+
+
+def reprocessar(db: Session, mensagem_id: int) -> OutboxModel:
+    """Devolve uma mensagem morta à fila, com as tentativas zeradas."""
+    mensagem = db.get(OutboxModel, mensagem_id)
+    if mensagem is None:
+        raise NotFoundException("Mensagem da outbox não encontrada")
+    if mensagem.status != MORTO:
+        raise ValidationException("Só mensagens mortas podem ser reprocessadas")
+    mensagem.status = PENDENTE
+    mensagem.tentativas = 0
+    mensagem.proxima_tentativa = datetime.utcnow()
+    db.commit()
+    despachante_outbox.acordar()
+    return mensagem
+
+
+despachante_outbox = DespachanteOutbox()
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from crm_core.db.models_base import Base
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+# Esgotou as tentativas (dead letter); volta com ``reprocessar``
+MORTO = "morto"
+
+
+class OutboxModel(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(100), nullable=False, index=True)  # ex.: "mikrotik.sincronizar_cliente"
+    destino = Column(String(100), nullable=False, default="padrao")  # ex.: "mikrotik:3", "gerencianet"
+    chave_idempotencia = Column(String(255), nullable=True, index=True)
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(String(20), nullable=False, default=PENDENTE)
+    tentativas = Column(Integer, nullable=False, default=0)
+    proxima_tentativa = Column(DateTime, nullable=False, default=datetime.utcnow)
+    reservado_ate = Column(DateTime, nullable=True)
+    ultimo_erro = Column(Text, nullable=True)
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    processado_em = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Reserva: pendentes (ou reservas vencidas) em ordem de chegada
+        Index("ix_outbox_status_proxima", "status", "proxima_tentativa"),
+    )
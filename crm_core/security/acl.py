@@ -1,13 +1,71 @@
-from typing import List, Set, Optional
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 from enum import Enum
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from crm_core.config.settings import settings
 from crm_core.db.base import get_db_session
 
 try:
-    from crm_modules.usuarios.models import Usuario, Permissao
+    from crm_modules.usuarios.models import Usuario, Permissao, Grupo
 except:
     Usuario = None
     Permissao = None
+    Grupo = None
+
+# Versões das permissões: a geral muda quando grupos mudam (afeta vários
+# usuários); a de cada usuário, quando as permissões/grupos dele mudam.
+# Conjuntos calculados com outra versão são descartados na próxima consulta.
+_versoes_lock = threading.Lock()
+_versao_geral = 0
+_versoes_usuario: Dict[int, int] = {}
+
+
+def invalidar_permissoes(usuario_id: Optional[int] = None):
+    """Invalida as permissões em cache de um usuário, ou de todos sem ``usuario_id``."""
+    global _versao_geral
+    with _versoes_lock:
+        if usuario_id is None:
+            _versao_geral += 1
+        else:
+            _versoes_usuario[usuario_id] = _versoes_usuario.get(usuario_id, 0) + 1
+
+
+def _versao(usuario_id: int) -> Tuple[int, int]:
+    return _versao_geral, _versoes_usuario.get(usuario_id, 0)
+
+
+@dataclass(frozen=True)
+class PermissoesEfetivas:
+    """Permissões diretas e herdadas de grupos, achatadas para consulta O(1).
+
+    ``chaves`` contém pares ``(permissão, recurso)``: cada permissão vale
+    pelo nome e, se o nome terminar com ``_<modulo>``, também pelo prefixo
+    (``read_clientes`` do módulo ``clientes`` responde a ``read``), tanto
+    sem recurso quanto para o próprio módulo.
+    """
+    admin: bool
+    nomes: FrozenSet[str]
+    chaves: FrozenSet[Tuple[str, Optional[str]]]
+
+    @classmethod
+    def calcular(cls, role, permissoes) -> "PermissoesEfetivas":
+        nomes = set()
+        chaves = set()
+        for nome, modulo in permissoes:
+            nomes.add(nome)
+            aceitos = [nome]
+            if modulo and nome.endswith(f"_{modulo}"):
+                aceitos.append(nome[:-len(modulo) - 1])
+            for aceito in aceitos:
+                chaves.add((aceito, None))
+                if modulo:
+                    chaves.add((aceito, modulo))
+        return cls(admin=getattr(role, "value", role) == "admin", nomes=frozenset(nomes), chaves=frozenset(chaves))
+
+    def permite(self, permission_name: str, resource: Optional[str] = None) -> bool:
+        return self.admin or (permission_name, resource) in self.chaves
 
 
 class PermissionType(Enum):
@@ -22,8 +80,45 @@ class PermissionType(Enum):
 class ACL:
     """Access Control List - Sistema de permissões baseado em banco de dados"""
 
-    def __init__(self):
-        self._cache = {}  # Cache de permissões por usuário
+    def __init__(self, ttl: Optional[float] = None):
+        self._cache = {}  # usuario_id -> (versão, expira_em, PermissoesEfetivas)
+        self._lock = threading.Lock()
+        # Limita o atraso de alterações feitas por outro processo
+        self.ttl = ttl if ttl is not None else settings.acl_cache_ttl
+
+    def permissoes_efetivas(self, usuario_id: int) -> Optional[PermissoesEfetivas]:
+        """Permissões do usuário, calculadas uma vez e reaproveitadas até mudarem."""
+        versao = _versao(usuario_id)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._cache.get(usuario_id)
+        if item and item[0] == versao and item[1] > agora:
+            return item[2]
+
+        efetivas = self._carregar_permissoes(usuario_id)
+        with self._lock:
+            if efetivas is None:
+                self._cache.pop(usuario_id, None)
+            else:
+                # Guardado com a versão lida antes da carga: se algo mudou no meio, recalcula
+                self._cache[usuario_id] = (versao, agora + self.ttl, efetivas)
+        return efetivas
+
+    def _carregar_permissoes(self, usuario_id: int) -> Optional[PermissoesEfetivas]:
+        db = get_db_session()
+        try:
+            usuario = db.query(Usuario).options(
+                selectinload(Usuario.permissoes),
+                selectinload(Usuario.grupos).selectinload(Grupo.permissoes),
+            ).filter(Usuario.id == usuario_id).first()
+            if usuario is None:
+                return None
+            permissoes = [(p.nome, p.modulo) for p in usuario.permissoes]
+            for grupo in usuario.grupos:
+                permissoes.extend((p.nome, p.modulo) for p in grupo.permissoes)
+            return PermissoesEfetivas.calcular(usuario.role, permissoes)
+        finally:
+            db.close()
 
     def has_permission(self, usuario_id: int, permission_name: str, resource: Optional[str] = None) -> bool:
         """Verifica se usuário tem uma permissão específica"""
@@ -31,34 +126,8 @@ class ACL:
             # Fallback para roles hardcoded se modelos não existirem
             return self._has_role_permission_fallback(usuario_id, permission_name)
 
-        db = get_db_session()
-        try:
-            usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-            if usuario is None:
-                return False
-
-            # Admin tem todas as permissões
-            if usuario.role and usuario.role == "admin":
-                return True
-
-            # Verificar permissões específicas
-            for permissao in usuario.permissoes:
-                if permissao.nome in (permission_name, f"{permission_name}_{permissao.modulo}", f"{permission_name}_{resource}"):
-                    if resource and permissao.modulo != resource:
-                        continue
-                    return True
-
-            # Verificar permissões herdadas dos grupos
-            for grupo in usuario.grupos:
-                for permissao in grupo.permissoes:
-                    if permissao.nome in (permission_name, f"{permission_name}_{permissao.modulo}", f"{permission_name}_{resource}"):
-                        if resource and permissao.modulo != resource:
-                            continue
-                        return True
-
-            return False
-        finally:
-            db.close()
+        efetivas = self.permissoes_efetivas(usuario_id)
+        return efetivas is not None and efetivas.permite(permission_name, resource)
 
     def has_role_permission(self, role: str, permission_name: str) -> bool:
         """Verifica se uma role tem uma permissão (fallback)"""
@@ -88,23 +157,15 @@ class ACL:
         if Usuario is None:
             return ["read"]  # Fallback
 
-        db = get_db_session()
-        try:
-            usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-            if usuario is None:
-                return []
+        efetivas = self.permissoes_efetivas(usuario_id)
+        if efetivas is None:
+            return []
 
-            # Admin tem tudo
-            if usuario.role and usuario.role == "admin":
-                return ["read", "write", "delete", "create", "update", "manage"]
+        # Admin tem tudo
+        if efetivas.admin:
+            return ["read", "write", "delete", "create", "update", "manage"]
 
-            # Retornar permissões específicas
-            perms = {p.nome for p in usuario.permissoes}
-            for grupo in usuario.grupos:
-                perms.update(p.nome for p in grupo.permissoes)
-            return list(perms)
-        finally:
-            db.close()
+        return list(efetivas.nomes)
 
     def check_resource_access(self, usuario_id: int, action: str, resource: str) -> bool:
         """Verifica acesso a um recurso específico"""
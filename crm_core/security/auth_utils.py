@@ -1,24 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from typing import Optional
+from typing import Optional, Tuple
 from crm_core.config.settings import settings
 
-# Configurar contexto de hash de senha
+# Configurar contexto de hash de senha. Hashes com outro custo ou em bcrypt
+# são refeitos no próximo login (verificar_e_atualizar_senha).
 pwd_context = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt"],
-    deprecated="auto"
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.senha_pbkdf2_rounds,
+    pbkdf2_sha256__min_rounds=settings.senha_pbkdf2_rounds,
+    pbkdf2_sha256__max_rounds=settings.senha_pbkdf2_rounds,
 )
 
+# O hash é CPU intensivo e libera o GIL (hashlib/bcrypt). Um pool próprio e
+# limitado evita que uma rajada de logins ocupe todas as threads do servidor
+# e todos os núcleos; quem chama espera o resultado.
+_pool_senhas = ThreadPoolExecutor(max_workers=settings.senha_hash_max_paralelo, thread_name_prefix="senha-hash")
+
+
+def _normalizar(senha: str) -> str:
+    # Limitar senha a 72 caracteres para compatibilidade com bcrypt
+    return senha[:72]
+
+def _verificar(senha: str, senha_hash: str) -> bool:
+    return pwd_context.verify(_normalizar(senha), senha_hash)
+
+def _verificar_e_atualizar(senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(_normalizar(senha), senha_hash)
+
+def _gerar_hash(senha: str) -> str:
+    return pwd_context.hash(_normalizar(senha))
+
 def verificar_senha(senha: str, senha_hash: str) -> bool:
     """Verifica se a senha corresponde ao hash"""
-    return pwd_context.verify(senha, senha_hash)
+    return _pool_senhas.submit(_verificar, senha, senha_hash).result()
+
+def verificar_e_atualizar_senha(senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+    """Verifica a senha; devolve também o novo hash quando o atual está desatualizado"""
+    return _pool_senhas.submit(_verificar_e_atualizar, senha, senha_hash).result()
 
 def obter_hash_senha(senha: str) -> str:
     """Gera hash da senha"""
-    # Limitar senha a 72 caracteres para compatibilidade com bcrypt
-    senha = senha[:72]
-    return pwd_context.hash(senha)
+    return _pool_senhas.submit(_gerar_hash, senha).result()
 
 def criar_access_token(usuario_id: int, duracao: Optional[timedelta] = None) -> str:
     """Cria JWT token"""
@@ -42,8 +68,22 @@ def criar_access_token(usuario_id: int, duracao: Optional[timedelta] = None) ->
     )
     return token
 
-def decodificar_token(token: str) -> dict:
-    """Decodifica e valida JWT token"""
+def criar_token_stream(usuario_id: int) -> str:
+    """Cria JWT curto para abrir um stream SSE (o EventSource não envia headers)
+
+    Vai na query string, então só serve para abrir o stream: não é aceito
+    como token de acesso nas demais rotas.
+    """
+    agora = datetime.now(timezone.utc)
+    payload = {
+        "sub": str(usuario_id),
+        "exp": agora + timedelta(seconds=settings.dashboard_ao_vivo_token_ttl),
+        "iat": agora,
+        "type": "stream"
+    }
+    return jwt.encode(payload, settings.secret_key, algorithm="HS256")
+
+def _decodificar(token: str, tipo_stream: bool) -> dict:
     try:
         payload = jwt.decode(
             token,
@@ -51,8 +91,16 @@ def decodificar_token(token: str) -> dict:
             algorithms=["HS256"]
         )
         usuario_id: str = payload.get("sub")
-        if usuario_id is None:
+        if usuario_id is None or (payload.get("type") == "stream") != tipo_stream:
             return None
         return {"usuario_id": int(usuario_id)}
     except JWTError:
         return None
+
+def decodificar_token(token: str) -> dict:
+    """Decodifica e valida JWT token"""
+    return _decodificar(token, tipo_stream=False)
+
+def decodificar_token_stream(token: str) -> dict:
+    """Decodifica e valida o token criado por criar_token_stream"""
+    return _decodificar(token, tipo_stream=True)
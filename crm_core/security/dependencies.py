@@ -1,20 +1,28 @@
-from fastapi import Depends, HTTPException, status, Header
+from fastapi import Depends, HTTPException, Request, status, Header, Query
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from crm_core.db.base import get_db
-from crm_core.security.auth_utils import decodificar_token
+from starlette.concurrency import run_in_threadpool
+from crm_core.security.auth_utils import decodificar_token, decodificar_token_stream
 from crm_core.security.acl import ACL
-from crm_modules.usuarios.models import Usuario
+from crm_core.security.usuario_cache import UsuarioSnapshot, usuario_cache
 from typing import Optional
 
 security = HTTPBearer()
 acl = ACL()
 
 async def obter_usuario_atual(
+    request: Request,
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> Usuario:
-    """Extrai o usuário atual do token JWT"""
+) -> UsuarioSnapshot:
+    """Extrai o usuário atual do token JWT
+    
+    Retorna um ``UsuarioSnapshot`` do cache de usuários. Quando o
+    ``AuthMiddleware`` já validou o token, reaproveita o usuário que ele
+    deixou em ``request.state``.
+    """
+    usuario = getattr(request.state, "usuario", None)
+    if usuario is not None:
+        return usuario
+    
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,7 +41,23 @@ async def obter_usuario_atual(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    payload = decodificar_token(token)
+    return await _usuario_do_token(request, decodificar_token(token))
+
+async def obter_usuario_stream(
+    request: Request,
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+) -> UsuarioSnapshot:
+    """Como obter_usuario_atual, aceitando também ``?token=`` de criar_token_stream
+
+    Para rotas de Server-Sent Events: o EventSource do navegador não envia o
+    header Authorization.
+    """
+    if token is None:
+        return await obter_usuario_atual(request, authorization)
+    return await _usuario_do_token(request, decodificar_token_stream(token))
+
+async def _usuario_do_token(request: Request, payload: Optional[dict]) -> UsuarioSnapshot:
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,7 +66,7 @@ async def obter_usuario_atual(
         )
     
     usuario_id = payload.get("usuario_id")
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = usuario_cache.em_cache(usuario_id) or await run_in_threadpool(usuario_cache.obter, usuario_id)
     
     if usuario is None:
         raise HTTPException(
@@ -56,9 +80,10 @@ async def obter_usuario_atual(
             detail="Usuário inativo",
         )
     
+    request.state.usuario = usuario
     return usuario
 
-def obter_usuario_admin(usuario: Usuario = Depends(obter_usuario_atual)) -> Usuario:
+def obter_usuario_admin(usuario: UsuarioSnapshot = Depends(obter_usuario_atual)) -> UsuarioSnapshot:
     """Verifica se o usuário é administrador"""
     if usuario.role != "admin":
         raise HTTPException(
@@ -69,7 +94,7 @@ def obter_usuario_admin(usuario: Usuario = Depends(obter_usuario_atual)) -> Usua
 
 def verificar_permissao(permissao_necessaria: str, recurso: Optional[str] = None):
     """Dependência para verificar permissão específica do usuário"""
-    async def verificador(usuario: Usuario = Depends(obter_usuario_atual)):
+    async def verificador(usuario: UsuarioSnapshot = Depends(obter_usuario_atual)):
         if not acl.has_permission(usuario.id, permissao_necessaria, recurso):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -80,7 +105,7 @@ def verificar_permissao(permissao_necessaria: str, recurso: Optional[str] = None
 
 def verificar_acesso_recurso(acao: str, recurso: str):
     """Dependência para verificar acesso a recurso específico"""
-    async def verificador(usuario: Usuario = Depends(obter_usuario_atual)):
+    async def verificador(usuario: UsuarioSnapshot = Depends(obter_usuario_atual)):
         if not acl.check_resource_access(usuario.id, acao, recurso):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -91,7 +116,7 @@ def verificar_acesso_recurso(acao: str, recurso: str):
 
 def verificar_role(role_necessario: str):
     """Dependência para verificar role do usuário"""
-    async def verificador(usuario: Usuario = Depends(obter_usuario_atual)):
+    async def verificador(usuario: UsuarioSnapshot = Depends(obter_usuario_atual)):
         if usuario.role != role_necessario and usuario.role != "admin":
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
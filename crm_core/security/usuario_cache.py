@@ -0,0 +1,125 @@
+"""Cache em memória dos usuários autenticados.
+
+O ``AuthMiddleware`` e a dependência ``obter_usuario_atual`` precisam só de
+alguns campos do usuário (id, role, ativo...) a cada requisição. Em vez de
+abrir uma sessão e consultar a tabela ``usuario`` duas vezes por chamada,
+guardam um ``UsuarioSnapshot`` (objeto leve, com ``__slots__`` e
+desvinculado da sessão) num LRU com TTL. O middleware deixa o snapshot em
+``request.state.usuario`` e a dependência o reaproveita.
+
+``UsuarioService`` invalida a entrada quando o usuário é alterado,
+desativado, removido ou troca de senha. Em vários processos cada um tem o
+seu cache; o TTL (``auth_cache_usuarios_ttl``) limita o tempo de uma
+alteração feita em outro processo.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from crm_core.config.settings import settings
+
+
+class UsuarioSnapshot:
+    """Campos do usuário usados na autenticação e autorização."""
+
+    __slots__ = ("id", "username", "email", "nome_completo", "role", "ativo", "foto_url")
+
+    def __init__(self, id: int, username: str, email: str, nome_completo: str, role: str,
+                 ativo: bool, foto_url: Optional[str] = None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.nome_completo = nome_completo
+        self.role = role
+        self.ativo = ativo
+        self.foto_url = foto_url
+
+    @classmethod
+    def de_modelo(cls, usuario) -> "UsuarioSnapshot":
+        role = getattr(usuario.role, "value", usuario.role)
+        return cls(usuario.id, usuario.username, usuario.email, usuario.nome_completo, role,
+                   bool(usuario.ativo), usuario.foto_url)
+
+    @property
+    def nome(self) -> str:
+        return self.nome_completo
+
+    def __repr__(self):
+        return f"<UsuarioSnapshot(id={self.id}, username='{self.username}')>"
+
+
+def _carregar_do_banco(usuario_id: int) -> Optional[UsuarioSnapshot]:
+    from crm_core.db.base import get_db_session
+    from crm_modules.usuarios.models import Usuario
+
+    db = get_db_session()
+    try:
+        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        return UsuarioSnapshot.de_modelo(usuario) if usuario else None
+    finally:
+        db.close()
+
+
+class CacheUsuarios:
+    """LRU com TTL de ``UsuarioSnapshot`` por id."""
+
+    def __init__(self, ttl: Optional[float] = None, max_itens: Optional[int] = None,
+                 carregar: Optional[Callable[[int], Optional[UsuarioSnapshot]]] = None):
+        self.ttl = ttl if ttl is not None else settings.auth_cache_usuarios_ttl
+        self.max_itens = max_itens or settings.auth_cache_usuarios_max
+        self.carregar = carregar or _carregar_do_banco
+        self._itens: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Muda a cada invalidação; uma carga que cruzou uma invalidação não é guardada
+        self._geracao = 0
+        self.acertos = 0
+        self.faltas = 0
+
+    def em_cache(self, usuario_id: int) -> Optional[UsuarioSnapshot]:
+        """Snapshot ainda válido no cache, sem ir ao banco (seguro no event loop)."""
+        with self._lock:
+            item = self._itens.get(usuario_id)
+            if item and item[1] > time.monotonic():
+                self._itens.move_to_end(usuario_id)
+                self.acertos += 1
+                return item[0]
+        return None
+
+    def obter(self, usuario_id: int) -> Optional[UsuarioSnapshot]:
+        """Snapshot do usuário, do cache ou do banco; ``None`` se não existe."""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(usuario_id)
+            if item and item[1] > agora:
+                self._itens.move_to_end(usuario_id)
+                self.acertos += 1
+                return item[0]
+            self.faltas += 1
+            geracao = self._geracao
+
+        snapshot = self.carregar(usuario_id)
+        if snapshot is None:
+            self.invalidar(usuario_id)
+            return None
+        with self._lock:
+            if geracao != self._geracao:
+                return snapshot
+            self._itens[usuario_id] = (snapshot, agora + self.ttl)
+            self._itens.move_to_end(usuario_id)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return snapshot
+
+    def invalidar(self, usuario_id: int):
+        with self._lock:
+            self._geracao += 1
+            self._itens.pop(usuario_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+
+
+usuario_cache = CacheUsuarios()
@@ -0,0 +1,61 @@
+"""Respostas com ETag e ``If-None-Match`` (304 quando nada mudou).
+
+O ETag é o hash do corpo serializado de forma canônica (chaves ordenadas),
+então o mesmo conteúdo gera sempre o mesmo ETag, em qualquer processo. Para
+arquivos do cache em disco o ETag vem da própria chave de conteúdo.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+CACHE_CONTROL_PADRAO = "private, no-cache"
+
+
+def gerar_etag(corpo: bytes) -> str:
+    return '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"'
+
+
+def etag_de_chave(chave: str) -> str:
+    """ETag a partir de uma chave de conteúdo já calculada (ex.: cache de arquivos)."""
+    return '"' + chave[:32] + '"'
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara com o cabeçalho ``If-None-Match`` (lista de ETags, ``*`` ou ``W/``)."""
+    if not if_none_match:
+        return False
+    valor = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == valor:
+            return True
+    return False
+
+
+def resposta_json_com_etag(request: Request, conteudo: Any,
+                           cache_control: str = CACHE_CONTROL_PADRAO) -> Response:
+    corpo = json.dumps(conteudo, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                       default=str).encode("utf-8")
+    etag = gerar_etag(corpo)
+    cabecalhos = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type="application/json", headers=cabecalhos)
+
+
+def resposta_arquivo_com_etag(request: Request, caminho, etag: str, media_type: str,
+                              filename: Optional[str] = None, cache_control: str = CACHE_CONTROL_PADRAO,
+                              inline: bool = False) -> Response:
+    """``FileResponse`` (envio direto do arquivo, com ``Range``/``If-Range``) ou 304."""
+    cabecalhos = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return FileResponse(caminho, media_type=media_type, filename=filename, headers=cabecalhos,
+                        content_disposition_type="inline" if inline else "attachment")
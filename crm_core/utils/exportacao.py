@@ -0,0 +1,139 @@
+"""Exportação de listagens em CSV/XLSX por streaming.
+
+As linhas são lidas do banco em lotes (``yield_per``) e enviadas ao cliente
+à medida que são geradas, então a memória usada não depende do tamanho da
+exportação. A sessão é aberta pelo próprio gerador: dependências com
+``yield`` (``get_db``) são encerradas antes do corpo de um
+``StreamingResponse`` terminar de ser enviado.
+
+O formato XLSX depende do ``openpyxl`` (opcional); o arquivo é montado em
+modo ``write_only`` num arquivo temporário e enviado em blocos.
+"""
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from crm_core.utils.exceptions import ValidationException
+
+# (título da coluna, função que extrai o valor da linha)
+Coluna = Tuple[str, Callable[[Any], Any]]
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+LOTE_PADRAO = 1000
+TAMANHO_BLOCO = 64 * 1024
+
+
+def formatar_valor(valor: Any) -> Any:
+    """Converte valores do banco para células de CSV (datas no padrão brasileiro)."""
+    if valor is None:
+        return ""
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    return valor
+
+
+def iterar_query(query: Query, lote: int = LOTE_PADRAO) -> Iterator[Any]:
+    """Percorre a consulta em lotes, sem carregar todas as linhas na memória."""
+    return iter(query.execution_options(stream_results=True).yield_per(lote))
+
+
+def gerar_csv(colunas: Sequence[Coluna], linhas: Iterable[Any]) -> Iterator[bytes]:
+    """Gera o CSV em blocos de ~64 KB (com BOM, para o Excel reconhecer UTF-8)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow([titulo for titulo, _ in colunas])
+    for linha in linhas:
+        writer.writerow([formatar_valor(extrair(linha)) for _, extrair in colunas])
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gerar_xlsx(colunas: Sequence[Coluna], linhas: Iterable[Any], titulo: str = "Dados") -> Iterator[bytes]:
+    """Gera a planilha em modo ``write_only`` e envia o arquivo em blocos."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet(title=titulo[:31])
+    planilha.append([nome for nome, _ in colunas])
+    for linha in linhas:
+        valores = []
+        for _, extrair in colunas:
+            valor = extrair(linha)
+            valores.append(valor.value if isinstance(valor, Enum) else valor)
+        planilha.append(valores)
+
+    with tempfile.TemporaryFile(suffix=".xlsx") as arquivo:
+        workbook.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+
+
+def validar_formato(formato: str) -> str:
+    formato = (formato or "csv").lower()
+    if formato not in FORMATOS:
+        raise ValidationException(f"Formato de exportação inválido: {formato} (use csv ou xlsx)")
+    if formato == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ValidationException("Exportação XLSX requer o pacote openpyxl")
+    return formato
+
+
+def exportar(
+    formato: str,
+    nome_arquivo: str,
+    colunas: List[Coluna],
+    montar_query: Callable[[Session], Query],
+    lote: int = LOTE_PADRAO,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> StreamingResponse:
+    """Monta o ``StreamingResponse`` de uma exportação.
+
+    ``montar_query`` recebe a sessão aberta para a exportação e retorna a
+    consulta já filtrada e ordenada, como na listagem correspondente;
+    ``session_factory`` padrão é ``SessionLocal``. Lança ``ValidationException`` para formato inválido.
+    """
+    formato = validar_formato(formato)
+
+    def conteudo() -> Iterator[bytes]:
+        from crm_core.db.base import SessionLocal
+
+        session = (session_factory or SessionLocal)()
+        try:
+            linhas = iterar_query(montar_query(session), lote)
+            if formato == "xlsx":
+                yield from gerar_xlsx(colunas, linhas, titulo=nome_arquivo)
+            else:
+                yield from gerar_csv(colunas, linhas)
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        conteudo(),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f"attachment; filename={nome_arquivo}.{formato}"},
+    )
@@ -2,12 +2,25 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from typing import List, Optional
 from crm_modules.clientes.schemas import ClienteCreate, ClienteUpdate, Cliente, ClienteArquivo
 from crm_modules.clientes.service import ClienteService
+from crm_modules.clientes.repository import ClienteRepository
 from crm_core.db.base import get_db
+from crm_core.utils.exceptions import ValidationException
+from crm_core.utils.exportacao import exportar
 from sqlalchemy.orm import Session
-import io
 
 router = APIRouter(prefix="/api/v1/clientes", tags=["Clientes"])
 
+COLUNAS_EXPORTACAO = [
+    ("ID", lambda c: c.id),
+    ("Nome", lambda c: c.nome),
+    ("Email", lambda c: c.email),
+    ("Telefone", lambda c: c.telefone),
+    ("CPF", lambda c: c.cpf),
+    ("Endereço", lambda c: c.endereco),
+    ("Status", lambda c: c.status_contrato or "nenhum"),
+    ("Data Cadastro", lambda c: c.data_cadastro),
+]
+
 
 @router.post("/", response_model=Cliente)
 def criar_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
@@ -19,10 +32,16 @@ def criar_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/search")
-def buscar_clientes(q: str = "", db: Session = Depends(get_db)):
+def buscar_clientes(
+    q: str = "",
+    field: str = "todos",
+    page: int = 1,
+    per_page: int = 20,
+    db: Session = Depends(get_db)
+):
     service = ClienteService(repository_session=db)
     try:
-        clientes = service.buscar_clientes_por_nome(q)
+        clientes = service.buscar_clientes(q, page, per_page, field)
         return [
             {
                 "id": c.id, 
@@ -69,12 +88,30 @@ def listar_clientes_ativos(
     status: str = "",
     page: int = 1,
     per_page: int = 50,
+    cursor: Optional[str] = None,
     export: str = "",
     db: Session = Depends(get_db)
 ):
+    if export:
+        # Exporta todos os clientes do filtro (não apenas a página atual)
+        try:
+            return exportar(
+                export,
+                "clientes",
+                COLUNAS_EXPORTACAO,
+                lambda session: ClienteRepository(session).query_exportacao(q, status),
+            )
+        except ValidationException as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     service = ClienteService(repository_session=db)
     try:
-        clientes, total = service.listar_clientes_filtrados(q, status, page, per_page)
+        next_cursor = None
+        if not q and (cursor or page == 1):
+            # Sem busca textual: paginação por cursor (sem OFFSET)
+            clientes, total, next_cursor = service.listar_clientes_por_cursor(status, cursor, per_page)
+        else:
+            clientes, total = service.listar_clientes_filtrados(q, status, page, per_page)
         
         # Formata os clientes para incluir os campos necessários, garantindo que valor_mensal e dia_vencimento existam
         clientes_formatados = []
@@ -92,39 +129,13 @@ def listar_clientes_ativos(
                 "data_cadastro": c.data_cadastro
             })
 
-        if export == "csv":
-            # Return CSV data for export
-            import csv
-            from fastapi.responses import Response
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['ID', 'Nome', 'Email', 'Telefone', 'CPF', 'Endereço', 'Status', 'Data Cadastro'])
-
-            for cliente in clientes:
-                writer.writerow([
-                    cliente.id,
-                    cliente.nome,
-                    cliente.email,
-                    cliente.telefone,
-                    cliente.cpf,
-                    cliente.endereco,
-                    cliente.status_contrato or "nenhum",
-                    cliente.data_cadastro.strftime("%d/%m/%Y") if cliente.data_cadastro else "N/A"
-                ])
-
-            return Response(
-                content=output.getvalue(),
-                media_type="text/csv",
-                headers={"Content-Disposition": "attachment; filename=clientes.csv"}
-            )
-
         return {
             "clientes": clientes_formatados,
             "total": total,
             "page": page,
             "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
+            "total_pages": (total + per_page - 1) // per_page,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,10 +1,21 @@
-from typing import Optional
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import or_, desc
 from crm_core.db.repositories import BaseRepository
 from crm_modules.clientes.models import ClienteModel
+from crm_modules.clientes.models_arquivos import ClienteArquivoModel
+from crm_modules.clientes.search import indice_clientes
 from crm_core.db.base import SessionLocal
 
+# Tamanho dos lotes em consultas IN (abaixo do limite de variáveis do SQLite)
+IN_CHUNK_SIZE = 500
+
+
+def _em_lotes(ids: List[int], tamanho: int = IN_CHUNK_SIZE):
+    for i in range(0, len(ids), tamanho):
+        yield ids[i:i + tamanho]
+
 
 class ClienteRepository(BaseRepository[ClienteModel]):
     def __init__(self, session: Optional[Session] = None):
@@ -22,14 +33,86 @@ class ClienteRepository(BaseRepository[ClienteModel]):
     def get_by_cpf(self, cpf: str) -> ClienteModel:
         return self.session.query(ClienteModel).filter(ClienteModel.cpf == cpf).first()
 
+    def _listagem(self):
+        """Query base das listagens, com produtos carregados via selectinload."""
+        return self.session.query(ClienteModel).options(selectinload(ClienteModel.produtos))
+
+    def get_all_ordered(self):
+        return self._listagem().order_by(ClienteModel.id.desc()).all()
+
     def get_active_clients(self):
-        return self.session.query(ClienteModel).filter(ClienteModel.ativo == True).all()
+        return self._listagem().filter(ClienteModel.ativo == True).all()
 
     def search_by_name(self, name: str):
-        return self.session.query(ClienteModel).filter(ClienteModel.nome.ilike(f'%{name}%')).all()
+        return self._listagem().filter(ClienteModel.nome.ilike(f'%{name}%')).all()
+
+    def get_arquivos_por_cliente(self, cliente_ids: Iterable[int]) -> Dict[int, List[ClienteArquivoModel]]:
+        """Carrega os arquivos de vários clientes com uma consulta IN por lote."""
+        arquivos = defaultdict(list)
+        for lote in _em_lotes(list(set(cliente_ids))):
+            rows = (
+                self.session.query(ClienteArquivoModel)
+                .filter(ClienteArquivoModel.cliente_id.in_(lote))
+                .order_by(ClienteArquivoModel.id)
+                .all()
+            )
+            for arquivo in rows:
+                arquivos[arquivo.cliente_id].append(arquivo)
+        return arquivos
+
+    def get_valor_mensal_planos(self, plano_ids: Iterable[int]) -> Dict[int, float]:
+        """Resolve o valor mensal de vários planos com uma consulta IN por lote."""
+        from crm_modules.planos.models import PlanoModel
+
+        valores = {}
+        ids = [pid for pid in set(plano_ids) if pid]
+        for lote in _em_lotes(ids):
+            rows = (
+                self.session.query(PlanoModel.id, PlanoModel.valor_mensal)
+                .filter(PlanoModel.id.in_(lote))
+                .all()
+            )
+            valores.update({plano_id: valor for plano_id, valor in rows})
+        return valores
+
+    def get_by_ids(self, ids: List[int]) -> List[ClienteModel]:
+        """Carrega clientes preservando a ordem dos ids informados."""
+        if not ids:
+            return []
+        models = {m.id: m for m in self._listagem().filter(ClienteModel.id.in_(ids)).all()}
+        return [models[i] for i in ids if i in models]
+
+    def search_ids(self, q: str, field: str = "todos", status: str = "", page: int = 1, per_page: int = 50):
+        """Busca no índice textual; retorna (ids por relevância, total) ou None sem índice."""
+        return indice_clientes.buscar(self.session.connection(), q, field, status, page, per_page)
 
     def get_filtered_clients(self, q: str, status: str, page: int, per_page: int, field: str = "todos"):
+        if q:
+            resultado = self.search_ids(q, field, status, page, per_page)
+            if resultado is not None:
+                ids, total = resultado
+                return self.get_by_ids(ids), total
+
+        query = self._filtered_query(q, status, field)
+        total = query.count()
+        offset = (page - 1) * per_page
+        items = self.ordenar(query, "id", "desc").offset(offset).limit(per_page).all()
+        return items, total
+
+    def get_filtered_clients_keyset(self, status: str = "", cursor: Optional[str] = None,
+                                    limit: int = 50, q: str = "", field: str = "todos",
+                                    with_total: bool = True):
+        """Listagem por cursor (id decrescente). Buscas ranqueadas usam ``get_filtered_clients``."""
+        query = self._filtered_query(q, status, field)
+        return self.paginate_keyset(query, "id", "desc", cursor, limit, with_total)
+
+    def query_exportacao(self, q: str = "", status: str = "", field: str = "todos"):
+        """Consulta da exportação: mesmos filtros da listagem, sem carregar produtos."""
         query = self.session.query(ClienteModel)
+        return self._filtered_query(q, status, field, query).order_by(desc(ClienteModel.id))
+
+    def _filtered_query(self, q: str, status: str, field: str = "todos", query=None):
+        query = query if query is not None else self._listagem()
         if q:
             term = f"%{q}%"
             if field == "nome":
@@ -62,10 +145,7 @@ class ClienteRepository(BaseRepository[ClienteModel]):
                     )
         if status:
             query = query.filter(ClienteModel.status_contrato == status)
-        total = query.count()
-        offset = (page - 1) * per_page
-        items = query.order_by(desc(ClienteModel.id)).offset(offset).limit(per_page).all()
-        return items, total
+        return query
 
     def close(self):
         if not self._external_session:
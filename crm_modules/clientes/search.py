@@ -0,0 +1,263 @@
+"""Índice de busca textual de clientes.
+
+Mantém um índice FTS5 (SQLite) ou ``tsvector`` (PostgreSQL) com nome, CPF,
+email, login e endereço dos clientes, sincronizado por eventos do ORM em
+inserções, atualizações e exclusões de ``ClienteModel``. O índice é criado e
+populado pela migração 0019 (ou por ``cli reindexar-clientes``); os eventos
+só gravam a linha alterada, e sem índice a busca volta a usar LIKE. Textos e termos
+passam pelo mesmo ``normalizar`` (minúsculas e sem acentos), de modo que
+"João" encontra "joao", e cada termo é buscado por prefixo.
+"""
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Connection
+
+from crm_modules.clientes.models import ClienteModel
+
+TABELA_SQLITE = "clientes_fts"
+TABELA_POSTGRES = "clientes_busca"
+
+# Colunas do índice, na ordem usada pelo FTS5 e pelos pesos do bm25
+COLUNAS = ("nome", "documento", "email", "login", "endereco")
+PESOS_BM25 = (10.0, 5.0, 3.0, 3.0, 1.0)
+
+# Campos aceitos pela busca da tela de clientes -> colunas do índice
+CAMPOS = {
+    "todos": COLUNAS,
+    "nome": ("nome",),
+    "email": ("email",),
+    "cpf/cnpj": ("documento",),
+    "endereco": ("endereco",),
+    "login": ("login",),
+}
+
+# No PostgreSQL as colunas viram pesos do tsvector (são apenas quatro). CPF e
+# login ficam separados porque logins costumam ser o próprio CPF; email e
+# endereço, que quase não têm termos em comum, dividem o D
+PESOS_TSVECTOR = {"nome": "A", "documento": "B", "login": "C", "email": "D", "endereco": "D"}
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+_DOCUMENTO = re.compile(r"[\d.\-/\s]+")
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Converte para minúsculas e remove acentos ("João" -> "joao")."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokens(texto: Optional[str]) -> List[str]:
+    return _TOKEN.findall(normalizar(texto))
+
+
+def tokens_busca(termo: str) -> List[str]:
+    """Tokens do termo digitado; CPF/CNPJ formatado vira só dígitos."""
+    termo = termo.strip()
+    if termo and _DOCUMENTO.fullmatch(termo):
+        digitos = re.sub(r"\D", "", termo)
+        return [digitos] if digitos else []
+    return tokens(termo)
+
+
+def documento_indexado(cliente) -> dict:
+    """Textos normalizados de um cliente, por coluna do índice."""
+    endereco = " ".join(
+        filter(None, [
+            cliente.endereco, cliente.rua, cliente.numero,
+            cliente.bairro, cliente.cidade, cliente.cep,
+        ])
+    )
+    return {
+        "nome": " ".join(tokens(cliente.nome)),
+        "documento": re.sub(r"\D", "", cliente.cpf or ""),
+        "email": " ".join(tokens(cliente.email)),
+        "login": " ".join(tokens(cliente.username)),
+        "endereco": " ".join(tokens(endereco)),
+    }
+
+
+class ClienteSearchIndex:
+    """Índice textual de clientes sobre a conexão do próprio banco."""
+
+    def __init__(self):
+        self._disponiveis = set()
+
+    @staticmethod
+    def _dialeto(connection: Connection) -> str:
+        return connection.dialect.name
+
+    def suportado(self, connection: Connection) -> bool:
+        return self._dialeto(connection) in ("sqlite", "postgresql")
+
+    # ------------------------------------------------------------------
+    # Estrutura
+    # ------------------------------------------------------------------
+    def disponivel(self, connection: Connection) -> bool:
+        """Se o índice já existe neste banco (não cria nada)."""
+        if not self.suportado(connection):
+            return False
+        chave = str(connection.engine.url)
+        if chave in self._disponiveis:
+            return True
+        # Enquanto não existe a consulta ao catálogo se repete, para notar a migração
+        if not self._existe(connection):
+            return False
+        self._disponiveis.add(chave)
+        return True
+
+    def _existe(self, connection: Connection) -> bool:
+        if self._dialeto(connection) == "sqlite":
+            return connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :nome"),
+                {"nome": TABELA_SQLITE},
+            ).first() is not None
+        return connection.execute(
+            text("SELECT to_regclass(:nome)"), {"nome": TABELA_POSTGRES}
+        ).scalar() is not None
+
+    def criar_estrutura(self, connection: Connection):
+        if self._dialeto(connection) == "sqlite":
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_SQLITE} "
+                f"USING fts5({', '.join(COLUNAS)}, "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            ))
+        else:
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {TABELA_POSTGRES} ("
+                "cliente_id INTEGER PRIMARY KEY REFERENCES clientes(id) ON DELETE CASCADE, "
+                "documento TSVECTOR NOT NULL)"
+            ))
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{TABELA_POSTGRES}_documento "
+                f"ON {TABELA_POSTGRES} USING GIN (documento)"
+            ))
+
+    # ------------------------------------------------------------------
+    # Sincronização
+    # ------------------------------------------------------------------
+    def indexar(self, connection: Connection, cliente):
+        if self.disponivel(connection):
+            self._gravar(connection, cliente)
+
+    def _gravar(self, connection: Connection, cliente):
+        valores = documento_indexado(cliente)
+        valores["id"] = cliente.id
+        if self._dialeto(connection) == "sqlite":
+            connection.execute(text(f"DELETE FROM {TABELA_SQLITE} WHERE rowid = :id"), {"id": cliente.id})
+            connection.execute(text(
+                f"INSERT INTO {TABELA_SQLITE} (rowid, {', '.join(COLUNAS)}) "
+                f"VALUES (:id, {', '.join(':' + c for c in COLUNAS)})"
+            ), valores)
+        else:
+            vetor = " || ".join(
+                f"setweight(to_tsvector('simple', :{c}), '{PESOS_TSVECTOR[c]}')" for c in COLUNAS
+            )
+            connection.execute(text(
+                f"INSERT INTO {TABELA_POSTGRES} (cliente_id, documento) VALUES (:id, {vetor}) "
+                "ON CONFLICT (cliente_id) DO UPDATE SET documento = EXCLUDED.documento"
+            ), valores)
+
+    def remover(self, connection: Connection, cliente_id: int):
+        if not self.disponivel(connection):
+            return
+        if self._dialeto(connection) == "sqlite":
+            connection.execute(text(f"DELETE FROM {TABELA_SQLITE} WHERE rowid = :id"), {"id": cliente_id})
+        else:
+            connection.execute(text(f"DELETE FROM {TABELA_POSTGRES} WHERE cliente_id = :id"), {"id": cliente_id})
+
+    def reconstruir(self, connection: Connection, lote: int = 1000) -> int:
+        """Cria o índice se preciso e o popula a partir da tabela de clientes."""
+        if not self.suportado(connection):
+            return 0
+        self.criar_estrutura(connection)
+        tabela = TABELA_SQLITE if self._dialeto(connection) == "sqlite" else TABELA_POSTGRES
+        connection.execute(text(f"DELETE FROM {tabela}"))
+
+        colunas = [
+            ClienteModel.id, ClienteModel.nome, ClienteModel.cpf, ClienteModel.email,
+            ClienteModel.username, ClienteModel.endereco, ClienteModel.rua, ClienteModel.numero,
+            ClienteModel.bairro, ClienteModel.cidade, ClienteModel.cep,
+        ]
+        total = 0
+        ultimo_id = 0
+        while True:
+            rows = connection.execute(
+                select(*colunas).where(ClienteModel.id > ultimo_id).order_by(ClienteModel.id).limit(lote)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                self._gravar(connection, row)
+            total += len(rows)
+            ultimo_id = rows[-1].id
+        return total
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def buscar(
+        self,
+        connection: Connection,
+        termo: str,
+        campo: str = "todos",
+        status: str = "",
+        page: int = 1,
+        per_page: int = 50,
+    ) -> Optional[Tuple[List[int], int]]:
+        """Retorna (ids ordenados por relevância, total), ou None sem índice."""
+        if not self.disponivel(connection):
+            return None
+        termos = tokens_busca(termo or "")
+        if not termos:
+            return [], 0
+        colunas = CAMPOS.get(campo, COLUNAS)
+        params = {"limit": per_page, "offset": (max(page, 1) - 1) * per_page}
+        filtro_status = ""
+        if status:
+            filtro_status = " AND c.status_contrato = :status"
+            params["status"] = status
+
+        if self._dialeto(connection) == "sqlite":
+            expressao = " ".join(f'"{t}"*' for t in termos)
+            params["q"] = f"{{{' '.join(colunas)}}} : ({expressao})"
+            base = (
+                f"FROM {TABELA_SQLITE} JOIN clientes c ON c.id = {TABELA_SQLITE}.rowid "
+                f"WHERE {TABELA_SQLITE} MATCH :q{filtro_status}"
+            )
+            pesos = ", ".join(str(p) for p in PESOS_BM25)
+            ordem = f"bm25({TABELA_SQLITE}, {pesos}), c.id DESC"
+        else:
+            pesos = "".join(sorted({PESOS_TSVECTOR[c] for c in colunas}))
+            sufixo = "" if colunas == COLUNAS else pesos
+            params["q"] = " & ".join(f"{t}:*{sufixo}" for t in termos)
+            base = (
+                f"FROM {TABELA_POSTGRES} b JOIN clientes c ON c.id = b.cliente_id "
+                f"WHERE b.documento @@ to_tsquery('simple', :q){filtro_status}"
+            )
+            ordem = "ts_rank_cd(b.documento, to_tsquery('simple', :q)) DESC, c.id DESC"
+
+        total = connection.execute(text(f"SELECT count(*) {base}"), params).scalar() or 0
+        ids = connection.execute(
+            text(f"SELECT c.id {base} ORDER BY {ordem} LIMIT :limit OFFSET :offset"), params
+        ).scalars().all()
+        return list(ids), total
+
+
+indice_clientes = ClienteSearchIndex()
+
+
+@event.listens_for(ClienteModel, "after_insert")
+@event.listens_for(ClienteModel, "after_update")
+def _sincronizar_indice(mapper, connection, target):
+    indice_clientes.indexar(connection, target)
+
+
+@event.listens_for(ClienteModel, "after_delete")
+def _remover_do_indice(mapper, connection, target):
+    indice_clientes.remover(connection, target.id)
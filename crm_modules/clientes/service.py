@@ -4,7 +4,7 @@ from crm_modules.clientes.schemas import ClienteCreate, ClienteUpdate, ClienteAr
 from crm_modules.clientes.models import ClienteModel
 from crm_modules.clientes.models_arquivos import ClienteArquivoModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
-from crm_core.events.bus import EventBus
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
 from crm_core.events.events import ClientCreatedEvent
 import re
 from datetime import datetime
@@ -14,6 +14,13 @@ from pathlib import Path
 from sqlalchemy.orm import Session as SASession
 
 
+def _normalize_profile(value: str) -> str:
+    """Nome de profile PPPoE a partir do plano ("Plano 100 MB" -> "plano_100_mb")"""
+    value = (value or "").strip().lower()
+    value = re.sub(r"[^a-z0-9]+", "_", value)
+    return value.strip("_") or "default"
+
+
 class ClienteService:
     def __init__(self, repository: ClienteRepository = None, repository_session=None, event_bus: EventBus = None):
         # Allow passing a raw SQLAlchemy session in the first position (tests)
@@ -26,7 +33,7 @@ class ClienteService:
             self.repository = repository
         else:
             self.repository = ClienteRepository(session=repository_session) if repository_session is not None else ClienteRepository()
-        self.event_bus = event_bus or EventBus()
+        self.event_bus = event_bus or event_bus_padrao
 
     def criar_cliente(self, cliente_data: ClienteCreate) -> Cliente:
         # Validate
@@ -49,10 +56,6 @@ class ClienteService:
                 return self.repository.get_by_id(existente.id) # Retorna o domínio correspondente
 
         # Resolver profile para o Mikrotik (prioridade: profile informado > nome do plano > default)
-        def _normalize_profile(value: str) -> str:
-            value = (value or "").strip().lower()
-            value = re.sub(r"[^a-z0-9]+", "_", value)
-            return value.strip("_") or "default"
 
         resolved_profile = (getattr(cliente_data, 'profile', None) or '').strip() or None
         plano_for_profile = None
@@ -116,51 +119,24 @@ class ClienteService:
             produtos = self.repository.session.query(ProdutoModel).filter(ProdutoModel.id.in_(cliente_data.produto_ids)).all()
             model.produtos = produtos
 
-        model = self.repository.create(model)
-
-        # Sincronizar com MikroTik se username e password fornecidos
+        session = self.repository.session
+        session.add(model)
+        # Sincronização com o MikroTik vai pela outbox, no mesmo commit do cadastro
         if getattr(cliente_data, 'username', None) and getattr(cliente_data, 'password', None):
-            from crm_modules.mikrotik.integration import sincronizar_cliente_mikrotik
-            from crm_modules.mikrotik.integration import criar_profile_mikrotik
-            from crm_modules.servidores.service import ServidorService
-            
-            profile = resolved_profile
-            
-            host, user, secret = None, None, None
-            if model.servidor_id:
-                try:
-                    servidor_service = ServidorService(repository_session=self.repository.session)
-                    servidor = servidor_service.obter_servidor(model.servidor_id)
-                    host = servidor.ip
-                    user = servidor.usuario
-                    secret = servidor.senha
-                except Exception as e:
-                    print(f"Erro ao obter dados do servidor {model.servidor_id}: {e}")
-
-            # Garantir que o profile exista no MikroTik quando hÃ¡ plano vinculado
-            if plano_for_profile and plano_for_profile.nome:
-                try:
-                    success, msg = criar_profile_mikrotik(
-                        name=resolved_profile,
-                        download_limit=plano_for_profile.velocidade_download,
-                        upload_limit=plano_for_profile.velocidade_upload,
-                        host=host,
-                        user=user,
-                        secret=secret
-                    )
-                    if not success:
-                        print(f"Aviso: falha ao criar/atualizar profile no MikroTik: {msg}")
-                except Exception as e:
-                    print(f"Aviso: falha ao criar/atualizar profile no MikroTik: {e}")
-            
-            sincronizar_cliente_mikrotik(
-                cliente_data.username, 
-                cliente_data.password, 
-                profile,
-                host=host,
-                user=user,
-                secret=secret
+            from crm_modules.mikrotik.outbox import enfileirar_sincronizacao_cliente
+
+            session.flush()
+            enfileirar_sincronizacao_cliente(
+                session,
+                cliente_id=model.id,
+                username=cliente_data.username,
+                password=cliente_data.password,
+                profile=resolved_profile,
+                servidor_id=model.servidor_id,
+                plano_id=plano_for_profile.id if plano_for_profile and plano_for_profile.nome else None,
             )
+        session.commit()
+        session.refresh(model)
 
         # Create domain object to return
         cliente = Cliente(
@@ -215,19 +191,39 @@ class ClienteService:
         model = self.repository.get_by_id(cliente_id)
         if not model:
             raise NotFoundException("Cliente não encontrado")
-        
-        # Se o valor mensal do cliente for nulo ou zero, tenta buscar o valor do plano
-        valor_mensal = model.valor_mensal
-        if (valor_mensal is None or valor_mensal == 0) and model.plano_id:
+        return self._montar_clientes([model])[0]
+
+    def _montar_clientes(self, models) -> list:
+        """Converte modelos em objetos de domínio com uma consulta por relação.
+
+        Arquivos e valores mensais dos planos são resolvidos em lote (IN), e os
+        produtos devem vir carregados pela query de origem (selectinload).
+        """
+        if not models:
+            return []
+
+        arquivos = self.repository.get_arquivos_por_cliente(m.id for m in models)
+        # Se o valor mensal do cliente for nulo ou zero, usa o valor do plano
+        plano_ids = [m.plano_id for m in models if not m.valor_mensal and m.plano_id]
+        valores_plano = {}
+        if plano_ids:
             try:
-                from crm_modules.planos.models import PlanoModel
-                plano = self.repository.session.query(PlanoModel).filter(PlanoModel.id == model.plano_id).first()
-                if plano:
-                    valor_mensal = plano.valor_mensal
+                valores_plano = self.repository.get_valor_mensal_planos(plano_ids)
             except Exception as e:
-                print(f"Erro ao buscar valor do plano para o cliente {cliente_id}: {e}")
-        # NÃ£o faz fallback para valor de contrato aqui; somente plano ou valor_mensal direto
+                print(f"Erro ao buscar valor dos planos: {e}")
+        # Não faz fallback para valor de contrato aqui; somente plano ou valor_mensal direto
+
+        return [
+            self._para_dominio(
+                model,
+                valor_mensal=model.valor_mensal or valores_plano.get(model.plano_id, model.valor_mensal),
+                arquivos=arquivos.get(model.id, []),
+            )
+            for model in models
+        ]
 
+    @staticmethod
+    def _para_dominio(model: ClienteModel, valor_mensal, arquivos: list) -> Cliente:
         return Cliente(
             id=model.id,
             nome=model.nome,
@@ -267,8 +263,8 @@ class ClienteService:
             foto_casa=model.foto_casa,
             valor_mensal=valor_mensal,
             dia_vencimento=model.dia_vencimento,
-            arquivos=list(model.arquivos) if hasattr(model, 'arquivos') else [],
-            produto_ids=[p.id for p in model.produtos] if hasattr(model, 'produtos') else [],
+            arquivos=arquivos,
+            produto_ids=[p.id for p in model.produtos],
             valor_total=model.valor_total,
         )
 
@@ -311,23 +307,22 @@ class ClienteService:
 
     def listar_clientes_ativos(self):
         models = self.repository.get_active_clients()
-        return [self.obter_cliente(m.id) for m in models]
+        return self._montar_clientes(models)
 
     def listar_clientes(self):
         """Lista todos os clientes (ativos e inativos)"""
-        models = self.repository.session.query(ClienteModel).order_by(ClienteModel.id.desc()).all()
-        clientes = []
-        for m in models:
-            try:
-                clientes.append(self.obter_cliente(m.id))
-            except Exception as e:
-                print(f"DEBUG: Erro ao obter cliente {m.id}: {e}")
-        return clientes
+        models = self.repository.get_all_ordered()
+        return self._montar_clientes(models)
 
     def buscar_clientes_por_nome(self, nome: str):
         """Busca clientes por nome"""
         models = self.repository.search_by_name(nome)
-        return [self.obter_cliente(m.id) for m in models]
+        return self._montar_clientes(models)
+
+    def buscar_clientes(self, q: str, page: int = 1, per_page: int = 20, field: str = "todos"):
+        """Busca clientes pelo índice textual, ordenados por relevância"""
+        models, _ = self.repository.get_filtered_clients(q, "", page, per_page, field)
+        return self._montar_clientes(models)
 
     def atualizar_status_contrato(self, cliente_id: int, status: str):
         """Atualiza status de contrato do cliente"""
@@ -344,8 +339,12 @@ class ClienteService:
     def listar_clientes_filtrados(self, q: str = "", status: str = "", page: int = 1, per_page: int = 50, field: str = "todos"):
         """Lista clientes com filtros e paginação"""
         models, total = self.repository.get_filtered_clients(q, status, page, per_page, field)
-        clientes = [self.obter_cliente(m.id) for m in models]
-        return clientes, total
+        return self._montar_clientes(models), total
+
+    def listar_clientes_por_cursor(self, status: str = "", cursor: str = None, limite: int = 50):
+        """Lista clientes por cursor; retorna (clientes, total, próximo cursor)"""
+        pagina = self.repository.get_filtered_clients_keyset(status=status, cursor=cursor, limit=limite)
+        return self._montar_clientes(pagina.items), pagina.total, pagina.next_cursor
 
     def _get_upload_dir(self, cliente_id: int) -> Path:
         """Retorna o diretório de uploads para o cliente"""
@@ -258,4 +258,41 @@ async def update_configurations(
         return {"message": "Configurações atualizadas com sucesso"}
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao salvar configurações: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao salvar configurações: {str(e)}")
+
+@router.get("/eventos")
+async def get_event_bus_metrics(current_user = Depends(obter_usuario_admin)) -> Dict[str, Any]:
+    """Estado do barramento de eventos: filas, descartes, erros e latência por assinatura"""
+    from crm_core.events.bus import event_bus
+
+    return {"assinaturas": event_bus.metricas()}
+
+@router.get("/outbox")
+async def get_outbox_resumo(current_user = Depends(obter_usuario_admin), db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Mensagens da outbox por status e mensagens mortas por tipo"""
+    from crm_core.outbox import resumo
+
+    return resumo(db)
+
+@router.get("/outbox/mortas")
+async def get_outbox_mortas(limite: int = 50, offset: int = 0, current_user = Depends(obter_usuario_admin),
+                            db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Mensagens da outbox que esgotaram as tentativas (dead letter)"""
+    from crm_core.outbox import listar_mortas
+
+    return {"mensagens": listar_mortas(db, limite=min(limite, 500), offset=offset)}
+
+@router.post("/outbox/{mensagem_id}/reprocessar")
+async def reprocessar_outbox(mensagem_id: int, current_user = Depends(obter_usuario_admin),
+                             db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Devolve uma mensagem morta da outbox para a fila"""
+    from crm_core.outbox import reprocessar
+    from crm_core.utils.exceptions import NotFoundException, ValidationException
+
+    try:
+        mensagem = reprocessar(db, mensagem_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"id": mensagem.id, "status": mensagem.status}
@@ -1,8 +1,11 @@
 """API para Contratos"""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Optional
+from datetime import datetime
 from sqlalchemy.orm import Session
 from crm_modules.contratos.service import ContratoService
+from crm_modules.contratos.repository import ContratoRepository
 from crm_modules.contratos.schemas import (
     ContratoCreate, ContratoUpdate, ContratoResponse, AssinaturaDigitalRequest,
     ContratoHistoricoResponse
@@ -10,9 +13,27 @@ from crm_modules.contratos.schemas import (
 from crm_core.security.dependencies import obter_usuario_atual, verificar_permissao
 from interfaces.api.dependencies import get_db
 from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_modules.contratos.infrastructure.pdf.servico import FilaPDFCheia, TempoPDFEsgotado
+from crm_core.utils.exportacao import exportar
+from crm_core.utils.etag import etag_de_chave, resposta_arquivo_com_etag
 
 router = APIRouter(prefix="/api/v1/contratos", tags=["contratos"])
 
+COLUNAS_EXPORTACAO = [
+    ("ID", lambda r: r[0].id),
+    ("Título", lambda r: r[0].titulo),
+    ("Cliente ID", lambda r: r[0].cliente_id),
+    ("Cliente", lambda r: r[1]),
+    ("CPF", lambda r: r[2]),
+    ("Tipo", lambda r: r[0].tipo_contrato),
+    ("Status Assinatura", lambda r: r[0].status_assinatura),
+    ("Valor", lambda r: r[0].valor_contrato),
+    ("Criação", lambda r: r[0].data_criacao),
+    ("Assinatura", lambda r: r[0].data_assinatura),
+    ("Vigência Início", lambda r: r[0].data_vigencia_inicio),
+    ("Vigência Fim", lambda r: r[0].data_vigencia_fim),
+]
+
 
 @router.post("", response_model=ContratoResponse)
 def criar_contrato(
@@ -33,19 +54,60 @@ def criar_contrato(
 
 @router.get("", response_model=list[ContratoResponse])
 def listar_contratos(
+    response: Response,
     limite: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)"),
     db: Session = Depends(get_db),
     usuario_atual = Depends(obter_usuario_atual)
 ):
-    """Lista todos os contratos (com paginação)"""
+    """Lista todos os contratos (com paginação por cursor ou offset)"""
     try:
         service = ContratoService(repository_session=db)
+        if cursor or offset == 0:
+            contratos, total, next_cursor = service.listar_contratos_por_cursor(limite=limite, cursor=cursor)
+            response.headers["X-Total-Count"] = str(total)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return contratos
         return service.listar_todos_contratos(limite=limite, offset=offset)
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/exportar")
+def exportar_contratos(
+    formato: str = Query("csv"),
+    data_inicio: Optional[datetime] = Query(None),
+    data_fim: Optional[datetime] = Query(None),
+    nome: Optional[str] = Query(None),
+    cpf: Optional[str] = Query(None),
+    status_assinatura: Optional[str] = Query(None),
+    status_cliente: Optional[str] = Query(None),
+    usuario_atual = Depends(obter_usuario_atual)
+):
+    """Exporta contratos em CSV ou XLSX (streaming), com os filtros da listagem"""
+    filtros = dict(
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        nome=nome,
+        cpf=cpf,
+        status_assinatura=status_assinatura,
+        status_cliente=status_cliente,
+    )
+    try:
+        return exportar(
+            formato,
+            "contratos",
+            COLUNAS_EXPORTACAO,
+            lambda session: ContratoRepository(session).query_exportacao(**filtros)
+        )
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/{contrato_id}", response_model=ContratoResponse)
 def obter_contrato(
     contrato_id: int,
@@ -200,8 +262,9 @@ def renovar_contrato(
 
 
 @router.get("/{contrato_id}/pdf")
-def gerar_pdf_contrato(
+async def gerar_pdf_contrato(
     contrato_id: int,
+    request: Request,
     empresa_nome: str = Query(None),
     empresa_cnpj: str = Query(None),
     empresa_endereco: str = Query(None),
@@ -227,16 +290,19 @@ def gerar_pdf_contrato(
         if empresa_email:
             empresa_dados['email'] = empresa_email
 
-        pdf_bytes = service.gerar_pdf_contrato(contrato_id, empresa_dados or None)
+        # Vem do cache em disco; se o contrato mudou, renderiza no pool de processos
+        caminho, chave = await service.pdf_contrato_async(contrato_id)
 
-        from fastapi.responses import Response
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=contrato_{contrato_id}.pdf"}
+        return resposta_arquivo_com_etag(
+            request, caminho, etag_de_chave(chave), media_type="application/pdf",
+            filename=f"contrato_{contrato_id}.pdf"
         )
     except NotFoundException as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except FilaPDFCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except TempoPDFEsgotado as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar PDF: {str(e)}")
 
@@ -3,9 +3,25 @@
 from crm_modules.contratos.infrastructure.pdf.generator import (
     ContratosPDFGenerator,
     TemplateResolver,
+    ambiente_templates,
+)
+from crm_modules.contratos.infrastructure.pdf.servico import (
+    FilaPDFCheia,
+    ServicoPDF,
+    TempoPDFEsgotado,
+    instantaneo_contrato,
+    renderizar_contrato,
+    servico_pdf,
 )
 
 __all__ = [
     "ContratosPDFGenerator",
     "TemplateResolver",
+    "ambiente_templates",
+    "FilaPDFCheia",
+    "ServicoPDF",
+    "TempoPDFEsgotado",
+    "instantaneo_contrato",
+    "renderizar_contrato",
+    "servico_pdf",
 ]
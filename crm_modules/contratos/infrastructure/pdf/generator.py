@@ -1,56 +1,110 @@
 """Gerador de PDFs para Contratos"""
 
 import os
+import tempfile
 from abc import ABC, abstractmethod
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+@lru_cache(maxsize=1)
+def ambiente_templates():
+    """
+    Environment Jinja2 do processo, criado uma vez
+
+    Guarda os templates já compilados (sem reler o arquivo a cada PDF) e grava
+    o bytecode em disco, para que novos processos do pool não recompilem.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+    from crm_core.config.settings import settings
+
+    diretorio = settings.pdf_cache_bytecode or os.path.join(tempfile.gettempdir(), "crm_jinja_contratos")
+    os.makedirs(diretorio, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(diretorio),
+        auto_reload=settings.debug,
+        cache_size=64,
+    )
+
+
+@lru_cache(maxsize=32)
+def compilar_template(html: str):
+    """Compila um template HTML informado como texto (ex.: template personalizado)"""
+    return ambiente_templates().from_string(html)
+
+
+@lru_cache(maxsize=1)
+def recursos_weasyprint():
+    """
+    Configuração de fontes e folhas de estilo do WeasyPrint, carregadas uma
+    vez por processo e reaproveitadas em todos os PDFs
+
+    Returns:
+        tuple: (FontConfiguration, lista de CSS)
+    """
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+    from crm_core.config.settings import settings
+
+    fontes = FontConfiguration()
+    folhas = [
+        CSS(filename=caminho.strip(), font_config=fontes)
+        for caminho in settings.pdf_css.split(",") if caminho.strip()
+    ]
+    return fontes, folhas
+
 
 class TemplateResolver:
     """Resolve qual template usar baseado no tipo de contrato"""
     
-    TEMPLATES_DIR = os.path.join(
-        os.path.dirname(__file__),
-        "templates"
-    )
+    TEMPLATES_DIR = TEMPLATES_DIR
     
     @staticmethod
-    def obter_template(tipo_contrato: str) -> str:
+    def nome_template(tipo_contrato: str) -> str:
         """
-        Retorna conteúdo do template HTML baseado no tipo de contrato
+        Retorna o nome do arquivo de template para o tipo de contrato
         
-        Args:
-            tipo_contrato: Tipo do contrato (servico, assinatura, manutencao, suporte, outro)
-            
-        Returns:
-            str: Conteúdo HTML do template
-            
         Raises:
             FileNotFoundError: Se template não existir
         """
         template_file = f"{tipo_contrato}.html"
-        template_path = os.path.join(TemplateResolver.TEMPLATES_DIR, template_file)
-        
-        # Tentar com tipo específico
-        if os.path.exists(template_path):
-            logger.info(f"Template encontrado: {template_file}")
-            with open(template_path, 'r', encoding='utf-8') as f:
-                return f.read()
+        if os.path.exists(os.path.join(TemplateResolver.TEMPLATES_DIR, template_file)):
+            return template_file
         
         # Fallback para template base
-        template_path = os.path.join(TemplateResolver.TEMPLATES_DIR, "base.html")
-        if os.path.exists(template_path):
+        if os.path.exists(os.path.join(TemplateResolver.TEMPLATES_DIR, "base.html")):
             logger.warning(f"Template {template_file} não encontrado, usando base.html")
-            with open(template_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return "base.html"
         
         raise FileNotFoundError(
             f"Nenhum template encontrado. "
             f"Esperado: {template_file} ou base.html"
         )
+    
+    @staticmethod
+    def obter_template(tipo_contrato: str) -> str:
+        """
+        Retorna conteúdo do template HTML baseado no tipo de contrato
+        
+        Args:
+            tipo_contrato: Tipo do contrato (servico, assinatura, manutencao, suporte, outro)
+            
+        Returns:
+            str: Conteúdo HTML do template
+            
+        Raises:
+            FileNotFoundError: Se template não existir
+        """
+        ambiente = ambiente_templates()
+        nome = TemplateResolver.nome_template(tipo_contrato)
+        return ambiente.loader.get_source(ambiente, nome)[0]
 
 
 class RendererPDF(ABC):
@@ -77,11 +131,14 @@ class WeasyPrintRenderer(RendererPDF):
     def renderizar(self, html: str, filename: str) -> bytes:
         """Renderiza HTML para PDF usando WeasyPrint"""
         try:
-            from weasyprint import HTML, CSS
-            from io import BytesIO
+            from weasyprint import HTML
             
-            # Renderizar HTML para PDF
-            pdf_bytes = HTML(string=html).write_pdf()
+            # Renderizar HTML para PDF (fontes e CSS já carregados no processo)
+            fontes, folhas = recursos_weasyprint()
+            pdf_bytes = HTML(string=html, base_url=TEMPLATES_DIR).write_pdf(
+                stylesheets=folhas,
+                font_config=fontes
+            )
             
             logger.info(f"PDF gerado com sucesso: {filename}")
             return pdf_bytes
@@ -142,10 +199,12 @@ class ContratosPDFGenerator:
             self.contrato.tipo_contrato, 'value'
         ) else self.contrato.tipo_contrato
         
-        template_html = TemplateResolver.obter_template(tipo_contrato)
+        template = ambiente_templates().get_template(
+            TemplateResolver.nome_template(tipo_contrato)
+        )
         
         # 2. Preencher placeholders
-        html_preenchido = self._preencher_template(template_html)
+        html_preenchido = self._preencher_template(template)
         
         # 3. Renderizar
         pdf_bytes = self.renderer.renderizar(
@@ -155,20 +214,18 @@ class ContratosPDFGenerator:
         
         return pdf_bytes
     
-    def _preencher_template(self, html: str) -> str:
+    def _preencher_template(self, html) -> str:
         """
         Substitui placeholders no template com dados do contrato
         
         Args:
-            html: Template HTML com placeholders
+            html: Template HTML com placeholders (texto ou template já compilado)
             
         Returns:
             str: HTML com placeholders preenchidos
         """
         try:
-            from jinja2 import Template
-            
-            template = Template(html)
+            template = compilar_template(html) if isinstance(html, str) else html
             
             # Preparar contexto com dados do contrato
             contexto = self._preparar_contexto()
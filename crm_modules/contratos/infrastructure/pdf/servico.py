@@ -0,0 +1,170 @@
+"""Serviço de renderização de PDFs em processos separados
+
+ReportLab e WeasyPrint gastam CPU segurando o GIL: gerar o PDF dentro da
+requisição trava o worker web por segundos. O ``ServicoPDF`` envia a
+renderização para um pool limitado de processos (``pdf_workers``):
+
+- Cada processo é iniciado com ``spawn`` e já carrega ReportLab, estilos,
+  templates Jinja e fontes/CSS do WeasyPrint (``_inicializar_worker``).
+- Entram no máximo ``pdf_workers + pdf_max_fila`` pedidos; além disso
+  ``FilaPDFCheia`` (a API responde 503).
+- Quem espera desiste após ``pdf_timeout`` segundos (``TempoPDFEsgotado``);
+  o pedido já iniciado termina no worker e libera a vaga.
+
+O contrato vai para o processo como um instantâneo (``instantaneo_contrato``)
+com as colunas do contrato e do cliente, sem sessão do banco.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from sqlalchemy import inspect
+
+from crm_core.cache.arquivos import chave_conteudo
+from crm_core.config.settings import settings
+from crm_core.utils.exceptions import CRMException
+
+
+class FilaPDFCheia(CRMException):
+    """Mais pedidos de PDF do que o pool e a fila comportam."""
+    pass
+
+
+class TempoPDFEsgotado(CRMException):
+    """O PDF não ficou pronto dentro de ``pdf_timeout``."""
+    pass
+
+
+def _colunas(model) -> dict:
+    return {coluna.key: getattr(model, coluna.key) for coluna in inspect(model).mapper.column_attrs}
+
+
+def instantaneo_contrato(model) -> SimpleNamespace:
+    """Cópia serializável do contrato e do cliente para renderizar em outro processo."""
+    contrato = SimpleNamespace(**_colunas(model))
+    contrato.cliente = SimpleNamespace(**_colunas(model.cliente)) if model.cliente is not None else None
+    return contrato
+
+
+CAMPOS_EMPRESA = (
+    "company_name", "company_razao_social", "company_logo", "company_cnpj", "company_ie",
+    "company_telefone", "company_email", "company_endereco",
+)
+
+
+def chave_pdf_contrato(contrato, template_html: Optional[str] = None) -> str:
+    """Chave do PDF no cache: muda quando o contrato, o cliente, o template ou a empresa mudam."""
+    from crm_modules.contratos.pdf_generator import VERSAO_LAYOUT
+
+    dados = {chave: valor for chave, valor in vars(contrato).items() if chave != "cliente"}
+    cliente = vars(contrato.cliente) if contrato.cliente is not None else None
+    empresa = {campo: getattr(settings, campo) for campo in CAMPOS_EMPRESA}
+    return chave_conteudo("contrato", VERSAO_LAYOUT, template_html or "", empresa, dados, cliente)
+
+
+def _inicializar_worker():
+    """Carrega uma vez, no processo do pool, o que todo PDF usa."""
+    from crm_modules.contratos.infrastructure.pdf.generator import ambiente_templates, recursos_weasyprint
+    from crm_modules.contratos.pdf_generator import _estilos
+
+    _estilos()
+    ambiente = ambiente_templates()
+    for nome in ambiente.list_templates(extensions=["html"]):
+        try:
+            ambiente.get_template(nome)
+        except Exception as e:
+            print(f"Aviso: template de contrato '{nome}' não compilou: {e}")
+    try:
+        recursos_weasyprint()
+    except ImportError:
+        pass  # sem WeasyPrint os templates HTML caem no layout padrão do ReportLab
+
+
+def renderizar_contrato(contrato, template_html: Optional[str] = None) -> bytes:
+    """Gera o PDF do contrato (executado no processo do pool)."""
+    from crm_modules.contratos.pdf_generator import ContratosPDFGenerator
+
+    return ContratosPDFGenerator(contrato, template_html).gerar_pdf()
+
+
+class ServicoPDF:
+    def __init__(self, workers: Optional[int] = None, max_fila: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.workers = settings.pdf_workers if workers is None else workers
+        self.max_fila = settings.pdf_max_fila if max_fila is None else max_fila
+        self.timeout = timeout or settings.pdf_timeout
+        self._vagas = threading.BoundedSemaphore(max(1, self.workers) + self.max_fila)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obter_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_inicializar_worker,
+                )
+            return self._pool
+
+    def _descartar_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def submeter(self, funcao: Callable, *args) -> Future:
+        """Enfileira a renderização; levanta ``FilaPDFCheia`` se não houver vaga."""
+        if not self._vagas.acquire(blocking=False):
+            raise FilaPDFCheia("Muitos PDFs sendo gerados, tente novamente em instantes")
+        try:
+            if self.workers <= 0:
+                # Sem pool: renderiza na própria thread (scripts, testes)
+                futuro = Future()
+                try:
+                    futuro.set_result(funcao(*args))
+                except Exception as e:
+                    futuro.set_exception(e)
+            else:
+                pool = self._obter_pool()
+                try:
+                    futuro = pool.submit(funcao, *args)
+                except BrokenProcessPool:
+                    # Um worker morreu (ex.: falta de memória): recria o pool uma vez
+                    self._descartar_pool(pool)
+                    futuro = self._obter_pool().submit(funcao, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        return futuro
+
+    def renderizar(self, funcao: Callable, *args, timeout: Optional[float] = None) -> bytes:
+        futuro = self.submeter(funcao, *args)
+        try:
+            return futuro.result(timeout=timeout or self.timeout)
+        except FuturesTimeout:
+            futuro.cancel()
+            raise TempoPDFEsgotado("Tempo esgotado ao gerar o PDF")
+
+    async def renderizar_async(self, funcao: Callable, *args, timeout: Optional[float] = None) -> bytes:
+        """Como ``renderizar``, sem ocupar uma thread do servidor enquanto espera."""
+        futuro = self.submeter(funcao, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout=timeout or self.timeout)
+        except asyncio.TimeoutError:
+            futuro.cancel()
+            raise TempoPDFEsgotado("Tempo esgotado ao gerar o PDF")
+
+    def parar(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+servico_pdf = ServicoPDF()
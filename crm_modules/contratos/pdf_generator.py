@@ -8,9 +8,68 @@ from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 )
 from datetime import datetime
+from functools import lru_cache
 import io
 import os
 
+# Entra na chave do cache de PDFs: aumente ao mudar o layout gerado aqui
+VERSAO_LAYOUT = 1
+
+
+@lru_cache(maxsize=1)
+def _estilos():
+    """Cria estilos customizados para o documento"""
+    styles = getSampleStyleSheet()
+
+    # Estilo para título
+    style_titulo = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=22,
+        textColor=colors.HexColor('#1a237e'),
+        spaceAfter=20,
+        alignment=1,  # Center
+        fontName='Helvetica-Bold'
+    )
+    
+    # Estilo para subtítulo
+    style_subtitulo = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=12,
+        textColor=colors.HexColor('#0d47a1'),
+        spaceBefore=15,
+        spaceAfter=8,
+        fontName='Helvetica-Bold',
+        borderPadding=2,
+        borderWidth=0,
+        borderColor=colors.white
+    )
+    
+    # Estilo para texto normal
+    style_normal = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=4,  # Justify
+        spaceAfter=8,
+        fontName='Helvetica',
+        leading=12
+    )
+
+    # Estilo para cláusulas
+    style_clausula = ParagraphStyle(
+        'Clausula',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=4,
+        spaceBefore=10,
+        spaceAfter=5,
+        fontName='Helvetica-Bold',
+        leading=12
+    )
+    return styles, style_titulo, style_subtitulo, style_normal, style_clausula
+
 
 class ContratosPDFGenerator:
     """Gera PDFs profissionais de contratos"""
@@ -18,59 +77,13 @@ class ContratosPDFGenerator:
     def __init__(self, contrato, template_html=None):
         self.contrato = contrato
         self.template_html = template_html
-        self.styles = getSampleStyleSheet()
         self._criar_estilos_customizados()
     
     def _criar_estilos_customizados(self):
-        """Cria estilos customizados para o documento"""
-        # Estilo para título
-        self.style_titulo = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=22,
-            textColor=colors.HexColor('#1a237e'),
-            spaceAfter=20,
-            alignment=1,  # Center
-            fontName='Helvetica-Bold'
-        )
-        
-        # Estilo para subtítulo
-        self.style_subtitulo = ParagraphStyle(
-            'CustomSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            textColor=colors.HexColor('#0d47a1'),
-            spaceBefore=15,
-            spaceAfter=8,
-            fontName='Helvetica-Bold',
-            borderPadding=2,
-            borderWidth=0,
-            borderColor=colors.white
-        )
-        
-        # Estilo para texto normal
-        self.style_normal = ParagraphStyle(
-            'CustomNormal',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            alignment=4,  # Justify
-            spaceAfter=8,
-            fontName='Helvetica',
-            leading=12
-        )
+        """Usa os estilos do processo (criados uma vez, compartilhados entre os PDFs)"""
+        (self.styles, self.style_titulo, self.style_subtitulo,
+         self.style_normal, self.style_clausula) = _estilos()
 
-        # Estilo para cláusulas
-        self.style_clausula = ParagraphStyle(
-            'Clausula',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            alignment=4,
-            spaceBefore=10,
-            spaceAfter=5,
-            fontName='Helvetica-Bold',
-            leading=12
-        )
-    
     def gerar_pdf(self) -> bytes:
         """Gera PDF completo do contrato"""
         if self.template_html:
@@ -146,8 +159,10 @@ class ContratosPDFGenerator:
             # Substituir placeholders
             html_content = self._substituir_placeholders(self.template_html)
 
-            # Gerar PDF
-            pdf_bytes = weasyprint.HTML(string=html_content).write_pdf()
+            # Gerar PDF (fontes e CSS carregados uma vez por processo)
+            from crm_modules.contratos.infrastructure.pdf.generator import recursos_weasyprint
+            fontes, folhas = recursos_weasyprint()
+            pdf_bytes = weasyprint.HTML(string=html_content).write_pdf(stylesheets=folhas, font_config=fontes)
             return pdf_bytes
         except Exception as e:
             # Se houver erro ao gerar PDF com weasyprint, usar layout padrão
@@ -30,20 +30,26 @@ class ContratoRepository(BaseRepository):
             ContratoModel.deletado_em == None
         ).first()
 
-    def get_contratos_vencendo(self, dias: int = 30) -> List[ContratoModel]:
-        """Busca contratos que vencerão nos próximos N dias"""
+    def _query_vencendo(self, dias: int):
         from sqlalchemy import and_
         data_limite = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         from datetime import timedelta
         data_limite = data_limite + timedelta(days=dias)
-        
+
         return self.session.query(ContratoModel).filter(
             and_(
                 ContratoModel.data_vigencia_fim <= data_limite,
                 ContratoModel.status_assinatura == StatusAssinatura.LIBERADO,
                 ContratoModel.deletado_em == None
             )
-        ).order_by(ContratoModel.data_vigencia_fim.asc()).all()
+        )
+
+    def get_contratos_vencendo(self, dias: int = 30) -> List[ContratoModel]:
+        """Busca contratos que vencerão nos próximos N dias"""
+        return self._query_vencendo(dias).order_by(ContratoModel.data_vigencia_fim.asc()).all()
+
+    def contar_contratos_vencendo(self, dias: int = 30) -> int:
+        return self._query_vencendo(dias).count()
 
     def list(self, limit: int = 100, offset: int = 0) -> List[ContratoModel]:
         """Lista contratos com paginação"""
@@ -51,6 +57,11 @@ class ContratoRepository(BaseRepository):
             ContratoModel.deletado_em == None
         ).order_by(ContratoModel.data_criacao.desc()).limit(limit).offset(offset).all()
 
+    def list_keyset(self, limit: int = 100, cursor: Optional[str] = None, with_total: bool = True):
+        """Lista contratos por cursor (data de criação decrescente)"""
+        query = self.session.query(ContratoModel).filter(ContratoModel.deletado_em == None)
+        return self.paginate_keyset(query, "data_criacao", "desc", cursor, limit, with_total)
+
     def listar_contratos_filtrados(self, 
                                   data_inicio: Optional[datetime] = None,
                                   data_fim: Optional[datetime] = None,
@@ -59,10 +70,30 @@ class ContratoRepository(BaseRepository):
                                   status_assinatura: Optional[str] = None,
                                   status_cliente: Optional[str] = None) -> List[ContratoModel]:
         """Lista contratos com diversos filtros"""
+        return self.query_filtrada(
+            data_inicio, data_fim, nome, cpf, status_assinatura, status_cliente
+        ).all()
+
+    def query_exportacao(self, **filtros):
+        """Linhas ``(contrato, nome e CPF do cliente)`` com os filtros da listagem"""
+        from crm_modules.clientes.models import ClienteModel
+
+        return self.query_filtrada(
+            **filtros, colunas=(ContratoModel, ClienteModel.nome, ClienteModel.cpf)
+        )
+
+    def query_filtrada(self,
+                       data_inicio: Optional[datetime] = None,
+                       data_fim: Optional[datetime] = None,
+                       nome: Optional[str] = None,
+                       cpf: Optional[str] = None,
+                       status_assinatura: Optional[str] = None,
+                       status_cliente: Optional[str] = None,
+                       colunas: tuple = (ContratoModel,)):
+        """Consulta (ainda não executada) de ``listar_contratos_filtrados``"""
         from crm_modules.clientes.models import ClienteModel
-        from sqlalchemy import and_, or_
         
-        query = self.session.query(ContratoModel).join(ClienteModel, ContratoModel.cliente_id == ClienteModel.id)
+        query = self.session.query(*colunas).join(ClienteModel, ContratoModel.cliente_id == ClienteModel.id)
         
         query = query.filter(ContratoModel.deletado_em == None)
         
@@ -86,20 +117,26 @@ class ContratoRepository(BaseRepository):
         if status_cliente:
             query = query.filter(ClienteModel.status_cliente == status_cliente)
             
-        return query.order_by(ContratoModel.data_criacao.desc()).all()
+        return query.order_by(ContratoModel.data_criacao.desc())
 
-    def get_contratos_vencidos(self) -> List[ContratoModel]:
-        """Busca contratos que já venceram"""
+    def _query_vencidos(self):
         from sqlalchemy import and_
         data_atual = datetime.utcnow()
-        
+
         return self.session.query(ContratoModel).filter(
             and_(
                 ContratoModel.data_vigencia_fim < data_atual,
                 ContratoModel.status_assinatura == StatusAssinatura.LIBERADO,
                 ContratoModel.deletado_em == None
             )
-        ).order_by(ContratoModel.data_vigencia_fim.desc()).all()
+        )
+
+    def get_contratos_vencidos(self) -> List[ContratoModel]:
+        """Busca contratos que já venceram"""
+        return self._query_vencidos().order_by(ContratoModel.data_vigencia_fim.desc()).all()
+
+    def contar_contratos_vencidos(self) -> int:
+        return self._query_vencidos().count()
 
     def update_status_assinatura(self, contrato_id: int, status: StatusAssinatura,
                                 hash_assinatura: Optional[str] = None,
@@ -1,19 +1,28 @@
 """Service para Contratos"""
 
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from pathlib import Path
 from datetime import datetime, timedelta
 from crm_modules.contratos.repository import ContratoRepository, ContratoHistoricoRepository
 from crm_modules.contratos.domain import Contrato, StatusAssinatura
 from crm_modules.contratos.schemas import ContratoCreate, ContratoUpdate
-from crm_modules.contratos.pdf_generator import ContratosPDFGenerator
+from crm_modules.contratos.infrastructure.pdf.servico import (
+    chave_pdf_contrato, instantaneo_contrato, renderizar_contrato, servico_pdf
+)
 from crm_modules.clientes.service import ClienteService
-from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_core.cache.arquivos import cache_pdf
+from crm_core.utils.exceptions import CRMException, NotFoundException, ValidationException
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
+from crm_core.events.events import ContratoCreatedEvent, ContratoStatusChangedEvent
+from starlette.concurrency import run_in_threadpool
 import hashlib
 import os
+import shutil
 
 
 class ContratoService:
-    def __init__(self, repository: Optional[ContratoRepository] = None, repository_session=None, usuario_id: Optional[str] = None):
+    def __init__(self, repository: Optional[ContratoRepository] = None, repository_session=None, usuario_id: Optional[str] = None,
+                 event_bus: Optional[EventBus] = None):
         if repository is not None:
             self.repository = repository
         else:
@@ -21,6 +30,7 @@ class ContratoService:
         
         self.historico_repo = ContratoHistoricoRepository(session=self.repository.session)
         self.usuario_id = usuario_id or "SISTEMA"
+        self.event_bus = event_bus or event_bus_padrao
 
     def criar_contrato(self, contrato_data: ContratoCreate, usuario_id: Optional[str] = None) -> Contrato:
         """Cria um novo contrato com geração de PDF, faturas automáticas e auditoria"""
@@ -114,6 +124,7 @@ class ContratoService:
             self.repository.session.add(cliente_model)
             self.repository.session.commit()
 
+        self.event_bus.publish(ContratoCreatedEvent(model.id, model.cliente_id))
         return self._model_to_domain(model)
 
     def obter_contrato(self, contrato_id: int):
@@ -132,13 +143,29 @@ class ContratoService:
     def listar_todos_contratos(self, limite: int = 100, offset: int = 0) -> List[dict]:
         """Lista todos os contratos (com paginação) com dados do cliente"""
         models = self.repository.list(limit=limite, offset=offset)
+        return self._dicts_com_nome_cliente(models)
+
+    def listar_contratos_por_cursor(self, limite: int = 100, cursor: Optional[str] = None):
+        """Lista contratos por cursor; retorna (contratos, total, próximo cursor)"""
+        pagina = self.repository.list_keyset(limit=limite, cursor=cursor)
+        return self._dicts_com_nome_cliente(pagina.items), pagina.total, pagina.next_cursor
+
+    def _dicts_com_nome_cliente(self, models) -> List[dict]:
+        """Converte contratos em dicts com o nome do cliente (uma consulta para todos)"""
+        from crm_modules.clientes.models import ClienteModel
+
+        cliente_ids = list({model.cliente_id for model in models})
+        nomes = {}
+        if cliente_ids:
+            nomes = dict(
+                self.repository.session.query(ClienteModel.id, ClienteModel.nome)
+                .filter(ClienteModel.id.in_(cliente_ids))
+                .all()
+            )
         contratos = []
         for model in models:
             contrato_dict = self._model_to_dict(model)
-            # Adicionar nome do cliente
-            cliente_service = ClienteService(repository_session=self.repository.session)
-            cliente = cliente_service.obter_cliente(model.cliente_id)
-            contrato_dict['cliente_nome'] = cliente.nome if cliente else f'Cliente {model.cliente_id}'
+            contrato_dict['cliente_nome'] = nomes.get(model.cliente_id) or f'Cliente {model.cliente_id}'
             contratos.append(contrato_dict)
         return contratos
 
@@ -186,6 +213,7 @@ class ContratoService:
             f"Contrato assinado digitalmente por {nome_signatario or usuario}"
         )
 
+        self.event_bus.publish(ContratoStatusChangedEvent(model.id, model.cliente_id, "assinado"))
         return model
 
     def liberar_contrato(self, contrato_id: int, usuario_id: str = None, motivo: str = None) -> Contrato:
@@ -229,6 +257,7 @@ class ContratoService:
             cliente_model.status_contrato = "assinado"
             self.repository.session.add(cliente_model)
 
+        self.event_bus.publish(ContratoStatusChangedEvent(model.id, model.cliente_id, "liberado"))
         return self._model_to_domain(model)
 
     def obter_historico(self, contrato_id: int) -> list:
@@ -264,8 +293,8 @@ class ContratoService:
                 'aguardando': 0,
                 'assinado': 0,
                 'liberado': 0,
-                'vencendo_30_dias': len(self.verificar_contratos_vencendo(30)),
-                'vencidos': len(self.verificar_contratos_vencidos())
+                'vencendo_30_dias': self.repository.contar_contratos_vencendo(30),
+                'vencidos': self.repository.contar_contratos_vencidos()
             }
 
             for status, count in status_counts:
@@ -484,40 +513,61 @@ class ContratoService:
 
     def gerar_pdf_contrato(self, contrato_id: int, empresa_dados: Optional[dict] = None) -> bytes:
         """Gera PDF do contrato existente e retorna bytes"""
-        try:
-            # Buscar contrato
-            model = self.repository.get_by_id(contrato_id)
-            if not model:
-                raise NotFoundException("Contrato não encontrado")
-
-            # Usar o gerador de PDF padrão
-            from crm_modules.contratos.pdf_generator import ContratosPDFGenerator
+        caminho, _ = self.pdf_contrato(contrato_id)
+        return caminho.read_bytes()
 
-            generator = ContratosPDFGenerator(
-                contrato=model,
-                template_html=None
+    def pdf_contrato(self, contrato_id: int) -> Tuple[Path, str]:
+        """Arquivo do PDF no cache (gerado só se o contrato ou o template mudou) e a chave dele"""
+        contrato = self.dados_pdf_contrato(contrato_id)
+        chave = chave_pdf_contrato(contrato)
+        try:
+            caminho = cache_pdf.obter_ou_gerar(
+                chave, lambda: servico_pdf.renderizar(renderizar_contrato, contrato)
             )
+        except CRMException:
+            raise
+        except Exception as e:
+            raise Exception(f"Erro ao gerar PDF: {str(e)}")
+        return caminho, chave
 
-            pdf_bytes = generator.gerar_pdf()
-            return pdf_bytes
+    async def pdf_contrato_async(self, contrato_id: int) -> Tuple[Path, str]:
+        """Como ``pdf_contrato``, sem prender uma thread do servidor durante a renderização"""
+        contrato = await run_in_threadpool(self.dados_pdf_contrato, contrato_id)
+        chave = chave_pdf_contrato(contrato)
+        try:
+            caminho = await cache_pdf.obter_ou_gerar_async(
+                chave, lambda: servico_pdf.renderizar_async(renderizar_contrato, contrato)
+            )
+        except CRMException:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao gerar PDF: {str(e)}")
+        return caminho, chave
+
+    def dados_pdf_contrato(self, contrato_id: int):
+        """Instantâneo do contrato (com o cliente) enviado ao processo que gera o PDF"""
+        model = self.repository.get_by_id(contrato_id)
+        if not model:
+            raise NotFoundException("Contrato não encontrado")
+        return instantaneo_contrato(model)
 
     def _gerar_pdf_contrato(self, model) -> str:
         """Gera PDF do contrato usando ReportLab ou template"""
         try:
             from crm_core.config.settings import settings
             template_html = settings.contract_template_html if settings.contract_template_html else None
-            generator = ContratosPDFGenerator(model, template_html)
-            pdf_bytes = generator.gerar_pdf()
+            contrato = instantaneo_contrato(model)
+            caminho = cache_pdf.obter_ou_gerar(
+                chave_pdf_contrato(contrato, template_html),
+                lambda: servico_pdf.renderizar(renderizar_contrato, contrato, template_html)
+            )
 
             # Salvar arquivo
             os.makedirs("interfaces/web/static/contratos", exist_ok=True)
             filename = f"contrato_{model.id}_{model.cliente_id}.pdf"
             filepath = f"interfaces/web/static/contratos/{filename}"
 
-            with open(filepath, 'wb') as f:
-                f.write(pdf_bytes)
+            shutil.copyfile(caminho, filepath)
 
             print(f"[PDF] Arquivo salvo: {filepath}, retornando filename: {filename}")
             return filename
@@ -0,0 +1,233 @@
+"""Contadores ao vivo do dashboard e do menu, enviados por Server-Sent Events.
+
+Em vez de cada aba consultar ``/contratos/stats/realtime`` periodicamente, o
+``PainelAoVivo`` assina o barramento de eventos do processo e recalcula só os
+grupos de contadores afetados:
+
+- ``contratos``: criado, assinado ou liberado (estatísticas e últimos 5);
+- ``faturamento``: fatura paga;
+- ``sessoes``: logins PPPoE que conectaram ou desconectaram.
+
+- Eventos que chegam dentro de ``dashboard_ao_vivo_janela`` segundos são
+  juntados num único recálculo por grupo, feito uma vez para todas as
+  conexões abertas (N abas custam um cálculo, não N).
+- Cada conexão recebe um ``snapshot`` completo ao abrir e depois só ``delta``
+  com as chaves que mudaram. Se a fila da conexão encher (cliente lento), ela
+  é esvaziada e recebe um ``snapshot`` novo.
+- Sem conexões abertas nada é recalculado; os grupos afetados ficam marcados
+  e são atualizados quando a próxima conexão abrir.
+"""
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from crm_core.config.settings import settings
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
+
+CONTRATOS = "contratos"
+FATURAMENTO = "faturamento"
+SESSOES = "sessoes"
+
+GRUPO_POR_EVENTO = {
+    "ContratoCreatedEvent": CONTRATOS,
+    "ContratoStatusChangedEvent": CONTRATOS,
+    "FaturaPaidEvent": FATURAMENTO,
+    "SessoesPPPoEChangedEvent": SESSOES,
+}
+
+
+def _contadores_contratos() -> dict:
+    from crm_core.db.base import get_db_session
+    from crm_modules.contratos.service import ContratoService
+
+    db = get_db_session()
+    try:
+        service = ContratoService(repository_session=db)
+        stats = service.obter_estatisticas_contratos()
+        return {
+            'total': stats.get('total', 0),
+            'aguardando': stats.get('aguardando', 0),
+            'assinado': stats.get('assinado', 0),
+            'liberado': stats.get('liberado', 0),
+            'vencendo_30_dias': stats.get('vencendo_30_dias', 0),
+            'vencidos': stats.get('vencidos', 0),
+            'recentes': service.listar_todos_contratos(limite=5, offset=0),
+        }
+    finally:
+        db.close()
+
+
+def _contadores_faturamento() -> dict:
+    from datetime import datetime
+    from sqlalchemy import func
+    from crm_core.db.base import get_db_session
+    from crm_modules.faturamento.models import FaturaModel, PagamentoModel
+
+    db = get_db_session()
+    try:
+        pendentes = db.query(func.count(FaturaModel.id)).filter(FaturaModel.status != 'pago').scalar() or 0
+        hoje = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        pagamentos, recebido = db.query(func.count(PagamentoModel.id), func.sum(PagamentoModel.valor_pago)).filter(
+            PagamentoModel.data_pagamento >= hoje).one()
+        return {
+            'faturas_pendentes': pendentes,
+            'pagamentos_hoje': pagamentos or 0,
+            'recebido_hoje': round(float(recebido or 0), 2),
+        }
+    finally:
+        db.close()
+
+
+def _contadores_sessoes() -> dict:
+    from crm_modules.mikrotik.sessoes import indice_sessoes
+
+    # estado() só lê o índice em memória; não dispara leitura nos roteadores
+    return {'online': indice_sessoes.estado()['total']}
+
+
+CALCULOS_PADRAO = {
+    CONTRATOS: _contadores_contratos,
+    FATURAMENTO: _contadores_faturamento,
+    SESSOES: _contadores_sessoes,
+}
+
+
+def formatar_sse(evento: str, dados) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, default=str, ensure_ascii=False)}\n\n"
+
+
+class PainelAoVivo:
+    def __init__(
+        self,
+        event_bus: Optional[EventBus] = None,
+        calculos: Optional[Dict[str, Callable[[], dict]]] = None,
+        janela: Optional[float] = None,
+        keepalive: Optional[float] = None,
+        max_fila: Optional[int] = None,
+    ):
+        self.event_bus = event_bus or event_bus_padrao
+        self.calculos = calculos or CALCULOS_PADRAO
+        self.janela = settings.dashboard_ao_vivo_janela if janela is None else janela
+        self.keepalive = keepalive or settings.dashboard_ao_vivo_keepalive
+        self.max_fila = max_fila or settings.dashboard_ao_vivo_max_fila
+        self.estado: Dict[str, dict] = {}
+        self.recalculos = 0
+        self._assinantes = set()
+        self._sujos = set()
+        self._desatualizados = set(self.calculos)
+        self._lock = threading.Lock()
+        self._inscrito = False
+        self._loop = None
+        self._acordar: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self._atualizando: Optional[asyncio.Lock] = None
+
+    # Eventos (chamado na thread de quem publicou)
+    def _ao_evento(self, evento):
+        grupo = GRUPO_POR_EVENTO.get(type(evento).__name__)
+        if grupo is None or grupo not in self.calculos:
+            return
+        with self._lock:
+            self._sujos.add(grupo)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._acordar.set)
+
+    def _iniciar(self):
+        if not self._inscrito:
+            for tipo in GRUPO_POR_EVENTO:
+                self.event_bus.subscribe(tipo, self._ao_evento)
+            self._inscrito = True
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._tarefa is None or self._tarefa.done():
+            self._loop = loop
+            self._acordar = asyncio.Event()
+            self._atualizando = asyncio.Lock()
+            self._tarefa = loop.create_task(self._coalescer())
+            with self._lock:
+                if self._sujos:
+                    self._acordar.set()
+
+    # Recálculo
+    def _recalcular(self, grupos) -> Dict[str, dict]:
+        """Recalcula os grupos e devolve só as chaves que mudaram em cada um."""
+        delta = {}
+        for grupo in grupos:
+            try:
+                novo = self.calculos[grupo]()
+            except Exception as e:
+                print(f"Aviso: falha ao recalcular contadores '{grupo}': {e}")
+                continue
+            self.recalculos += 1
+            anterior = self.estado.get(grupo, {})
+            mudou = {chave: valor for chave, valor in novo.items() if anterior.get(chave) != valor}
+            # Copia em vez de alterar: o loop pode estar serializando o estado anterior
+            self.estado = {**self.estado, grupo: novo}
+            if mudou:
+                delta[grupo] = mudou
+        return delta
+
+    async def _atualizar_desatualizados(self):
+        async with self._atualizando:
+            grupos, self._desatualizados = self._desatualizados, set()
+            if not self._assinantes:
+                # Ninguém espera um delta destes eventos: entram já no snapshot
+                with self._lock:
+                    grupos |= self._sujos
+                    self._sujos = set()
+            if grupos:
+                await run_in_threadpool(self._recalcular, grupos)
+
+    async def _coalescer(self):
+        while True:
+            await self._acordar.wait()
+            await asyncio.sleep(self.janela)
+            self._acordar.clear()
+            with self._lock:
+                grupos, self._sujos = self._sujos, set()
+            if not self._assinantes:
+                self._desatualizados |= grupos
+                continue
+            async with self._atualizando:
+                delta = await run_in_threadpool(self._recalcular, grupos)
+            if delta:
+                self._difundir("delta", delta)
+
+    def _difundir(self, evento: str, dados):
+        for fila in list(self._assinantes):
+            try:
+                fila.put_nowait((evento, dados))
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o que estava pendente e manda o estado inteiro
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait(("snapshot", self.estado))
+
+    # Conexões
+    async def assinar(self) -> AsyncIterator[str]:
+        """Mensagens SSE para uma conexão: ``snapshot``, depois ``delta`` e keep-alives."""
+        self._iniciar()
+        await self._atualizar_desatualizados()
+        fila = asyncio.Queue(maxsize=self.max_fila)
+        self._assinantes.add(fila)
+        try:
+            yield formatar_sse("snapshot", self.estado)
+            while True:
+                try:
+                    evento, dados = await asyncio.wait_for(fila.get(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield formatar_sse(evento, dados)
+        finally:
+            self._assinantes.discard(fila)
+
+    @property
+    def conexoes(self) -> int:
+        return len(self._assinantes)
+
+
+painel_ao_vivo = PainelAoVivo()
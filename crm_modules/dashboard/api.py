@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends
+from crm_core.config.settings import settings
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from crm_core.db.base import get_db
 from crm_modules.dashboard.service import DashboardService
-from crm_core.security.dependencies import obter_usuario_atual
+from crm_modules.dashboard.ao_vivo import painel_ao_vivo
+from crm_core.security.auth_utils import criar_token_stream
+from crm_core.security.dependencies import obter_usuario_atual, obter_usuario_admin, obter_usuario_stream
 
 router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
 
@@ -41,3 +45,28 @@ def get_connection_uptime_chart(db: Session = Depends(get_db), _ = Depends(obter
     """Retorna dados do gráfico de uptime de conexão"""
     service = DashboardService(db)
     return service.get_connection_uptime_chart()
+
+@router.post("/metricas/consolidar")
+def consolidar_metricas(db: Session = Depends(get_db), _ = Depends(obter_usuario_admin)):
+    """Consolida agora as métricas do dashboard (normalmente feito pelo job)"""
+    service = DashboardService(db)
+    return service.record_daily_metrics()
+
+
+@router.post("/ao-vivo/token")
+def token_ao_vivo(usuario = Depends(obter_usuario_atual)):
+    """Token curto para abrir ``/ao-vivo`` com EventSource (``?token=...``)"""
+    return {"token": criar_token_stream(usuario.id), "expira_em": settings.dashboard_ao_vivo_token_ttl}
+
+
+@router.get("/ao-vivo")
+async def contadores_ao_vivo(_ = Depends(obter_usuario_stream)):
+    """Contadores de contratos, faturamento e sessões por Server-Sent Events (snapshot e deltas)
+
+    Aceita o header Authorization ou ``?token=`` obtido em ``POST /ao-vivo/token``.
+    """
+    return StreamingResponse(
+        painel_ao_vivo.assinar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
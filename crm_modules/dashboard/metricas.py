@@ -0,0 +1,373 @@
+"""Consolidação das métricas do dashboard em ``MetricHistory`` e ``DashboardKPI``.
+
+O ``ConsolidadorMetricas`` roda como job (``tasks/jobs/dashboard.py``) e grava
+agregados diários, semanais e mensais; as rotas do dashboard leem essas
+linhas em vez de varrer as tabelas de clientes, faturas e ordens a cada
+acesso.
+
+- Métricas de fluxo (receita paga, clientes novos, receita por plano e por
+  cliente) são recalculadas por dia a partir da marca d'água: o último dia
+  processado (refeito por estar possivelmente incompleto) e os maiores ids de
+  pagamento e cliente já vistos. Registros com id acima da marca entram mesmo
+  com data retroativa (ex.: baixa de um pagamento da semana passada), e os
+  dias deles são refeitos junto. Estornos de pagamentos antigos (``ativo``)
+  não têm registro de alteração e só entram reconsolidando o período.
+- Métricas de situação (clientes, ordens e contratos por status) são fotos do
+  momento da execução, gravadas no dia corrente.
+- Não há data de cancelamento de cliente: os cancelamentos do dia são a
+  diferença entre o total de cancelados agora e na última foto de um dia
+  anterior.
+- Linhas semanais e mensais são refeitas a partir das diárias dos períodos
+  afetados: soma para fluxos, última foto para situações.
+"""
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from crm_core.config.settings import settings
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.contratos.models import ContratoModel
+from crm_modules.dashboard.models import Dashboard, DashboardKPI, MetricHistory
+from crm_modules.faturamento.models import FaturaModel, PagamentoModel
+from crm_modules.ordens_servico.models import OrdemServicoModel
+
+DIARIO = "daily"
+SEMANAL = "weekly"
+MENSAL = "monthly"
+
+RECEITA_PAGA = "receita_paga"
+CLIENTES_NOVOS = "clientes_novos"
+CANCELAMENTOS = "cancelamentos"
+RECEITA_POR_PLANO = "receita_por_plano"
+RECEITA_POR_CLIENTE = "receita_por_cliente"
+CLIENTES_STATUS = "clientes_status"
+ORDENS_STATUS = "ordens_status"
+CONTRATOS_STATUS = "contratos_status"
+MARCA_DAGUA = "rollup_watermark"
+
+FLUXOS = (RECEITA_PAGA, CLIENTES_NOVOS, CANCELAMENTOS, RECEITA_POR_PLANO, RECEITA_POR_CLIENTE)
+SITUACOES = (CLIENTES_STATUS, ORDENS_STATUS, CONTRATOS_STATUS)
+ORDENS_PENDENTES = ("aberta", "em_andamento")
+
+DASHBOARD_PRINCIPAL = "principal"
+
+# dia -> (valor, metadados)
+Serie = Dict[date, Tuple[float, Optional[dict]]]
+
+
+def inicio_semana(dia: date) -> date:
+    return dia - timedelta(days=dia.weekday())
+
+
+def inicio_mes(dia: date) -> date:
+    return dia.replace(day=1)
+
+
+def _como_data(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _meia_noite(dia: date) -> datetime:
+    return datetime(dia.year, dia.month, dia.day)
+
+
+def metadados(linha: MetricHistory) -> dict:
+    return json.loads(linha.data_metadata) if linha.data_metadata else {}
+
+
+def somar_metadados(linhas: Iterable[MetricHistory]) -> Dict[str, float]:
+    total: Dict[str, float] = defaultdict(float)
+    for linha in linhas:
+        for chave, valor in metadados(linha).items():
+            total[chave] += valor
+    return dict(total)
+
+
+def serie(db: Session, metrica: str, periodo: str, desde: date) -> List[MetricHistory]:
+    """Linhas de uma métrica a partir de ``desde``, em ordem cronológica."""
+    return db.query(MetricHistory).filter(
+        MetricHistory.metric_type == metrica,
+        MetricHistory.period == periodo,
+        MetricHistory.timestamp >= _meia_noite(desde),
+    ).order_by(MetricHistory.timestamp).all()
+
+
+def series(db: Session, nomes: Iterable[str], periodo: str, desde: date) -> Dict[str, List[MetricHistory]]:
+    """Como ``serie``, para várias métricas numa única consulta."""
+    nomes = tuple(nomes)
+    resultado: Dict[str, List[MetricHistory]] = {nome: [] for nome in nomes}
+    for linha in db.query(MetricHistory).filter(
+        MetricHistory.metric_type.in_(nomes),
+        MetricHistory.period == periodo,
+        MetricHistory.timestamp >= _meia_noite(desde),
+    ).order_by(MetricHistory.timestamp):
+        resultado[linha.metric_type].append(linha)
+    return resultado
+
+
+def ultima_foto(db: Session, metrica: str, antes_de: Optional[date] = None) -> Optional[MetricHistory]:
+    """Última linha diária de uma métrica de situação (opcionalmente antes de um dia)."""
+    query = db.query(MetricHistory).filter(MetricHistory.metric_type == metrica, MetricHistory.period == DIARIO)
+    if antes_de is not None:
+        query = query.filter(MetricHistory.timestamp < _meia_noite(antes_de))
+    return query.order_by(MetricHistory.timestamp.desc()).first()
+
+
+def ultimas_fotos(db: Session, nomes: Iterable[str]) -> Dict[str, MetricHistory]:
+    """Última linha diária de cada métrica de situação, numa única consulta (CTE)."""
+    ultimas = db.query(
+        MetricHistory.metric_type.label("metrica"),
+        func.max(MetricHistory.timestamp).label("timestamp"),
+    ).filter(
+        MetricHistory.metric_type.in_(tuple(nomes)),
+        MetricHistory.period == DIARIO,
+    ).group_by(MetricHistory.metric_type).cte("ultimas")
+    linhas = db.query(MetricHistory).join(ultimas, (MetricHistory.metric_type == ultimas.c.metrica)
+                                          & (MetricHistory.timestamp == ultimas.c.timestamp)).filter(
+        MetricHistory.period == DIARIO)
+    return {linha.metric_type: linha for linha in linhas}
+
+
+def contar_por_status(db: Session, coluna) -> Dict[str, int]:
+    """Quantidade de registros por valor de ``coluna`` (um ``GROUP BY``)."""
+    contagem = {}
+    for status, quantidade in db.query(coluna, func.count()).group_by(coluna):
+        status = getattr(status, "value", status) or "sem_status"
+        contagem[str(status)] = quantidade
+    return contagem
+
+
+class ConsolidadorMetricas:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def consolidar(self, agora: Optional[datetime] = None) -> dict:
+        """Atualiza as métricas desde a marca d'água e grava os KPIs; um único commit."""
+        agora = agora or datetime.utcnow()
+        hoje = agora.date()
+        limite = hoje - timedelta(days=settings.dashboard_rollup_dias_iniciais)
+        marca, ids = self._marca_dagua()
+        novos, ids_atuais = self._novos_desde(ids)
+        inicio = min(marca or limite, novos or hoje, hoje)
+        inicio = max(inicio, limite)
+
+        diarios = self._fluxos_diarios(inicio)
+        situacoes = self._situacoes()
+
+        cancelados_antes = ultima_foto(self.db, CLIENTES_STATUS, antes_de=hoje)
+        diarios[CANCELAMENTOS] = {}
+        if cancelados_antes is not None:
+            novos = situacoes[CLIENTES_STATUS][1].get("cancelado", 0) - metadados(cancelados_antes).get("cancelado", 0)
+            diarios[CANCELAMENTOS][hoje] = (max(0, novos), None)
+
+        for metrica, valores in diarios.items():
+            # Cancelamentos só podem ser calculados para hoje; os dias anteriores ficam como estão
+            desde = hoje if metrica == CANCELAMENTOS else inicio
+            self._substituir(metrica, DIARIO, desde, hoje, valores)
+        for metrica, valor in situacoes.items():
+            self._substituir(metrica, DIARIO, hoje, hoje, {hoje: valor})
+        self.db.flush()
+
+        for metrica in FLUXOS + SITUACOES:
+            self._reagrupar(metrica, inicio, hoje, somar=metrica in FLUXOS)
+        self.db.flush()
+
+        self._atualizar_kpis(hoje)
+        self._substituir(MARCA_DAGUA, "controle", date.min, date.max, {hoje: (0.0, ids_atuais)})
+        self.db.commit()
+
+        from crm_core.cache import cache
+        cache.invalidar("dashboard")
+        return {"inicio": inicio.isoformat(), "fim": hoje.isoformat(), "dias": (hoje - inicio).days + 1}
+
+    # Leitura das tabelas de origem
+    def _marca_dagua(self) -> Tuple[Optional[date], Dict[str, int]]:
+        """Último dia processado e maiores ids já consolidados."""
+        linha = self.db.query(MetricHistory).filter(MetricHistory.metric_type == MARCA_DAGUA).first()
+        if linha is None:
+            return None, {}
+        return linha.timestamp.date(), metadados(linha)
+
+    def _novos_desde(self, ids: Dict[str, int]) -> Tuple[Optional[date], Dict[str, int]]:
+        """Dia mais antigo entre os registros acima da marca e os novos maiores ids."""
+        mais_antigo = None
+        atuais = {}
+        for chave, id_coluna, data_coluna in (
+            ("pagamento_id", PagamentoModel.id, PagamentoModel.data_pagamento),
+            ("cliente_id", ClienteModel.id, ClienteModel.data_cadastro),
+        ):
+            ultimo = ids.get(chave, 0)
+            menor_data, maior_id = self.db.query(func.min(data_coluna), func.max(id_coluna)).filter(
+                id_coluna > ultimo).one()
+            atuais[chave] = maior_id or ultimo
+            if ids and menor_data is not None:
+                dia = _como_data(menor_data)
+                mais_antigo = dia if mais_antigo is None else min(mais_antigo, dia)
+        return mais_antigo, atuais
+
+    def _fluxos_diarios(self, inicio: date) -> Dict[str, Serie]:
+        desde = _meia_noite(inicio)
+        dia_pagamento = func.date(PagamentoModel.data_pagamento)
+        pagamentos = self.db.query(PagamentoModel).filter(
+            PagamentoModel.ativo == True,
+            PagamentoModel.data_pagamento >= desde,
+        )
+
+        receita: Serie = {}
+        for dia, total, quantidade in pagamentos.with_entities(
+            dia_pagamento, func.sum(PagamentoModel.valor_pago), func.count(PagamentoModel.id)
+        ).group_by(dia_pagamento):
+            receita[_como_data(dia)] = (float(total or 0), {"pagamentos": quantidade})
+
+        por_plano = defaultdict(dict)
+        por_cliente = defaultdict(dict)
+        for dia, plano_id, cliente_id, total in pagamentos.join(
+            FaturaModel, FaturaModel.id == PagamentoModel.fatura_id
+        ).join(
+            ClienteModel, ClienteModel.id == FaturaModel.cliente_id
+        ).with_entities(
+            dia_pagamento, ClienteModel.plano_id, ClienteModel.id, func.sum(PagamentoModel.valor_pago)
+        ).group_by(dia_pagamento, ClienteModel.plano_id, ClienteModel.id):
+            dia = _como_data(dia)
+            chave_plano = str(plano_id or 0)
+            por_plano[dia][chave_plano] = por_plano[dia].get(chave_plano, 0.0) + float(total or 0)
+            por_cliente[dia][str(cliente_id)] = float(total or 0)
+
+        dia_cadastro = func.date(ClienteModel.data_cadastro)
+        novos: Serie = {
+            _como_data(dia): (float(quantidade), None)
+            for dia, quantidade in self.db.query(dia_cadastro, func.count(ClienteModel.id))
+            .filter(ClienteModel.data_cadastro >= desde)
+            .group_by(dia_cadastro)
+        }
+
+        return {
+            RECEITA_PAGA: receita,
+            CLIENTES_NOVOS: novos,
+            RECEITA_POR_PLANO: {dia: (sum(valores.values()), valores) for dia, valores in por_plano.items()},
+            RECEITA_POR_CLIENTE: {dia: (sum(valores.values()), valores) for dia, valores in por_cliente.items()},
+        }
+
+    def _situacoes(self) -> Dict[str, Tuple[float, dict]]:
+        clientes = contar_por_status(self.db, ClienteModel.status_servico)
+        ordens = contar_por_status(self.db, OrdemServicoModel.status)
+        contratos = contar_por_status(self.db, ContratoModel.status_assinatura)
+        return {
+            CLIENTES_STATUS: (float(sum(clientes.values())), clientes),
+            ORDENS_STATUS: (float(sum(ordens.get(s, 0) for s in ORDENS_PENDENTES)), ordens),
+            CONTRATOS_STATUS: (float(sum(contratos.values())), contratos),
+        }
+
+    # Escrita
+    def _substituir(self, metrica: str, periodo: str, desde: date, ate: date, valores: Serie):
+        """Troca as linhas da métrica/período entre ``desde`` e ``ate`` pelos ``valores``."""
+        filtro = self.db.query(MetricHistory).filter(
+            MetricHistory.metric_type == metrica,
+            MetricHistory.period == periodo,
+        )
+        if desde != date.min:
+            filtro = filtro.filter(MetricHistory.timestamp >= _meia_noite(desde))
+        if ate != date.max:
+            filtro = filtro.filter(MetricHistory.timestamp < _meia_noite(ate + timedelta(days=1)))
+        filtro.delete(synchronize_session=False)
+
+        self.db.add_all([
+            MetricHistory(
+                metric_type=metrica,
+                period=periodo,
+                timestamp=_meia_noite(dia),
+                value=valor,
+                data_metadata=json.dumps(meta, sort_keys=True) if meta else None,
+            )
+            for dia, (valor, meta) in sorted(valores.items())
+        ])
+
+    def _reagrupar(self, metrica: str, inicio: date, hoje: date, somar: bool):
+        for periodo, inicio_periodo in ((SEMANAL, inicio_semana), (MENSAL, inicio_mes)):
+            desde = inicio_periodo(inicio)
+            grupos: Dict[date, List[MetricHistory]] = defaultdict(list)
+            for linha in serie(self.db, metrica, DIARIO, desde):
+                grupos[inicio_periodo(linha.timestamp.date())].append(linha)
+
+            valores: Serie = {}
+            for dia, linhas in grupos.items():
+                if somar:
+                    meta = somar_metadados(linhas)
+                    valores[dia] = (sum(linha.value for linha in linhas), meta or None)
+                else:
+                    ultima = linhas[-1]
+                    valores[dia] = (ultima.value, metadados(ultima) or None)
+            self._substituir(metrica, periodo, desde, hoje, valores)
+
+    def _atualizar_kpis(self, hoje: date):
+        mes = _meia_noite(inicio_mes(hoje))
+        mes_anterior = _meia_noite(inicio_mes(inicio_mes(hoje) - timedelta(days=1)))
+
+        def mensal(metrica: str, inicio: datetime) -> Optional[MetricHistory]:
+            return self.db.query(MetricHistory).filter(
+                MetricHistory.metric_type == metrica,
+                MetricHistory.period == MENSAL,
+                MetricHistory.timestamp == inicio,
+            ).first()
+
+        def valor(linha, chave=None, chaves=None) -> Optional[float]:
+            if linha is None:
+                return None
+            if chaves is not None:
+                meta = metadados(linha)
+                return float(sum(meta.get(c, 0) for c in chaves))
+            return float(metadados(linha).get(chave, 0)) if chave else float(linha.value)
+
+        clientes, clientes_antes = mensal(CLIENTES_STATUS, mes), mensal(CLIENTES_STATUS, mes_anterior)
+        ordens, ordens_antes = mensal(ORDENS_STATUS, mes), mensal(ORDENS_STATUS, mes_anterior)
+        receita, receita_antes = mensal(RECEITA_PAGA, mes), mensal(RECEITA_PAGA, mes_anterior)
+
+        def ticket_medio(linha) -> Optional[float]:
+            if linha is None:
+                return None
+            pagamentos = metadados(linha).get("pagamentos", 0)
+            return float(linha.value) / pagamentos if pagamentos else 0.0
+
+        kpis = [
+            ("total_clients", "clients", "count", valor(clientes), valor(clientes_antes)),
+            ("active_contracts", "clients", "count", valor(clientes, "ativo"), valor(clientes_antes, "ativo")),
+            ("monthly_revenue", "revenue", "currency", valor(receita) or 0.0, valor(receita_antes)),
+            ("pending_orders", "orders", "count", valor(ordens, chaves=ORDENS_PENDENTES),
+             valor(ordens_antes, chaves=ORDENS_PENDENTES)),
+            ("new_clients", "clients", "count", valor(mensal(CLIENTES_NOVOS, mes)) or 0.0,
+             valor(mensal(CLIENTES_NOVOS, mes_anterior))),
+            ("cancellations", "clients", "count", valor(mensal(CANCELAMENTOS, mes)) or 0.0,
+             valor(mensal(CANCELAMENTOS, mes_anterior))),
+            ("avg_ticket_value", "revenue", "currency", ticket_medio(receita) or 0.0, ticket_medio(receita_antes)),
+        ]
+
+        dashboard = self.db.query(Dashboard).filter(Dashboard.name == DASHBOARD_PRINCIPAL).first()
+        if dashboard is None:
+            dashboard = Dashboard(name=DASHBOARD_PRINCIPAL, description="KPIs consolidados pelo job de métricas")
+            self.db.add(dashboard)
+            self.db.flush()
+        existentes = {kpi.name: kpi for kpi in self.db.query(DashboardKPI).filter(
+            DashboardKPI.dashboard_id == dashboard.id)}
+
+        for nome, tipo, unidade, atual, anterior in kpis:
+            kpi = existentes.get(nome)
+            if kpi is None:
+                kpi = DashboardKPI(dashboard_id=dashboard.id, name=nome, metric_type=tipo, unit=unidade)
+                self.db.add(kpi)
+            kpi.current_value = atual or 0.0
+            kpi.previous_value = anterior
+            # Mesma regra de DashboardRepository.update_kpi, comparando com o mês anterior
+            if anterior:
+                kpi.percentage_change = ((kpi.current_value - anterior) / anterior) * 100
+            else:
+                kpi.percentage_change = 0
+            kpi.trend = "up" if kpi.percentage_change > 0 else "down" if kpi.percentage_change < 0 else "stable"
+            kpi.updated_at = datetime.utcnow()
@@ -1,39 +1,243 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime
+from datetime import datetime, timedelta
 from crm_modules.clientes.models import ClienteModel, ClienteConexaoLog
 from crm_modules.ordens_servico.models import OrdemServicoModel
-from crm_modules.faturamento.models import FaturaModel
+from crm_modules.faturamento.models import FaturaModel, PagamentoModel
 from crm_modules.planos.models import PlanoModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from crm_core.cache import em_cache
+from crm_core.config.settings import settings
+from crm_modules.dashboard.models import Dashboard, DashboardKPI
+from crm_modules.dashboard import metricas
+from crm_modules.dashboard.metricas import ConsolidadorMetricas
+
+# Os números do dashboard podem ficar alguns segundos atrasados
+TTL_DASHBOARD = 30
+
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Métricas mensais lidas pelo bundle (os gráficos de 6 meses usam o final da janela de 12)
+MENSAIS_BUNDLE = (metricas.RECEITA_PAGA, metricas.CLIENTES_NOVOS, metricas.RECEITA_POR_PLANO,
+                  metricas.RECEITA_POR_CLIENTE)
+COLUNAS_STATUS = {
+    metricas.CLIENTES_STATUS: ClienteModel.status_servico,
+    metricas.ORDENS_STATUS: OrdemServicoModel.status,
+}
+
+
+def _inicios_meses(meses: int) -> List:
+    inicios = []
+    dia = metricas.inicio_mes(datetime.utcnow().date())
+    for _ in range(meses):
+        inicios.append(dia)
+        dia = metricas.inicio_mes(dia - timedelta(days=1))
+    inicios.reverse()
+    return inicios
+
+
+# Montagem dos gráficos (sem acesso ao banco)
+def _grafico_receita(rotulos, valores) -> Dict[str, Any]:
+    return {
+        "labels": rotulos,
+        "datasets": [{
+            "label": 'Receita',
+            "data": valores,
+            "borderColor": '#667eea',
+            "backgroundColor": 'rgba(102, 126, 234, 0.1)'
+        }],
+        "title": "Receita Mensal",
+        "type": "line"
+    }
+
+
+def _grafico_clientes(rotulos, valores) -> Dict[str, Any]:
+    return {
+        "labels": rotulos,
+        "datasets": [{
+            "label": 'Novos Clientes',
+            "data": valores,
+            "borderColor": '#764ba2',
+            "backgroundColor": 'rgba(118, 75, 162, 0.1)'
+        }],
+        "title": "Crescimento de Clientes",
+        "type": "line"
+    }
+
+
+def _grafico_ordens(contagem: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "labels": ['Pendente', 'Em Andamento', 'Concluída'],
+        "datasets": [{
+            "label": 'Ordens',
+            "data": [contagem.get('aberta', 0), contagem.get('em_andamento', 0), contagem.get('concluida', 0)],
+            "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71']
+        }],
+        "title": "Ordens por Status",
+        "type": "doughnut"
+    }
+
+
+def _grafico_contratos(contagem: Dict[str, int]) -> Dict[str, Any]:
+    return {
+        "labels": ['Ativo', 'Pendente', 'Cancelado'],
+        "datasets": [{
+            "label": 'Contratos',
+            "data": [contagem.get('ativo', 0), contagem.get('pendente', 0), contagem.get('cancelado', 0)],
+            "backgroundColor": ['#2ecc71', '#3498db', '#e74c3c']
+        }],
+        "title": "Contratos por Status",
+        "type": "doughnut"
+    }
+
+
+def _grafico_top_clientes(rotulos, valores) -> Dict[str, Any]:
+    return {
+        "labels": rotulos,
+        "datasets": [{
+            "label": 'Receita',
+            "data": valores,
+            "backgroundColor": '#667eea'
+        }],
+        "title": "Top Clientes por Receita",
+        "type": "bar"
+    }
+
+
+def _grafico_receita_por_plano(rotulos, valores) -> Dict[str, Any]:
+    return {
+        "labels": rotulos,
+        "datasets": [{
+            "label": 'Receita por Plano',
+            "data": valores,
+            "backgroundColor": ['#667eea', '#764ba2', '#f093fb', '#f5576c', '#4facfe']
+        }],
+        "title": "Receita por Plano",
+        "type": "bar"
+    }
+
+
+def _summary_dos_kpis(kpis: Dict[str, DashboardKPI]) -> Dict[str, Any]:
+    def valor(nome: str) -> float:
+        return float(kpis[nome].current_value or 0) if nome in kpis else 0.0
+
+    total = kpis.get("total_clients")
+    return {
+        "total_clients": int(valor("total_clients")),
+        "active_contracts": int(valor("active_contracts")),
+        "monthly_revenue": valor("monthly_revenue"),
+        "pending_orders": int(valor("pending_orders")),
+        "support_tickets_open": 0,  # TODO: implementar tabela de tickets
+        "system_uptime_percentage": 99.9,  # Valor padrão
+        "client_growth_percentage": round(total.percentage_change or 0.0, 2) if total else 0.0,
+        "net_revenue": valor("monthly_revenue"),  # Por enquanto igual à receita mensal
+        "avg_ticket_value": round(valor("avg_ticket_value"), 2),
+    }
 
 class DashboardService:
     def __init__(self, db: Session):
         self.db = db
 
+    # Leitura das métricas consolidadas (crm_modules.dashboard.metricas)
+    def _ultimos_meses(self, metrica: str, meses: int, mensais: Optional[Dict[str, list]] = None):
+        """Rótulos e linhas mensais dos últimos ``meses`` meses (None onde não há linha).
+
+        ``mensais`` são linhas já lidas com ``metricas.series`` (como no bundle).
+        """
+        inicios = _inicios_meses(meses)
+        if mensais is None:
+            mensais = metricas.series(self.db, (metrica,), metricas.MENSAL, inicios[0])
+        linhas = {linha.timestamp.date(): linha for linha in mensais[metrica]}
+        rotulos = [f"{MESES[inicio.month - 1]}/{inicio.year % 100:02d}" for inicio in inicios]
+        return rotulos, [linhas.get(inicio) for inicio in inicios]
+
+    def _total_por_chave(self, metrica: str, meses: int = 12, mensais: Optional[Dict[str, list]] = None) -> Dict[str, float]:
+        _, linhas = self._ultimos_meses(metrica, meses, mensais)
+        return metricas.somar_metadados(linha for linha in linhas if linha is not None)
+
+    def _contagem_status(self, metrica: str, fotos: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Contagem por status da última foto; sem foto em dia, um GROUP BY direto na tabela."""
+        if fotos is None:
+            fotos = self._fotos_em_dia(self._kpis())
+        foto = fotos.get(metrica)
+        if foto is not None:
+            return metricas.metadados(foto)
+        return metricas.contar_por_status(self.db, COLUNAS_STATUS[metrica])
+
+    def _kpis(self) -> Dict[str, DashboardKPI]:
+        """KPIs consolidados; vazio se o job não rodou ou está parado há mais que o permitido."""
+        kpis = {
+            kpi.name: kpi
+            for kpi in self.db.query(DashboardKPI).join(Dashboard).filter(
+                Dashboard.name == metricas.DASHBOARD_PRINCIPAL)
+        }
+        limite = datetime.utcnow() - timedelta(seconds=settings.dashboard_kpis_max_idade)
+        if any(kpi.updated_at is None or kpi.updated_at < limite for kpi in kpis.values()):
+            return {}
+        return kpis
+
+    def _fotos_em_dia(self, kpis: Dict[str, DashboardKPI]) -> Dict[str, Any]:
+        """Últimas fotos de situação, só se os KPIs estão em dia.
+
+        Fotos e KPIs são gravados no mesmo commit da consolidação, e o
+        ``timestamp`` da foto é só o dia; a idade dos KPIs vale para as duas.
+        """
+        return metricas.ultimas_fotos(self.db, COLUNAS_STATUS) if kpis else {}
+
+    @em_cache("dashboard:bundle", ttl=TTL_DASHBOARD, tags=("dashboard",))
+    def get_bundle(self, top_clientes: int = 10) -> Dict[str, Any]:
+        """Resumo e todos os gráficos do dashboard, com as consultas compartilhadas entre eles"""
+        mensais = metricas.series(self.db, MENSAIS_BUNDLE, metricas.MENSAL, _inicios_meses(12)[0])
+        kpis = self._kpis()
+        fotos = self._fotos_em_dia(kpis)
+        clientes = self._contagem_status(metricas.CLIENTES_STATUS, fotos)
+        ordens = self._contagem_status(metricas.ORDENS_STATUS, fotos)
+
+        return {
+            "summary": _summary_dos_kpis(kpis) if kpis else self._summary_ao_vivo(clientes, ordens),
+            "charts": {
+                "revenue": self._receita(mensais),
+                "clients": self._clientes_novos(mensais),
+                "orders_status": _grafico_ordens(ordens),
+                "contracts_status": _grafico_contratos(clientes),
+                "top_clients": self._top_clientes(top_clientes, mensais),
+                "support_tickets": self.get_support_tickets_chart(),
+                "revenue_by_plan": self._receita_por_plano(mensais),
+            },
+        }
+
+    @em_cache("dashboard:summary", ttl=TTL_DASHBOARD, tags=("dashboard",))
     def get_summary(self) -> Dict[str, Any]:
         """Retorna resumo executivo para o dashboard"""
+        kpis = self._kpis()
+        if not kpis:
+            # Job de métricas não rodou ou está atrasado: calcular direto nas tabelas
+            return self._summary_ao_vivo()
+        return _summary_dos_kpis(kpis)
+
+    def _summary_ao_vivo(self, clientes: Optional[Dict[str, int]] = None,
+                         ordens: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         try:
-            # Total de clientes
-            total_clients = self.db.query(func.count(ClienteModel.id)).scalar() or 0
+            # Clientes e ordens por status (um GROUP BY cada, se não vieram prontos)
+            if clientes is None:
+                clientes = metricas.contar_por_status(self.db, ClienteModel.status_servico)
+            if ordens is None:
+                ordens = metricas.contar_por_status(self.db, OrdemServicoModel.status)
 
-            # Contratos ativos (clientes com status ativo)
-            active_contracts = self.db.query(func.count(ClienteModel.id)).filter(ClienteModel.status_servico == 'ativo').scalar() or 0
+            total_clients = sum(clientes.values())
 
-            # Receita do mês atual
-            current_month = datetime.utcnow().month
-            current_year = datetime.utcnow().year
+            # Contratos ativos (clientes com status ativo)
+            active_contracts = clientes.get('ativo', 0)
 
-            monthly_revenue = self.db.query(func.sum(FaturaModel.valor_total)).filter(
-                func.extract('month', FaturaModel.data_emissao) == current_month,
-                func.extract('year', FaturaModel.data_emissao) == current_year,
-                FaturaModel.status == 'pago'
+            # Receita do mês atual: pagamentos ativos pela data do pagamento, como o KPI
+            inicio = metricas.inicio_mes(datetime.utcnow().date())
+            monthly_revenue = self.db.query(func.sum(PagamentoModel.valor_pago)).filter(
+                PagamentoModel.ativo == True,
+                PagamentoModel.data_pagamento >= datetime(inicio.year, inicio.month, 1),
             ).scalar() or 0.0
 
             # Pedidos pendentes (ordens de serviço com status pendente)
-            pending_orders = self.db.query(func.count(OrdemServicoModel.id)).filter(
-                OrdemServicoModel.status.in_(['aberta', 'em_andamento'])
-            ).scalar() or 0
+            pending_orders = sum(ordens.get(status, 0) for status in metricas.ORDENS_PENDENTES)
 
             # Campos adicionais para ExecutiveSummary
             support_tickets_open = 0  # TODO: implementar tabela de tickets
@@ -67,63 +271,72 @@ class DashboardService:
                 "avg_ticket_value": 0.0
             }
 
+    def _receita(self, mensais: Optional[Dict[str, list]] = None) -> Dict[str, Any]:
+        rotulos, linhas = self._ultimos_meses(metricas.RECEITA_PAGA, 6, mensais)
+        return _grafico_receita(rotulos, [round(linha.value, 2) if linha else 0 for linha in linhas])
+
+    def _clientes_novos(self, mensais: Optional[Dict[str, list]] = None) -> Dict[str, Any]:
+        rotulos, linhas = self._ultimos_meses(metricas.CLIENTES_NOVOS, 6, mensais)
+        return _grafico_clientes(rotulos, [int(linha.value) if linha else 0 for linha in linhas])
+
+    def _top_clientes(self, limit: int, mensais: Optional[Dict[str, list]] = None) -> Dict[str, Any]:
+        totais = self._total_por_chave(metricas.RECEITA_POR_CLIENTE, mensais=mensais)
+        top = sorted(totais.items(), key=lambda item: item[1], reverse=True)[:limit]
+        nomes = {}
+        if top:
+            nomes = dict(self.db.query(ClienteModel.id, ClienteModel.nome).filter(
+                ClienteModel.id.in_([int(cliente_id) for cliente_id, _ in top])))
+        return _grafico_top_clientes(
+            [nomes.get(int(cliente_id), f"Cliente {cliente_id}") for cliente_id, _ in top],
+            [round(total, 2) for _, total in top],
+        )
+
+    def _receita_por_plano(self, mensais: Optional[Dict[str, list]] = None) -> Dict[str, Any]:
+        totais = self._total_por_chave(metricas.RECEITA_POR_PLANO, mensais=mensais)
+        if totais:
+            # Receita paga nos últimos 12 meses, consolidada pelo job de métricas
+            nomes = dict(self.db.query(PlanoModel.id, PlanoModel.nome).filter(
+                PlanoModel.id.in_([int(plano_id) for plano_id in totais])))
+            ordenados = sorted(totais.items(), key=lambda item: item[1], reverse=True)
+            return _grafico_receita_por_plano([nomes.get(int(plano_id), "Sem plano") for plano_id, _ in ordenados],
+                                              [round(total, 2) for _, total in ordenados])
+
+        # Query para agrupar receita por plano
+        revenue_by_plan = self.db.query(
+            PlanoModel.nome,
+            func.sum(FaturaModel.valor_total).label('total_revenue')
+        ).join(
+            ClienteModel, ClienteModel.plano_id == PlanoModel.id
+        ).join(
+            FaturaModel, FaturaModel.cliente_id == ClienteModel.id
+        ).filter(
+            FaturaModel.status == 'pago'
+        ).group_by(
+            PlanoModel.id, PlanoModel.nome
+        ).order_by(
+            func.sum(FaturaModel.valor_total).desc()
+        ).all()
+
+        if revenue_by_plan:
+            return _grafico_receita_por_plano([row[0] for row in revenue_by_plan],
+                                              [float(row[1]) for row in revenue_by_plan])
+        # Dados mockados se não houver dados reais
+        return _grafico_receita_por_plano(['Plano 50Mbps', 'Plano 100Mbps', 'Plano 200Mbps'], [15000, 25000, 35000])
+
     def get_revenue_chart_data(self) -> Dict[str, Any]:
         """Retorna dados para gráfico de receita (últimos 6 meses)"""
         try:
-            # Dados mockados por enquanto, implementar consulta real depois
-            return {
-                "labels": ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'],
-                "datasets": [{
-                    "label": 'Receita',
-                    "data": [10000, 12000, 15000, 14000, 18000, 20000],
-                    "borderColor": '#667eea',
-                    "backgroundColor": 'rgba(102, 126, 234, 0.1)'
-                }],
-                "title": "Receita Mensal",
-                "type": "line"
-            }
+            return self._receita()
         except Exception:
-            return {
-                "labels": ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'],
-                "datasets": [{
-                    "label": 'Receita',
-                    "data": [0, 0, 0, 0, 0, 0],
-                    "borderColor": '#667eea',
-                    "backgroundColor": 'rgba(102, 126, 234, 0.1)'
-                }],
-                "title": "Receita Mensal",
-                "type": "line"
-            }
+            return _grafico_receita(['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'], [0, 0, 0, 0, 0, 0])
 
+    @em_cache("dashboard:orders_chart", ttl=TTL_DASHBOARD, tags=("dashboard",))
     def get_orders_chart_data(self) -> Dict[str, Any]:
         """Retorna dados para gráfico de ordens por status"""
         try:
-            # Contar ordens por status
-            pendente = self.db.query(func.count(OrdemServicoModel.id)).filter(OrdemServicoModel.status == 'aberta').scalar() or 0
-            em_andamento = self.db.query(func.count(OrdemServicoModel.id)).filter(OrdemServicoModel.status == 'em_andamento').scalar() or 0
-            concluida = self.db.query(func.count(OrdemServicoModel.id)).filter(OrdemServicoModel.status == 'concluida').scalar() or 0
-
-            return {
-                "labels": ['Pendente', 'Em Andamento', 'Concluída'],
-                "datasets": [{
-                    "label": 'Ordens',
-                    "data": [pendente, em_andamento, concluida],
-                    "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71']
-                }],
-                "title": "Ordens por Status",
-                "type": "doughnut"
-            }
+            return _grafico_ordens(self._contagem_status(metricas.ORDENS_STATUS))
         except Exception:
-            return {
-                "labels": ['Pendente', 'Em Andamento', 'Concluída'],
-                "datasets": [{
-                    "label": 'Ordens',
-                    "data": [0, 0, 0],
-                    "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71']
-                }],
-                "title": "Ordens por Status",
-                "type": "doughnut"
-            }
+            return _grafico_ordens({})
 
     # Métodos chamados pelas rotas da API
     def get_executive_summary(self) -> Dict[str, Any]:
@@ -137,171 +350,58 @@ class DashboardService:
     def get_clients_chart(self, days: int = 30) -> Dict[str, Any]:
         """Retorna dados para gráfico de crescimento de clientes"""
         try:
-            # Dados mockados por enquanto
-            return {
-                "labels": ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'],
-                "datasets": [{
-                    "label": 'Novos Clientes',
-                    "data": [5, 8, 12, 10, 15, 18],
-                    "borderColor": '#764ba2',
-                    "backgroundColor": 'rgba(118, 75, 162, 0.1)'
-                }],
-                "title": "Crescimento de Clientes",
-                "type": "line"
-            }
+            return self._clientes_novos()
         except Exception:
-            return {
-                "labels": ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'],
-                "datasets": [{
-                    "label": 'Novos Clientes',
-                    "data": [0, 0, 0, 0, 0, 0],
-                    "borderColor": '#764ba2',
-                    "backgroundColor": 'rgba(118, 75, 162, 0.1)'
-                }],
-                "title": "Crescimento de Clientes",
-                "type": "line"
-            }
+            return _grafico_clientes(['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun'], [0, 0, 0, 0, 0, 0])
 
     def get_orders_status_chart(self) -> Dict[str, Any]:
         """Alias para get_orders_chart_data"""
         return self.get_orders_chart_data()
 
     def get_top_clients_chart(self, limit: int = 10) -> Dict[str, Any]:
-        """Retorna top clientes por receita"""
+        """Retorna top clientes por receita (últimos 12 meses)"""
         try:
-            # Dados mockados por enquanto
-            return {
-                "labels": ['Cliente A', 'Cliente B', 'Cliente C', 'Cliente D', 'Cliente E'],
-                "datasets": [{
-                    "label": 'Receita',
-                    "data": [8000, 7000, 6500, 5000, 4500],
-                    "backgroundColor": '#667eea'
-                }],
-                "title": "Top Clientes por Receita",
-                "type": "bar"
-            }
+            return self._top_clientes(limit)
         except Exception:
-            return {
-                "labels": ['Cliente A', 'Cliente B', 'Cliente C', 'Cliente D', 'Cliente E'],
-                "datasets": [{
-                    "label": 'Receita',
-                    "data": [0, 0, 0, 0, 0],
-                    "backgroundColor": '#667eea'
-                }],
-                "title": "Top Clientes por Receita",
-                "type": "bar"
-            }
+            return _grafico_top_clientes(['Cliente A', 'Cliente B', 'Cliente C', 'Cliente D', 'Cliente E'],
+                                         [0, 0, 0, 0, 0])
 
     def get_support_tickets_chart(self) -> Dict[str, Any]:
         """Retorna dados para gráfico de tickets de suporte"""
-        try:
-            # Dados mockados por enquanto
-            return {
-                "labels": ['Aberto', 'Em Andamento', 'Fechado', 'Pendente'],
-                "datasets": [{
-                    "label": 'Tickets',
-                    "data": [12, 8, 45, 5],
-                    "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71', '#3498db']
-                }],
-                "title": "Tickets de Suporte",
-                "type": "pie"
-            }
-        except Exception:
-            return {
-                "labels": ['Aberto', 'Em Andamento', 'Fechado', 'Pendente'],
-                "datasets": [{
-                    "label": 'Tickets',
-                    "data": [0, 0, 0, 0],
-                    "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71', '#3498db']
-                }],
-                "title": "Tickets de Suporte",
-                "type": "pie"
-            }
+        # Dados mockados por enquanto
+        return {
+            "labels": ['Aberto', 'Em Andamento', 'Fechado', 'Pendente'],
+            "datasets": [{
+                "label": 'Tickets',
+                "data": [12, 8, 45, 5],
+                "backgroundColor": ['#e74c3c', '#f39c12', '#2ecc71', '#3498db']
+            }],
+            "title": "Tickets de Suporte",
+            "type": "pie"
+        }
 
+    @em_cache("dashboard:contracts_status_chart", ttl=TTL_DASHBOARD, tags=("dashboard",))
     def get_contracts_status_chart(self) -> Dict[str, Any]:
         """Retorna dados para gráfico de contratos por status"""
         try:
-            # Contar contratos por status (usando clientes como proxy)
-            ativo = self.db.query(func.count(ClienteModel.id)).filter(ClienteModel.status_servico == 'ativo').scalar() or 0
-            pendente = self.db.query(func.count(ClienteModel.id)).filter(ClienteModel.status_servico == 'pendente').scalar() or 0
-            cancelado = self.db.query(func.count(ClienteModel.id)).filter(ClienteModel.status_servico == 'cancelado').scalar() or 0
-
-            return {
-                "labels": ['Ativo', 'Pendente', 'Cancelado'],
-                "datasets": [{
-                    "label": 'Contratos',
-                    "data": [ativo, pendente, cancelado],
-                    "backgroundColor": ['#2ecc71', '#3498db', '#e74c3c']
-                }],
-                "title": "Contratos por Status",
-                "type": "doughnut"
-            }
+            # Contratos por status (usando clientes como proxy)
+            return _grafico_contratos(self._contagem_status(metricas.CLIENTES_STATUS))
         except Exception:
-            return {
-                "labels": ['Ativo', 'Pendente', 'Cancelado'],
-                "datasets": [{
-                    "label": 'Contratos',
-                    "data": [0, 0, 0],
-                    "backgroundColor": ['#2ecc71', '#3498db', '#e74c3c']
-                }],
-                "title": "Contratos por Status",
-                "type": "doughnut"
-            }
+            return _grafico_contratos({})
 
+    @em_cache("dashboard:revenue_by_plan_chart", ttl=TTL_DASHBOARD, tags=("dashboard",))
     def get_revenue_by_plan_chart(self) -> Dict[str, Any]:
         """Retorna dados para gráfico de receita por plano"""
         try:
-            # Query para agrupar receita por plano
-            revenue_by_plan = self.db.query(
-                PlanoModel.nome,
-                func.sum(FaturaModel.valor_total).label('total_revenue')
-            ).join(
-                ClienteModel, ClienteModel.plano_id == PlanoModel.id
-            ).join(
-                FaturaModel, FaturaModel.cliente_id == ClienteModel.id
-            ).filter(
-                FaturaModel.status == 'pago'
-            ).group_by(
-                PlanoModel.id, PlanoModel.nome
-            ).order_by(
-                func.sum(FaturaModel.valor_total).desc()
-            ).all()
-
-            if revenue_by_plan:
-                labels = [row[0] for row in revenue_by_plan]
-                data = [float(row[1]) for row in revenue_by_plan]
-            else:
-                # Dados mockados se não houver dados reais
-                labels = ['Plano 50Mbps', 'Plano 100Mbps', 'Plano 200Mbps']
-                data = [15000, 25000, 35000]
-
-            return {
-                "labels": labels,
-                "datasets": [{
-                    "label": 'Receita por Plano',
-                    "data": data,
-                    "backgroundColor": ['#667eea', '#764ba2', '#f093fb', '#f5576c', '#4facfe']
-                }],
-                "title": "Receita por Plano",
-                "type": "bar"
-            }
+            return self._receita_por_plano()
         except Exception as e:
             # Fallback para dados mockados
-            return {
-                "labels": ['Plano 50Mbps', 'Plano 100Mbps', 'Plano 200Mbps'],
-                "datasets": [{
-                    "label": 'Receita por Plano',
-                    "data": [15000, 25000, 35000],
-                    "backgroundColor": ['#667eea', '#764ba2', '#f093fb']
-                }],
-                "title": "Receita por Plano",
-                "type": "bar"
-            }
+            return _grafico_receita_por_plano(['Plano 50Mbps', 'Plano 100Mbps', 'Plano 200Mbps'], [15000, 25000, 35000])
 
     def initialize_default_dashboard(self):
         """Inicializa dashboard padrão"""
         pass  # Implementar se necessário
 
-    def record_daily_metrics(self):
-        """Registra métricas diárias"""
-        pass  # Implementar se necessário
+    def record_daily_metrics(self) -> Dict[str, Any]:
+        """Consolida as métricas desde a última execução (ver crm_modules.dashboard.metricas)"""
+        return ConsolidadorMetricas(self.db).consolidar()
@@ -1,42 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from crm_modules.faturamento.schemas import FaturaCreate, FaturaUpdate, PagamentoCreate, FaturaResponse, PagamentoResponse
 from crm_modules.faturamento.service import FaturamentoService
+from crm_modules.faturamento.repository import FaturamentoRepository
 from crm_core.db.base import get_db
+from crm_core.utils.exceptions import ValidationException
+from crm_core.utils.exportacao import exportar
 from sqlalchemy.orm import Session
-from typing import List
-from pathlib import Path
+from typing import List, Optional
+from datetime import date
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 router = APIRouter()
 
-def _load_env_pix_config() -> dict:
-    """Lê configurações PIX diretamente do .env para refletir mudanças sem restart."""
-    try:
-        env_path = Path(__file__).parent.parent.parent / '.env'
-        data = {}
-        if env_path.exists():
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        data[key.strip()] = value.strip()
-        return {
-            "PIX_CHAVE": data.get("PIX_CHAVE", os.getenv("PIX_CHAVE", "")),
-            "PIX_TIPO_CHAVE": data.get("PIX_TIPO_CHAVE", os.getenv("PIX_TIPO_CHAVE", "cpf")),
-            "PIX_BENEFICIARIO": data.get("PIX_BENEFICIARIO", os.getenv("PIX_BENEFICIARIO", "CRM PROVEDOR")),
-            "PIX_CIDADE": data.get("PIX_CIDADE", os.getenv("PIX_CIDADE", "SAO PAULO")),
-        }
-    except Exception:
-        return {
-            "PIX_CHAVE": os.getenv("PIX_CHAVE", ""),
-            "PIX_TIPO_CHAVE": os.getenv("PIX_TIPO_CHAVE", "cpf"),
-            "PIX_BENEFICIARIO": os.getenv("PIX_BENEFICIARIO", "CRM PROVEDOR"),
-            "PIX_CIDADE": os.getenv("PIX_CIDADE", "SAO PAULO"),
-        }
-
+COLUNAS_EXPORTACAO_FATURAS = [
+    ("ID", lambda r: r[0].id),
+    ("Número", lambda r: r[0].numero_fatura),
+    ("Cliente ID", lambda r: r[0].cliente_id),
+    ("Cliente", lambda r: r[1]),
+    ("Emissão", lambda r: r[0].data_emissao),
+    ("Vencimento", lambda r: r[0].data_vencimento),
+    ("Valor Total", lambda r: r[0].valor_total),
+    ("Valor Pago", lambda r: r[0].valor_pago),
+    ("Status", lambda r: r[0].status),
+    ("Descrição", lambda r: r[0].descricao),
+]
+
+COLUNAS_EXPORTACAO_PAGAMENTOS = [
+    ("ID", lambda r: r[0].id),
+    ("Fatura ID", lambda r: r[0].fatura_id),
+    ("Número Fatura", lambda r: r[1]),
+    ("Cliente ID", lambda r: r[2]),
+    ("Cliente", lambda r: r[3]),
+    ("Valor Pago", lambda r: r[0].valor_pago),
+    ("Data Pagamento", lambda r: r[0].data_pagamento),
+    ("Método", lambda r: r[0].metodo_pagamento),
+    ("Referência", lambda r: r[0].referencia),
+    ("Observações", lambda r: r[0].observacoes),
+]
 
 @router.post("/faturas/", response_model=FaturaResponse)
 def criar_fatura(fatura: FaturaCreate, db: Session = Depends(get_db)):
@@ -53,6 +55,28 @@ def listar_faturas(db: Session = Depends(get_db)):
     return service.listar_todas_faturas()
 
 
+@router.get("/faturas/exportar")
+def exportar_faturas(
+    formato: str = "csv",
+    cliente_id: Optional[int] = None,
+    status: Optional[str] = None,
+    vencimento_de: Optional[date] = None,
+    vencimento_ate: Optional[date] = None,
+):
+    """Exporta faturas em CSV ou XLSX (streaming)"""
+    try:
+        return exportar(
+            formato,
+            "faturas",
+            COLUNAS_EXPORTACAO_FATURAS,
+            lambda session: FaturamentoRepository(session).query_exportacao_faturas(
+                cliente_id, status, vencimento_de, vencimento_ate
+            ),
+        )
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/faturas/{fatura_id}", response_model=FaturaResponse)
 def obter_fatura(fatura_id: int, db: Session = Depends(get_db)):
     service = FaturamentoService(repository_session=db)
@@ -83,6 +107,29 @@ def listar_pagamentos(db: Session = Depends(get_db)):
     return service.listar_todos_pagamentos()
 
 
+@router.get("/pagamentos/exportar")
+def exportar_pagamentos(
+    formato: str = "csv",
+    fatura_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    metodo_pagamento: Optional[str] = None,
+    data_de: Optional[date] = None,
+    data_ate: Optional[date] = None,
+):
+    """Exporta pagamentos em CSV ou XLSX (streaming)"""
+    try:
+        return exportar(
+            formato,
+            "pagamentos",
+            COLUNAS_EXPORTACAO_PAGAMENTOS,
+            lambda session: FaturamentoRepository(session).query_exportacao_pagamentos(
+                fatura_id, cliente_id, metodo_pagamento, data_de, data_ate
+            ),
+        )
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/pagamentos/", response_model=PagamentoResponse)
 def registrar_pagamento(pagamento: PagamentoCreate, db: Session = Depends(get_db)):
     service = FaturamentoService(repository_session=db)
@@ -102,8 +149,8 @@ def gerar_faturas_mensais(mes: int, ano: int, cliente_id: int = None, db: Sessio
             return {"message": f"Fatura gerada para cliente {cliente_id}", "faturas": [fatura.id] if fatura else []}
         else:
             # Gerar faturas para todos os clientes
-            faturas = service.gerar_faturas_mensais(mes, ano)
-            return {"message": f"{len(faturas)} faturas geradas", "faturas": [f.id for f in faturas]}
+            resumo = service.gerar_faturas_mensais(mes, ano)
+            return {"message": f"{resumo['faturas_criadas']} faturas geradas", **resumo}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -122,13 +169,15 @@ def imprimir_fatura(fatura_id: int, request: Request, db: Session = Depends(get_
     from fastapi.templating import Jinja2Templates
     import os
     from datetime import datetime
+    from crm_modules.faturamento.pix import payload_fatura, qr_svg
 
     service = FaturamentoService(repository_session=db)
     try:
         fatura = service.obter_fatura_detalhada(fatura_id)
+        # PIX das configurações (crm_modules.faturamento.pix), QR memorizado por conteúdo
+        pix_payload = payload_fatura(fatura)
         
         # Carregar configurações da empresa para o template
-        pix_config = _load_env_pix_config()
         config = {
             "COMPANY_NAME": os.getenv("COMPANY_NAME", "CRM PROVEDOR"),
             "COMPANY_CNPJ": os.getenv("COMPANY_CNPJ", ""),
@@ -138,7 +187,6 @@ def imprimir_fatura(fatura_id: int, request: Request, db: Session = Depends(get_
             "COMPANY_ENDERECO": os.getenv("COMPANY_ENDERECO", ""),
             "BOLETO_JUROS_PADRAO": os.getenv("BOLETO_JUROS_PADRAO", "2,00"),
             "BOLETO_MULTA_PADRAO": os.getenv("BOLETO_MULTA_PADRAO", "1,00"),
-            **pix_config,
         }
         
         templates = Jinja2Templates(directory="interfaces/web/templates")
@@ -148,7 +196,9 @@ def imprimir_fatura(fatura_id: int, request: Request, db: Session = Depends(get_
                 "request": request, 
                 "fatura": fatura,
                 "config": config,
-                "now": datetime.now
+                "now": datetime.now,
+                "pix_payload": pix_payload,
+                "pix_qr": qr_svg(pix_payload) if pix_payload else None
             }
         )
     except Exception as e:
@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 from crm_modules.faturamento.carne_models import BoletoModel
 from crm_modules.faturamento.models import FaturaModel
 from crm_modules.faturamento.carne_schemas import BoletoCreate, BoletoResponse
-from crm_modules.faturamento.gerencianet_client import GerencianetClient
+from crm_modules.faturamento.gerencianet_client import GerencianetClient, obter_cliente_gerencianet
+from crm_modules.faturamento.pix import pix_boleto
 from crm_modules.clientes.models import ClienteModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
 
@@ -15,7 +16,7 @@ class BoletoService:
     
     def __init__(self, session: Session, gerencianet_client: Optional[GerencianetClient] = None):
         self.session = session
-        self.gerencianet_client = gerencianet_client or GerencianetClient()
+        self.gerencianet_client = gerencianet_client or obter_cliente_gerencianet()
     
     def gerar_boleto_fatura(
         self,
@@ -94,6 +95,8 @@ class BoletoService:
         )
         
         self.session.add(boleto)
+        self.session.flush()  # O txid do PIX usa o ID
+        pix_boleto(boleto)
         self.session.commit()
         self.session.refresh(boleto)
         
@@ -175,6 +178,8 @@ class BoletoService:
         )
         
         self.session.add(boleto)
+        self.session.flush()  # O txid do PIX usa o ID
+        pix_boleto(boleto)
         self.session.commit()
         self.session.refresh(boleto)
         
@@ -212,11 +217,25 @@ class BoletoService:
         
         from sqlalchemy.orm import joinedload
         
-        query = self.session.query(BoletoModel).options(
-            joinedload(BoletoModel.cliente)
-        ).filter(
-            BoletoModel.ativo == True
+        query = self._query_boletos(self.session.query(BoletoModel), cliente_id, status)
+        boletos = query.options(joinedload(BoletoModel.cliente)).all()
+        
+        return [self._model_to_response(b) for b in boletos]
+    
+    @classmethod
+    def query_exportacao(cls, session: Session, cliente_id: Optional[int] = None, status: Optional[str] = None):
+        """Linhas ``(boleto, nome do cliente)`` com os filtros de ``listar_todos_boletos``
+        
+        Não depende do cliente Gerencianet, por isso recebe só a sessão.
+        """
+        query = session.query(BoletoModel, ClienteModel.nome).outerjoin(
+            ClienteModel, ClienteModel.id == BoletoModel.cliente_id
         )
+        return cls._query_boletos(query, cliente_id, status)
+    
+    @staticmethod
+    def _query_boletos(query, cliente_id: Optional[int] = None, status: Optional[str] = None):
+        query = query.filter(BoletoModel.ativo == True)
         
         if cliente_id:
             query = query.filter(BoletoModel.cliente_id == cliente_id)
@@ -224,9 +243,7 @@ class BoletoService:
         if status:
             query = query.filter(BoletoModel.status == status)
         
-        boletos = query.order_by(BoletoModel.data_vencimento.desc()).all()
-        
-        return [self._model_to_response(b) for b in boletos]
+        return query.order_by(BoletoModel.data_vencimento.desc())
     
     def listar_boletos_vencidos(self) -> List[BoletoResponse]:
         """Lista todos os boletos vencidos não pagos"""
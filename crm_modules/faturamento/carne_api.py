@@ -2,24 +2,42 @@
 API endpoints para gerenciar carnês e boletos
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from crm_modules.faturamento.carne_service import CarneService
 from crm_modules.faturamento.boleto_service import BoletoService
 from crm_modules.faturamento.carne_schemas import (
-    CarneCreate, CarneUpdate, CarneResponse, BoletoCreate, BoletoResponse
+    CarneCreate, CarneUpdate, CarneResponse, BoletoCreate, BoletoResponse, ImpressaoLoteCreate
 )
 from crm_modules.faturamento.carne_models import CarneModel, BoletoModel
+from crm_modules.faturamento.impressao import FORMATOS, impressao_carnes
 from crm_core.db.base import get_db
 from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_core.utils.etag import etag_de_chave, resposta_arquivo_com_etag
+from crm_core.utils.exportacao import exportar
 
 router = APIRouter(
     prefix="",
     tags=["faturamento"]
 )
 
+COLUNAS_EXPORTACAO_BOLETOS = [
+    ("ID", lambda r: r[0].id),
+    ("Número", lambda r: r[0].numero_boleto),
+    ("Cliente ID", lambda r: r[0].cliente_id),
+    ("Cliente", lambda r: r[1]),
+    ("Fatura ID", lambda r: r[0].fatura_id),
+    ("Parcela ID", lambda r: r[0].parcela_id),
+    ("Valor", lambda r: r[0].valor),
+    ("Vencimento", lambda r: r[0].data_vencimento),
+    ("Emissão", lambda r: r[0].data_emissao),
+    ("Status", lambda r: r[0].status),
+    ("Status Gerencianet", lambda r: r[0].gerencianet_status),
+    ("Linha Digitável", lambda r: r[0].linha_digitavel),
+]
+
 
 # ==================== CARNÊS ====================
 
@@ -38,6 +56,41 @@ def criar_carne(
         raise HTTPException(status_code=500, detail=f"Erro ao criar carnê: {str(e)}")
 
 
+@router.post("/carnes/impressao", status_code=202)
+def criar_lote_impressao(
+    dados: ImpressaoLoteCreate,
+    db: Session = Depends(get_db)
+):
+    """Agenda a impressão em lote dos carnês do filtro (PDF único ou ZIP)"""
+    try:
+        lote = impressao_carnes.criar_lote(db, **dados.dict())
+        return lote.resumo()
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/carnes/impressao/{lote_id}")
+def status_lote_impressao(lote_id: str):
+    """Andamento de um lote de impressão"""
+    try:
+        return impressao_carnes.obter(lote_id).resumo()
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/carnes/impressao/{lote_id}/arquivo")
+def baixar_lote_impressao(lote_id: str, request: Request):
+    """Arquivo gerado pelo lote (enviado direto do cache em disco)"""
+    try:
+        caminho, lote = impressao_carnes.arquivo(lote_id)
+    except NotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValidationException as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return resposta_arquivo_com_etag(request, caminho, etag_de_chave(lote.chave), FORMATOS[lote.formato],
+                                     lote.nome_arquivo)
+
+
 @router.get("/carnes/{carne_id}", response_model=CarneResponse)
 def obter_carne(
     carne_id: int,
@@ -196,6 +249,24 @@ def gerar_boleto_fatura(
         raise HTTPException(status_code=500, detail=f"Erro ao gerar boleto: {str(e)}")
 
 
+@router.get("/boletos/exportar")
+def exportar_boletos(
+    formato: str = Query("csv"),
+    cliente_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None)
+):
+    """Exporta boletos em CSV ou XLSX (streaming), com os filtros da listagem"""
+    try:
+        return exportar(
+            formato,
+            "boletos",
+            COLUNAS_EXPORTACAO_BOLETOS,
+            lambda session: BoletoService.query_exportacao(session, cliente_id, status)
+        )
+    except ValidationException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/boletos/{boleto_id}", response_model=BoletoResponse)
 def obter_boleto(
     boleto_id: int,
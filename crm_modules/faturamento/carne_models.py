@@ -55,6 +55,9 @@ class ParcelaModel(Base):
     gerencianet_link_boleto = Column(String, nullable=True)  # Link do boleto para download
     codigo_barras = Column(String, nullable=True)
     linha_digitavel = Column(String, nullable=True)
+    pix_copia_cola = Column(Text, nullable=True)  # BR Code PIX (crm_modules.faturamento.pix)
+    # Pedido de boleto enviado e ainda sem charge_id confirmado (ver faturamento.outbox)
+    gerencianet_envio_em = Column(DateTime, nullable=True)
     
     ativo = Column(Boolean, default=True)
     data_criacao = Column(DateTime, default=datetime.utcnow)
@@ -83,6 +86,7 @@ class BoletoModel(Base):
     codigo_barras = Column(String, nullable=True)
     linha_digitavel = Column(String, nullable=True)
     url_boleto = Column(String, nullable=True)
+    pix_copia_cola = Column(Text, nullable=True)  # BR Code PIX (crm_modules.faturamento.pix)
     
     # Integração Gerencianet
     gerencianet_charge_id = Column(String, nullable=True, unique=True)
@@ -0,0 +1,175 @@
+"""Layout em PDF (ReportLab) dos carnês impressos em lote
+
+Roda dentro do pool de processos de PDFs (``servico_pdf``): recebe carnês já
+convertidos em dicionários (``instantaneo_carne``) e devolve os bytes do PDF.
+
+- Três parcelas por folha A4, cada uma com canhoto e recibo.
+- A moldura da parcela (bordas, rótulos e cabeçalho da empresa) é desenhada
+  uma vez por documento como formulário do PDF e reaproveitada em todas as
+  parcelas; só os dados variáveis são escritos a cada vez.
+- O QR Code do PIX vem de ``crm_modules.faturamento.pix`` (LRU por conteúdo
+  no processo): um worker que imprime o mesmo pagamento de novo não
+  recalcula a imagem.
+"""
+import io
+from typing import List, Optional, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from crm_modules.faturamento.pix import payload_pix, qr_png
+
+# Entra na chave do cache dos lotes: aumente ao mudar o layout gerado aqui
+VERSAO_LAYOUT = 1
+
+PARCELAS_POR_FOLHA = 3
+LARGURA, ALTURA = A4
+MARGEM = 10 * mm
+ALTURA_PARCELA = (ALTURA - 2 * MARGEM) / PARCELAS_POR_FOLHA
+LARGURA_CANHOTO = 50 * mm
+LADO_QR = 32 * mm
+FORMULARIO_MOLDURA = "moldura_parcela"
+
+
+def instantaneo_carne(carne, parcelas) -> dict:
+    """Cópia serializável do carnê, do cliente e das parcelas a imprimir."""
+    cliente = carne.cliente
+    return {
+        "carne": {
+            "id": carne.id,
+            "numero_carne": carne.numero_carne,
+            "quantidade_parcelas": carne.quantidade_parcelas,
+            "descricao": carne.descricao,
+        },
+        "cliente": {
+            "nome": cliente.nome,
+            "cpf": cliente.cpf,
+            "endereco": cliente.endereco,
+            "bairro": cliente.bairro,
+        },
+        "parcelas": [
+            {
+                "id": parcela.id,
+                "numero_parcela": parcela.numero_parcela,
+                "valor": parcela.valor,
+                "data_vencimento": parcela.data_vencimento,
+                "status": parcela.status,
+                "linha_digitavel": parcela.linha_digitavel,
+            }
+            for parcela in parcelas
+        ],
+    }
+
+
+def _moeda(valor: float) -> str:
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _desenhar_moldura(pdf: canvas.Canvas, empresa: dict):
+    """Parte fixa de toda parcela: vira um formulário reaproveitado no documento."""
+    largura = LARGURA - 2 * MARGEM
+    pdf.beginForm(FORMULARIO_MOLDURA, 0, 0, largura, ALTURA_PARCELA)
+    pdf.setStrokeColor(colors.HexColor("#9e9e9e"))
+    pdf.setDash(3, 3)
+    pdf.line(0, 0, largura, 0)
+    pdf.line(LARGURA_CANHOTO, 4 * mm, LARGURA_CANHOTO, ALTURA_PARCELA - 4 * mm)
+    pdf.setDash()
+
+    pdf.setFillColor(colors.HexColor("#1a237e"))
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(3 * mm, ALTURA_PARCELA - 9 * mm, "Canhoto")
+    pdf.drawString(LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 9 * mm, empresa.get("company_name") or "")
+    pdf.setFont("Helvetica", 7)
+    documento = " | ".join(filter(None, [
+        f"CNPJ {empresa['company_cnpj']}" if empresa.get("company_cnpj") else "",
+        empresa.get("company_telefone"),
+    ]))
+    pdf.drawString(LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 13 * mm, documento)
+
+    pdf.setFillColor(colors.HexColor("#616161"))
+    pdf.setFont("Helvetica-Bold", 7)
+    for x, y, rotulo in (
+        (3 * mm, ALTURA_PARCELA - 17 * mm, "CARNÊ / PARCELA"),
+        (3 * mm, ALTURA_PARCELA - 31 * mm, "VENCIMENTO"),
+        (3 * mm, ALTURA_PARCELA - 45 * mm, "VALOR"),
+        (3 * mm, ALTURA_PARCELA - 59 * mm, "PAGADOR"),
+        (LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 21 * mm, "PAGADOR"),
+        (LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 35 * mm, "CARNÊ / PARCELA"),
+        (LARGURA_CANHOTO + 55 * mm, ALTURA_PARCELA - 35 * mm, "VENCIMENTO"),
+        (LARGURA_CANHOTO + 95 * mm, ALTURA_PARCELA - 35 * mm, "VALOR DA PARCELA"),
+        (LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 49 * mm, "LINHA DIGITÁVEL"),
+    ):
+        pdf.drawString(x, y, rotulo)
+    pdf.endForm()
+
+
+def _desenhar_parcela(pdf: canvas.Canvas, documento: dict, parcela: dict, pix: Optional[dict]):
+    carne, cliente = documento["carne"], documento["cliente"]
+    identificacao = f"{carne['numero_carne']} - {parcela['numero_parcela']}/{carne['quantidade_parcelas']}"
+    vencimento = parcela["data_vencimento"].strftime("%d/%m/%Y")
+    valor = _moeda(parcela["valor"])
+
+    pdf.doForm(FORMULARIO_MOLDURA)
+    pdf.setFillColor(colors.black)
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(3 * mm, ALTURA_PARCELA - 21 * mm, identificacao)
+    pdf.drawString(3 * mm, ALTURA_PARCELA - 63 * mm, cliente["nome"][:30])
+    pdf.drawString(LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 25 * mm, cliente["nome"][:60])
+    pdf.drawString(LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 39 * mm, identificacao)
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(3 * mm, ALTURA_PARCELA - 35 * mm, vencimento)
+    pdf.drawString(3 * mm, ALTURA_PARCELA - 49 * mm, valor)
+    pdf.drawString(LARGURA_CANHOTO + 55 * mm, ALTURA_PARCELA - 39 * mm, vencimento)
+    pdf.drawString(LARGURA_CANHOTO + 95 * mm, ALTURA_PARCELA - 39 * mm, valor)
+
+    pdf.setFont("Courier", 8)
+    pdf.drawString(LARGURA_CANHOTO + 5 * mm, ALTURA_PARCELA - 53 * mm,
+                   parcela["linha_digitavel"] or "Pagamento via transferência ou na sede da empresa")
+
+    if pix and pix.get("chave"):
+        txid = f"CARNE{carne['id']}P{parcela['numero_parcela']}"
+        imagem = ImageReader(io.BytesIO(qr_png(payload_pix(parcela["valor"], txid, config=pix))))
+        x = LARGURA - 2 * MARGEM - LADO_QR - 4 * mm
+        pdf.drawImage(imagem, x, 6 * mm, LADO_QR, LADO_QR)
+        pdf.setFont("Helvetica", 6)
+        pdf.drawCentredString(x + LADO_QR / 2, 3 * mm, "Pague com PIX")
+
+
+def _gerar_pdf(documentos: List[dict], empresa: dict, pix: Optional[dict]) -> bytes:
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle("Carnês")
+    _desenhar_moldura(pdf, empresa)
+    posicao = 0
+    for documento in documentos:
+        for parcela in documento["parcelas"]:
+            if posicao == PARCELAS_POR_FOLHA:
+                pdf.showPage()
+                posicao = 0
+            pdf.saveState()
+            pdf.translate(MARGEM, ALTURA - MARGEM - (posicao + 1) * ALTURA_PARCELA)
+            _desenhar_parcela(pdf, documento, parcela, pix)
+            pdf.restoreState()
+            posicao += 1
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def renderizar_carnes(documentos: List[dict], empresa: dict, pix: Optional[dict] = None,
+                      separados: bool = False):
+    """Gera os carnês (executado no processo do pool).
+
+    Com ``separados`` devolve ``[(nome_arquivo, pdf), ...]``, um PDF por carnê;
+    senão, um único PDF com todos.
+    """
+    if not separados:
+        return _gerar_pdf(documentos, empresa, pix)
+    arquivos: List[Tuple[str, bytes]] = []
+    for documento in documentos:
+        nome = f"carne_{documento['carne']['numero_carne']}.pdf"
+        arquivos.append((nome, _gerar_pdf([documento], empresa, pix)))
+    return arquivos
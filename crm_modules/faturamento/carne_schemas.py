@@ -79,3 +79,11 @@ class BoletoResponse(BaseModel):
     status: str
     data_emissao: datetime
     data_criacao: datetime
+
+
+class ImpressaoLoteCreate(BaseModel):
+    formato: str = "pdf"  # "pdf" (um arquivo paginado) ou "zip" (um PDF por carnê)
+    mes_vencimento: Optional[str] = None  # "AAAA-MM"
+    bairro: Optional[str] = None
+    plano_id: Optional[int] = None
+    incluir_pagas: bool = False
@@ -4,7 +4,9 @@ from sqlalchemy.orm import Session
 
 from crm_modules.faturamento.carne_models import CarneModel, ParcelaModel, BoletoModel
 from crm_modules.faturamento.carne_schemas import CarneCreate, CarneUpdate, CarneResponse, BoletoResponse
-from crm_modules.faturamento.gerencianet_client import GerencianetClient
+from crm_modules.faturamento.gerencianet_client import GerencianetClient, obter_cliente_gerencianet
+from crm_modules.faturamento.outbox import enfileirar_boleto_parcela, enfileirar_cancelamento_boleto
+from crm_modules.faturamento.pix import pix_parcela
 from crm_modules.clientes.models import ClienteModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
 
@@ -18,7 +20,7 @@ class CarneService:
 
     def _get_gerencianet_client(self) -> GerencianetClient:
         if self.gerencianet_client is None:
-            self.gerencianet_client = GerencianetClient()
+            self.gerencianet_client = obter_cliente_gerencianet()
         return self.gerencianet_client
     
     def criar_carne(self, carne_data: CarneCreate) -> CarneResponse:
@@ -82,13 +84,14 @@ class CarneService:
             quantidade=carne_data.quantidade_parcelas
         )
         
-        # Se solicitado, gerar boletos no Gerencianet
+        # Se solicitado, gerar boletos no Gerencianet (pela outbox, no mesmo commit do carnê)
         if carne_data.gerar_boletos:
-            try:
+            if cliente.email:
+                self.session.flush()  # IDs das parcelas
                 self._gerar_boletos_gerencianet(carne, parcelas, cliente)
-            except Exception as e:
+            else:
                 # Log do erro mas não falha a criação do carnê
-                print(f"Aviso: Erro ao gerar boletos no Gerencianet: {e}")
+                print("Aviso: Erro ao gerar boletos no Gerencianet: Cliente não possui email cadastrado")
         
         self.session.commit()
         self.session.refresh(carne)
@@ -116,6 +119,7 @@ class CarneService:
                 data_vencimento=data_vencimento,
                 status="pendente"
             )
+            pix_parcela(parcela)
             
             self.session.add(parcela)
             parcelas.append(parcela)
@@ -131,36 +135,10 @@ class CarneService:
         parcelas: List[ParcelaModel],
         cliente: ClienteModel
     ) -> None:
-        """Gera boletos no Gerencianet para cada parcela"""
+        """Enfileira na outbox a geração do boleto de cada parcela"""
         
-        # Validar dados necessários do cliente
-        if not cliente.email:
-            raise ValidationException("Cliente não possui email cadastrado")
-        
-        cpf = cliente.cpf or "00000000000"  # Fallback se não tiver CPF
-        
-        client = self._get_gerencianet_client()
         for parcela in parcelas:
-            try:
-                # Gerar boleto no Gerencianet
-                resultado = client.gerar_boleto(
-                    cliente_nome=cliente.nome,
-                    cliente_cpf=cpf,
-                    cliente_email=cliente.email,
-                    valor=parcela.valor,
-                    data_vencimento=parcela.data_vencimento,
-                    numero_referencia=f"{carne.numero_carne}-{parcela.numero_parcela}",
-                    descricao=f"Parcela {parcela.numero_parcela} de {carne.quantidade_parcelas}"
-                )
-                
-                # Atualizar parcela com dados do boleto
-                parcela.gerencianet_charge_id = resultado.get("charge_id")
-                parcela.codigo_barras = resultado.get("codigo_barras")
-                parcela.linha_digitavel = resultado.get("linha_digitavel")
-                parcela.gerencianet_link_boleto = resultado.get("url_boleto")
-                
-            except Exception as e:
-                print(f"Erro ao gerar boleto para parcela {parcela.numero_parcela}: {e}")
+            enfileirar_boleto_parcela(self.session, parcela.id)
     
     def obter_carne(self, carne_id: int) -> CarneResponse:
         """Obtém um carnê pelo ID"""
@@ -239,14 +217,9 @@ class CarneService:
         ).all()
         
         for parcela in parcelas:
-            # Cancelar no Gerencianet se houver charge_id
-            if parcela.gerencianet_charge_id:
-                try:
-                    self._get_gerencianet_client().cancelar_boleto(
-                        int(parcela.gerencianet_charge_id)
-                    )
-                except:
-                    pass  # Log silencioso se falhar
+            # Cancelar no Gerencianet se houver charge_id (pela outbox, no mesmo commit)
+            if parcela.gerencianet_charge_id and parcela.status != "cancelado":
+                enfileirar_cancelamento_boleto(self.session, parcela.gerencianet_charge_id, parcela.id)
             
             parcela.status = "cancelado"
         
@@ -271,15 +244,10 @@ class CarneService:
             raise NotFoundException("Carnê não encontrado")
             
         try:
-            # Tenta cancelar no Gerencianet primeiro
+            # Cancelamento no Gerencianet vai pela outbox, no mesmo commit da exclusão
             for parcela in carne.parcelas:
-                if parcela.gerencianet_charge_id:
-                    try:
-                        self._get_gerencianet_client().cancelar_boleto(
-                            int(parcela.gerencianet_charge_id)
-                        )
-                    except:
-                        pass
+                if parcela.gerencianet_charge_id and parcela.status != "cancelado":
+                    enfileirar_cancelamento_boleto(self.session, parcela.gerencianet_charge_id, parcela.id)
 
             # Tenta exclusão física (hard delete)
             # Devido ao cascade="all, delete-orphan", as parcelas serão excluídas automaticamente
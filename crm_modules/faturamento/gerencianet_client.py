@@ -5,15 +5,51 @@ Gerencianet é uma gateway de pagamento brasileira que permite:
 - Criar recorrências (carnês)
 - Processar pagamentos
 - Consultar status de transações
+
+O cliente é compartilhado pelo processo (``obter_cliente_gerencianet``):
+- Uma ``requests.Session`` com pool de conexões (``gerencianet_pool_conexoes``)
+  mantém as conexões HTTPS abertas entre chamadas.
+- O token OAuth é obtido na primeira chamada (não no construtor) e reutilizado
+  até ``expires_in``; é renovado ``gerencianet_token_margem`` segundos antes de
+  expirar, ou de imediato se a API responder 401.
+- Timeouts de conexão e leitura configuráveis; falhas de conexão, timeouts e
+  respostas 5xx são repetidas até ``gerencianet_max_tentativas`` vezes, com
+  espera exponencial e jitter. Criar cobrança não é idempotente: nesse caso
+  só se repete quando a requisição não chegou a ser enviada, e uma falha
+  depois do envio (ex.: timeout de leitura) levanta ``CobrancaIncerta``.
 """
 
-import requests
-import json
+import os
+import random
+import threading
+import time
 from typing import Optional, Dict, Any
 from datetime import date
-import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from crm_core.config.settings import settings
 from crm_core.utils.exceptions import ValidationException
 
+# Respostas que valem nova tentativa
+STATUS_REPETIR = {500, 502, 503, 504}
+# Validade do token quando a resposta não traz expires_in (s)
+VALIDADE_TOKEN_PADRAO = 600
+
+
+def _nao_enviada(erro: requests.exceptions.RequestException) -> bool:
+    """A conexão nem chegou a ser aberta: a requisição não foi ao servidor."""
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return True
+    causa = erro.args[0] if erro.args else None
+    return isinstance(getattr(causa, "reason", causa), NewConnectionError)
+
+
+class CobrancaIncerta(ValidationException):
+    """O pedido de cobrança foi enviado mas não houve resposta: ela pode ter sido criada."""
+
 
 class GerencianetClient:
     """Cliente para integração com Gerencianet"""
@@ -22,49 +58,96 @@ class GerencianetClient:
         self,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
-        sandbox: bool = True
+        sandbox: Optional[bool] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[tuple] = None,
+        max_tentativas: Optional[int] = None,
+        backoff_base: Optional[float] = None,
     ):
         """
-        Inicializa o cliente Gerencianet
+        Inicializa o cliente Gerencianet (sem chamadas de rede)
         
         Args:
             client_id: ID da aplicação Gerencianet
             client_secret: Secret da aplicação
             sandbox: Se True usa ambiente de teste, False usa produção
+            base_url: URL da API (ex.: servidor falso em testes); sobrepõe ``sandbox``
+            timeout: (conexão, leitura) em segundos
+            max_tentativas: Tentativas por requisição em falhas temporárias
+            backoff_base: Espera antes da segunda tentativa (dobra a cada nova)
         """
         self.client_id = client_id or os.getenv("GERENCIANET_CLIENT_ID")
         self.client_secret = client_secret or os.getenv("GERENCIANET_CLIENT_SECRET")
+        if sandbox is None:
+            sandbox = str(settings.gerencianet_sandbox).lower() in ("1", "true", "sim")
         self.sandbox = sandbox
-        
-        # Se não houver credenciais, o cliente não se autentica
-        self.connected = False
-        if self.client_id and self.client_secret and self.client_id != "seu_client_id_aqui" and self.client_secret != "seu_client_secret_aqui":
-            self.base_url = (
-                "https://sandbox.gerencianet.com.br" if sandbox
-                else "https://api.gerencianet.com.br"
-            )
-            self.oauth_url = (
-                "https://sandbox.gerencianet.com.br/oauth/authorize" if sandbox
-                else "https://api.gerencianet.com.br/oauth/authorize"
-            )
-            self.token = None
-            self.connected = True
-            try:
-                self._authenticate()
-            except Exception as e:
-                print(f"Aviso: Falha na autenticação com Gerencianet - {str(e)}")
-                self.connected = False
-        else:
+        self.base_url = (base_url or settings.gerencianet_base_url or (
+            "https://sandbox.gerencianet.com.br" if sandbox
+            else "https://api.gerencianet.com.br"
+        )).rstrip("/")
+        self.timeout = timeout or (settings.gerencianet_timeout_conexao, settings.gerencianet_timeout_leitura)
+        self.max_tentativas = max_tentativas or settings.gerencianet_max_tentativas
+        self.backoff_base = settings.gerencianet_backoff_base if backoff_base is None else backoff_base
+        self.token_margem = settings.gerencianet_token_margem
+
+        self.token: Optional[str] = None
+        self._token_expira_em = 0.0
+        self._token_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=settings.gerencianet_pool_conexoes)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+
+        # Sem credenciais o cliente fica desconectado e os serviços geram boletos localmente
+        self.connected = bool(
+            self.client_id and self.client_secret
+            and self.client_id != "seu_client_id_aqui" and self.client_secret != "seu_client_secret_aqui"
+        )
+        if not self.connected:
             print("Aviso: Credenciais Gerencianet não configuradas")
     
+    def _esperar(self, tentativa: int):
+        atraso = self.backoff_base * (2 ** (tentativa - 1))
+        time.sleep(atraso * random.uniform(0.8, 1.2))
+
+    def _requisicao(self, metodo: str, caminho: str, idempotente: bool = True,
+                    autenticar: bool = True, **kwargs) -> requests.Response:
+        """Envia a requisição com novas tentativas; levanta ``requests.exceptions.RequestException``."""
+        url = f"{self.base_url}{caminho}"
+        tentativa = 0
+        token_renovado = False
+        while True:
+            tentativa += 1
+            if autenticar:
+                kwargs["headers"] = self._get_headers()
+            try:
+                response = self.session.request(metodo, url, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Depois de enviada, o servidor pode ter processado: só repete se for idempotente
+                if not (idempotente or _nao_enviada(e)) or tentativa >= self.max_tentativas:
+                    raise
+                self._esperar(tentativa)
+                continue
+            if response.status_code == 401 and autenticar and not token_renovado:
+                # Token revogado ou expirado antes do previsto: renova uma vez, sem gastar tentativa
+                self._invalidar_token()
+                token_renovado = True
+                tentativa -= 1
+                continue
+            if response.status_code in STATUS_REPETIR and idempotente and tentativa < self.max_tentativas:
+                self._esperar(tentativa)
+                continue
+            response.raise_for_status()
+            return response
+
+    def _invalidar_token(self):
+        with self._token_lock:
+            self.token = None
+            self._token_expira_em = 0.0
+
     def _authenticate(self) -> str:
         """Autentica com Gerencianet e obtém token de acesso"""
-        url = f"{self.base_url}/oauth/token"
-        
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-        
         data = {
             "grant_type": "client_credentials",
             "client_id": self.client_id,
@@ -72,24 +155,32 @@ class GerencianetClient:
         }
         
         try:
-            response = requests.post(url, headers=headers, data=data, timeout=10)
-            response.raise_for_status()
-            
-            self.token = response.json()["access_token"]
+            response = self._requisicao(
+                "POST", "/oauth/token", autenticar=False,
+                headers={"Content-Type": "application/x-www-form-urlencoded"}, data=data
+            )
+            corpo = response.json()
+            self.token = corpo["access_token"]
+            self._token_expira_em = time.monotonic() + float(corpo.get("expires_in") or VALIDADE_TOKEN_PADRAO)
             return self.token
         
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
             raise ValidationException(f"Erro ao autenticar com Gerencianet: {str(e)}")
     
     def _get_headers(self) -> Dict[str, str]:
-        """Retorna headers padrão com autenticação"""
-        if not self.token:
-            self._authenticate()
+        """Retorna headers padrão com autenticação (renova o token perto de expirar)"""
+        with self._token_lock:
+            if not self.token or time.monotonic() >= self._token_expira_em - self.token_margem:
+                self._authenticate()
+            token = self.token
         
         return {
             "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.token}"
+            "Authorization": f"Bearer {token}"
         }
+
+    def fechar(self):
+        self.session.close()
     
     def gerar_boleto(
         self,
@@ -121,7 +212,7 @@ class GerencianetClient:
             Dict com dados do boleto gerado (código de barras, linha digitável, etc)
         """
         
-        url = f"{self.base_url}/v1/charge"
+        caminho = "/v1/charge"
         
         # Formatar CPF
         cpf_limpo = cliente_cpf.replace(".", "").replace("-", "")
@@ -181,13 +272,7 @@ class GerencianetClient:
         }
         
         try:
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json=payload,
-                timeout=15
-            )
-            response.raise_for_status()
+            response = self._requisicao("POST", caminho, idempotente=False, json=payload)
             
             data = response.json()
             
@@ -207,21 +292,20 @@ class GerencianetClient:
                 "data_vencimento": data_vencimento.isoformat()
             }
         
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if _nao_enviada(e):
+                raise ValidationException(f"Erro ao gerar boleto: {str(e)}")
+            raise CobrancaIncerta(f"Boleto {numero_referencia} enviado sem resposta: {str(e)}")
         except requests.exceptions.RequestException as e:
             raise ValidationException(f"Erro ao gerar boleto: {str(e)}")
     
     def _get_boleto_details(self, charge_id: int) -> Dict[str, Any]:
         """Obtém detalhes do boleto após sua criação"""
         
-        url = f"{self.base_url}/v1/charge/{charge_id}"
+        caminho = f"/v1/charge/{charge_id}"
         
         try:
-            response = requests.get(
-                url,
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._requisicao("GET", caminho)
             
             data = response.json().get("data", {})
             boleto_data = data.get("boleto", {})
@@ -264,7 +348,7 @@ class GerencianetClient:
             Dict com ID da recorrência e dados das parcelas
         """
         
-        url = f"{self.base_url}/v1/subscription"
+        caminho = "/v1/subscription"
         
         cpf_limpo = cliente_cpf.replace(".", "").replace("-", "")
         
@@ -303,13 +387,7 @@ class GerencianetClient:
         }
         
         try:
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json=payload,
-                timeout=15
-            )
-            response.raise_for_status()
+            response = self._requisicao("POST", caminho, idempotente=False, json=payload)
             
             data = response.json().get("data", {})
             
@@ -327,15 +405,10 @@ class GerencianetClient:
     def consultar_boleto(self, charge_id: int) -> Dict[str, Any]:
         """Consulta status de um boleto"""
         
-        url = f"{self.base_url}/v1/charge/{charge_id}"
+        caminho = f"/v1/charge/{charge_id}"
         
         try:
-            response = requests.get(
-                url,
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._requisicao("GET", caminho)
             
             data = response.json().get("data", {})
             
@@ -353,15 +426,10 @@ class GerencianetClient:
     def consultar_recorrencia(self, subscription_id: int) -> Dict[str, Any]:
         """Consulta status de uma recorrência"""
         
-        url = f"{self.base_url}/v1/subscription/{subscription_id}"
+        caminho = f"/v1/subscription/{subscription_id}"
         
         try:
-            response = requests.get(
-                url,
-                headers=self._get_headers(),
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._requisicao("GET", caminho)
             
             return response.json().get("data", {})
         
@@ -371,16 +439,10 @@ class GerencianetClient:
     def cancelar_boleto(self, charge_id: int) -> bool:
         """Cancela um boleto"""
         
-        url = f"{self.base_url}/v1/charge/{charge_id}/cancel"
+        caminho = f"/v1/charge/{charge_id}/cancel"
         
         try:
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json={},
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._requisicao("POST", caminho, json={})
             return True
         
         except requests.exceptions.RequestException as e:
@@ -389,17 +451,32 @@ class GerencianetClient:
     def cancelar_recorrencia(self, subscription_id: int) -> bool:
         """Cancela uma recorrência"""
         
-        url = f"{self.base_url}/v1/subscription/{subscription_id}/cancel"
+        caminho = f"/v1/subscription/{subscription_id}/cancel"
         
         try:
-            response = requests.post(
-                url,
-                headers=self._get_headers(),
-                json={},
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._requisicao("POST", caminho, json={})
             return True
         
         except requests.exceptions.RequestException as e:
             raise ValidationException(f"Erro ao cancelar recorrência: {str(e)}")
+
+
+_cliente_compartilhado: Optional[GerencianetClient] = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente_gerencianet() -> GerencianetClient:
+    """Cliente único do processo: conexões e token reaproveitados entre requisições."""
+    global _cliente_compartilhado
+    with _cliente_lock:
+        if _cliente_compartilhado is None:
+            _cliente_compartilhado = GerencianetClient()
+        return _cliente_compartilhado
+
+
+def fechar_cliente_gerencianet():
+    global _cliente_compartilhado
+    with _cliente_lock:
+        cliente, _cliente_compartilhado = _cliente_compartilhado, None
+    if cliente is not None:
+        cliente.fechar()
@@ -0,0 +1,170 @@
+"""Servidor falso da API Gerencianet, para testes e benchmarks
+
+Responde localmente as rotas usadas pelo ``GerencianetClient`` (OAuth,
+cobranças e recorrências), com HTTP/1.1 keep-alive, e conta conexões, tokens
+emitidos e requisições, o que permite medir o reaproveitamento de conexões e
+do token. ``falhar(503, ...)`` programa as próximas respostas com erro e
+``latencia`` simula o tempo de resposta da API.
+
+Uso: ``python -m crm_modules.faturamento.gerencianet_mock [--porta 8765] [--latencia 0.02]``
+e ``GERENCIANET_BASE_URL=http://127.0.0.1:8765`` na aplicação.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+ROTA_COBRANCA = re.compile(r"^/v1/charge/(\d+)(/cancel)?$")
+ROTA_RECORRENCIA = re.compile(r"^/v1/subscription/(\d+)(/cancel)?$")
+
+
+class ServidorGerencianetFalso:
+    def __init__(self, porta: int = 0, latencia: float = 0.0, validade_token: int = 3600):
+        self.latencia = latencia
+        self.validade_token = validade_token
+        self.conexoes = 0
+        self.tokens_emitidos = 0
+        self.requisicoes = 0
+        self.cobrancas = {}
+        self.recorrencias = {}
+        self._tokens = set()
+        self._falhas = deque()
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._criar_handler())
+        self._servidor.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def falhar(self, *status: int):
+        """As próximas requisições (exceto o OAuth) respondem com estes códigos, na ordem."""
+        with self._lock:
+            self._falhas.extend(status)
+
+    def revogar_tokens(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def iniciar(self) -> "ServidorGerencianetFalso":
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="gerencianet-falso", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _responder(self, metodo: str, caminho: str, corpo: dict, autorizacao: str):
+        """Devolve (status, corpo) da rota."""
+        with self._lock:
+            self.requisicoes += 1
+            if caminho == "/oauth/token":
+                token = uuid.uuid4().hex
+                self._tokens.add(token)
+                self.tokens_emitidos += 1
+                return 200, {"access_token": token, "token_type": "Bearer", "expires_in": self.validade_token}
+            if autorizacao.removeprefix("Bearer ") not in self._tokens:
+                return 401, {"error": "invalid_token"}
+            if self._falhas:
+                return self._falhas.popleft(), {"error": "falha simulada"}
+
+            if metodo == "POST" and caminho == "/v1/charge":
+                cobranca_id = next(self._ids)
+                valor = corpo["charges"][0]["amount"]
+                self.cobrancas[cobranca_id] = {
+                    "charge_id": cobranca_id,
+                    "status": "waiting",
+                    "amount": valor,
+                    "boleto": {
+                        "barcode": f"00190000090{cobranca_id:010d}",
+                        "digitable_line": f"00190.00009 0{cobranca_id:010d}",
+                        "link": f"https://boletos.exemplo/{cobranca_id}",
+                    },
+                }
+                return 200, {"code": 200, "data": {"charges": [{"id": cobranca_id}]}}
+            if metodo == "POST" and caminho == "/v1/subscription":
+                recorrencia_id = next(self._ids)
+                self.recorrencias[recorrencia_id] = {"subscription_id": recorrencia_id, "status": "active"}
+                return 200, {"code": 200, "data": {"subscription": {"id": recorrencia_id}}}
+
+            for rota, registros in ((ROTA_COBRANCA, self.cobrancas), (ROTA_RECORRENCIA, self.recorrencias)):
+                encontrado = rota.match(caminho)
+                if not encontrado:
+                    continue
+                registro = registros.get(int(encontrado.group(1)))
+                if registro is None:
+                    return 404, {"error": "not_found"}
+                if encontrado.group(2) and metodo == "POST":
+                    registro["status"] = "canceled"
+                return 200, {"code": 200, "data": registro}
+            return 404, {"error": "not_found"}
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexoes += 1
+
+            def _tratar(self, metodo: str):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                bruto = self.rfile.read(tamanho) if tamanho else b""
+                try:
+                    corpo = json.loads(bruto) if bruto and self.headers.get("Content-Type", "").startswith(
+                        "application/json") else {}
+                except ValueError:
+                    corpo = {}
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                status, resposta = servidor._responder(metodo, self.path, corpo,
+                                                       self.headers.get("Authorization", ""))
+                dados = json.dumps(resposta).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                self._tratar("GET")
+
+            def do_POST(self):
+                self._tratar("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor falso da API Gerencianet")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por resposta")
+    args = parser.parse_args()
+    servidor = ServidorGerencianetFalso(args.porta, args.latencia)
+    print(f"Gerencianet falso em {servidor.url} (Ctrl+C para sair)")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.parar()
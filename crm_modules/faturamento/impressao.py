@@ -0,0 +1,321 @@
+"""Impressão de carnês em lote
+
+Um lote junta os carnês que atendem a um filtro (mês de vencimento, bairro,
+plano) e gera um único PDF paginado ou um ZIP com um PDF por carnê:
+
+- A seleção roda na requisição, que já recebe o total de carnês; a geração
+  segue em segundo plano (``impressao_lotes_simultaneos`` threads) e o
+  andamento é consultado pelo id do lote.
+- Os carnês são divididos em pedaços de ``impressao_carnes_por_pedaco`` e
+  renderizados no pool de processos de PDFs (``servico_pdf``), no máximo um
+  pedaço por worker de cada vez para não tomar a fila dos contratos.
+- Cada pedaço pronto vai para um arquivo num diretório temporário dentro do
+  cache; o PDF único (``pypdf``) ou o ZIP é escrito direto em arquivo a
+  partir deles. Sem ``pypdf`` instalado o lote inteiro vai como um pedaço só
+  (um processo).
+- O arquivo final é movido para o cache em disco, pela chave do conteúdo:
+  repetir o mesmo lote sem mudança nas parcelas não renderiza de novo.
+
+O processo que gera o lote o mantém na memória (os ``impressao_lotes_max``
+mais recentes) e publica o andamento no cache compartilhado
+(``crm_core.cache``, Redis) por ``impressao_lotes_ttl`` segundos: status e
+download funcionam em qualquer worker que veja o Redis e o ``pdf_cache_dir``
+(mesmo host ou diretório compartilhado). Sem Redis, só o worker que criou o
+lote o encontra.
+"""
+import dataclasses
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from crm_core.cache import cache as cache_padrao
+from crm_core.cache.arquivos import CacheArquivos, cache_pdf, chave_conteudo
+from crm_core.cache.camadas import CacheEmCamadas
+from crm_core.config.settings import settings
+from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.contratos.infrastructure.pdf.servico import CAMPOS_EMPRESA, FilaPDFCheia, ServicoPDF, servico_pdf
+from crm_modules.faturamento.carne_models import CarneModel, ParcelaModel
+from crm_modules.faturamento.carne_pdf import VERSAO_LAYOUT, instantaneo_carne, renderizar_carnes
+from crm_modules.faturamento.pix import config_pix
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+FORMATOS = {"pdf": "application/pdf", "zip": "application/zip"}
+
+# Espera antes de tentar de novo quando a fila de PDFs está cheia (s)
+ESPERA_FILA_CHEIA = 0.5
+
+
+@dataclass
+class LoteImpressao:
+    id: str
+    formato: str
+    filtro: dict
+    total: int
+    documentos: List[dict] = field(default_factory=list, repr=False)
+    status: str = PENDENTE
+    processados: int = 0
+    chave: Optional[str] = None
+    erro: Optional[str] = None
+    criado_em: datetime = field(default_factory=datetime.utcnow)
+    concluido_em: Optional[datetime] = None
+
+    @property
+    def nome_arquivo(self) -> str:
+        return f"carnes_{self.criado_em:%Y%m%d_%H%M%S}.{self.formato}"
+
+    def resumo(self) -> dict:
+        return {
+            "id": self.id,
+            "formato": self.formato,
+            "filtro": self.filtro,
+            "status": self.status,
+            "total": self.total,
+            "processados": self.processados,
+            "progresso": round(100 * self.processados / self.total, 1) if self.total else 100.0,
+            "erro": self.erro,
+            "criado_em": self.criado_em,
+            "concluido_em": self.concluido_em,
+        }
+
+
+def _intervalo_mes(mes_vencimento: str) -> Tuple[date, date]:
+    try:
+        inicio = datetime.strptime(mes_vencimento, "%Y-%m").date()
+    except ValueError:
+        raise ValidationException("mes_vencimento deve estar no formato AAAA-MM")
+    fim = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    return inicio, fim
+
+
+def selecionar_carnes(db: Session, mes_vencimento: Optional[str] = None, bairro: Optional[str] = None,
+                      plano_id: Optional[int] = None, incluir_pagas: bool = False) -> List[dict]:
+    """Carnês ativos com parcelas no filtro, já como instantâneos para o pool."""
+    query = (
+        db.query(ParcelaModel)
+        .join(CarneModel, ParcelaModel.carne_id == CarneModel.id)
+        .join(ClienteModel, CarneModel.cliente_id == ClienteModel.id)
+        .options(joinedload(ParcelaModel.carne).joinedload(CarneModel.cliente))
+        .filter(CarneModel.ativo == True, ParcelaModel.ativo == True)
+    )
+    if not incluir_pagas:
+        query = query.filter(ParcelaModel.status.notin_(("pago", "cancelado")))
+    if mes_vencimento:
+        inicio, fim = _intervalo_mes(mes_vencimento)
+        query = query.filter(ParcelaModel.data_vencimento >= inicio, ParcelaModel.data_vencimento < fim)
+    if bairro:
+        query = query.filter(ClienteModel.bairro.ilike(bairro.strip()))
+    if plano_id is not None:
+        query = query.filter(ClienteModel.plano_id == plano_id)
+    parcelas = query.order_by(ClienteModel.nome, CarneModel.id, ParcelaModel.numero_parcela).all()
+
+    por_carne: "OrderedDict[int, list]" = OrderedDict()
+    for parcela in parcelas:
+        por_carne.setdefault(parcela.carne_id, []).append(parcela)
+    return [instantaneo_carne(itens[0].carne, itens) for itens in por_carne.values()]
+
+
+def _dados_empresa() -> dict:
+    return {campo: getattr(settings, campo) for campo in CAMPOS_EMPRESA}
+
+
+def _juntar_pdfs(partes: List[Path], destino: Path) -> Path:
+    if len(partes) == 1:
+        return partes[0]
+    escritor = PdfWriter()
+    for parte in partes:
+        escritor.append(str(parte))
+    with open(destino, "wb") as saida:
+        escritor.write(saida)
+    return destino
+
+
+def _compactar(arquivos: List[Tuple[str, Path]], destino: Path) -> Path:
+    # PDFs já vêm comprimidos: guardar sem recomprimir
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zip_:
+        for nome, caminho in arquivos:
+            zip_.write(caminho, nome)
+    return destino
+
+
+class ImpressaoCarnes:
+    def __init__(self, servico: Optional[ServicoPDF] = None, carnes_por_pedaco: Optional[int] = None,
+                 lotes_simultaneos: Optional[int] = None, max_lotes: Optional[int] = None,
+                 cache: Optional[CacheArquivos] = None, cache_zip: Optional[CacheArquivos] = None,
+                 estado: Optional[CacheEmCamadas] = None):
+        self.servico = servico or servico_pdf
+        self.carnes_por_pedaco = carnes_por_pedaco or settings.impressao_carnes_por_pedaco
+        self.lotes_simultaneos = lotes_simultaneos or settings.impressao_lotes_simultaneos
+        self.max_lotes = max_lotes or settings.impressao_lotes_max
+        self.caches = {
+            "pdf": cache or cache_pdf,
+            "zip": cache_zip or CacheArquivos(str((cache or cache_pdf).diretorio), extensao=".zip"),
+        }
+        self.estado = estado or cache_padrao
+        self._lotes: "OrderedDict[str, LoteImpressao]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.lotes_simultaneos,
+                                                    thread_name_prefix="impressao-carnes")
+            return self._executor
+
+    def criar_lote(self, db: Session, formato: str = "pdf", mes_vencimento: Optional[str] = None,
+                   bairro: Optional[str] = None, plano_id: Optional[int] = None,
+                   incluir_pagas: bool = False) -> LoteImpressao:
+        """Seleciona os carnês e agenda a geração; devolve o lote já com o total."""
+        if formato not in FORMATOS:
+            raise ValidationException(f"Formato inválido: {formato}. Use 'pdf' ou 'zip'")
+        filtro = {"mes_vencimento": mes_vencimento, "bairro": bairro, "plano_id": plano_id,
+                  "incluir_pagas": incluir_pagas}
+        documentos = selecionar_carnes(db, **filtro)
+        if not documentos:
+            raise ValidationException("Nenhum carnê com parcelas para o filtro informado")
+
+        lote = LoteImpressao(id=uuid.uuid4().hex, formato=formato, filtro=filtro, total=len(documentos),
+                             documentos=documentos)
+        with self._lock:
+            self._lotes[lote.id] = lote
+            self._descartar_antigos()
+        self._publicar(lote)
+        self._obter_executor().submit(self._executar, lote)
+        return lote
+
+    def _publicar(self, lote: LoteImpressao):
+        """Andamento no cache compartilhado, para os demais workers (sem os documentos)."""
+        self.estado.definir(f"impressao:lote:{lote.id}", dataclasses.replace(lote, documentos=[]),
+                            ttl=settings.impressao_lotes_ttl)
+
+    def _descartar_antigos(self):
+        excedente = len(self._lotes) - self.max_lotes
+        for lote_id in [i for i, l in self._lotes.items() if l.status in (CONCLUIDO, ERRO)][:max(0, excedente)]:
+            del self._lotes[lote_id]
+
+    def obter(self, lote_id: str) -> LoteImpressao:
+        with self._lock:
+            lote = self._lotes.get(lote_id)
+        if lote is None:
+            # Criado por outro worker
+            lote = self.estado.obter(f"impressao:lote:{lote_id}")
+        if lote is None:
+            raise NotFoundException(f"Lote de impressão {lote_id} não encontrado")
+        return lote
+
+    def arquivo(self, lote_id: str) -> Tuple[Path, LoteImpressao]:
+        """Caminho do arquivo gerado; ``ValidationException`` se o lote não concluiu."""
+        lote = self.obter(lote_id)
+        if lote.status != CONCLUIDO:
+            raise ValidationException(f"Lote de impressão ainda não concluído ({lote.status})")
+        caminho = self.caches[lote.formato].obter(lote.chave)
+        if caminho is None:
+            raise NotFoundException("Arquivo do lote removido do cache; gere o lote novamente")
+        return caminho, lote
+
+    def _executar(self, lote: LoteImpressao):
+        lote.status = PROCESSANDO
+        self._publicar(lote)
+        try:
+            empresa, pix = _dados_empresa(), config_pix()
+            lote.chave = chave_conteudo("lote_carnes", VERSAO_LAYOUT, lote.formato, empresa, pix, lote.documentos)
+            cache = self.caches[lote.formato]
+            if cache.obter(lote.chave) is None:
+                with cache.temporario() as pasta:
+                    cache.mover(lote.chave, self._renderizar(lote, empresa, pix, Path(pasta)))
+            lote.processados = lote.total
+            lote.status = CONCLUIDO
+        except Exception as e:
+            print(f"Aviso: falha na impressão do lote {lote.id}: {e}")
+            lote.erro = str(e)
+            lote.status = ERRO
+        finally:
+            lote.documentos = []
+            lote.concluido_em = datetime.utcnow()
+            self._publicar(lote)
+
+    def _pedacos(self, lote: LoteImpressao) -> List[List[dict]]:
+        if lote.formato == "pdf" and PdfWriter is None:
+            print("Aviso: pypdf não instalado; lote de carnês renderizado em um único processo")
+            return [lote.documentos]
+        n = self.carnes_por_pedaco
+        return [lote.documentos[i:i + n] for i in range(0, len(lote.documentos), n)]
+
+    def _renderizar(self, lote: LoteImpressao, empresa: dict, pix: Optional[dict], pasta: Path) -> Path:
+        """Renderiza os pedaços em arquivos de ``pasta`` e devolve o arquivo final (também em ``pasta``)."""
+        separados = lote.formato == "zip"
+        pedacos = self._pedacos(lote)
+        resultados: list = [None] * len(pedacos)
+        janela = max(1, self.servico.workers)
+        pendentes: Dict = {}
+        proximo = 0
+        try:
+            while proximo < len(pedacos) or pendentes:
+                while proximo < len(pedacos) and len(pendentes) < janela:
+                    try:
+                        futuro = self.servico.submeter(renderizar_carnes, pedacos[proximo], empresa, pix, separados)
+                    except FilaPDFCheia:
+                        break
+                    pendentes[futuro] = proximo
+                    proximo += 1
+                if not pendentes:
+                    time.sleep(ESPERA_FILA_CHEIA)
+                    continue
+                feitos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in feitos:
+                    indice = pendentes.pop(futuro)
+                    resultados[indice] = self._salvar_pedaco(pasta, indice, futuro.result(), separados)
+                    lote.processados += len(pedacos[indice])
+                if feitos:
+                    self._publicar(lote)
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
+        # Extensão fora do padrão do cache: a poda nunca pega arquivos em andamento
+        destino = pasta / f"lote.{lote.formato}.parte"
+        if separados:
+            return _compactar([arquivo for arquivos in resultados for arquivo in arquivos], destino)
+        return _juntar_pdfs(resultados, destino)
+
+    @staticmethod
+    def _salvar_pedaco(pasta: Path, indice: int, resultado, separados: bool):
+        """Grava o resultado de um pedaço em disco: caminho do PDF, ou (nome, caminho) por carnê."""
+        if not separados:
+            caminho = pasta / f"{indice:05d}.parte"
+            caminho.write_bytes(resultado)
+            return caminho
+        arquivos = []
+        for n, (nome, conteudo) in enumerate(resultado):
+            caminho = pasta / f"{indice:05d}-{n:05d}.parte"
+            caminho.write_bytes(conteudo)
+            arquivos.append((nome, caminho))
+        return arquivos
+
+    def parar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+impressao_carnes = ImpressaoCarnes()
@@ -0,0 +1,90 @@
+"""Tratadores da outbox para o Gerencianet (geração e cancelamento de boletos).
+
+Criar cobrança não é idempotente. Antes de chamar a API a parcela é marcada
+(``gerencianet_envio_em``, em commit próprio) e a marca só sai junto com o
+``charge_id``. Se a chamada ficar sem resposta, ou o processo cair antes de
+gravar o resultado, a marca fica: a mensagem vai para ``morto`` em vez de ser
+repetida, para conferência no Gerencianet pela referência do boleto.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from crm_core.outbox import ErroDefinitivo, registrar, tratador
+from crm_modules.faturamento.gerencianet_client import CobrancaIncerta, obter_cliente_gerencianet
+
+GERAR_BOLETO = "gerencianet.gerar_boleto"
+CANCELAR_BOLETO = "gerencianet.cancelar_boleto"
+DESTINO = "gerencianet"
+
+
+def _obter_cliente():
+    """Cliente Gerencianet do processo (conexões e token compartilhados com a API)."""
+    cliente = obter_cliente_gerencianet()
+    if not cliente.connected:
+        raise Exception("Gerencianet não configurado")
+    return cliente
+
+
+def enfileirar_boleto_parcela(session: Session, parcela_id: int):
+    return registrar(session, GERAR_BOLETO, {"parcela_id": parcela_id}, destino=DESTINO,
+                     chave=f"{GERAR_BOLETO}:{parcela_id}")
+
+
+def enfileirar_cancelamento_boleto(session: Session, charge_id, parcela_id: Optional[int] = None):
+    return registrar(session, CANCELAR_BOLETO, {"charge_id": charge_id, "parcela_id": parcela_id},
+                     destino=DESTINO, chave=f"{CANCELAR_BOLETO}:{charge_id}")
+
+
+@tratador(GERAR_BOLETO)
+def gerar_boleto_parcela(db: Session, payload: dict):
+    from crm_modules.clientes.models import ClienteModel
+    from crm_modules.faturamento.carne_models import CarneModel, ParcelaModel
+
+    parcela = db.get(ParcelaModel, payload["parcela_id"])
+    # Parcela excluída, cancelada ou com boleto já gerado (mensagem repetida): nada a fazer
+    if parcela is None or parcela.status == "cancelado" or parcela.gerencianet_charge_id:
+        return
+    carne = db.get(CarneModel, parcela.carne_id)
+    referencia = f"{carne.numero_carne}-{parcela.numero_parcela}"
+    if parcela.gerencianet_envio_em is not None:
+        raise ErroDefinitivo(
+            f"Boleto {referencia} enviado em {parcela.gerencianet_envio_em:%Y-%m-%d %H:%M:%S} sem confirmação; "
+            "confira no Gerencianet e, se não existir, limpe parcelas.gerencianet_envio_em antes de reprocessar"
+        )
+    cliente = db.get(ClienteModel, carne.cliente_id)
+    if not cliente.email:
+        raise Exception("Cliente não possui email cadastrado")
+    gerencianet = _obter_cliente()
+
+    parcela.gerencianet_envio_em = datetime.utcnow()
+    db.commit()
+    try:
+        resultado = gerencianet.gerar_boleto(
+            cliente_nome=cliente.nome,
+            cliente_cpf=cliente.cpf or "00000000000",  # Fallback se não tiver CPF
+            cliente_email=cliente.email,
+            valor=parcela.valor,
+            data_vencimento=parcela.data_vencimento,
+            numero_referencia=referencia,
+            descricao=f"Parcela {parcela.numero_parcela} de {carne.quantidade_parcelas}",
+        )
+    except CobrancaIncerta as e:
+        raise ErroDefinitivo(str(e))
+    except Exception:
+        # A API respondeu com erro (ou nada foi enviado): seguro tentar de novo
+        parcela.gerencianet_envio_em = None
+        db.commit()
+        raise
+    # Gravados no mesmo commit que conclui a mensagem
+    parcela.gerencianet_envio_em = None
+    parcela.gerencianet_charge_id = resultado.get("charge_id")
+    parcela.codigo_barras = resultado.get("codigo_barras")
+    parcela.linha_digitavel = resultado.get("linha_digitavel")
+    parcela.gerencianet_link_boleto = resultado.get("url_boleto")
+
+
+@tratador(CANCELAR_BOLETO)
+def cancelar_boleto(db: Session, payload: dict):
+    _obter_cliente().cancelar_boleto(int(payload["charge_id"]))
@@ -0,0 +1,172 @@
+"""PIX "copia e cola" (BR Code EMV) e QR Codes de cobrança
+
+- ``payload_pix`` monta o BR Code estático (campos EMV 00/26/52/53/54/58/59/
+  60/62 e CRC16-CCITT no campo 63) a partir das configurações ``pix_*``.
+- ``qr_png`` e ``qr_svg`` desenham o QR Code de um conteúdo e ficam num LRU
+  limitado (``pix_qr_cache_tamanho``) por conteúdo: reimprimir o mesmo
+  boleto ou carnê não recalcula a imagem. O SVG junta os módulos vizinhos de
+  cada linha num só retângulo, o que o deixa bem menor que o do ``qrcode``.
+- ``pix_parcela`` / ``pix_boleto`` gravam o payload na coluna
+  ``pix_copia_cola`` (listagens e API o leem sem depender da configuração);
+  os services de carnê e boleto os chamam ao criar a parcela ou o boleto.
+- ``payload_parcela`` / ``payload_boleto`` / ``payload_fatura`` só calculam o
+  payload atual, sem gravar: é o que as páginas de impressão usam.
+"""
+import base64
+import io
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+from crm_core.config.settings import settings
+
+TAMANHO_MAXIMO = {"59": 25, "60": 15, "05": 25}
+
+
+def config_pix() -> Optional[dict]:
+    """Dados do recebedor a partir das configurações; ``None`` sem chave PIX."""
+    if not settings.pix_chave:
+        return None
+    return {
+        "chave": settings.pix_chave,
+        "tipo": settings.pix_tipo_chave or "cpf",
+        "beneficiario": settings.pix_beneficiario or "CRM Provedor",
+        "cidade": settings.pix_cidade or "São Paulo",
+    }
+
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").upper()
+
+
+def _campo(identificador: str, valor: str) -> str:
+    return f"{identificador}{len(valor):02d}{valor}"
+
+
+def crc16(payload: str) -> str:
+    """CRC16-CCITT (polinômio 0x1021, início 0xFFFF) em 4 dígitos hexadecimais."""
+    crc = 0xFFFF
+    for byte in payload.encode("utf-8"):
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return f"{crc:04X}"
+
+
+def normalizar_chave(chave: str, tipo: str) -> str:
+    chave, tipo = chave.strip(), (tipo or "").lower()
+    if tipo in ("cpf", "cnpj"):
+        return "".join(c for c in chave if c.isdigit())
+    if tipo == "telefone":
+        digitos = "".join(c for c in chave if c.isdigit())
+        return f"+{digitos}" if digitos.startswith("55") and len(digitos) > 11 else f"+55{digitos}"
+    if tipo == "email":
+        return "".join(chave.split()).lower()
+    return "".join(chave.split())
+
+
+def txid_parcela(parcela) -> str:
+    return f"CARNE{parcela.carne_id}P{parcela.numero_parcela}"
+
+
+def txid_boleto(boleto) -> str:
+    return f"BOLETO{boleto.id}"
+
+
+def payload_pix(valor: Optional[float], txid: str = "***", config: Optional[dict] = None) -> Optional[str]:
+    """BR Code estático para ``valor``; ``None`` se não houver chave PIX configurada."""
+    config = config or config_pix()
+    if not config:
+        return None
+    conta = _campo("26", _campo("00", "br.gov.bcb.pix") + _campo("01", normalizar_chave(config["chave"], config["tipo"])))
+    txid = "".join(c for c in _sem_acentos(txid or "") if c.isalnum())[:TAMANHO_MAXIMO["05"]] or "***"
+    campos = [
+        _campo("00", "01"),
+        conta,
+        _campo("52", "0000"),
+        _campo("53", "986"),
+    ]
+    if valor:
+        campos.append(_campo("54", f"{valor:.2f}"))
+    campos += [
+        _campo("58", "BR"),
+        _campo("59", _sem_acentos(config["beneficiario"])[:TAMANHO_MAXIMO["59"]]),
+        _campo("60", _sem_acentos(config["cidade"])[:TAMANHO_MAXIMO["60"]]),
+        _campo("62", _campo("05", txid)),
+        "6304",
+    ]
+    payload = "".join(campos)
+    return payload + crc16(payload)
+
+
+def _pix_persistido(objeto, valor: float, txid: str) -> Optional[str]:
+    payload = payload_pix(valor, txid)
+    if payload and settings.pix_persistir_payload and payload != objeto.pix_copia_cola:
+        # Quem chamou decide quando fazer o commit
+        objeto.pix_copia_cola = payload
+    return payload
+
+
+def pix_parcela(parcela) -> Optional[str]:
+    return _pix_persistido(parcela, parcela.valor, txid_parcela(parcela))
+
+
+def pix_boleto(boleto) -> Optional[str]:
+    return _pix_persistido(boleto, boleto.valor, txid_boleto(boleto))
+
+
+def payload_parcela(parcela) -> Optional[str]:
+    return payload_pix(parcela.valor, txid_parcela(parcela)) or parcela.pix_copia_cola
+
+
+def payload_boleto(boleto) -> Optional[str]:
+    return payload_pix(boleto.valor, txid_boleto(boleto)) or boleto.pix_copia_cola
+
+
+def payload_fatura(fatura: dict) -> Optional[str]:
+    """Payload da fatura (o dicionário de ``obter_fatura_detalhada``)."""
+    return payload_pix(fatura["valor_total"], fatura["numero_fatura"])
+
+
+def _matriz(conteudo: str):
+    import qrcode
+
+    qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+    return qr
+
+
+@lru_cache(maxsize=settings.pix_qr_cache_tamanho)
+def qr_png(conteudo: str) -> bytes:
+    buffer = io.BytesIO()
+    _matriz(conteudo).make_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=settings.pix_qr_cache_tamanho)
+def qr_svg(conteudo: str) -> str:
+    matriz = _matriz(conteudo).get_matrix()
+    lado = len(matriz)
+    trechos = []
+    for y, linha in enumerate(matriz):
+        x = 0
+        while x < lado:
+            if not linha[x]:
+                x += 1
+                continue
+            inicio = x
+            while x < lado and linha[x]:
+                x += 1
+            trechos.append(f"M{inicio} {y}h{x - inicio}v1h-{x - inicio}z")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {lado} {lado}" shape-rendering="crispEdges">'
+        f'<rect width="{lado}" height="{lado}" fill="#fff"/><path d="{"".join(trechos)}"/></svg>'
+    )
+
+
+def qr_data_uri(conteudo: str, formato: str = "svg") -> str:
+    if formato == "png":
+        return "data:image/png;base64," + base64.b64encode(qr_png(conteudo)).decode("ascii")
+    return "data:image/svg+xml;base64," + base64.b64encode(qr_svg(conteudo).encode("utf-8")).decode("ascii")
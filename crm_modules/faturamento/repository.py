@@ -1,3 +1,4 @@
+from datetime import date
 from typing import Optional, List
 from sqlalchemy.orm import Session
 from crm_modules.faturamento.models import FaturaModel, PagamentoModel
@@ -33,4 +34,108 @@ class FaturamentoRepository(BaseRepository):
             PagamentoModel.fatura_id == fatura_id,
             PagamentoModel.ativo == True
         ).scalar()
-        return result if result else 0.0
\ No newline at end of file
+        return result if result else 0.0
+
+    def query_exportacao_faturas(self, cliente_id: Optional[int] = None, status: Optional[str] = None,
+                                 vencimento_de: Optional[date] = None, vencimento_ate: Optional[date] = None):
+        """Linhas ``(fatura, nome do cliente)`` na ordem da listagem de faturas."""
+        from crm_modules.clientes.models import ClienteModel
+
+        query = self.session.query(FaturaModel, ClienteModel.nome).outerjoin(
+            ClienteModel, ClienteModel.id == FaturaModel.cliente_id
+        ).filter(FaturaModel.ativo == True)
+        if cliente_id:
+            query = query.filter(FaturaModel.cliente_id == cliente_id)
+        if status:
+            query = query.filter(FaturaModel.status == status)
+        if vencimento_de:
+            query = query.filter(FaturaModel.data_vencimento >= vencimento_de)
+        if vencimento_ate:
+            query = query.filter(FaturaModel.data_vencimento <= vencimento_ate)
+        return query.order_by(FaturaModel.id.desc())
+
+    def query_exportacao_pagamentos(self, fatura_id: Optional[int] = None, cliente_id: Optional[int] = None,
+                                    metodo_pagamento: Optional[str] = None,
+                                    data_de: Optional[date] = None, data_ate: Optional[date] = None):
+        """Linhas ``(pagamento, número da fatura, id e nome do cliente)`` na ordem da listagem."""
+        from datetime import datetime, time, timedelta
+        from crm_modules.clientes.models import ClienteModel
+
+        query = self.session.query(
+            PagamentoModel, FaturaModel.numero_fatura, FaturaModel.cliente_id, ClienteModel.nome
+        ).outerjoin(
+            FaturaModel, FaturaModel.id == PagamentoModel.fatura_id
+        ).outerjoin(
+            ClienteModel, ClienteModel.id == FaturaModel.cliente_id
+        ).filter(PagamentoModel.ativo == True)
+        if fatura_id:
+            query = query.filter(PagamentoModel.fatura_id == fatura_id)
+        if cliente_id:
+            query = query.filter(FaturaModel.cliente_id == cliente_id)
+        if metodo_pagamento:
+            query = query.filter(PagamentoModel.metodo_pagamento == metodo_pagamento)
+        if data_de:
+            query = query.filter(PagamentoModel.data_pagamento >= datetime.combine(data_de, time.min))
+        if data_ate:
+            query = query.filter(PagamentoModel.data_pagamento < datetime.combine(data_ate + timedelta(days=1), time.min))
+        return query.order_by(PagamentoModel.data_pagamento.desc())
+
+    def faturas_do_periodo(self, prefixo_numero: str) -> List[tuple]:
+        """``(cliente_id, numero_fatura)`` das faturas mensais já geradas para o período.
+
+        Só conta o número com o prefixo do período (``FAT-{ano}-{mes}-``),
+        mesmo de faturas inativas, já que ``numero_fatura`` é único na tabela
+        inteira; faturas avulsas vencendo no mês não impedem a mensal.
+        """
+        return self.session.query(FaturaModel.cliente_id, FaturaModel.numero_fatura).filter(
+            FaturaModel.numero_fatura.like(f"{prefixo_numero}%")
+        ).all()
+
+    def inserir_faturas_em_lote(self, linhas: List[dict], lote: int = 500) -> List[int]:
+        """Insere as faturas em lotes numa única transação e retorna os ids criados.
+
+        No SQLite e no PostgreSQL números de fatura já existentes são
+        ignorados (``ON CONFLICT DO NOTHING``), o que torna uma segunda
+        execução concorrente inofensiva. Nos demais bancos (ex.: MySQL, sem
+        ``RETURNING``) o lote é inserido sem cláusula de conflito, um número
+        repetido desfaz a transação, e os ids são relidos por ``numero_fatura``.
+        """
+        dialeto = self.session.get_bind().dialect.name
+        if dialeto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialeto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            insert = None
+
+        ids = []
+        try:
+            for inicio in range(0, len(linhas), lote):
+                pedaco = linhas[inicio:inicio + lote]
+                if insert is None:
+                    ids.extend(self._inserir_sem_returning(pedaco))
+                    continue
+                comando = (
+                    insert(FaturaModel)
+                    .on_conflict_do_nothing(index_elements=[FaturaModel.numero_fatura])
+                    .returning(FaturaModel.id)
+                )
+                ids.extend(self.session.execute(comando, pedaco).scalars())
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return ids
+
+    def _inserir_sem_returning(self, linhas: List[dict]) -> List[int]:
+        """INSERT simples do lote e releitura dos ids pelos números de fatura."""
+        from sqlalchemy import insert
+
+        self.session.execute(insert(FaturaModel), linhas)
+        numeros = [linha["numero_fatura"] for linha in linhas]
+        ids = dict(
+            self.session.query(FaturaModel.numero_fatura, FaturaModel.id)
+            .filter(FaturaModel.numero_fatura.in_(numeros))
+            .all()
+        )
+        return [ids[numero] for numero in numeros]
@@ -1,21 +1,31 @@
+from calendar import monthrange
 from typing import Optional, List
 from datetime import datetime, date
 from crm_modules.faturamento.repository import FaturamentoRepository
 from crm_modules.faturamento.domain import Fatura, Pagamento
-from crm_modules.faturamento.schemas import FaturaCreate, FaturaUpdate, PagamentoCreate, PagamentoUpdate
+from crm_modules.faturamento.schemas import FaturaCreate, FaturaUpdate, PagamentoCreate, PagamentoUpdate, PagamentoResponse
 from crm_modules.faturamento.models import FaturaModel, PagamentoModel
 from crm_modules.clientes.models import ClienteModel
 from crm_modules.planos.models import PlanoModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
+from crm_core.events.events import FaturaPaidEvent
 from sqlalchemy.orm import Session
 
 
+def data_vencimento_no_mes(ano: int, mes: int, dia: int) -> date:
+    """Vencimento no dia pedido, ou no último dia do mês se ele for mais curto."""
+    return date(ano, mes, max(1, min(dia, monthrange(ano, mes)[1])))
+
+
 class FaturamentoService:
-    def __init__(self, repository: Optional[FaturamentoRepository] = None, repository_session: Optional[Session] = None):
+    def __init__(self, repository: Optional[FaturamentoRepository] = None, repository_session: Optional[Session] = None,
+                 event_bus: Optional[EventBus] = None):
         if repository is not None:
             self.repository = repository
         else:
             self.repository = FaturamentoRepository(session=repository_session) if repository_session is not None else FaturamentoRepository()
+        self.event_bus = event_bus or event_bus_padrao
 
     def criar_fatura(self, fatura_data: FaturaCreate) -> Fatura:
         # Validate
@@ -104,9 +114,12 @@ class FaturamentoService:
         # Update fatura valor_pago and status
         total_pago = self.repository.calcular_total_pago_fatura(pagamento_data.fatura_id)
         fatura.valor_pago = total_pago
-        if total_pago >= fatura.valor_total:
+        quitada = total_pago >= fatura.valor_total and fatura.status != "pago"
+        if quitada:
             fatura.status = "pago"
         self.repository.update(fatura)
+        if quitada:
+            self.event_bus.publish(FaturaPaidEvent(fatura.id, fatura.cliente_id, fatura.valor_total))
 
         return Pagamento(
             id=model.id,
@@ -119,39 +132,59 @@ class FaturamentoService:
             ativo=model.ativo,
         )
 
-    def gerar_faturas_mensais(self, mes: int, ano: int) -> List[Fatura]:
-        # Get clients with plans
-        clientes = self.repository.session.query(ClienteModel).filter(
+    def gerar_faturas_mensais(self, mes: int, ano: int, lote: int = 500) -> dict:
+        """Gera as faturas do mês para todos os clientes ativos com plano.
+
+        Carrega clientes e faturas já existentes do período em uma consulta
+        cada, monta as novas linhas em memória e insere tudo em lotes numa
+        única transação. Rodar de novo para o mesmo mês não duplica faturas.
+        """
+        if not 1 <= mes <= 12:
+            raise ValidationException("Mês inválido")
+
+        clientes = self.repository.session.query(
+            ClienteModel.id, ClienteModel.plano_id, ClienteModel.valor_mensal, ClienteModel.dia_vencimento
+        ).filter(
             ClienteModel.plano_id.isnot(None),
             ClienteModel.valor_mensal.isnot(None),
             ClienteModel.dia_vencimento.isnot(None),
             ClienteModel.ativo == True
-        ).all()
+        ).order_by(ClienteModel.id).all()
+
+        prefixo = f"FAT-{ano}-{mes:02d}-"
+        existentes = self.repository.faturas_do_periodo(prefixo)
+        clientes_faturados = {cliente_id for cliente_id, _ in existentes}
+        numeros_usados = {numero for _, numero in existentes}
+
+        novas = []
+        vencimentos_ajustados = 0
+        for cliente_id, plano_id, valor_mensal, dia_vencimento in clientes:
+            numero_fatura = f"{prefixo}{cliente_id}"
+            if cliente_id in clientes_faturados or numero_fatura in numeros_usados:
+                continue
+            vencimento = data_vencimento_no_mes(ano, mes, dia_vencimento)
+            if vencimento.day != dia_vencimento:
+                vencimentos_ajustados += 1
+            novas.append({
+                "cliente_id": cliente_id,
+                "numero_fatura": numero_fatura,
+                "data_vencimento": vencimento,
+                "valor_total": valor_mensal,
+                "descricao": f"Fatura mensal - Plano {plano_id}",
+            })
+
+        ids = self.repository.inserir_faturas_em_lote(novas, lote=lote) if novas else []
 
-        faturas_criadas = []
-
-        for cliente in clientes:
-            # Check if fatura already exists for this month
-            vencimento = date(ano, mes, cliente.dia_vencimento)
-            existing = self.repository.session.query(FaturaModel).filter(
-                FaturaModel.cliente_id == cliente.id,
-                FaturaModel.data_vencimento == vencimento,
-                FaturaModel.ativo == True
-            ).first()
-
-            if not existing:
-                numero_fatura = f"FAT-{ano}-{mes:02d}-{cliente.id}"
-                fatura_data = FaturaCreate(
-                    cliente_id=cliente.id,
-                    numero_fatura=numero_fatura,
-                    data_vencimento=vencimento,
-                    valor_total=cliente.valor_mensal,
-                    descricao=f"Fatura mensal - Plano {cliente.plano_id}"
-                )
-                fatura = self.criar_fatura(fatura_data)
-                faturas_criadas.append(fatura)
-
-        return faturas_criadas
+        return {
+            "mes": mes,
+            "ano": ano,
+            "clientes_faturaveis": len(clientes),
+            "faturas_criadas": len(ids),
+            "ja_existentes": len(clientes) - len(novas),
+            "ignoradas_por_conflito": len(novas) - len(ids),
+            "vencimentos_ajustados": vencimentos_ajustados,
+            "faturas": ids,
+        }
 
     def gerar_fatura_cliente(self, cliente_id: int, mes: int, ano: int) -> Optional[Fatura]:
         """Gera fatura mensal para um cliente específico"""
@@ -162,7 +195,7 @@ class FaturamentoService:
 
         try:
             # Verificar se já existe fatura para este mês/ano
-            vencimento = date(ano, mes, cliente.dia_vencimento)
+            vencimento = data_vencimento_no_mes(ano, mes, cliente.dia_vencimento)
             fatura_existente = self.repository.session.query(FaturaModel).filter(
                 FaturaModel.cliente_id == cliente.id,
                 FaturaModel.data_vencimento == vencimento,
@@ -225,6 +258,7 @@ class FaturamentoService:
         if not model:
             raise NotFoundException("Fatura não encontrada")
         
+        ja_paga = model.status == "pago"
         model.status = "pago"
         model.valor_pago = model.valor_total
         
@@ -241,6 +275,8 @@ class FaturamentoService:
             self.repository.session.add(pagamento)
             
         self.repository.update(model)
+        if not ja_paga:
+            self.event_bus.publish(FaturaPaidEvent(model.id, model.cliente_id, model.valor_total))
         return self._model_to_domain(model)
 
     def obter_fatura_detalhada(self, fatura_id: int) -> dict:
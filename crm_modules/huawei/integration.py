@@ -26,6 +26,20 @@ def get_huawei_server():
         return None
 
 
+def verificar_conexao_huawei(host: str, user: str, secret: str, timeout: int = 10) -> bool:
+    """Teste de saúde: abre e fecha uma sessão SSH com o Huawei."""
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        ssh.connect(host, username=user, password=secret, timeout=timeout)
+        return True
+    except Exception as e:
+        print(f"Huawei {host} indisponível: {e}")
+        return False
+    finally:
+        ssh.close()
+
+
 def sincronizar_cliente_huawei(username: str, password: str, profile: str = "default", host: Optional[str] = None, user: Optional[str] = None, secret: Optional[str] = None):
     """
     Sincroniza credenciais do cliente com Huawei PPPoE.
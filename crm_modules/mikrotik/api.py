@@ -81,6 +81,14 @@ async def get_mikrotik_status(servidor_id: int = None):
     return result
 
 
+@router.get("/pool")
+async def get_pool_status():
+    """Obtém o estado do pool de conexões RouterOS (por roteador)"""
+    from crm_modules.mikrotik.pool import routeros_pool
+
+    return {'roteadores': routeros_pool.estatisticas()}
+
+
 @router.post("/profiles")
 async def create_profile(
     profile: ProfileCreate
@@ -182,10 +190,13 @@ async def update_client_credentials(
 
 
 @router.get("/sessions")
-async def get_active_sessions(servidor_id: int = None):
-    """Obtém as sessões PPPoE ativas"""
+def get_active_sessions(servidor_id: int = None, atualizar: bool = False):
+    """Obtém as sessões PPPoE ativas (do índice; ``atualizar`` relê os roteadores)
+    
+    Sem ``servidor_id`` junta as sessões de todos os roteadores ativos.
+    """
     service = MikrotikService(servidor_id=servidor_id)
-    result = service.obter_sessoes_ativas()
+    result = service.obter_sessoes_ativas(atualizar=atualizar, todos_servidores=servidor_id is None)
     
     if result['status'] == 'error':
         raise HTTPException(status_code=400, detail=result['message'])
@@ -193,6 +204,14 @@ async def get_active_sessions(servidor_id: int = None):
     return result
 
 
+@router.get("/sessions/index")
+async def get_sessions_index_status():
+    """Obtém o frescor do índice de sessões PPPoE por roteador"""
+    from crm_modules.mikrotik.sessoes import indice_sessoes
+
+    return indice_sessoes.estado()
+
+
 @router.post("/sessions/{session_id}/disconnect")
 async def disconnect_session(session_id: str, servidor_id: int = None):
     """Desconecta uma sessão ativa"""
@@ -206,13 +225,13 @@ async def disconnect_session(session_id: str, servidor_id: int = None):
 
 
 @router.get("/logs")
-async def get_logs(
+def get_logs(
     servidor_id: int = None,
     limit: int = 50
 ):
-    """Obtém logs recentes do MikroTik"""
+    """Obtém logs recentes do MikroTik (de todos os roteadores sem ``servidor_id``)"""
     service = MikrotikService(servidor_id=servidor_id)
-    result = service.obter_logs_recentes(limit=limit)
+    result = service.obter_logs_recentes(limit=limit, todos_servidores=servidor_id is None)
     
     if result['status'] == 'error':
         raise HTTPException(status_code=400, detail=result['message'])
@@ -257,55 +276,23 @@ async def sync_plans(servidor_id: int = None):
 
 
 @router.post("/sync-clients")
-async def sync_clients(servidor_id: int = None):
-    """Sincroniza todos os clientes do CRM com secrets PPPoE no MikroTik"""
+def sync_clients(servidor_id: int = None, dry_run: bool = False, remover_extras: bool = False):
+    """Reconcilia os secrets PPPoE com os clientes do CRM
+    
+    Sem ``servidor_id`` todos os roteadores MikroTik ativos são
+    reconciliados em paralelo. Com ``dry_run`` apenas lista as alterações.
+    """
     service = MikrotikService(servidor_id=servidor_id)
-    try:
-        from crm_modules.clientes.service import ClienteService
-        from crm_modules.contratos.service import ContratoService
-        from crm_core.db.base import get_db_session
-        
-        db = get_db_session()
-        try:
-            cliente_service = ClienteService(repository_session=db)
-            contrato_service = ContratoService(repository_session=db)
-            
-            clientes = cliente_service.listar_clientes_ativos()
-            contratos = contrato_service.listar_todos_contratos()
-            
-            resultados = []
-            for cliente in clientes:
-                # Buscar contrato ativo do cliente
-                cliente_contratos = [
-                    c for c in contratos
-                    if c.get('cliente_id') == cliente.id and c.get('status_assinatura') == 'assinado'
-                ]
-                if cliente_contratos:
-                    contrato = cliente_contratos[0]
-                    result = service.sincronizar_cliente_real_time(cliente, contrato)
-                    resultados.append({
-                        'cliente_id': cliente.id,
-                        'cliente_nome': cliente.nome,
-                        'resultado': result
-                    })
-            
-            sucessos = sum(1 for r in resultados if r['resultado']['status'] == 'success')
-            falhas = len(resultados) - sucessos
-            
-            return {
-                'status': 'success',
-                'message': f'Sincronização concluída: {sucessos} clientes sincronizados, {falhas} falhas',
-                'resultados': resultados,
-                'total_clientes': len(clientes),
-                'sucessos': sucessos,
-                'falhas': falhas
-            }
-            
-        finally:
-            db.close()
-            
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f'Erro ao sincronizar clientes: {str(e)}')
+    result = service.sincronizar_todos_clientes(
+        dry_run=dry_run,
+        remover_extras=remover_extras,
+        todos_servidores=servidor_id is None
+    )
+    
+    if result['status'] == 'error':
+        raise HTTPException(status_code=400, detail=result['message'])
+    
+    return result
 
 # Integração com o módulo de contratos
 @router.post("/contratos/{contrato_id}/sync")
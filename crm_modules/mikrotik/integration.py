@@ -1,4 +1,5 @@
 from crm_core.config.settings import settings
+from crm_modules.mikrotik.pool import routeros_pool
 from typing import Optional
 
 
@@ -34,6 +35,19 @@ def get_mikrotik_server(servidor_id: int = None):
         db.close()
 
 
+def listar_servidores_mikrotik():
+    """Retorna todos os servidores MikroTik ativos."""
+    from crm_core.db.base import get_db_session
+    from crm_modules.servidores.repository import ServidorRepository
+
+    db = get_db_session()
+    try:
+        servidores = ServidorRepository(db).listar_servidores_ativos()
+        return [s for s in servidores if s.tipo_conexao and s.tipo_conexao.lower() == 'mikrotik']
+    finally:
+        db.close()
+
+
 def criar_profile_mikrotik(name: str, download_limit: int, upload_limit: int, host: Optional[str] = None, user: Optional[str] = None, secret: Optional[str] = None):
     """
     Cria ou atualiza um profile PPPoE no MikroTik com limitacoes de velocidade.
@@ -63,69 +77,59 @@ def criar_profile_mikrotik(name: str, download_limit: int, upload_limit: int, ho
         return False, error_msg
 
     try:
-        connection = routeros_api.RouterOsApiPool(
-            host,
-            username=user,
-            password=secret,
-            port=8728,
-            plaintext_login=True
-        )
-        api = connection.get_api()
-
-        ppp_profiles = api.get_resource('/ppp/profile')
-        existing = ppp_profiles.get(name=name)
-
-        # Verificar se ha pools disponiveis
-        pools = api.get_resource('/ip/pool').get()
-        pool_name = None
-
-        if pools:
-            # Usa o primeiro pool encontrado
-            pool_name = pools[0]['name']
-        else:
-            # Cria um pool padrao se nao existir
-            pool_name = "pppoe-pool"
-            api.get_resource('/ip/pool').add(
-                name=pool_name,
-                ranges="192.168.1.100-192.168.1.200"
-            )
-
-        if existing:
-            # Atualizar profile
-            update_params = {
-                'rate_limit': f"{upload_limit}M/{download_limit}M",
-                'remote_address': pool_name
-            }
-            # Opcionalmente, adiciona local_address se configurado
-            if settings.mikrotik_local_address:
-                update_params['local_address'] = settings.mikrotik_local_address
-
-            ppp_profiles.set(
-                id=existing[0]['id'],
-                **update_params
-            )
-            msg = f"Profile PPPoE atualizado: {name}"
-            print(msg)
-            connection.disconnect()
-            return True, msg
-        else:
-            # Criar novo profile
-            create_params = {
-                'name': name,
-                'rate_limit': f"{upload_limit}M/{download_limit}M",
-                'remote_address': pool_name
-            }
-            # Opcionalmente, adiciona local_address se configurado
-            if settings.mikrotik_local_address:
-                create_params['local_address'] = settings.mikrotik_local_address
-
-            ppp_profiles.add(
-                **create_params
-            )
-            msg = f"Profile PPPoE criado: {name}"
-            print(msg)
-            connection.disconnect()
-            return True, msg
+        with routeros_pool.conexao(host, user, secret) as api:
+            ppp_profiles = api.get_resource('/ppp/profile')
+            existing = ppp_profiles.get(name=name)
+
+            # Verificar se ha pools disponiveis
+            pools = api.get_resource('/ip/pool').get()
+            pool_name = None
+
+            if pools:
+                # Usa o primeiro pool encontrado
+                pool_name = pools[0]['name']
+            else:
+                # Cria um pool padrao se nao existir
+                pool_name = "pppoe-pool"
+                api.get_resource('/ip/pool').add(
+                    name=pool_name,
+                    ranges="192.168.1.100-192.168.1.200"
+                )
+
+            if existing:
+                # Atualizar profile
+                update_params = {
+                    'rate_limit': f"{upload_limit}M/{download_limit}M",
+                    'remote_address': pool_name
+                }
+                # Opcionalmente, adiciona local_address se configurado
+                if settings.mikrotik_local_address:
+                    update_params['local_address'] = settings.mikrotik_local_address
+
+                ppp_profiles.set(
+                    id=existing[0]['id'],
+                    **update_params
+                )
+                msg = f"Profile PPPoE atualizado: {name}"
+                print(msg)
+                return True, msg
+            else:
+                # Criar novo profile
+                create_params = {
+                    'name': name,
+                    'rate_limit': f"{upload_limit}M/{download_limit}M",
+                    'remote_address': pool_name
+                }
+                # Opcionalmente, adiciona local_address se configurado
+                if settings.mikrotik_local_address:
+                    create_params['local_address'] = settings.mikrotik_local_address
+
+                ppp_profiles.add(
+                    **create_params
+                )
+                msg = f"Profile PPPoE criado: {name}"
+                print(msg)
+                return True, msg
 
     except Exception as e:
         msg = f"Erro ao criar profile no MikroTik: {e}"
@@ -133,9 +137,12 @@ def criar_profile_mikrotik(name: str, download_limit: int, upload_limit: int, ho
         return False, msg
 
 
-def sincronizar_cliente_mikrotik(username: str, password: str, profile: str = "default", host: Optional[str] = None, user: Optional[str] = None, secret: Optional[str] = None):
+def sincronizar_cliente_mikrotik(username: str, password: str, profile: str = "default", host: Optional[str] = None, user: Optional[str] = None, secret: Optional[str] = None, levantar_erros: bool = False):
     """
     Sincroniza credenciais do cliente com MikroTik PPPoE secrets.
+
+    Com ``levantar_erros=True`` (outbox) a falha é propagada para que a
+    sincronização seja tentada de novo; senão só é registrada.
     """
     if not any([host, user, secret]):
         server = get_mikrotik_server()
@@ -150,6 +157,8 @@ def sincronizar_cliente_mikrotik(username: str, password: str, profile: str = "d
 
     if not all([host, user, secret]):
         print("MikroTik não configurado, pulando sincronização")
+        if levantar_erros:
+            raise Exception("MikroTik não configurado")
         return
 
     try:
@@ -160,32 +169,24 @@ def sincronizar_cliente_mikrotik(username: str, password: str, profile: str = "d
         raise Exception(error_msg)
 
     try:
-        connection = routeros_api.RouterOsApiPool(
-            host,
-            username=user,
-            password=secret,
-            port=8728,
-            plaintext_login=True
-        )
-        api = connection.get_api()
-
-        # Verificar se o secret já existe
-        ppp_secrets = api.get_resource('/ppp/secret')
-        existing = ppp_secrets.get(name=username)
-
-        if existing:
-            # Atualizar
-            ppp_secrets.set(id=existing[0]['id'], password=password, profile=profile)
-            print(f"Secret PPPoE atualizado: {username}")
-        else:
-            # Criar novo
-            ppp_secrets.add(name=username, password=password, profile=profile, service="pppoe")
-            print(f"Secret PPPoE criado: {username}")
-
-        connection.disconnect()
+        with routeros_pool.conexao(host, user, secret) as api:
+            # Verificar se o secret já existe
+            ppp_secrets = api.get_resource('/ppp/secret')
+            existing = ppp_secrets.get(name=username)
+
+            if existing:
+                # Atualizar
+                ppp_secrets.set(id=existing[0]['id'], password=password, profile=profile)
+                print(f"Secret PPPoE atualizado: {username}")
+            else:
+                # Criar novo
+                ppp_secrets.add(name=username, password=password, profile=profile, service="pppoe")
+                print(f"Secret PPPoE criado: {username}")
 
     except Exception as e:
         print(f"Erro ao sincronizar com MikroTik: {e}")
+        if levantar_erros:
+            raise
         # Não falhar o cadastro por erro na sincronização
 
 
@@ -211,46 +212,34 @@ def coletar_logs_mikrotik(host: Optional[str] = None, user: Optional[str] = None
         raise Exception(error_msg)
 
     try:
-        import routeros_api
-
-        connection = routeros_api.RouterOsApiPool(
-            host,
-            username=user,
-            password=secret,
-            port=8728,
-            plaintext_login=True
-        )
-        api = connection.get_api()
-        
-        logs = []
+        with routeros_pool.conexao(host, user, secret) as api:
+            logs = []
         
-        # Tentar endpoint /log primeiro
-        try:
-            log_resource = api.get_resource('/log')
-            logs = log_resource.get()
-        except Exception as e:
-            print(f"Erro ao acessar /log: {e}")
-            
-            # Tentar alternativa: /system/history
+            # Tentar endpoint /log primeiro
             try:
-                history_resource = api.get_resource('/system/history')
-                logs = history_resource.get()
-                # Converter formato do history para formato de log
-                if logs:
-                    logs = [
-                        {
-                            'time': log.get('time', ''),
-                            'topics': 'system',
-                            'message': log.get('message', ''),
-                            'id': log.get('id', '')
-                        }
-                        for log in logs
-                    ]
-            except Exception as e2:
-                print(f"Erro ao acessar /system/history: {e2}")
-        
-        connection.disconnect()
-        
+                log_resource = api.get_resource('/log')
+                logs = log_resource.get()
+            except Exception as e:
+                print(f"Erro ao acessar /log: {e}")
+            
+                # Tentar alternativa: /system/history
+                try:
+                    history_resource = api.get_resource('/system/history')
+                    logs = history_resource.get()
+                    # Converter formato do history para formato de log
+                    if logs:
+                        logs = [
+                            {
+                                'time': log.get('time', ''),
+                                'topics': 'system',
+                                'message': log.get('message', ''),
+                                'id': log.get('id', '')
+                            }
+                            for log in logs
+                        ]
+                except Exception as e2:
+                    print(f"Erro ao acessar /system/history: {e2}")
+
         # Processar logs para garantir formato consistente
         processed_logs = []
         for log in logs:
@@ -290,20 +279,9 @@ def monitorar_sessoes_mikrotik(host: Optional[str] = None, user: Optional[str] =
         return []
 
     try:
-        import routeros_api
-
-        connection = routeros_api.RouterOsApiPool(
-            host,
-            username=user,
-            password=secret,
-            port=8728,
-            plaintext_login=True
+        return routeros_pool.executar(
+            host, user, secret, lambda api: api.get_resource('/ppp/active').get()
         )
-        api = connection.get_api()
-
-        active_sessions = api.get_resource('/ppp/active').get()
-        connection.disconnect()
-        return active_sessions
 
     except Exception as e:
         print(f"Erro ao monitorar sessões: {e}")
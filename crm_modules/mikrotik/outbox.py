@@ -0,0 +1,74 @@
+"""Tratadores da outbox para o MikroTik.
+
+As credenciais do roteador são lidas na hora da execução (não ficam gravadas
+na outbox); a senha PPPoE do cliente sai do payload quando a mensagem conclui.
+"""
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from crm_core.outbox import registrar, tratador
+
+SINCRONIZAR_CLIENTE = "mikrotik.sincronizar_cliente"
+
+
+def destino_servidor(servidor_id: Optional[int]) -> str:
+    """Um destino por roteador: o limite de concorrência vale para cada um."""
+    return f"mikrotik:{servidor_id or 'padrao'}"
+
+
+def enfileirar_sincronizacao_cliente(session: Session, cliente_id: int, username: str, password: str,
+                                     profile: str, servidor_id: Optional[int] = None,
+                                     plano_id: Optional[int] = None):
+    return registrar(
+        session,
+        SINCRONIZAR_CLIENTE,
+        {
+            "cliente_id": cliente_id,
+            "username": username,
+            "password": password,
+            "profile": profile,
+            "servidor_id": servidor_id,
+            "plano_id": plano_id,
+        },
+        destino=destino_servidor(servidor_id),
+        chave=f"{SINCRONIZAR_CLIENTE}:{cliente_id}",
+    )
+
+
+@tratador(SINCRONIZAR_CLIENTE, sensiveis=("password",))
+def sincronizar_cliente(db: Session, payload: dict):
+    from crm_modules.mikrotik.integration import criar_profile_mikrotik, sincronizar_cliente_mikrotik
+    from crm_modules.planos.models import PlanoModel
+    from crm_modules.servidores.models import ServidorModel
+
+    host, user, secret = None, None, None
+    if payload.get("servidor_id"):
+        servidor = db.get(ServidorModel, payload["servidor_id"])
+        if servidor is None:
+            raise Exception(f"Servidor {payload['servidor_id']} não encontrado")
+        host, user, secret = servidor.ip, servidor.usuario, servidor.senha
+
+    # Garantir que o profile exista no MikroTik quando há plano vinculado
+    plano = db.get(PlanoModel, payload["plano_id"]) if payload.get("plano_id") else None
+    if plano and plano.nome:
+        success, msg = criar_profile_mikrotik(
+            name=payload["profile"],
+            download_limit=plano.velocidade_download,
+            upload_limit=plano.velocidade_upload,
+            host=host,
+            user=user,
+            secret=secret,
+        )
+        if not success:
+            print(f"Aviso: falha ao criar/atualizar profile no MikroTik: {msg}")
+
+    sincronizar_cliente_mikrotik(
+        payload["username"],
+        payload["password"],
+        payload["profile"],
+        host=host,
+        user=user,
+        secret=secret,
+        levantar_erros=True,
+    )
@@ -0,0 +1,315 @@
+"""Pool de conexões RouterOS compartilhado pelo processo.
+
+Cada roteador (``ServidorModel``, identificado por IP, porta e usuário) tem
+até ``mikrotik_pool_max_conexoes`` conexões já autenticadas. Quem precisa
+falar com o roteador pega uma conexão emprestada com ``conexao()`` e a
+devolve ao sair do bloco, evitando o handshake de login a cada comando.
+
+- Conexões que falham com erro de socket/protocolo são descartadas; a
+  próxima requisição abre uma nova (reconexão automática). ``executar()``
+  ainda repete a operação uma vez numa conexão nova.
+- Uma thread de manutenção envia um comando leve (``/system/identity``) às
+  conexões ociosas a cada ``mikrotik_pool_keepalive`` segundos e fecha as
+  que ficaram ociosas por mais de ``mikrotik_pool_idle_timeout``.
+- ``verificar()`` faz o teste de saúde de um roteador usando o pool.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from crm_core.config.settings import settings
+
+# Comando barato usado no keepalive e no teste de saúde
+COMANDO_PING = "/system/identity"
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão livre para o roteador dentro do tempo de espera."""
+
+
+def _erros_de_conexao() -> Tuple[type, ...]:
+    """Erros que indicam socket quebrado (a conexão não pode ser reutilizada)."""
+    erros = [OSError, EOFError]
+    try:
+        from routeros_api import exceptions
+
+        erros += [
+            exceptions.RouterOsApiConnectionError,
+            exceptions.FatalRouterOsApiError,
+            exceptions.RouterOsApiFatalCommunicationError,
+            exceptions.RouterOsApiParsingError,
+        ]
+    except ImportError:
+        pass
+    return tuple(erros)
+
+
+@dataclass
+class _Conexao:
+    pool_api: Any
+    api: Any
+    criada_em: float = field(default_factory=time.monotonic)
+    usada_em: float = field(default_factory=time.monotonic)
+
+    def fechar(self):
+        try:
+            self.pool_api.disconnect()
+        except Exception:
+            pass
+
+
+class _PoolRoteador:
+    """Conexões de um roteador; todo acesso ao estado é feito sob ``condicao``."""
+
+    def __init__(self, host: str, porta: int, usuario: str, senha: str):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.ociosas: Deque[_Conexao] = deque()
+        self.em_uso = 0
+        self.condicao = threading.Condition()
+        self.falhas_consecutivas = 0
+        self.ultimo_erro: Optional[str] = None
+
+
+class RouterOSPool:
+    def __init__(
+        self,
+        max_conexoes: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        keepalive: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+        socket_timeout: Optional[float] = None,
+        porta: Optional[int] = None,
+        conectar: Optional[Callable[..., Tuple[Any, Any]]] = None,
+    ):
+        self.max_conexoes = max_conexoes or settings.mikrotik_pool_max_conexoes
+        self.idle_timeout = idle_timeout or settings.mikrotik_pool_idle_timeout
+        self.keepalive = keepalive or settings.mikrotik_pool_keepalive
+        self.acquire_timeout = acquire_timeout or settings.mikrotik_pool_acquire_timeout
+        self.socket_timeout = socket_timeout or settings.mikrotik_socket_timeout
+        self.porta = porta or settings.mikrotik_api_port
+        self._conectar = conectar or self._conectar_routeros
+        self.erros_conexao = _erros_de_conexao()
+        self._roteadores: Dict[Tuple[str, int, str], _PoolRoteador] = {}
+        self._lock = threading.Lock()
+        self._manutencao: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Conexão
+    # ------------------------------------------------------------------
+    def _conectar_routeros(self, host: str, porta: int, usuario: str, senha: str):
+        import routeros_api
+
+        pool_api = routeros_api.RouterOsApiPool(
+            host,
+            username=usuario,
+            password=senha,
+            port=porta,
+            plaintext_login=True
+        )
+        pool_api.socket_timeout = self.socket_timeout
+        return pool_api, pool_api.get_api()
+
+    def _roteador(self, host: str, usuario: str, senha: str, porta: Optional[int]) -> _PoolRoteador:
+        chave = (host, porta or self.porta, usuario)
+        with self._lock:
+            roteador = self._roteadores.get(chave)
+            if roteador is None:
+                roteador = _PoolRoteador(host, chave[1], usuario, senha)
+                self._roteadores[chave] = roteador
+        if roteador.senha != senha:
+            # Senha alterada no cadastro do servidor: descarta as conexões antigas
+            with roteador.condicao:
+                roteador.senha = senha
+                antigas = list(roteador.ociosas)
+                roteador.ociosas.clear()
+            for conexao in antigas:
+                conexao.fechar()
+        self._iniciar_manutencao()
+        return roteador
+
+    def _emprestar(self, roteador: _PoolRoteador) -> _Conexao:
+        limite = time.monotonic() + self.acquire_timeout
+        expiradas = []
+        try:
+            with roteador.condicao:
+                while True:
+                    conexao = None
+                    while roteador.ociosas:
+                        candidata = roteador.ociosas.pop()
+                        if time.monotonic() - candidata.usada_em > self.idle_timeout:
+                            expiradas.append(candidata)
+                            continue
+                        conexao = candidata
+                        break
+                    if conexao is not None or roteador.em_uso < self.max_conexoes:
+                        roteador.em_uso += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise PoolEsgotadoError(
+                            f"Sem conexões livres para {roteador.host} ({self.max_conexoes} em uso)"
+                        )
+                    roteador.condicao.wait(restante)
+        finally:
+            for antiga in expiradas:
+                antiga.fechar()
+        if conexao is not None:
+            return conexao
+
+        try:
+            pool_api, api = self._conectar(roteador.host, roteador.porta, roteador.usuario, roteador.senha)
+        except Exception as e:
+            with roteador.condicao:
+                roteador.em_uso -= 1
+                roteador.falhas_consecutivas += 1
+                roteador.ultimo_erro = str(e)
+                roteador.condicao.notify()
+            raise
+        with roteador.condicao:
+            roteador.falhas_consecutivas = 0
+            roteador.ultimo_erro = None
+        return _Conexao(pool_api, api)
+
+    def _devolver(self, roteador: _PoolRoteador, conexao: _Conexao, quebrada: bool):
+        with roteador.condicao:
+            roteador.em_uso -= 1
+            if not quebrada:
+                conexao.usada_em = time.monotonic()
+                roteador.ociosas.append(conexao)
+            roteador.condicao.notify()
+        if quebrada:
+            conexao.fechar()
+
+    @contextmanager
+    def conexao(self, host: str, usuario: str, senha: str, porta: Optional[int] = None):
+        """Empresta uma API autenticada do roteador; devolve ao pool ao sair.
+
+        Se o bloco falhar com erro de conexão, a conexão é descartada em vez
+        de voltar ao pool.
+        """
+        roteador = self._roteador(host, usuario, senha, porta)
+        conexao = self._emprestar(roteador)
+        quebrada = False
+        try:
+            yield conexao.api
+        except self.erros_conexao as e:
+            quebrada = True
+            with roteador.condicao:
+                roteador.ultimo_erro = str(e)
+            raise
+        finally:
+            self._devolver(roteador, conexao, quebrada)
+
+    def conexao_servidor(self, servidor):
+        """``conexao()`` a partir de um ``ServidorModel`` (ou domínio equivalente)."""
+        return self.conexao(servidor.ip, servidor.usuario, servidor.senha)
+
+    def executar(self, host: str, usuario: str, senha: str, operacao: Callable[[Any], Any],
+                 tentativas: int = 2, porta: Optional[int] = None):
+        """Executa ``operacao(api)``, repetindo numa conexão nova se o socket cair."""
+        for tentativa in range(tentativas):
+            try:
+                with self.conexao(host, usuario, senha, porta) as api:
+                    return operacao(api)
+            except self.erros_conexao:
+                if tentativa == tentativas - 1:
+                    raise
+
+    # ------------------------------------------------------------------
+    # Saúde e manutenção
+    # ------------------------------------------------------------------
+    def verificar(self, host: str, usuario: str, senha: str, porta: Optional[int] = None) -> bool:
+        """Teste de saúde: executa um comando leve numa conexão do pool."""
+        try:
+            self.executar(host, usuario, senha, lambda api: api.get_resource(COMANDO_PING).get(), porta=porta)
+            return True
+        except Exception:
+            return False
+
+    def _ping(self, conexao: _Conexao) -> bool:
+        try:
+            conexao.api.get_resource(COMANDO_PING).get()
+            return True
+        except Exception:
+            return False
+
+    def manter(self):
+        """Uma rodada de manutenção: keepalive das ociosas e expulsão das expiradas."""
+        agora = time.monotonic()
+        with self._lock:
+            roteadores = list(self._roteadores.values())
+        for roteador in roteadores:
+            fechar, testar = [], []
+            with roteador.condicao:
+                restantes = deque()
+                for conexao in roteador.ociosas:
+                    ociosa = agora - conexao.usada_em
+                    if ociosa > self.idle_timeout:
+                        fechar.append(conexao)
+                    elif ociosa >= self.keepalive:
+                        testar.append(conexao)
+                    else:
+                        restantes.append(conexao)
+                roteador.ociosas = restantes
+                # Conexões em teste contam como emprestadas
+                roteador.em_uso += len(testar)
+            for conexao in fechar:
+                conexao.fechar()
+            for conexao in testar:
+                self._devolver(roteador, conexao, quebrada=not self._ping(conexao))
+
+    def _loop_manutencao(self):
+        while not self._parar.wait(max(1.0, self.keepalive / 2)):
+            try:
+                self.manter()
+            except Exception as e:
+                print(f"Aviso: falha na manutenção do pool RouterOS: {e}")
+
+    def _iniciar_manutencao(self):
+        if self._manutencao is not None and self._manutencao.is_alive():
+            return
+        with self._lock:
+            if self._manutencao is not None and self._manutencao.is_alive():
+                return
+            self._parar.clear()
+            self._manutencao = threading.Thread(
+                target=self._loop_manutencao, name="routeros-pool", daemon=True
+            )
+            self._manutencao.start()
+
+    def estatisticas(self) -> Dict[str, dict]:
+        with self._lock:
+            roteadores = list(self._roteadores.values())
+        resultado = {}
+        for roteador in roteadores:
+            with roteador.condicao:
+                resultado[f"{roteador.usuario}@{roteador.host}:{roteador.porta}"] = {
+                    "ociosas": len(roteador.ociosas),
+                    "em_uso": roteador.em_uso,
+                    "falhas_consecutivas": roteador.falhas_consecutivas,
+                    "ultimo_erro": roteador.ultimo_erro,
+                }
+        return resultado
+
+    def fechar_todas(self):
+        """Fecha todas as conexões ociosas e para a manutenção."""
+        self._parar.set()
+        with self._lock:
+            roteadores = list(self._roteadores.values())
+            self._roteadores.clear()
+        for roteador in roteadores:
+            with roteador.condicao:
+                ociosas = list(roteador.ociosas)
+                roteador.ociosas.clear()
+            for conexao in ociosas:
+                conexao.fechar()
+
+
+routeros_pool = RouterOSPool()
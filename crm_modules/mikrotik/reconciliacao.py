@@ -0,0 +1,263 @@
+"""Reconciliação em lote dos secrets PPPoE com o cadastro de clientes.
+
+Em vez de consultar e gravar cliente a cliente, cada roteador tem sua
+tabela ``/ppp/secret`` lida uma única vez. O estado desejado (montado a
+partir de ``ClienteModel``) é comparado com ela e só as diferenças são
+aplicadas, com os comandos enviados em lotes sem esperar a resposta de cada
+um (``*_async``). Os roteadores são processados em paralelo, cada um numa
+conexão do ``routeros_pool``.
+
+Diferenças detectadas por secret:
+
+- ``criar``: cliente com login que não existe no roteador (só quando a
+  senha é conhecida; o cadastro não guarda a senha PPPoE, então sem ela o
+  login é apenas reportado em ``sem_senha``);
+- ``atualizar``: profile, bloqueio (``disabled``) ou senha divergentes;
+  o bloqueio só é comparado com ``mikrotik_reconciliar_bloqueio``, porque
+  os bloqueios feitos em tempo real (``/mikrotik/clients/block``) ficam
+  apenas no roteador e seriam desfeitos;
+- ``extras``: secrets do roteador sem cliente correspondente (removidos só
+  com ``remover_extras=True``).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from crm_core.config.settings import settings
+from crm_modules.mikrotik.pool import RouterOSPool, routeros_pool
+
+CAMINHO_SECRETS = "/ppp/secret"
+
+
+@dataclass
+class SecretDesejado:
+    name: str
+    profile: str = "default"
+    # None: o estado de bloqueio do roteador é mantido como está
+    disabled: Optional[bool] = False
+    password: Optional[str] = None
+    cliente_id: Optional[int] = None
+    # Clientes inativos só têm o secret desabilitado, nunca criado
+    criar_se_ausente: bool = True
+
+
+@dataclass
+class Alteracao:
+    acao: str  # "criar", "atualizar" ou "remover"
+    name: str
+    campos: Dict[str, str] = field(default_factory=dict)
+    id: Optional[str] = None
+    cliente_id: Optional[int] = None
+
+
+@dataclass
+class Diferencas:
+    alteracoes: List[Alteracao] = field(default_factory=list)
+    extras: List[str] = field(default_factory=list)
+    sem_senha: List[str] = field(default_factory=list)
+    em_dia: int = 0
+
+
+def _bool_routeros(valor) -> bool:
+    return str(valor).lower() in ("true", "yes")
+
+
+def calcular_diferencas(
+    desejados: Dict[str, SecretDesejado],
+    atuais: Iterable[dict],
+    remover_extras: bool = False,
+) -> Diferencas:
+    """Compara o estado desejado com a tabela ``/ppp/secret`` lida do roteador."""
+    diferencas = Diferencas()
+    por_nome = {}
+    for secret in atuais:
+        if secret.get("name"):
+            por_nome[secret["name"]] = secret
+
+    for nome, desejado in desejados.items():
+        atual = por_nome.get(nome)
+        if atual is None:
+            if not desejado.criar_se_ausente:
+                continue
+            if not desejado.password:
+                diferencas.sem_senha.append(nome)
+                continue
+            campos = {"password": desejado.password, "profile": desejado.profile, "service": "pppoe"}
+            if desejado.disabled is not None:
+                campos["disabled"] = "yes" if desejado.disabled else "no"
+            diferencas.alteracoes.append(Alteracao(
+                acao="criar", name=nome, campos=campos, cliente_id=desejado.cliente_id
+            ))
+            continue
+
+        campos = {}
+        if (atual.get("profile") or "default") != desejado.profile:
+            campos["profile"] = desejado.profile
+        if desejado.disabled is not None and _bool_routeros(atual.get("disabled")) != desejado.disabled:
+            campos["disabled"] = "yes" if desejado.disabled else "no"
+        # A senha só é lida pela API com permissão de "sensitive"; sem ela
+        # não há como comparar, e nesse caso não é regravada
+        if desejado.password and "password" in atual and atual["password"] != desejado.password:
+            campos["password"] = desejado.password
+        if campos:
+            diferencas.alteracoes.append(Alteracao(
+                acao="atualizar", name=nome, campos=campos, id=atual.get("id"), cliente_id=desejado.cliente_id
+            ))
+        else:
+            diferencas.em_dia += 1
+
+    for nome, atual in por_nome.items():
+        if nome in desejados:
+            continue
+        diferencas.extras.append(nome)
+        if remover_extras:
+            diferencas.alteracoes.append(Alteracao(acao="remover", name=nome, id=atual.get("id")))
+    return diferencas
+
+
+def carregar_estado_desejado(
+    session: Session,
+    servidor_padrao_id: Optional[int],
+    senhas: Optional[Dict[str, str]] = None,
+    reconciliar_bloqueio: Optional[bool] = None,
+) -> Dict[int, Dict[str, SecretDesejado]]:
+    """Secrets desejados por servidor a partir dos clientes com login PPPoE.
+
+    Clientes sem ``servidor_id`` ficam no servidor padrão (o mesmo de
+    ``get_mikrotik_server``). ``senhas`` (login -> senha) permite criar os
+    secrets ausentes. Sem ``reconciliar_bloqueio`` (padrão da configuração
+    ``mikrotik_reconciliar_bloqueio``) o ``disabled`` fica como está no roteador.
+    """
+    from crm_modules.clientes.models import ClienteModel
+    from crm_modules.clientes.service import _normalize_profile
+    from crm_modules.planos.models import PlanoModel
+
+    senhas = senhas or {}
+    if reconciliar_bloqueio is None:
+        reconciliar_bloqueio = settings.mikrotik_reconciliar_bloqueio
+    planos = dict(session.query(PlanoModel.id, PlanoModel.nome).all())
+    linhas = session.query(
+        ClienteModel.id, ClienteModel.username, ClienteModel.profile, ClienteModel.plano_id,
+        ClienteModel.servidor_id, ClienteModel.ativo, ClienteModel.status_cliente, ClienteModel.tipo_servico,
+    ).filter(
+        ClienteModel.username != None,
+        ClienteModel.username != "",
+    ).order_by(ClienteModel.id)
+
+    desejados: Dict[int, Dict[str, SecretDesejado]] = {}
+    for cliente_id, username, profile, plano_id, servidor_id, ativo, status_cliente, tipo_servico in linhas:
+        if tipo_servico and tipo_servico.lower() != "pppoe":
+            continue
+        servidor = servidor_id or servidor_padrao_id
+        if servidor is None:
+            continue
+        if not profile:
+            profile = _normalize_profile(planos.get(plano_id)) if plano_id in planos else "default"
+        desejados.setdefault(servidor, {})[username] = SecretDesejado(
+            name=username,
+            profile=profile,
+            disabled=((not ativo) or status_cliente == "bloqueio") if reconciliar_bloqueio else None,
+            password=senhas.get(username),
+            cliente_id=cliente_id,
+            criar_se_ausente=bool(ativo),
+        )
+    return desejados
+
+
+class ReconciliadorPPPoE:
+    def __init__(self, pool: Optional[RouterOSPool] = None, max_paralelo: int = 4, lote: int = 50):
+        self.pool = pool or routeros_pool
+        self.max_paralelo = max_paralelo
+        self.lote = lote
+
+    def reconciliar(
+        self,
+        servidores: List,
+        desejados: Dict[int, Dict[str, SecretDesejado]],
+        dry_run: bool = False,
+        remover_extras: bool = False,
+    ) -> Dict:
+        """Reconcilia vários roteadores em paralelo; retorna o resumo por servidor."""
+        if not servidores:
+            return {"dry_run": dry_run, "servidores": [], "total_alteracoes": 0, "total_erros": 0}
+        trabalhadores = max(1, min(self.max_paralelo, len(servidores)))
+        with ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="reconciliacao-pppoe") as executor:
+            resultados = list(executor.map(
+                lambda servidor: self.reconciliar_servidor(
+                    servidor, desejados.get(servidor.id, {}), dry_run, remover_extras
+                ),
+                servidores,
+            ))
+        return {
+            "dry_run": dry_run,
+            "servidores": resultados,
+            "total_alteracoes": sum(len(r["alteracoes"]) for r in resultados),
+            "total_erros": sum(len(r["erros"]) + (1 if r["erro"] else 0) for r in resultados),
+        }
+
+    def reconciliar_servidor(
+        self,
+        servidor,
+        desejados: Dict[str, SecretDesejado],
+        dry_run: bool = False,
+        remover_extras: bool = False,
+    ) -> Dict:
+        resultado = {
+            "servidor_id": servidor.id,
+            "servidor_nome": servidor.nome,
+            "alteracoes": [],
+            "extras": [],
+            "sem_senha": [],
+            "em_dia": 0,
+            "aplicadas": 0,
+            "erros": [],
+            "erro": None,
+        }
+        try:
+            with self.pool.conexao_servidor(servidor) as api:
+                recurso = api.get_resource(CAMINHO_SECRETS)
+                diferencas = calcular_diferencas(desejados, recurso.get(), remover_extras)
+                resultado.update(
+                    alteracoes=[self._descrever(a) for a in diferencas.alteracoes],
+                    extras=diferencas.extras,
+                    sem_senha=diferencas.sem_senha,
+                    em_dia=diferencas.em_dia,
+                )
+                if not dry_run and diferencas.alteracoes:
+                    resultado["erros"] = self._aplicar(recurso, diferencas.alteracoes)
+                    resultado["aplicadas"] = len(diferencas.alteracoes) - len(resultado["erros"])
+        except Exception as e:
+            resultado["erro"] = f"Erro ao reconciliar {servidor.nome} ({servidor.ip}): {e}"
+            print(resultado["erro"])
+        return resultado
+
+    def _aplicar(self, recurso, alteracoes: List[Alteracao]) -> List[Dict]:
+        """Envia os comandos em lotes e só então lê as respostas de cada lote."""
+        erros = []
+        for inicio in range(0, len(alteracoes), self.lote):
+            pendentes = []
+            for alteracao in alteracoes[inicio:inicio + self.lote]:
+                if alteracao.acao == "criar":
+                    promessa = recurso.add_async(name=alteracao.name, **alteracao.campos)
+                elif alteracao.acao == "atualizar":
+                    promessa = recurso.set_async(id=alteracao.id, **alteracao.campos)
+                else:
+                    promessa = recurso.remove_async(id=alteracao.id)
+                pendentes.append((alteracao, promessa))
+            for alteracao, promessa in pendentes:
+                try:
+                    promessa.get()
+                except self.pool.erros_conexao:
+                    raise
+                except Exception as e:
+                    erros.append({"acao": alteracao.acao, "name": alteracao.name, "erro": str(e)})
+        return erros
+
+    @staticmethod
+    def _descrever(alteracao: Alteracao) -> Dict:
+        descricao = asdict(alteracao)
+        if "password" in descricao["campos"]:
+            descricao["campos"]["password"] = "***"
+        return descricao
@@ -5,13 +5,16 @@ Serviços de integração com MikroTik para operações em tempo real
 
 from typing import Optional, List, Dict, Any
 from crm_core.config.settings import settings
+from crm_modules.mikrotik.pool import routeros_pool
 from crm_modules.mikrotik.integration import (
     get_mikrotik_server,
+    listar_servidores_mikrotik,
     criar_profile_mikrotik,
     sincronizar_cliente_mikrotik,
-    coletar_logs_mikrotik,
-    monitorar_sessoes_mikrotik
+    coletar_logs_mikrotik
 )
+from crm_modules.mikrotik.sessoes import indice_sessoes
+from crm_modules.servidores.fanout import consultar_servidores, mesclar
 from crm_modules.clientes.models import ClienteModel
 from crm_modules.contratos.models import ContratoModel
 
@@ -37,31 +40,19 @@ class MikrotikService:
             }
         
         try:
-            import routeros_api
+            with routeros_pool.conexao_servidor(self.server) as api:
+                # Obter informações do sistema
+                system_resource = api.get_resource('/system/resource')
+                system_info = system_resource.get()[0]
             
-            connection = routeros_api.RouterOsApiPool(
-                self.server.ip,
-                username=self.server.usuario,
-                password=self.server.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
-            # Obter informações do sistema
-            system_resource = api.get_resource('/system/resource')
-            system_info = system_resource.get()[0]
-            
-            # Obter pools de endereços
-            pools = api.get_resource('/ip/pool').get()
+                # Obter pools de endereços
+                pools = api.get_resource('/ip/pool').get()
             
-            # Obter profiles PPPoE
-            profiles = api.get_resource('/ppp/profile').get()
+                # Obter profiles PPPoE
+                profiles = api.get_resource('/ppp/profile').get()
             
-            # Obter secrets PPPoE
-            secrets = api.get_resource('/ppp/secret').get()
-            
-            connection.disconnect()
+                # Obter secrets PPPoE
+                secrets = api.get_resource('/ppp/secret').get()
             
             return {
                 'status': 'success',
@@ -139,44 +130,40 @@ class MikrotikService:
                 'message': f'Erro ao sincronizar cliente: {str(e)}'
             }
 
-    def sincronizar_todos_clientes(self) -> Dict[str, Any]:
-        """Sincroniza todos os clientes ativos com o MikroTik"""
-        from crm_modules.clientes.repository import ClienteRepository
-        from crm_modules.contratos.repository import ContratoRepository
+    def sincronizar_todos_clientes(self, dry_run: bool = False, remover_extras: bool = False,
+                                   todos_servidores: bool = False,
+                                   senhas: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Reconcilia os secrets PPPoE do(s) roteador(es) com o cadastro de clientes
+        
+        Lê /ppp/secret uma vez por roteador e aplica só as diferenças (ver
+        ``crm_modules.mikrotik.reconciliacao``). Com ``dry_run`` apenas
+        retorna o que seria alterado.
+        """
+        from crm_modules.mikrotik.reconciliacao import ReconciliadorPPPoE, carregar_estado_desejado
         from crm_core.db.base import get_db_session
         
         if not self.server:
             return {'status': 'error', 'message': 'Nenhum servidor MikroTik configurado'}
-            
+        
+        servidores = listar_servidores_mikrotik() if todos_servidores else [self.server]
+        padrao = get_mikrotik_server()
+        
         db = get_db_session()
         try:
-            cliente_repo = ClienteRepository(db)
-            contrato_repo = ContratoRepository(db)
-            
-            clientes = cliente_repo.get_active_clients()
-            sucesso = 0
-            falha = 0
-            
-            for cliente in clientes:
-                # Buscar contrato ativo do cliente
-                contratos = contrato_repo.get_by_cliente_id(cliente.id)
-                contrato_ativo = next((c for c in contratos if c.status == 'assinado'), None)
-                
-                if contrato_ativo:
-                    try:
-                        self.sincronizar_cliente_real_time(cliente, contrato_ativo)
-                        sucesso += 1
-                    except:
-                        falha += 1
-                else:
-                    falha += 1
-                    
-            return {
-                'status': 'success',
-                'message': f'Sincronização concluída. Sucesso: {sucesso}, Falha: {falha}'
-            }
+            desejados = carregar_estado_desejado(db, padrao.id if padrao else None, senhas)
         finally:
             db.close()
+        
+        resumo = ReconciliadorPPPoE().reconciliar(
+            servidores, desejados, dry_run=dry_run, remover_extras=remover_extras
+        )
+        acao = 'Alterações previstas' if dry_run else 'Alterações aplicadas'
+        resumo['status'] = 'success' if resumo['total_erros'] == 0 else 'partial'
+        resumo['message'] = (
+            f"Sincronização concluída. {acao}: {resumo['total_alteracoes']}, "
+            f"erros: {resumo['total_erros']}"
+        )
+        return resumo
     
     def bloquear_cliente_real_time(self, username: str) -> Dict[str, Any]:
         """Bloqueia um cliente no MikroTik em tempo real"""
@@ -184,35 +171,23 @@ class MikrotikService:
             if not self.server:
                 return {'status': 'error', 'message': 'Nenhum servidor MikroTik configurado'}
             
-            import routeros_api
-            
-            connection = routeros_api.RouterOsApiPool(
-                self.server.ip,
-                username=self.server.usuario,
-                password=self.server.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
-            # Verificar se o secret existe
-            ppp_secrets = api.get_resource('/ppp/secret')
-            existing = ppp_secrets.get(name=username)
-            
-            if existing:
-                # Bloquear o secret
-                ppp_secrets.set(id=existing[0]['id'], disabled='yes')
-                connection.disconnect()
-                return {
-                    'status': 'success',
-                    'message': f'Cliente {username} bloqueado com sucesso'
-                }
-            else:
-                connection.disconnect()
-                return {
-                    'status': 'error',
-                    'message': f'Cliente {username} não encontrado no MikroTik'
-                }
+            with routeros_pool.conexao_servidor(self.server) as api:
+                # Verificar se o secret existe
+                ppp_secrets = api.get_resource('/ppp/secret')
+                existing = ppp_secrets.get(name=username)
+            
+                if existing:
+                    # Bloquear o secret
+                    ppp_secrets.set(id=existing[0]['id'], disabled='yes')
+                    return {
+                        'status': 'success',
+                        'message': f'Cliente {username} bloqueado com sucesso'
+                    }
+                else:
+                    return {
+                        'status': 'error',
+                        'message': f'Cliente {username} não encontrado no MikroTik'
+                    }
                 
         except Exception as e:
             return {
@@ -226,35 +201,23 @@ class MikrotikService:
             if not self.server:
                 return {'status': 'error', 'message': 'Nenhum servidor MikroTik configurado'}
             
-            import routeros_api
-            
-            connection = routeros_api.RouterOsApiPool(
-                self.server.ip,
-                username=self.server.usuario,
-                password=self.server.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
-            # Verificar se o secret existe
-            ppp_secrets = api.get_resource('/ppp/secret')
-            existing = ppp_secrets.get(name=username)
-            
-            if existing:
-                # Desbloquear o secret
-                ppp_secrets.set(id=existing[0]['id'], disabled='no')
-                connection.disconnect()
-                return {
-                    'status': 'success',
-                    'message': f'Cliente {username} desbloqueado com sucesso'
-                }
-            else:
-                connection.disconnect()
-                return {
-                    'status': 'error',
-                    'message': f'Cliente {username} não encontrado no MikroTik'
-                }
+            with routeros_pool.conexao_servidor(self.server) as api:
+                # Verificar se o secret existe
+                ppp_secrets = api.get_resource('/ppp/secret')
+                existing = ppp_secrets.get(name=username)
+            
+                if existing:
+                    # Desbloquear o secret
+                    ppp_secrets.set(id=existing[0]['id'], disabled='no')
+                    return {
+                        'status': 'success',
+                        'message': f'Cliente {username} desbloqueado com sucesso'
+                    }
+                else:
+                    return {
+                        'status': 'error',
+                        'message': f'Cliente {username} não encontrado no MikroTik'
+                    }
                 
         except Exception as e:
             return {
@@ -262,19 +225,30 @@ class MikrotikService:
                 'message': f'Erro ao desbloquear cliente: {str(e)}'
             }
     
-    def obter_sessoes_ativas(self) -> Dict[str, Any]:
-        """Obtém as sessões PPPoE ativas em tempo real"""
+    def obter_sessoes_ativas(self, atualizar: bool = False, todos_servidores: bool = False) -> Dict[str, Any]:
+        """Obtém as sessões PPPoE ativas a partir do índice em memória
+        
+        Args:
+            atualizar: relê ``/ppp/active`` dos roteadores antes de responder
+            todos_servidores: junta as sessões de todos os roteadores ativos
+        """
         try:
-            sessions = monitorar_sessoes_mikrotik(
-                host=self.server.ip if self.server else None,
-                user=self.server.usuario if self.server else None,
-                secret=self.server.senha if self.server else None
-            )
+            servidor_id = self.server.id if self.server and not todos_servidores else None
+            sessions = indice_sessoes.sessoes(servidor_id=servidor_id, atualizar=atualizar)
+            estado = indice_sessoes.estado()
+            erros = [
+                {'servidor_id': s['servidor_id'], 'servidor_nome': s['servidor_nome'], 'erro': s['erro']}
+                for s in estado['servidores']
+                if s['erro'] and (servidor_id is None or s['servidor_id'] == servidor_id)
+            ]
             
             return {
                 'status': 'success',
                 'sessions': sessions,
-                'total': len(sessions)
+                'total': len(sessions),
+                'erros': erros,
+                'atualizado_em': estado['atualizado_em'],
+                'idade_segundos': estado['idade_segundos']
             }
             
         except Exception as e:
@@ -283,14 +257,33 @@ class MikrotikService:
                 'message': f'Erro ao obter sessões: {str(e)}'
             }
     
-    def obter_logs_recentes(self, limit: int = 50) -> Dict[str, Any]:
-        """Obtém logs recentes do MikroTik"""
+    def obter_logs_recentes(self, limit: int = 50, todos_servidores: bool = False) -> Dict[str, Any]:
+        """Obtém logs recentes do MikroTik
+        
+        Com ``todos_servidores`` os logs de todos os roteadores ativos são
+        coletados em paralelo; roteadores que falharem vão para ``erros``.
+        """
         try:
-            logs = coletar_logs_mikrotik(
-                host=self.server.ip if self.server else None,
-                user=self.server.usuario if self.server else None,
-                secret=self.server.senha if self.server else None
-            )
+            servidores = listar_servidores_mikrotik() if todos_servidores else []
+            erros = []
+            if servidores:
+                resultado = mesclar(consultar_servidores(
+                    servidores,
+                    lambda s: coletar_logs_mikrotik(host=s.ip, user=s.usuario, secret=s.senha)
+                ))
+                logs, erros = resultado['itens'], resultado['erros']
+                if len(erros) == len(servidores):
+                    return {
+                        'status': 'error',
+                        'message': '; '.join(f"{e['servidor_nome']}: {e['erro']}" for e in erros),
+                        'erros': erros
+                    }
+            else:
+                logs = coletar_logs_mikrotik(
+                    host=self.server.ip if self.server else None,
+                    user=self.server.usuario if self.server else None,
+                    secret=self.server.senha if self.server else None
+                )
             
             # Tentar ordenar por time, mas tratar erros graciosamente
             try:
@@ -302,7 +295,8 @@ class MikrotikService:
             return {
                 'status': 'success',
                 'logs': recent_logs,
-                'total': len(recent_logs)
+                'total': len(recent_logs),
+                'erros': erros
             }
             
         except Exception as e:
@@ -317,40 +311,27 @@ class MikrotikService:
             if not self.server:
                 return {'status': 'error', 'message': 'Nenhum servidor MikroTik configurado'}
             
-            import routeros_api
-            
-            connection = routeros_api.RouterOsApiPool(
-                self.server.ip,
-                username=self.server.usuario,
-                password=self.server.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
+            with routeros_pool.conexao_servidor(self.server) as api:
+                # Verificar se o secret existe
+                ppp_secrets = api.get_resource('/ppp/secret')
+                existing = ppp_secrets.get(name=username)
             
-            # Verificar se o secret existe
-            ppp_secrets = api.get_resource('/ppp/secret')
-            existing = ppp_secrets.get(name=username)
-            
-            if existing:
-                # Atualizar as credenciais
-                update_data = {'password': new_password}
-                if new_profile:
-                    update_data['profile'] = new_profile
-                
-                ppp_secrets.set(id=existing[0]['id'], **update_data)
-                connection.disconnect()
+                if existing:
+                    # Atualizar as credenciais
+                    update_data = {'password': new_password}
+                    if new_profile:
+                        update_data['profile'] = new_profile
                 
-                return {
-                    'status': 'success',
-                    'message': f'Credenciais do cliente {username} atualizadas com sucesso'
-                }
-            else:
-                connection.disconnect()
-                return {
-                    'status': 'error',
-                    'message': f'Cliente {username} não encontrado no MikroTik'
-                }
+                    ppp_secrets.set(id=existing[0]['id'], **update_data)
+                    return {
+                        'status': 'success',
+                        'message': f'Credenciais do cliente {username} atualizadas com sucesso'
+                    }
+                else:
+                    return {
+                        'status': 'error',
+                        'message': f'Cliente {username} não encontrado no MikroTik'
+                    }
                 
         except Exception as e:
             return {
@@ -407,27 +388,16 @@ class MikrotikService:
             if not self.server:
                 return {'status': 'error', 'message': 'Nenhum servidor MikroTik configurado'}
             
-            import routeros_api
-            
-            connection = routeros_api.RouterOsApiPool(
-                self.server.ip,
-                username=self.server.usuario,
-                password=self.server.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
-            # Remover a sessão ativa (geralmente em /ppp/active)
-            ppp_active = api.get_resource('/ppp/active')
-            ppp_active.remove(id=session_id)
-            
-            connection.disconnect()
-            
-            return {
-                'status': 'success',
-                'message': f'Sessão {session_id} desconectada com sucesso'
-            }
+            with routeros_pool.conexao_servidor(self.server) as api:
+                # Remover a sessão ativa (geralmente em /ppp/active)
+                ppp_active = api.get_resource('/ppp/active')
+                ppp_active.remove(id=session_id)
+                indice_sessoes.remover_sessao(self.server.id, session_id)
+
+                return {
+                    'status': 'success',
+                    'message': f'Sessão {session_id} desconectada com sucesso'
+                }
                 
         except Exception as e:
             return {
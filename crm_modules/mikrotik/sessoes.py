@@ -0,0 +1,284 @@
+"""Índice em memória das sessões PPPoE ativas (``/ppp/active``).
+
+Em vez de baixar a tabela ``/ppp/active`` inteira a cada página e procurar
+o login nela, uma thread lê a tabela de todos os roteadores (em paralelo)
+a cada ``mikrotik_sessoes_intervalo`` segundos e monta um dicionário
+``username -> sessão``. Detalhe do cliente, tela de sessões e dashboards
+consultam esse índice em O(1).
+
+- Cada roteador tem seu próprio snapshot com o horário da última leitura
+  bem-sucedida; se a leitura falha, o snapshot anterior é mantido e o erro
+  fica em ``estado()``.
+- Se a thread parar (ou ainda não tiver rodado), a leitura seguinte que
+  encontrar o índice vencido (``mikrotik_sessoes_max_idade``) atualiza na
+  hora. ``atualizar=True`` força a releitura.
+- Com ``mikrotik_sessoes_redis`` o índice também é gravado no Redis, e um
+  processo que acabou de subir parte da cópia de lá se ela estiver fresca.
+- Quando logins conectam ou desconectam entre duas leituras, publica um
+  ``SessoesPPPoEChangedEvent`` no barramento de eventos do processo.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from crm_core.config.settings import settings
+from crm_core.events.bus import event_bus as event_bus_padrao
+from crm_core.events.events import SessoesPPPoEChangedEvent
+from crm_modules.mikrotik.pool import RouterOSPool, routeros_pool
+from crm_modules.servidores.fanout import ResultadoServidor, consultar_servidores
+
+CAMINHO_ATIVOS = "/ppp/active"
+CHAVE_REDIS = "mikrotik:sessoes_ativas"
+
+
+@dataclass
+class _Snapshot:
+    servidor_id: Optional[int]
+    servidor_nome: str
+    sessoes: Dict[str, dict] = field(default_factory=dict)
+    atualizado_em: Optional[float] = None
+    erro: Optional[str] = None
+
+
+def _iso(instante: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(instante).isoformat() if instante else None
+
+
+def _servidores_configurados() -> List:
+    """Servidores MikroTik ativos; sem nenhum, usa o roteador das settings."""
+    from crm_modules.mikrotik.integration import listar_servidores_mikrotik
+
+    servidores = listar_servidores_mikrotik()
+    if not servidores and all([settings.mikrotik_host, settings.mikrotik_user, settings.mikrotik_password]):
+        servidores = [SimpleNamespace(
+            id=None, nome="MikroTik", ip=settings.mikrotik_host,
+            usuario=settings.mikrotik_user, senha=settings.mikrotik_password,
+        )]
+    return servidores
+
+
+class IndiceSessoesPPPoE:
+    def __init__(
+        self,
+        pool: Optional[RouterOSPool] = None,
+        listar_servidores: Optional[Callable[[], List]] = None,
+        intervalo: Optional[int] = None,
+        max_idade: Optional[int] = None,
+        redis_client=None,
+        event_bus=None,
+    ):
+        self.pool = pool or routeros_pool
+        self.listar_servidores = listar_servidores or _servidores_configurados
+        self.intervalo = intervalo or settings.mikrotik_sessoes_intervalo
+        self.max_idade = max_idade or settings.mikrotik_sessoes_max_idade
+        self._redis = redis_client
+        self.event_bus = event_bus or event_bus_padrao
+        self._snapshots: Dict[Optional[int], _Snapshot] = {}
+        self._por_usuario: Dict[str, dict] = {}
+        self._ultima_tentativa = 0.0
+        self._lock = threading.Lock()
+        # Uma releitura por vez; quem chega durante uma espera por ela
+        self._atualizando = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+
+    @property
+    def redis(self):
+        if self._redis is None and settings.mikrotik_sessoes_redis:
+            from crm_core.cache.redis import redis_cache
+            self._redis = redis_cache
+        return self._redis
+
+    # Leitura
+
+    def obter(self, username: str, atualizar: bool = False) -> Optional[dict]:
+        """Sessão ativa do login, ou None se ele não está conectado."""
+        self._garantir_atualizado(atualizar)
+        return self._por_usuario.get(username)
+
+    def sessoes(self, servidor_id: Optional[int] = None, atualizar: bool = False) -> List[dict]:
+        self._garantir_atualizado(atualizar)
+        with self._lock:
+            if servidor_id is None:
+                return list(self._por_usuario.values())
+            snapshot = self._snapshots.get(servidor_id)
+            return list(snapshot.sessoes.values()) if snapshot else []
+
+    def estado(self) -> Dict:
+        """Frescor do índice: horário da leitura mais antiga e situação por roteador."""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+            total = len(self._por_usuario)
+        leituras = [s.atualizado_em for s in snapshots]
+        mais_antiga = None if not leituras or None in leituras else min(leituras)
+        return {
+            "atualizado_em": _iso(mais_antiga),
+            "idade_segundos": round(time.time() - mais_antiga, 1) if mais_antiga else None,
+            "total": total,
+            "servidores": [
+                {
+                    "servidor_id": s.servidor_id,
+                    "servidor_nome": s.servidor_nome,
+                    "sessoes": len(s.sessoes),
+                    "atualizado_em": _iso(s.atualizado_em),
+                    "erro": s.erro,
+                }
+                for s in snapshots
+            ],
+        }
+
+    def _garantir_atualizado(self, forcar: bool):
+        self.iniciar()
+        if forcar:
+            self.atualizar()
+        elif time.time() - self._ultima_tentativa > self.max_idade:
+            if not self._por_usuario and not self._snapshots and self._carregar_redis():
+                return
+            self.atualizar(apenas_se_vencido=True)
+
+    # Atualização
+
+    def atualizar(self, servidor_id: Optional[int] = None, apenas_se_vencido: bool = False) -> Dict:
+        """Relê ``/ppp/active`` (de um roteador ou de todos) e reconstrói o índice."""
+        with self._atualizando:
+            if apenas_se_vencido and time.time() - self._ultima_tentativa <= self.max_idade:
+                return self.estado()
+            servidores = self.listar_servidores()
+            if servidor_id is not None:
+                servidores = [s for s in servidores if s.id == servidor_id]
+            resultados = consultar_servidores(servidores, self._ler_ativos)
+            novos = {
+                servidor.id: self._snapshot(servidor, resultado)
+                for servidor, resultado in zip(servidores, resultados)
+            }
+            with self._lock:
+                if servidor_id is None:
+                    # Roteadores desativados saem do índice
+                    self._snapshots = novos
+                else:
+                    self._snapshots.update(novos)
+                mudancas = self._reindexar()
+            if servidor_id is None:
+                self._ultima_tentativa = time.time()
+            self._espelhar()
+        self._notificar(mudancas)
+        return self.estado()
+
+    def _ler_ativos(self, servidor) -> List[dict]:
+        return self.pool.executar(
+            servidor.ip, servidor.usuario, servidor.senha,
+            lambda api: api.get_resource(CAMINHO_ATIVOS).get(),
+        )
+
+    def _snapshot(self, servidor, resultado: ResultadoServidor) -> _Snapshot:
+        if not resultado.ok:
+            erro = f"Erro ao ler sessões de {servidor.nome} ({servidor.ip}): {resultado.erro}"
+            anterior = self._snapshots.get(servidor.id)
+            if anterior is None:
+                return _Snapshot(servidor.id, servidor.nome, erro=erro)
+            return _Snapshot(servidor.id, servidor.nome, anterior.sessoes, anterior.atualizado_em, erro)
+
+        sessoes = {}
+        for linha in resultado.dados:
+            if linha.get("name"):
+                sessoes[linha["name"]] = dict(linha, servidor_id=servidor.id, servidor_nome=servidor.nome)
+        return _Snapshot(servidor.id, servidor.nome, sessoes, time.time())
+
+    def _reindexar(self):
+        """Reconstrói ``username -> sessão``; devolve (conectados, desconectados)."""
+        por_usuario = {}
+        for snapshot in self._snapshots.values():
+            por_usuario.update(snapshot.sessoes)
+        anteriores = self._por_usuario.keys()
+        mudancas = (sorted(por_usuario.keys() - anteriores), sorted(anteriores - por_usuario.keys()))
+        # Troca a referência de uma vez; leitores sem lock veem o índice antigo ou o novo
+        self._por_usuario = por_usuario
+        return mudancas
+
+    def _notificar(self, mudancas):
+        conectados, desconectados = mudancas
+        if not conectados and not desconectados:
+            return
+        try:
+            self.event_bus.publish(SessoesPPPoEChangedEvent(conectados, desconectados))
+        except Exception as e:
+            print(f"Aviso: falha ao publicar mudanças de sessões PPPoE: {e}")
+
+    def remover_sessao(self, servidor_id: Optional[int], sessao_id: str):
+        """Tira do índice uma sessão derrubada pelo CRM, sem esperar a próxima leitura."""
+        with self._lock:
+            snapshot = self._snapshots.get(servidor_id)
+            if snapshot is None:
+                return
+            snapshot.sessoes = {
+                nome: sessao for nome, sessao in snapshot.sessoes.items() if sessao.get("id") != sessao_id
+            }
+            mudancas = self._reindexar()
+        self._notificar(mudancas)
+
+    # Espelho no Redis
+
+    def _espelhar(self):
+        if self.redis is None:
+            return
+        try:
+            with self._lock:
+                dados = {
+                    "ultima_tentativa": self._ultima_tentativa,
+                    "snapshots": [
+                        [s.servidor_id, s.servidor_nome, s.sessoes, s.atualizado_em, s.erro]
+                        for s in self._snapshots.values()
+                    ],
+                }
+            self.redis.set(CHAVE_REDIS, json.dumps(dados, default=str), expire=self.max_idade * 2)
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar as sessões PPPoE no Redis: {e}")
+
+    def _carregar_redis(self) -> bool:
+        if self.redis is None:
+            return False
+        try:
+            bruto = self.redis.get(CHAVE_REDIS)
+        except Exception as e:
+            print(f"Aviso: não foi possível ler as sessões PPPoE do Redis: {e}")
+            return False
+        if not bruto:
+            return False
+        dados = json.loads(bruto)
+        if time.time() - dados["ultima_tentativa"] > self.max_idade:
+            return False
+        with self._lock:
+            self._snapshots = {linha[0]: _Snapshot(*linha) for linha in dados["snapshots"]}
+            mudancas = self._reindexar()
+        self._ultima_tentativa = dados["ultima_tentativa"]
+        self._notificar(mudancas)
+        return True
+
+    # Thread de atualização
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.atualizar()
+            except Exception as e:
+                print(f"Aviso: falha ao atualizar o índice de sessões PPPoE: {e}")
+
+    def iniciar(self):
+        if self._poller is not None and self._poller.is_alive():
+            return
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._parar.clear()
+            self._poller = threading.Thread(target=self._loop, name="sessoes-pppoe", daemon=True)
+            self._poller.start()
+
+    def parar(self):
+        self._parar.set()
+
+
+indice_sessoes = IndiceSessoesPPPoE()
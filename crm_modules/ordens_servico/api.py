@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from crm_modules.ordens_servico.schemas import OrdemServicoCreate, OrdemServicoUpdate, OrdemServico
 from crm_modules.ordens_servico.service import OrdemServicoService
 from crm_core.db.base import get_db
+from crm_core.utils.exceptions import ValidationException
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -88,8 +89,36 @@ def cancelar_ordem_servico(ordem_id: int, motivo: str, db: Session = Depends(get
 
 
 @router.get("/", response_model=list[OrdemServico])
-def listar_ordens_servico(status: Optional[str] = None, cliente_id: Optional[int] = None, db: Session = Depends(get_db)):
+def listar_ordens_servico(
+    response: Response,
+    status: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+    tipo_servico: Optional[str] = None,
+    prioridade: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = Query(None, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
     service = OrdemServicoService(repository_session=db)
+    if cursor is not None or limite is not None:
+        # Paginação por cursor; o próximo cursor e o total vão nos cabeçalhos
+        try:
+            result = service.listar_ordens_com_filtros(
+                status=status,
+                cliente_id=cliente_id,
+                tipo_servico=tipo_servico,
+                prioridade=prioridade,
+                search=search,
+                per_page=limite or 50,
+                cursor=cursor or None,
+            )
+        except ValidationException as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        response.headers["X-Total-Count"] = str(result["total"])
+        if result["next_cursor"]:
+            response.headers["X-Next-Cursor"] = result["next_cursor"]
+        return result["ordens"]
     if cliente_id:
         return service.listar_ordens_por_cliente(cliente_id)
     elif status:
@@ -54,7 +54,7 @@ class OrdemServicoRepository(BaseRepository[OrdemServicoModel]):
                 
         return result
 
-    def get_ordens_com_filtros(
+    def _query_com_filtros(
         self,
         status: Optional[str] = None,
         tipo_servico: Optional[str] = None,
@@ -65,12 +65,8 @@ class OrdemServicoRepository(BaseRepository[OrdemServicoModel]):
         search: Optional[str] = None,
         data_inicio: Optional[str] = None,
         data_fim: Optional[str] = None,
-        sort_by: Optional[str] = "data_criacao",
-        sort_order: Optional[str] = "desc",
-        page: int = 1,
-        per_page: int = 10
-    ) -> tuple[list[OrdemServicoModel], int]:
-        from sqlalchemy import or_, desc, asc
+    ):
+        from sqlalchemy import or_
         from datetime import datetime
         query = self.session.query(OrdemServicoModel)
         if status:
@@ -110,14 +106,57 @@ class OrdemServicoRepository(BaseRepository[OrdemServicoModel]):
                     OrdemServicoModel.tecnico_responsavel.ilike(term),
                 )
             )
-        if sort_by:
-            column = getattr(OrdemServicoModel, sort_by, OrdemServicoModel.data_criacao)
-            query = query.order_by(desc(column) if sort_order == "desc" else asc(column))
+        return query
+
+    def get_ordens_com_filtros(
+        self,
+        status: Optional[str] = None,
+        tipo_servico: Optional[str] = None,
+        cliente_id: Optional[int] = None,
+        tecnico: Optional[str] = None,
+        prioridade: Optional[str] = None,
+        endereco: Optional[str] = None,
+        search: Optional[str] = None,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        sort_by: Optional[str] = "data_criacao",
+        sort_order: Optional[str] = "desc",
+        page: int = 1,
+        per_page: int = 10
+    ) -> tuple[list[OrdemServicoModel], int]:
+        query = self._query_com_filtros(
+            status, tipo_servico, cliente_id, tecnico, prioridade, endereco, search, data_inicio, data_fim
+        )
+        # Mesma ordenação da paginação por cursor (desempate por id)
+        query = self.ordenar(query, sort_by or "data_criacao", sort_order)
         total = query.count()
         offset = (page - 1) * per_page
         models = query.offset(offset).limit(per_page).all()
         return models, total
 
+    def get_ordens_keyset(
+        self,
+        status: Optional[str] = None,
+        tipo_servico: Optional[str] = None,
+        cliente_id: Optional[int] = None,
+        tecnico: Optional[str] = None,
+        prioridade: Optional[str] = None,
+        endereco: Optional[str] = None,
+        search: Optional[str] = None,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None,
+        sort_by: Optional[str] = "data_criacao",
+        sort_order: Optional[str] = "desc",
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        with_total: bool = True,
+    ):
+        """Mesmos filtros de ``get_ordens_com_filtros``, paginados por cursor."""
+        query = self._query_com_filtros(
+            status, tipo_servico, cliente_id, tecnico, prioridade, endereco, search, data_inicio, data_fim
+        )
+        return self.paginate_keyset(query, sort_by or "data_criacao", sort_order, cursor, limit, with_total)
+
     def close(self):
         if not self._external_session:
             try:
@@ -3,7 +3,7 @@ from crm_modules.ordens_servico.domain import OrdemServico
 from crm_modules.ordens_servico.schemas import OrdemServicoCreate, OrdemServicoUpdate
 from crm_modules.ordens_servico.models import OrdemServicoModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
-from crm_core.events.bus import EventBus
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
 from crm_core.events.events import OrdemServicoCreatedEvent
 from datetime import datetime
 
@@ -14,7 +14,7 @@ class OrdemServicoService:
             self.repository = repository
         else:
             self.repository = OrdemServicoRepository(session=repository_session) if repository_session is not None else OrdemServicoRepository()
-        self.event_bus = event_bus or EventBus()
+        self.event_bus = event_bus or event_bus_padrao
 
     def criar_ordem_servico(self, ordem_data: OrdemServicoCreate) -> OrdemServico:
         # Validate
@@ -235,9 +235,10 @@ class OrdemServicoService:
         sort_by: str | None = "data_criacao",
         sort_order: str | None = "desc",
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: str | None = None
     ):
-        models, total = self.repository.get_ordens_com_filtros(
+        filtros = dict(
             status=status,
             tipo_servico=tipo_servico,
             cliente_id=cliente_id,
@@ -249,9 +250,14 @@ class OrdemServicoService:
             data_fim=data_fim,
             sort_by=sort_by,
             sort_order=sort_order,
-            page=page,
-            per_page=per_page,
         )
+        next_cursor = None
+        if cursor or page == 1:
+            # Primeira página ou cursor informado: paginação keyset, sem OFFSET
+            pagina = self.repository.get_ordens_keyset(**filtros, cursor=cursor, limit=per_page)
+            models, total, next_cursor = pagina.items, pagina.total, pagina.next_cursor
+        else:
+            models, total = self.repository.get_ordens_com_filtros(**filtros, page=page, per_page=per_page)
         ordens = [self.obter_ordem_servico(m.id) for m in models]
         try:
             from crm_modules.clientes.models import ClienteModel
@@ -275,4 +281,5 @@ class OrdemServicoService:
             "page": page,
             "per_page": per_page,
             "total_pages": (total + per_page - 1) // per_page,
+            "next_cursor": next_cursor,
         }
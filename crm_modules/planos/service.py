@@ -4,6 +4,7 @@ from crm_modules.planos.domain import Plano
 from crm_modules.planos.schemas import PlanoCreate, PlanoUpdate
 from crm_modules.planos.models import PlanoModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_core.cache import cache, em_cache
 
 
 class PlanoService:
@@ -29,6 +30,7 @@ class PlanoService:
         )
 
         model = self.repository.create(model)
+        cache.invalidar("planos")
 
         # Create domain object to return
         plano = Plano(
@@ -43,6 +45,7 @@ class PlanoService:
 
         return plano
 
+    @em_cache("plano", ttl=300, tags=("plano:{plano_id}",))
     def obter_plano(self, plano_id: int) -> Plano:
         model = self.repository.get_by_id(plano_id)
         if not model:
@@ -80,6 +83,7 @@ class PlanoService:
             model.ativo = update_data.ativo
 
         self.repository.update(model)
+        cache.invalidar(f"plano:{plano_id}", "planos")
 
         return self._to_domain(model)
 
@@ -89,8 +93,10 @@ class PlanoService:
             raise NotFoundException("Plano não encontrado")
         model.ativo = False
         self.repository.update(model)
+        cache.invalidar(f"plano:{plano_id}", "planos")
         return self._to_domain(model)
 
+    @em_cache("planos:ativos", ttl=300, tags=("planos",))
     def listar_planos_ativos(self):
         models = self.repository.get_active_planos()
         return [self._to_domain(model) for model in models]
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Optional, List
 from crm_modules.produtos.schemas import ProdutoCreate, ProdutoUpdate, ProdutoResponse
 from crm_modules.produtos.service import ProdutoService
@@ -47,6 +47,7 @@ def excluir_produto(produto_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[ProdutoResponse])
 def listar_produtos(
+    response: Response,
     db: Session = Depends(get_db),
     tipo: Optional[str] = Query(None, description="Filtrar por tipo"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoria"),
@@ -55,7 +56,8 @@ def listar_produtos(
     sort_by: Optional[str] = Query("nome", description="Campo para ordenação"),
     sort_order: Optional[str] = Query("asc", description="Ordem: asc ou desc"),
     page: int = Query(1, ge=1, description="Página atual"),
-    per_page: int = Query(10, ge=1, le=100, description="Itens por página")
+    per_page: int = Query(10, ge=1, le=100, description="Itens por página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (cabeçalho X-Next-Cursor)")
 ):
     service = ProdutoService(repository_session=db)
     try:
@@ -67,8 +69,12 @@ def listar_produtos(
             sort_by=sort_by,
             sort_order=sort_order,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor
         )
+        response.headers["X-Total-Count"] = str(result["total"])
+        if result["next_cursor"]:
+            response.headers["X-Next-Cursor"] = result["next_cursor"]
         return result["produtos"]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -18,18 +18,14 @@ class ProdutoRepository(BaseRepository):
     def get_by_nome(self, nome: str) -> Optional[ProdutoModel]:
         return self.session.query(ProdutoModel).filter(ProdutoModel.nome == nome).first()
 
-    def get_produtos_com_filtros(
+    def _query_com_filtros(
         self,
         tipo: Optional[str] = None,
         categoria: Optional[str] = None,
         ativo: Optional[bool] = None,
         search: Optional[str] = None,
-        sort_by: Optional[str] = "nome",
-        sort_order: Optional[str] = "asc",
-        page: int = 1,
-        per_page: int = 10
     ):
-        from sqlalchemy import or_, desc, asc
+        from sqlalchemy import or_
 
         query = self.session.query(ProdutoModel)
 
@@ -48,14 +44,23 @@ class ProdutoRepository(BaseRepository):
                     ProdutoModel.descricao.ilike(search_term)
                 )
             )
+        return query
+
+    def get_produtos_com_filtros(
+        self,
+        tipo: Optional[str] = None,
+        categoria: Optional[str] = None,
+        ativo: Optional[bool] = None,
+        search: Optional[str] = None,
+        sort_by: Optional[str] = "nome",
+        sort_order: Optional[str] = "asc",
+        page: int = 1,
+        per_page: int = 10
+    ):
+        query = self._query_com_filtros(tipo, categoria, ativo, search)
 
-        # Aplicar ordenação
-        if sort_by:
-            column = getattr(ProdutoModel, sort_by, ProdutoModel.nome)
-            if sort_order == "desc":
-                query = query.order_by(desc(column))
-            else:
-                query = query.order_by(asc(column))
+        # Mesma ordenação da paginação por cursor (desempate por id)
+        query = self.ordenar(query, sort_by or "nome", sort_order)
 
         # Contar total antes da paginação
         total = query.count()
@@ -64,4 +69,20 @@ class ProdutoRepository(BaseRepository):
         offset = (page - 1) * per_page
         query = query.offset(offset).limit(per_page)
 
-        return query.all(), total
\ No newline at end of file
+        return query.all(), total
+
+    def get_produtos_keyset(
+        self,
+        tipo: Optional[str] = None,
+        categoria: Optional[str] = None,
+        ativo: Optional[bool] = None,
+        search: Optional[str] = None,
+        sort_by: Optional[str] = "nome",
+        sort_order: Optional[str] = "asc",
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        with_total: bool = True,
+    ):
+        """Mesmos filtros de ``get_produtos_com_filtros``, paginados por cursor."""
+        query = self._query_com_filtros(tipo, categoria, ativo, search)
+        return self.paginate_keyset(query, sort_by or "nome", sort_order, cursor, limit, with_total)
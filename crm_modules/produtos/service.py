@@ -4,7 +4,8 @@ from crm_modules.produtos.domain import Produto
 from crm_modules.produtos.schemas import ProdutoCreate, ProdutoUpdate
 from crm_modules.produtos.models import ProdutoModel
 from crm_core.utils.exceptions import NotFoundException, ValidationException
-from crm_core.events.bus import EventBus
+from crm_core.events.bus import EventBus, event_bus as event_bus_padrao
+from crm_core.cache import cache, em_cache
 from crm_core.events.events import ProdutoCreatedEvent
 
 
@@ -14,7 +15,7 @@ class ProdutoService:
             self.repository = repository
         else:
             self.repository = ProdutoRepository(session=repository_session) if repository_session is not None else ProdutoRepository()
-        self.event_bus = event_bus or EventBus()
+        self.event_bus = event_bus or event_bus_padrao
 
     def _to_domain(self, model: ProdutoModel) -> Produto:
         return Produto(
@@ -81,6 +82,7 @@ class ProdutoService:
         )
 
         model = self.repository.create(model)
+        cache.invalidar("produtos")
 
         # Create domain object to return
         produto = self._to_domain(model)
@@ -89,6 +91,7 @@ class ProdutoService:
         self.event_bus.publish(ProdutoCreatedEvent(produto.id, produto.nome))
         return produto
 
+    @em_cache("produto", ttl=300, tags=("produto:{produto_id}",))
     def obter_produto(self, produto_id: int) -> Produto:
         model = self.repository.get_by_id(produto_id)
         if not model:
@@ -148,6 +151,7 @@ class ProdutoService:
             model.imagem_url = update_data.imagem_url
 
         self.repository.update(model)
+        cache.invalidar(f"produto:{produto_id}", "produtos")
 
         return self._to_domain(model)
 
@@ -157,6 +161,7 @@ class ProdutoService:
             raise NotFoundException("Produto não encontrado")
         model.ativo = False
         self.repository.update(model)
+        cache.invalidar(f"produto:{produto_id}", "produtos")
         return self._to_domain(model)
 
     def excluir_produto(self, produto_id: int) -> bool:
@@ -174,7 +179,10 @@ class ProdutoService:
             model.ativo = False
             self.repository.update(model)
             raise ValidationException(f"Não foi possível excluir fisicamente o produto (pode estar vinculado a outros registros). O produto foi inativado. Detalhe: {str(e)}")
+        finally:
+            cache.invalidar(f"produto:{produto_id}", "produtos")
 
+    @em_cache("produtos:ativos", ttl=300, tags=("produtos",))
     def listar_produtos_ativos(self):
         models = self.repository.get_active_produtos()
         return [self._to_domain(model) for model in models]
@@ -188,19 +196,25 @@ class ProdutoService:
         sort_by: Optional[str] = "nome",
         sort_order: Optional[str] = "asc",
         page: int = 1,
-        per_page: int = 10
+        per_page: int = 10,
+        cursor: Optional[str] = None
     ):
-        models, total = self.repository.get_produtos_com_filtros(
+        filtros = dict(
             tipo=tipo,
             categoria=categoria,
             ativo=ativo,
             search=search,
             sort_by=sort_by,
             sort_order=sort_order,
-            page=page,
-            per_page=per_page
         )
-        produtos = [self.obter_produto(model.id) for model in models]
+        next_cursor = None
+        if cursor or page == 1:
+            # Primeira página ou cursor informado: paginação keyset, sem OFFSET
+            pagina = self.repository.get_produtos_keyset(**filtros, cursor=cursor, limit=per_page)
+            models, total, next_cursor = pagina.items, pagina.total, pagina.next_cursor
+        else:
+            models, total = self.repository.get_produtos_com_filtros(**filtros, page=page, per_page=per_page)
+        produtos = [self._to_domain(model) for model in models]
 
         # Adicionar informações de paginação
         result = {
@@ -208,6 +222,7 @@ class ProdutoService:
             "total": total,
             "page": page,
             "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
+            "total_pages": (total + per_page - 1) // per_page,
+            "next_cursor": next_cursor
         }
         return result
\ No newline at end of file
@@ -17,6 +17,13 @@ def criar_servidor(servidor: ServidorCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/status")
+def status_servidores(db: Session = Depends(get_db)):
+    """Status de conexão de todos os servidores ativos, verificados em paralelo"""
+    service = ServidorService(repository_session=db)
+    return {"servidores": service.verificar_status_servidores()}
+
+
 @router.get("/{servidor_id}", response_model=Servidor)
 def obter_servidor(servidor_id: int, db: Session = Depends(get_db)):
     service = ServidorService(repository_session=db)
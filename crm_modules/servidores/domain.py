@@ -1,5 +1,5 @@
 class Servidor:
-    def __init__(self, id: int, nome: str, ip: str, tipo_conexao: str, tipo_acesso: str, usuario: str, senha: str, alterar_nome: bool, ativo: bool, status: str = "offline"):
+    def __init__(self, id: int, nome: str, ip: str, tipo_conexao: str, tipo_acesso: str, usuario: str, senha: str, alterar_nome: bool, ativo: bool, status: str = "offline", erro_conexao: str = None):
         self.id = id
         self.nome = nome
         self.ip = ip
@@ -10,3 +10,4 @@ class Servidor:
         self.alterar_nome = alterar_nome
         self.ativo = ativo
         self.status = status
+        self.erro_conexao = erro_conexao
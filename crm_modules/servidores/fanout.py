@@ -0,0 +1,109 @@
+"""Consulta simultânea a vários servidores (MikroTik e Huawei).
+
+``consultar_servidores()`` dispara a mesma operação em todos os servidores
+num pool de threads compartilhado e espera no máximo ``timeout`` segundos
+pelo conjunto. Com alguns roteadores fora do ar a resposta leva o tempo do
+mais lento (limitado pelo ``timeout``), e não a soma dos tempos de cada um.
+
+Cada servidor gera um ``ResultadoServidor`` com os dados ou o erro;
+``mesclar()`` junta as listas de dados marcando de qual servidor veio cada
+item e separa os erros por servidor.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from crm_core.config.settings import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class ResultadoServidor:
+    servidor_id: Optional[int]
+    servidor_nome: str
+    tipo_conexao: Optional[str] = None
+    dados: Any = None
+    erro: Optional[str] = None
+    duracao_ms: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.erro is None
+
+
+def _obter_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.servidores_fanout_max_paralelo,
+                    thread_name_prefix="fanout-servidores",
+                )
+    return _executor
+
+
+def _cronometrar(operacao: Callable[[Any], Any], servidor):
+    inicio = time.monotonic()
+    dados = operacao(servidor)
+    return dados, (time.monotonic() - inicio) * 1000
+
+
+def consultar_servidores(
+    servidores: Iterable,
+    operacao: Callable[[Any], Any],
+    timeout: Optional[float] = None,
+) -> List[ResultadoServidor]:
+    """Executa ``operacao(servidor)`` em todos os servidores ao mesmo tempo.
+
+    Servidores que não respondem dentro de ``timeout`` são reportados com
+    erro de tempo esgotado; a thread deles termina sozinha quando o socket
+    expira (``mikrotik_socket_timeout``), sem segurar a resposta.
+    """
+    timeout = timeout or settings.servidores_fanout_timeout
+    executor = _obter_executor()
+    futuros = [(servidor, executor.submit(_cronometrar, operacao, servidor)) for servidor in servidores]
+    if futuros:
+        wait([futuro for _, futuro in futuros], timeout=timeout)
+
+    resultados = []
+    for servidor, futuro in futuros:
+        resultado = ResultadoServidor(
+            servidor_id=getattr(servidor, "id", None),
+            servidor_nome=getattr(servidor, "nome", None) or getattr(servidor, "ip", ""),
+            tipo_conexao=getattr(servidor, "tipo_conexao", None),
+        )
+        if not futuro.done():
+            futuro.cancel()
+            resultado.erro = f"Tempo esgotado após {timeout:g}s"
+        elif futuro.exception() is not None:
+            resultado.erro = str(futuro.exception()) or futuro.exception().__class__.__name__
+        else:
+            resultado.dados, resultado.duracao_ms = futuro.result()
+        if resultado.erro:
+            print(f"Aviso: {resultado.servidor_nome}: {resultado.erro}")
+        resultados.append(resultado)
+    return resultados
+
+
+def mesclar(resultados: List[ResultadoServidor]) -> Dict[str, list]:
+    """Junta as listas retornadas pelos servidores e os erros de cada um."""
+    itens = []
+    erros = []
+    for resultado in resultados:
+        if not resultado.ok:
+            erros.append({
+                "servidor_id": resultado.servidor_id,
+                "servidor_nome": resultado.servidor_nome,
+                "erro": resultado.erro,
+            })
+            continue
+        for item in resultado.dados or []:
+            if isinstance(item, dict):
+                item = dict(item, servidor_id=resultado.servidor_id, servidor_nome=resultado.servidor_nome)
+            itens.append(item)
+    return {"itens": itens, "erros": erros}
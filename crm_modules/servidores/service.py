@@ -2,7 +2,9 @@ from crm_modules.servidores.repository import ServidorRepository
 from crm_modules.servidores.domain import Servidor
 from crm_modules.servidores.schemas import ServidorCreate, ServidorUpdate
 from crm_modules.servidores.models import ServidorModel
+from crm_modules.servidores.fanout import consultar_servidores
 from crm_core.utils.exceptions import NotFoundException, ValidationException
+from crm_core.cache import cache, em_cache
 
 
 class ServidorService:
@@ -47,9 +49,12 @@ class ServidorService:
         )
 
         model = self.repository.create(model)
+        cache.invalidar("servidores")
 
         return self._to_domain(model)
 
+    # Servidores carregam usuário e senha dos equipamentos: ficam só no cache local
+    @em_cache("servidor", ttl=60, tags=("servidor:{servidor_id}",), local_apenas=True)
     def obter_servidor(self, servidor_id: int) -> Servidor:
         model = self.repository.get_by_id(servidor_id)
         if not model:
@@ -80,6 +85,7 @@ class ServidorService:
             model.ativo = update_data.ativo
 
         self.repository.update(model)
+        cache.invalidar(f"servidor:{servidor_id}", "servidores")
 
         return self._to_domain(model)
 
@@ -89,51 +95,55 @@ class ServidorService:
             raise NotFoundException("Servidor não encontrado")
         model.ativo = False
         self.repository.update(model)
+        cache.invalidar(f"servidor:{servidor_id}", "servidores")
         return self._to_domain(model)
 
+    @em_cache("servidores:todos", ttl=60, tags=("servidores",), local_apenas=True)
     def listar_servidores(self):
         models = self.repository.get_all()
         return [self._to_domain(m) for m in models]
 
+    @em_cache("servidores:ativos", ttl=60, tags=("servidores",), local_apenas=True)
+    def _servidores_ativos_cadastrados(self):
+        return [self._to_domain(model) for model in self.repository.get_active_servers()]
+
     def listar_servidores_ativos(self, verificar_conexao: bool = True):
-        models = self.repository.get_active_servers()
-        servidores = []
-        for model in models:
-            servidor = self._to_domain(model)
-            # Adicionar status de conexão apenas se solicitado
-            if verificar_conexao:
-                servidor.status = self._verificar_status_conexao(servidor)
-            else:
-                servidor.status = "unknown"
-            servidores.append(servidor)
+        servidores = self._servidores_ativos_cadastrados()
+        for servidor in servidores:
+            servidor.status = "unknown"
+        # Adicionar status de conexão apenas se solicitado
+        if verificar_conexao:
+            for servidor, resultado in zip(servidores, consultar_servidores(servidores, self._verificar_status_conexao)):
+                servidor.status = resultado.dados if resultado.ok else "offline"
+                servidor.erro_conexao = resultado.erro
         return servidores
+
+    def verificar_status_servidores(self) -> list:
+        """Verifica todos os servidores ativos ao mesmo tempo"""
+        servidores = self.listar_servidores_ativos(verificar_conexao=True)
+        return [
+            {
+                "servidor_id": servidor.id,
+                "servidor_nome": servidor.nome,
+                "tipo_conexao": servidor.tipo_conexao,
+                "status": servidor.status,
+                "erro": servidor.erro_conexao,
+            }
+            for servidor in servidores
+        ]
     
     def _verificar_status_conexao(self, servidor) -> str:
         """Verifica o status de conexão com o servidor"""
-        if servidor.tipo_conexao.lower() != "mikrotik":
-            return "offline"
-        
-        try:
-            import routeros_api
-            connection = routeros_api.RouterOsApiPool(
-                servidor.ip,
-                username=servidor.usuario,
-                password=servidor.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
-            # Verificar se é possível obter informações do sistema
-            system_resource = api.get_resource('/system/resource')
-            system_resource.get()[0]
-            
-            connection.disconnect()
-            
-            return "online"
-            
-        except Exception as e:
-            return "offline"
+        tipo = (servidor.tipo_conexao or "").lower()
+        if tipo == "mikrotik":
+            from crm_modules.mikrotik.pool import routeros_pool
+
+            return "online" if routeros_pool.verificar(servidor.ip, servidor.usuario, servidor.senha) else "offline"
+        if tipo == "huawei":
+            from crm_modules.huawei.integration import verificar_conexao_huawei
+
+            return "online" if verificar_conexao_huawei(servidor.ip, servidor.usuario, servidor.senha) else "offline"
+        return "offline"
     
     def testar_conexao(self, servidor_id: int) -> dict:
         """Testa a conexão com um servidor MikroTik"""
@@ -143,21 +153,13 @@ class ServidorService:
             return {"success": False, "message": "Tipo de servidor não é MikroTik"}
         
         try:
-            import routeros_api
-            connection = routeros_api.RouterOsApiPool(
-                servidor.ip,
-                username=servidor.usuario,
-                password=servidor.senha,
-                port=8728,
-                plaintext_login=True
-            )
-            api = connection.get_api()
-            
+            from crm_modules.mikrotik.pool import routeros_pool
+
             # Obter informações do sistema para verificar a conexão
-            system_resource = api.get_resource('/system/resource')
-            system_info = system_resource.get()[0]
-            
-            connection.disconnect()
+            system_info = routeros_pool.executar(
+                servidor.ip, servidor.usuario, servidor.senha,
+                lambda api: api.get_resource('/system/resource').get()[0]
+            )
             
             return {
                 "success": True,
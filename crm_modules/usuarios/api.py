@@ -51,9 +51,10 @@ def login(
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.get("/me", response_model=UsuarioResponse)
-def obter_perfil(usuario = Depends(obter_usuario_atual)):
+def obter_perfil(usuario = Depends(obter_usuario_atual), db: Session = Depends(get_db)):
     """Obtém dados do usuário autenticado"""
-    return usuario
+    # A dependência devolve só o snapshot do cache; o perfil inclui permissões e grupos
+    return UsuarioService(repository_session=db).obter_usuario_por_id(usuario.id)
 
 @router.put("/me/editar", response_model=UsuarioResponse)
 def atualizar_meu_perfil(
@@ -1,6 +1,8 @@
 from crm_modules.usuarios.models import Usuario, AuditoriaLog, Permissao, Grupo
 from crm_modules.usuarios.schemas import UsuarioCreate, UsuarioUpdate, UsuarioResponse, TokenResponse
-from crm_core.security.auth_utils import obter_hash_senha, verificar_senha, criar_access_token
+from crm_core.security.auth_utils import obter_hash_senha, verificar_senha, verificar_e_atualizar_senha, criar_access_token
+from crm_core.security.acl import invalidar_permissoes
+from crm_core.security.usuario_cache import usuario_cache
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
@@ -48,12 +50,17 @@ class UsuarioService:
         if not usuario:
             raise ValueError("Usuário não encontrado")
         
-        if not verificar_senha(senha, usuario.senha_hash):
+        senha_ok, novo_hash = verificar_e_atualizar_senha(senha, usuario.senha_hash)
+        if not senha_ok:
             raise ValueError("Senha incorreta")
         
         if not usuario.ativo:
             raise ValueError("Usuário inativo")
         
+        # Hash em bcrypt ou com custo diferente do configurado: refazer agora
+        if novo_hash:
+            usuario.senha_hash = novo_hash
+
         # Atualizar último acesso
         usuario.ultimo_acesso = datetime.utcnow()
         self.session.commit()
@@ -118,6 +125,7 @@ class UsuarioService:
         
         usuario.atualizado_em = datetime.utcnow()
         self.session.commit()
+        usuario_cache.invalidar(usuario_id)
         self.session.refresh(usuario)
         return usuario
 
@@ -133,6 +141,7 @@ class UsuarioService:
         usuario.senha_hash = obter_hash_senha(nova_senha)
         usuario.atualizado_em = datetime.utcnow()
         self.session.commit()
+        usuario_cache.invalidar(usuario_id)
         self.session.refresh(usuario)
         return usuario
 
@@ -156,6 +165,7 @@ class UsuarioService:
         usuario.foto_url = relative_path
         usuario.atualizado_em = datetime.utcnow()
         self.session.commit()
+        usuario_cache.invalidar(usuario_id)
         self.session.refresh(usuario)
         return relative_path
 
@@ -244,6 +254,7 @@ class UsuarioService:
             grupo.permissoes = permissoes
 
         self.session.commit()
+        invalidar_permissoes()
         self.session.refresh(grupo)
         return grupo
 
@@ -253,6 +264,7 @@ class UsuarioService:
             raise ValueError("Grupo n?o encontrado")
         self.session.delete(grupo)
         self.session.commit()
+        invalidar_permissoes()
 
     def definir_permissoes_usuario(self, usuario_id: int, permissoes_ids: list[int]) -> Usuario:
         usuario = self.obter_usuario_por_id(usuario_id)
@@ -261,6 +273,7 @@ class UsuarioService:
         permissoes = self.session.query(Permissao).filter(Permissao.id.in_(permissoes_ids)).all()
         usuario.permissoes = permissoes
         self.session.commit()
+        invalidar_permissoes(usuario_id)
         self.session.refresh(usuario)
         return usuario
 
@@ -271,6 +284,7 @@ class UsuarioService:
         grupos = self.session.query(Grupo).filter(Grupo.id.in_(grupos_ids)).all()
         usuario.grupos = grupos
         self.session.commit()
+        invalidar_permissoes(usuario_id)
         self.session.refresh(usuario)
         return usuario
     def deletar_usuario(self, usuario_id: int) -> bool:
@@ -288,4 +302,6 @@ class UsuarioService:
 
         self.session.delete(usuario)
         self.session.commit()
+        usuario_cache.invalidar(usuario_id)
+        invalidar_permissoes(usuario_id)
         return True
@@ -332,29 +332,31 @@ DASHBOARD_HTML = """
             }
         };
         
-        // Função auxiliar para fazer requisições
-        async function fetchAPI(endpoint) {
+        // ETag do último bundle recebido (o servidor responde 304 se nada mudou)
+        let bundleETag = null;
+        
+        // Buscar resumo e gráficos numa única requisição
+        async function fetchBundle() {
             try {
-                // Temporariamente sem autenticação para debug
-                const response = await fetch(API_BASE + endpoint);
+                const headers = bundleETag ? { 'If-None-Match': bundleETag } : {};
+                const response = await fetch(API_BASE + '/bundle?top_clients=10', { headers });
+                if (response.status === 304) {
+                    return { naoModificado: true };
+                }
                 if (!response.ok) {
                     throw new Error(`HTTP ${response.status}`);
                 }
                 const data = await response.json();
-                if (data && Object.keys(data).length > 0) {
-                    return data;
-                }
-                return null;
+                bundleETag = response.headers.get('ETag');
+                return data;
             } catch (error) {
-                console.error(`Erro ao buscar ${endpoint}:`, error);
+                console.error('Erro ao buscar /bundle:', error);
                 return null;
             }
         }
         
-        // Carregar resumo executivo (KPIs)
-        async function loadExecutiveSummary() {
-            let data = await fetchAPI('/executive-summary');
-            
+        // Desenhar resumo executivo (KPIs)
+        function renderExecutiveSummary(data) {
             if (!data) {
                 data = MOCK_DATA.summary;
             }
@@ -404,10 +406,8 @@ DASHBOARD_HTML = """
             document.getElementById('kpiContainer').innerHTML = html;
         }
         
-        // Carregar e desenhar gráfico
-        async function loadChart(endpoint, chartId, type, mockKey) {
-            let data = await fetchAPI(endpoint);
-            
+        // Desenhar gráfico
+        function renderChart(data, chartId, type, mockKey) {
             if (!data || !data.labels) {
                 data = MOCK_DATA[mockKey];
                 if (!data) return;
@@ -460,20 +460,57 @@ DASHBOARD_HTML = """
         
         // Inicializar dashboard
         async function initDashboard() {
-            await loadExecutiveSummary();
-            await loadChart('/charts/revenue?days=30', 'revenueChart', 'line', 'revenue');
-            await loadChart('/charts/clients?days=30', 'clientsChart', 'line', 'clients');
-            await loadChart('/charts/orders-status', 'ordersChart', 'doughnut', 'orders');
-            await loadChart('/charts/contracts-status', 'contractsChart', 'doughnut', 'contracts');
-            await loadChart('/charts/support-tickets', 'ticketsChart', 'pie', 'tickets');
-            await loadChart('/charts/top-clients?limit=10', 'topClientsChart', 'bar', 'topClients');
+            const bundle = await fetchBundle();
+            if (bundle && bundle.naoModificado) {
+                return;  // Nada mudou desde a última atualização
+            }
+            const graficos = (bundle && bundle.charts) || {};
+            renderExecutiveSummary(bundle && bundle.summary);
+            renderChart(graficos.revenue, 'revenueChart', 'line', 'revenue');
+            renderChart(graficos.clients, 'clientsChart', 'line', 'clients');
+            renderChart(graficos.orders_status, 'ordersChart', 'doughnut', 'orders');
+            renderChart(graficos.contracts_status, 'contractsChart', 'doughnut', 'contracts');
+            renderChart(graficos.support_tickets, 'ticketsChart', 'pie', 'tickets');
+            renderChart(graficos.top_clients, 'topClientsChart', 'bar', 'topClients');
         }
         
         // Carregar ao abrir a página
         initDashboard();
         
-        // Recarregar a cada 5 minutos
-        setInterval(initDashboard, 5 * 60 * 1000);
+        // Recarregar quando os contadores ao vivo mudarem. O EventSource não
+        // envia o header Authorization: a URL leva um token curto, renovado
+        // a cada reconexão.
+        let recarga = null;
+        async function assinarAoVivo() {
+            const acesso = localStorage.getItem('access_token');
+            if (!acesso) return;
+            let fonte;
+            try {
+                const response = await fetch(API_BASE + '/ao-vivo/token', {
+                    method: 'POST',
+                    headers: { 'Authorization': `Bearer ${acesso}` }
+                });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const { token } = await response.json();
+                fonte = new EventSource(`${API_BASE}/ao-vivo?token=${encodeURIComponent(token)}`);
+            } catch (error) {
+                console.error('Erro ao abrir /ao-vivo:', error);
+                setTimeout(assinarAoVivo, 30000);
+                return;
+            }
+            fonte.addEventListener('delta', () => {
+                // Vários deltas seguidos viram uma só busca do bundle (com ETag)
+                clearTimeout(recarga);
+                recarga = setTimeout(initDashboard, 2000);
+            });
+            fonte.onerror = () => {
+                fonte.close();
+                setTimeout(assinarAoVivo, 5000);
+            };
+        }
+        assinarAoVivo();
     </script>
 </body>
 </html>
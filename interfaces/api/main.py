@@ -5,6 +5,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import logging
 import os
+from contextlib import asynccontextmanager
 from interfaces.api.routes_dashboard import router as dashboard_router
 from interfaces.api.dashboard_ui import router as dashboard_ui_router
 from interfaces.api.routers import api_router
@@ -18,10 +19,30 @@ from crm_modules.contratos.api import router as contratos_router
 from crm_modules.mikrotik.api import router as mikrotik_router
 from crm_modules.servidores.api import router as servidores_router
 from interfaces.web.app import app as web_app
+from crm_core.config.settings import settings
+from crm_core.events.bus import event_bus
+from crm_core.outbox import despachante_outbox
+from crm_modules.contratos.infrastructure.pdf.servico import servico_pdf
+from crm_modules.faturamento.gerencianet_client import fechar_cliente_gerencianet
+from crm_modules.faturamento.impressao import impressao_carnes
 
 logging.basicConfig(level=logging.DEBUG)
 
-app = FastAPI(title="CRM Provedor", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Outbox: despacha na própria API quando não há worker do Celery dedicado
+    if settings.outbox_despachar_no_processo:
+        despachante_outbox.iniciar()
+    yield
+    despachante_outbox.parar(timeout=10)
+    impressao_carnes.parar()
+    servico_pdf.parar()
+    fechar_cliente_gerencianet()
+    event_bus.parar(timeout=10)
+
+
+app = FastAPI(title="CRM Provedor", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -1,6 +1,6 @@
 """Dashboard API routes"""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from crm_modules.dashboard import DashboardService
 from crm_modules.dashboard.schemas import (
@@ -12,12 +12,29 @@ from crm_modules.dashboard.schemas import (
     KPICreateRequest,
 )
 from interfaces.api.dependencies import get_db
+from crm_core.utils.etag import resposta_json_com_etag
 from crm_core.security.dependencies import verificar_permissao, obter_usuario_atual
 
 router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
 # Temporariamente removendo autenticação para debug
 
 
+@router.get("/bundle")
+def get_dashboard_bundle(request: Request, top_clients: int = Query(10, ge=5, le=50),
+                         db: Session = Depends(get_db)):
+    """
+    Get the executive summary and every chart in a single response
+
+    Keys: summary, charts.revenue, charts.clients, charts.orders_status,
+    charts.contracts_status, charts.top_clients, charts.support_tickets and
+    charts.revenue_by_plan (same payloads as the individual routes).
+
+    Sends an ETag; a request with a matching If-None-Match gets 304 Not Modified.
+    """
+    service = DashboardService(db)
+    return resposta_json_com_etag(request, service.get_bundle(top_clientes=top_clients))
+
+
 @router.get("/executive-summary", response_model=ExecutiveSummary)
 def get_executive_summary(db: Session = Depends(get_db)):
     """
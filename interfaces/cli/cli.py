@@ -27,5 +27,45 @@ def list_clientes():
         typer.echo(f"{cliente.id}: {cliente.nome} - {cliente.email}")
 
 
+
+@app.command()
+def reindexar_clientes():
+    """Reconstrói o índice de busca textual de clientes."""
+    from crm_core.db.base import engine
+    from crm_modules.clientes.search import indice_clientes
+
+    with engine.begin() as conn:
+        total = indice_clientes.reconstruir(conn)
+    typer.echo(f"Índice de clientes reconstruído: {total} registros")
+
+
+@app.command()
+def reconciliar_pppoe(
+    servidor_id: int = typer.Option(None, help="Apenas este servidor (padrão: todos)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Só mostra as alterações"),
+    remover_extras: bool = typer.Option(False, "--remover-extras", help="Remove secrets sem cliente"),
+):
+    """Reconcilia os secrets PPPoE dos roteadores com o cadastro de clientes."""
+    from crm_modules.mikrotik.services import MikrotikService
+
+    resultado = MikrotikService(servidor_id=servidor_id).sincronizar_todos_clientes(
+        dry_run=dry_run, remover_extras=remover_extras, todos_servidores=servidor_id is None
+    )
+    if resultado['status'] == 'error':
+        typer.echo(resultado['message'])
+        raise typer.Exit(1)
+    for servidor in resultado['servidores']:
+        typer.echo(f"[{servidor['servidor_nome']}] em dia: {servidor['em_dia']}, "
+                   f"alterações: {len(servidor['alteracoes'])}, extras: {len(servidor['extras'])}, "
+                   f"sem senha: {len(servidor['sem_senha'])}")
+        if servidor['erro']:
+            typer.echo(f"  {servidor['erro']}")
+        for alteracao in servidor['alteracoes']:
+            typer.echo(f"  {alteracao['acao']} {alteracao['name']} {alteracao['campos']}")
+        for erro in servidor['erros']:
+            typer.echo(f"  erro: {erro['acao']} {erro['name']}: {erro['erro']}")
+    typer.echo(resultado['message'])
+
+
 if __name__ == "__main__":
     app()
@@ -35,6 +35,10 @@ app.include_router(faturamento_router, prefix="/api/v1")
 from crm_modules.faturamento.api import router as faturamento_main_router
 app.include_router(faturamento_main_router, prefix="/api/v1")
 
+# Include Dashboard API routes (contadores ao vivo do menu)
+from crm_modules.dashboard.api import router as dashboard_api_router
+app.include_router(dashboard_api_router)
+
 # Include Produtos API routes
 from crm_modules.produtos.api import router as produtos_router
 app.include_router(produtos_router, prefix="/api/v1/produtos")
@@ -195,11 +199,11 @@ def listar_clientes(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/clientes/{cliente_id}/detalhes", response_class=HTMLResponse)
-def detalhar_cliente(cliente_id: int, request: Request, db: Session = Depends(get_db)):
+def detalhar_cliente(cliente_id: int, request: Request, atualizar: bool = False, db: Session = Depends(get_db)):
     """Exibe detalhes de um cliente especÃ­fico"""
     from crm_modules.clientes.service import ClienteService
     from crm_modules.produtos.service import ProdutoService
-    from crm_modules.mikrotik.integration import monitorar_sessoes_mikrotik
+    from crm_modules.mikrotik.sessoes import indice_sessoes
     
     cliente_service = ClienteService(repository_session=db)
     produto_service = ProdutoService(repository_session=db)
@@ -207,17 +211,15 @@ def detalhar_cliente(cliente_id: int, request: Request, db: Session = Depends(ge
     cliente = cliente_service.obter_cliente(cliente_id)
     produtos = produto_service.listar_produtos_ativos()
     
-    # Verificar status online no MikroTik
+    # Verificar status online no índice de sessões PPPoE
     online = False
     ip_atual = None
     if cliente.username:
         try:
-            sessoes = monitorar_sessoes_mikrotik()
-            for sessao in sessoes:
-                if sessao.get('name') == cliente.username:
-                    online = True
-                    ip_atual = sessao.get('address')
-                    break
+            sessao = indice_sessoes.obter(cliente.username, atualizar=atualizar)
+            if sessao:
+                online = True
+                ip_atual = sessao.get('address')
         except Exception as e:
             print(f"Erro ao verificar status online: {e}")
             
@@ -732,11 +734,11 @@ def gerenciar_usuarios(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/api/clientes/search")
-async def buscar_clientes_api(q: str, db: Session = Depends(get_db)):
-    """Busca clientes por nome, email ou telefone (API para autocomplete)"""
+def buscar_clientes_api(q: str, page: int = 1, per_page: int = 20, db: Session = Depends(get_db)):
+    """Busca clientes por nome, CPF, email, login ou endereco (API para autocomplete)"""
     from crm_modules.clientes.service import ClienteService
     service = ClienteService(repository_session=db)
-    clientes = service.buscar_clientes(q)
+    clientes = service.buscar_clientes(q, page, per_page)
     return [{"id": cliente.id, "nome": cliente.nome, "email": cliente.email} for cliente in clientes]
 
 
@@ -1161,7 +1163,7 @@ def imprimir_carne(carne_id: int, request: Request, db: Session = Depends(get_db
         from crm_modules.faturamento.carne_models import CarneModel
         from sqlalchemy.orm import joinedload
         from datetime import datetime
-        from crm_core.config.settings import settings
+        from crm_modules.faturamento.pix import payload_parcela, qr_svg
 
         # Busca o modelo diretamente para ter acesso aos relacionamentos no template
         carne = db.query(CarneModel).options(
@@ -1172,19 +1174,20 @@ def imprimir_carne(carne_id: int, request: Request, db: Session = Depends(get_db
         if not carne:
             return HTMLResponse(content=f"CarnÃª nÃ£o encontrado: ID {carne_id}", status_code=404)
 
-        # ConfiguraÃ§Ã£o para o template
-        config = {
-            "PIX_CHAVE": settings.pix_chave or "",
-            "PIX_TIPO_CHAVE": settings.pix_tipo_chave or "cpf",
-            "PIX_BENEFICIARIO": settings.pix_beneficiario or "CRM Provedor",
-            "PIX_CIDADE": settings.pix_cidade or "SÃ£o Paulo"
-        }
+        # PIX e QR Code de cada parcela (QR memorizado por conteúdo; nada é gravado aqui)
+        pix_payload, pix_qr = {}, {}
+        for parcela in carne.parcelas:
+            payload = payload_parcela(parcela)
+            if payload:
+                pix_payload[parcela.id] = payload
+                pix_qr[parcela.id] = qr_svg(payload)
 
         return templates.TemplateResponse("carne_impressao.html", {
             "request": request,
             "carne": carne,
             "now": datetime.now(),
-            "config": config
+            "pix_payload": pix_payload,
+            "pix_qr": pix_qr
         })
     except Exception as e:
         return HTMLResponse(content=f"Erro ao gerar impressÃ£o: {str(e)}", status_code=400)
@@ -1235,8 +1238,7 @@ def imprimir_boleto(boleto_id: int, request: Request, db: Session = Depends(get_
         from crm_modules.faturamento.carne_models import BoletoModel
         from sqlalchemy.orm import joinedload
         from datetime import datetime
-        import io
-        import base64
+        from crm_modules.faturamento.pix import payload_boleto, qr_data_uri as qr_data_uri_pix
 
         boleto = db.query(BoletoModel).options(
             joinedload(BoletoModel.cliente)
@@ -1248,12 +1250,7 @@ def imprimir_boleto(boleto_id: int, request: Request, db: Session = Depends(get_
         if not boleto:
             return HTMLResponse(content=f"Boleto não encontrado: ID {boleto_id}", status_code=404)
 
-        pix_payload = (
-            getattr(boleto, "pix_copia_cola", None)
-            or getattr(boleto, "pix_payload", None)
-            or getattr(boleto, "payload_pix", None)
-            or getattr(boleto, "qr_code_payload", None)
-        )
+        pix_payload = payload_boleto(boleto)
         qr_payload = (
             pix_payload
             or boleto.url_boleto
@@ -1261,18 +1258,7 @@ def imprimir_boleto(boleto_id: int, request: Request, db: Session = Depends(get_
             or boleto.codigo_barras
             or boleto.numero_boleto
         )
-
-        qr_data_uri = None
-        if qr_payload:
-            try:
-                import qrcode
-                img = qrcode.make(str(qr_payload))
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG")
-                qr_b64 = base64.b64encode(buffer.getvalue()).decode("ascii")
-                qr_data_uri = f"data:image/png;base64,{qr_b64}"
-            except Exception:
-                qr_data_uri = None
+        qr_data_uri = qr_data_uri_pix(str(qr_payload)) if qr_payload else None
 
         return templates.TemplateResponse("boleto_impressao.html", {
             "request": request,
@@ -1420,17 +1406,16 @@ async def atualizar_contrato(contrato_id: int, request: Request, db: Session = D
 
 
 @app.get("/contratos/{contrato_id}/pdf")
-def gerar_pdf_contrato(contrato_id: int, db: Session = Depends(get_db)):
+def gerar_pdf_contrato(contrato_id: int, request: Request, db: Session = Depends(get_db)):
     """Gera PDF do contrato"""
     from crm_modules.contratos.service import ContratoService
+    from crm_core.utils.etag import etag_de_chave, resposta_arquivo_com_etag
     try:
         service = ContratoService(repository_session=db)
-        pdf_bytes = service.gerar_pdf_contrato(contrato_id)
-        from fastapi.responses import Response
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=contrato_{contrato_id}.pdf"}
+        caminho, chave = service.pdf_contrato(contrato_id)
+        return resposta_arquivo_com_etag(
+            request, caminho, etag_de_chave(chave), media_type="application/pdf",
+            filename=f"contrato_{contrato_id}.pdf"
         )
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
@@ -657,6 +657,63 @@ function clearSearch(inputs = []) {
     });
 }
 
+/* ==========================================================================
+   Contadores ao vivo (Server-Sent Events)
+   ========================================================================== */
+
+/**
+ * Assina /dashboard/ao-vivo: um snapshot ao conectar e depois só deltas.
+ * O EventSource não envia o header Authorization, então a URL leva um token
+ * curto de POST /dashboard/ao-vivo/token. Se a conexão cair, pede um token
+ * novo antes de reconectar (a reconexão automática usaria o token vencido).
+ */
+CRM.aoVivo = {
+    estado: {},
+    _ouvintes: [],
+    _iniciado: false,
+    
+    // callback(estado, delta): delta é null quando chega um snapshot
+    assinar(callback) {
+        this._ouvintes.push(callback);
+        if (Object.keys(this.estado).length) {
+            callback(this.estado, null);
+        }
+        if (!this._iniciado) {
+            this._iniciado = true;
+            this._conectar();
+        }
+    },
+    
+    async _conectar() {
+        if (!localStorage.getItem('access_token')) return;
+        let fonte;
+        try {
+            const { token } = await CRM.api.post('/dashboard/ao-vivo/token');
+            fonte = new EventSource(`${CRM.config.apiBase}/dashboard/ao-vivo?token=${encodeURIComponent(token)}`);
+        } catch (error) {
+            setTimeout(() => this._conectar(), 30000);
+            return;
+        }
+        fonte.addEventListener('snapshot', (e) => this._receber(JSON.parse(e.data), null));
+        fonte.addEventListener('delta', (e) => this._receber(null, JSON.parse(e.data)));
+        fonte.onerror = () => {
+            fonte.close();
+            setTimeout(() => this._conectar(), 5000);
+        };
+    },
+    
+    _receber(snapshot, delta) {
+        if (snapshot) {
+            this.estado = snapshot;
+        } else {
+            for (const [grupo, mudou] of Object.entries(delta)) {
+                this.estado[grupo] = { ...(this.estado[grupo] || {}), ...mudou };
+            }
+        }
+        this._ouvintes.forEach(callback => callback(this.estado, delta));
+    }
+};
+
 /* ==========================================================================
    Auth Functions
    ========================================================================== */
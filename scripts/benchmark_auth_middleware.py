@@ -0,0 +1,116 @@
+"""Benchmark do overhead por requisição do AuthMiddleware.
+
+Compara, chamando a aplicação ASGI diretamente (sem servidor HTTP):
+
+- ``sem middleware``: só a aplicação Starlette;
+- ``antes``: a implementação anterior (``BaseHTTPMiddleware`` com
+  ``any(path.startswith(...))`` e dois ``print`` por requisição, com a saída
+  descartada). A entrada "/" é ignorada aqui, senão toda rota seria pública;
+- ``depois``: o ``AuthMiddleware`` ASGI atual.
+
+Uso: ``python scripts/benchmark_auth_middleware.py [requisicoes]``
+(precisa de DATABASE_URL, REDIS_URL e SECRET_KEY no ambiente, como a aplicação).
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from crm_core.middleware.auth_middleware import ROTAS_PUBLICAS, AuthMiddleware
+from crm_core.security.auth_utils import criar_access_token, decodificar_token
+from crm_core.security.usuario_cache import UsuarioSnapshot, usuario_cache
+
+
+class MiddlewareAnterior(BaseHTTPMiddleware):
+    """Cópia resumida do AuthMiddleware anterior, para comparação."""
+
+    async def dispatch(self, request, call_next):
+        is_public = any(request.url.path.startswith(rota) for rota in ROTAS_PUBLICAS if rota != "/")
+        print(f"[AUTH] Path: {request.url.path}, Public: {is_public}, Method: {request.method}")
+        if is_public:
+            response = await call_next(request)
+            print(f"[AUTH] Static response status: {response.status_code}")
+            return response
+        scheme, token = request.headers.get("authorization").split()
+        payload = decodificar_token(token)
+        usuario = usuario_cache.em_cache(payload["usuario_id"])
+        if not usuario or not usuario.ativo:
+            return JSONResponse(status_code=401, content={"detail": "Usuario invalido ou inativo"})
+        request.state.usuario = usuario
+        return await call_next(request)
+
+
+def criar_app(middleware):
+    async def estatico(request):
+        return PlainTextResponse("body{}")
+
+    async def clientes(request):
+        return JSONResponse({"usuario": request.state.usuario.username})
+
+    async def clientes_sem_auth(request):
+        return JSONResponse({"usuario": "ana"})
+
+    rotas = [
+        Route("/static/css/app.css", estatico),
+        Route("/api/v1/clientes", clientes if middleware else clientes_sem_auth),
+    ]
+    return Starlette(routes=rotas, middleware=[Middleware(middleware)] if middleware else [])
+
+
+async def medir(app, path, headers, requisicoes):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": headers, "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        if mensagem["type"] == "http.response.start":
+            assert mensagem["status"] == 200, mensagem
+
+    for _ in range(min(200, requisicoes)):
+        await app(dict(scope), receive, send)
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+
+async def principal(requisicoes):
+    usuario_cache.carregar = lambda usuario_id: UsuarioSnapshot(usuario_id, "ana", "ana@example.com",
+                                                                "Ana Lima", "admin", True)
+    usuario_cache.obter(1)
+    headers = [(b"authorization", f"Bearer {criar_access_token(1)}".encode())]
+
+    variantes = [
+        ("sem middleware", criar_app(None)),
+        ("antes", criar_app(MiddlewareAnterior)),
+        ("depois", criar_app(AuthMiddleware)),
+    ]
+    casos = [("/static/css/app.css", []), ("/api/v1/clientes", headers)]
+
+    print(f"{'variante':<16}{'rota':<24}{'us/req':>10}{'overhead':>10}")
+    for path, cabecalhos in casos:
+        base = None
+        for nome, app in variantes:
+            with contextlib.redirect_stdout(io.StringIO()):
+                microssegundos = await medir(app, path, cabecalhos, requisicoes)
+            base = microssegundos if base is None else base
+            print(f"{nome:<16}{path:<24}{microssegundos:>10.1f}{microssegundos - base:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(principal(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
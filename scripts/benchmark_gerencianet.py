@@ -0,0 +1,49 @@
+"""Benchmark do cliente Gerencianet contra o servidor falso local.
+
+``antes``: um ``GerencianetClient`` novo por requisição (como o
+``BoletoService`` fazia), ou seja, conexão e token OAuth novos a cada
+consulta. ``depois``: o cliente compartilhado, com conexões mantidas e token
+em cache. Mede consultas de boleto por segundo com 8 threads e conta
+conexões e tokens emitidos pelo servidor.
+
+Uso: ``python scripts/benchmark_gerencianet.py [consultas] [latencia_s]``
+(precisa de DATABASE_URL, REDIS_URL e SECRET_KEY no ambiente, como a aplicação).
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_modules.faturamento.gerencianet_client import GerencianetClient
+from crm_modules.faturamento.gerencianet_mock import ServidorGerencianetFalso
+
+THREADS = 8
+
+
+def medir(nome, servidor, consultas, obter_cliente):
+    charge_id = obter_cliente().gerar_boleto("Ana", "12345678901", "ana@example.com", 10.0,
+                                             date(2026, 12, 10), "BENCH")["charge_id"]
+    conexoes, tokens = servidor.conexoes, servidor.tokens_emitidos
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(lambda _: obter_cliente().consultar_boleto(charge_id), range(consultas)))
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:>6}: {consultas / duracao:8.1f} consultas/s | "
+          f"conexões {servidor.conexoes - conexoes:5d} | tokens {servidor.tokens_emitidos - tokens:5d}")
+
+
+def main():
+    consultas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    with ServidorGerencianetFalso(latencia=latencia) as servidor:
+        medir("antes", servidor, consultas, lambda: GerencianetClient("id", "segredo", base_url=servidor.url))
+        compartilhado = GerencianetClient("id", "segredo", base_url=servidor.url)
+        medir("depois", servidor, consultas, lambda: compartilhado)
+        compartilhado.fechar()
+
+
+if __name__ == "__main__":
+    main()
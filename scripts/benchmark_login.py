@@ -0,0 +1,89 @@
+"""Benchmark de login: vazão e latência do caminho das rotas de login.
+
+As rotas de login (``crm_modules.usuarios.api``) são ``def``: o Starlette as
+roda no seu threadpool (40 threads por padrão). O benchmark chama
+``UsuarioService.autenticar`` por 40 threads sobre um SQLite temporário, como
+o servidor faria. ``antes`` faz o hash na própria thread da requisição;
+``depois`` usa o pool limitado (``senha_hash_max_paralelo``).
+
+Uso: ``python scripts/benchmark_login.py [logins]``
+(precisa de DATABASE_URL, REDIS_URL e SECRET_KEY no ambiente, como a aplicação).
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from crm_core.config.settings import settings
+from crm_core.db.models_base import Base
+from crm_core.security import auth_utils
+from crm_modules.usuarios import service as usuarios_service
+from crm_modules.usuarios.models import Usuario
+from crm_modules.usuarios.service import UsuarioService
+
+THREADS_SERVIDOR = 40
+SENHA = "senha123456"
+
+
+def preparar_banco(diretorio, usuarios):
+    # Uma conexão por login: o SingletonThreadPool do criar_engine não comporta 40 threads
+    engine = create_engine(f"sqlite:///{os.path.join(diretorio, 'login.db')}", poolclass=NullPool,
+                           connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine)
+    session = fabrica()
+    senha_hash = auth_utils.obter_hash_senha(SENHA)
+    session.add_all([
+        Usuario(username=f"usuario{i}", email=f"usuario{i}@example.com", senha_hash=senha_hash,
+                nome_completo=f"Usuário {i}")
+        for i in range(usuarios)
+    ])
+    session.commit()
+    session.close()
+    return engine, fabrica
+
+
+def medir_vazao(fabrica, logins, usuarios):
+    def login(i):
+        session = fabrica()
+        try:
+            inicio = time.perf_counter()
+            UsuarioService(repository_session=session).autenticar(f"usuario{i % usuarios}", SENHA)
+            return time.perf_counter() - inicio
+        finally:
+            session.close()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS_SERVIDOR) as threads:
+        latencias = sorted(threads.map(login, range(logins)))
+    total = time.perf_counter() - inicio
+    return logins / total, statistics.median(latencias), latencias[int(len(latencias) * 0.95) - 1]
+
+
+def principal(logins):
+    usuarios = 50
+    print(f"pbkdf2_sha256 com {settings.senha_pbkdf2_rounds} rounds, pool de {settings.senha_hash_max_paralelo} "
+          f"threads, {os.cpu_count()} CPUs, {logins} logins")
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, fabrica = preparar_banco(diretorio, usuarios)
+        try:
+            original = usuarios_service.verificar_e_atualizar_senha
+            for nome, funcao in [("antes", auth_utils._verificar_e_atualizar), ("depois", original)]:
+                usuarios_service.verificar_e_atualizar_senha = funcao
+                vazao, p50, p95 = medir_vazao(fabrica, logins, usuarios)
+                print(f"{nome:<8}vazão {vazao:8.1f} logins/s   p50 {p50 * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+            usuarios_service.verificar_e_atualizar_senha = original
+        finally:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    principal(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
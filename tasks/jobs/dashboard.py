@@ -0,0 +1,14 @@
+from crm_provedor.tasks.worker import celery_app
+from crm_core.db.base import get_db_session
+from crm_modules.dashboard.metricas import ConsolidadorMetricas
+
+
+@celery_app.task
+def consolidar_metricas_dashboard():
+    """Consolida as métricas do dashboard desde a última execução."""
+    db = get_db_session()
+    try:
+        resumo = ConsolidadorMetricas(db).consolidar()
+    finally:
+        db.close()
+    return f"Métricas consolidadas de {resumo['inicio']} a {resumo['fim']}"
@@ -10,8 +10,8 @@ def processar_faturamento():
     now = datetime.now()
     mes = now.month
     ano = now.year
-    faturas = service.gerar_faturas_mensais(mes, ano)
-    return f"Faturamento processado: {len(faturas)} faturas geradas"
+    resumo = service.gerar_faturas_mensais(mes, ano)
+    return f"Faturamento processado: {resumo['faturas_criadas']} faturas geradas"
 
 
 @celery_app.task
@@ -0,0 +1,10 @@
+from crm_provedor.tasks.worker import celery_app
+from crm_core.outbox import despachante_outbox
+
+
+@celery_app.task
+def despachar_outbox():
+    """Despacha as mensagens vencidas da outbox (MikroTik, Gerencianet)."""
+    resultado = despachante_outbox.drenar()
+    return (f"Outbox: {resultado.get('processadas', 0)} processadas, "
+            f"{resultado.get('concluido', 0)} concluídas, {resultado.get('morto', 0)} mortas")
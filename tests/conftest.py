@@ -1,6 +1,11 @@
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy.orm import sessionmaker
 
-from crm_core.db.base import get_db_session
+import crm_core.db.models  # noqa: F401  (registra todas as tabelas no Base)
+from crm_core.db.base import criar_engine, get_db_session
+from crm_core.db.models_base import Base
 
 
 @pytest.fixture()
@@ -13,3 +18,61 @@ def db_session():
             session.rollback()
         finally:
             session.close()
+
+
+@pytest.fixture()
+def engine_teste(tmp_path):
+    """Banco SQLite novo em arquivo temporário, com todas as tabelas."""
+    engine = criar_engine(f"sqlite:///{tmp_path / 'crm.db'}")
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture()
+def fabrica_teste(engine_teste):
+    """Fábrica de sessões do ``engine_teste``, configurada como a ``SessionLocal``."""
+    return sessionmaker(bind=engine_teste, autocommit=False, autoflush=False)
+
+
+@pytest.fixture()
+def sessao_teste(fabrica_teste):
+    session = fabrica_teste()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def hoje():
+    return datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture()
+def sessao_dashboard(sessao_teste, hoje):
+    """Dois clientes com faturas e pagamentos (mês passado e hoje) e uma OS aberta."""
+    from crm_modules.clientes.models import ClienteModel
+    from crm_modules.dashboard.metricas import inicio_mes
+    from crm_modules.faturamento.models import FaturaModel, PagamentoModel
+    from crm_modules.ordens_servico.models import OrdemServicoModel
+    from crm_modules.planos.models import PlanoModel
+
+    mes_passado = inicio_mes(hoje.date()) - timedelta(days=10)
+    sessao_teste.add_all([
+        PlanoModel(id=1, nome="100 Mega", velocidade_download=100, velocidade_upload=50, valor_mensal=100.0),
+        ClienteModel(id=1, nome="Ana", email="ana@example.com", cpf="1", telefone="1", endereco="Rua A",
+                     plano_id=1, data_cadastro=datetime.combine(mes_passado, datetime.min.time())),
+        ClienteModel(id=2, nome="Bruno", email="bruno@example.com", cpf="2", telefone="2", endereco="Rua B",
+                     plano_id=1, data_cadastro=hoje),
+        FaturaModel(id=1, cliente_id=1, numero_fatura="F1", valor_total=100.0, data_vencimento=mes_passado),
+        FaturaModel(id=2, cliente_id=2, numero_fatura="F2", valor_total=100.0, data_vencimento=hoje.date()),
+        PagamentoModel(fatura_id=1, valor_pago=80.0, metodo_pagamento="pix",
+                       data_pagamento=datetime.combine(mes_passado, datetime.min.time())),
+        PagamentoModel(fatura_id=2, valor_pago=100.0, metodo_pagamento="pix", data_pagamento=hoje),
+        OrdemServicoModel(cliente_id=1, tipo_servico="reparo", titulo="Sem sinal", descricao="-", status="aberta"),
+    ])
+    sessao_teste.commit()
+    return sessao_teste
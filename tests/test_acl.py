@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import event
+
+from crm_core.security import acl as acl_module
+from crm_core.security.acl import ACL
+from crm_modules.usuarios.models import Grupo, Permissao, Usuario
+from crm_modules.usuarios.service import UsuarioService
+
+
+@pytest.fixture()
+def banco(engine_teste, fabrica_teste, monkeypatch):
+    monkeypatch.setattr(acl_module, "get_db_session", fabrica_teste)
+
+    session = fabrica_teste()
+    ler = Permissao(nome="read_clientes", modulo="clientes")
+    faturar = Permissao(nome="manage", modulo="faturamento")
+    grupo = Grupo(nome="Financeiro", permissoes=[faturar])
+    session.add_all([
+        Usuario(id=1, username="ana", email="ana@example.com", senha_hash="x", nome_completo="Ana", role="tecnico",
+                permissoes=[ler], grupos=[grupo]),
+        Usuario(id=2, username="root", email="root@example.com", senha_hash="x", nome_completo="Root", role="admin"),
+    ])
+    session.commit()
+
+    consultas = []
+    event.listen(engine_teste, "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    try:
+        yield session, consultas
+    finally:
+        session.close()
+
+
+def test_permissoes_diretas_e_de_grupo(banco):
+    acl = ACL()
+
+    assert acl.has_permission(1, "read")
+    assert acl.has_permission(1, "read", "clientes")
+    assert acl.check_resource_access(1, "read", "clientes")
+    assert not acl.has_permission(1, "read", "faturamento")
+    assert acl.has_permission(1, "manage", "faturamento")
+    assert not acl.check_resource_access(1, "delete", "clientes")
+    assert acl.has_permission(2, "qualquer", "coisa")
+    assert not acl.has_permission(99, "read")
+    assert sorted(acl.get_user_permissions(1)) == ["manage", "read_clientes"]
+
+
+def test_cache_invalidado_ao_mudar_grupos_e_permissoes(banco):
+    session, consultas = banco
+    acl = ACL()
+    acl.has_permission(1, "read")
+    consultas.clear()
+
+    for _ in range(100):
+        assert acl.has_permission(1, "manage", "faturamento")
+    assert consultas == []
+
+    service = UsuarioService(repository_session=session)
+    grupo = session.query(Grupo).one()
+    service.atualizar_grupo(grupo.id, permissoes_ids=[])
+    assert not acl.has_permission(1, "manage", "faturamento")
+
+    escrever = service.criar_permissao("write_clientes", "clientes")
+    service.definir_permissoes_usuario(1, [escrever.id])
+    assert acl.has_permission(1, "write", "clientes")
+    assert not acl.has_permission(1, "read", "clientes")
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from crm_core.middleware.auth_middleware import AuthMiddleware, compilar_rotas_publicas, eh_rota_publica
+from crm_core.security.auth_utils import criar_access_token
+from crm_core.security.dependencies import obter_usuario_atual
+from crm_core.security.usuario_cache import UsuarioSnapshot, usuario_cache
+
+
+def test_matcher_de_rotas_publicas():
+    assert eh_rota_publica("/")
+    assert eh_rota_publica("/static/css/app.css")
+    assert eh_rota_publica("/api/v1/usuarios/login")
+    assert eh_rota_publica("/docs/oauth2-redirect")
+    assert not eh_rota_publica("/api/v1/clientes")
+    assert not eh_rota_publica("/staticos")
+    assert not eh_rota_publica("/api/v1/usuarios/me")
+    assert not compilar_rotas_publicas([])("/")
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    usuarios = {1: UsuarioSnapshot(1, "ana", "ana@example.com", "Ana Lima", "admin", True)}
+    consultas = []
+
+    def carregar(usuario_id):
+        consultas.append(usuario_id)
+        return usuarios.get(usuario_id)
+
+    monkeypatch.setattr(usuario_cache, "carregar", carregar)
+    usuario_cache.limpar()
+
+    app = FastAPI()
+
+    @app.get("/static/app.js")
+    def estatico():
+        return "ok"
+
+    @app.get("/api/v1/clientes")
+    def clientes(usuario=Depends(obter_usuario_atual)):
+        return {"usuario": usuario.username}
+
+    app.add_middleware(AuthMiddleware, amostragem=1.0)
+    yield TestClient(app), consultas
+    usuario_cache.limpar()
+
+
+def test_middleware_autentica_e_registra_amostra(client, caplog):
+    client, consultas = client
+    caplog.set_level(logging.INFO, logger="crm_core.middleware.auth_middleware")
+
+    assert client.get("/static/app.js").status_code == 200
+    resposta = client.get("/api/v1/clientes")
+    assert resposta.status_code == 401
+    assert resposta.headers["www-authenticate"] == "Bearer"
+    assert client.get("/api/v1/clientes", headers={"Authorization": "Basic abc"}).status_code == 401
+    assert client.get("/api/v1/clientes", headers={"Authorization": "Bearer invalido"}).status_code == 401
+    assert client.get("/api/v1/clientes", headers={"Authorization": f"Bearer {criar_access_token(7)}"}).status_code == 401
+
+    headers = {"Authorization": f"Bearer {criar_access_token(1)}"}
+    assert client.get("/api/v1/clientes", headers=headers).json() == {"usuario": "ana"}
+    assert client.get("/api/v1/clientes", headers=headers).status_code == 200
+    assert consultas == [7, 1]
+
+    registros = [(r.resultado, r.status) for r in caplog.records]
+    assert registros[:2] == [("publica", 200), ("negada", 401)]
+    assert registros[-1] == ("autenticada", 200)
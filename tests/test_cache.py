@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from crm_core.cache import cache
+from crm_core.cache.backends import BackendMemoria, BackendRedis
+from crm_core.cache.camadas import CacheEmCamadas
+from crm_core.cache.serializacao import desserializar, serializar
+from crm_modules.planos.schemas import PlanoUpdate
+from crm_modules.planos.service import PlanoService
+from crm_modules.planos.models import PlanoModel
+from crm_modules.produtos.domain import Produto
+
+
+@pytest.fixture()
+def backend():
+    backend = BackendMemoria()
+    cache.usar_backend(backend)
+    yield backend
+    cache.usar_backend(None)
+
+
+def test_serializa_objetos_de_dominio():
+    produto = Produto(id=1, nome="Roteador", tipo="equipamento", preco=199.9, categoria="rede", unidade="un",
+                      created_at=datetime(2025, 1, 2, 3, 4, 5))
+    copia = desserializar(serializar({"itens": [produto], "par": (1, "a")}))
+    assert copia == {"itens": [produto], "par": (1, "a")}
+    assert copia["itens"][0] is not produto
+    with pytest.raises(TypeError):
+        serializar(object())
+
+
+def test_service_usa_cache_e_invalida_por_tag(sessao_teste, backend):
+    session = sessao_teste
+    session.add(PlanoModel(nome="100 Mega", velocidade_download=100, velocidade_upload=50, valor_mensal=99.9))
+    session.commit()
+    consultas = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+
+    service = PlanoService(repository_session=session)
+    assert service.obter_plano(1).nome == "100 Mega"
+    assert [p.nome for p in service.listar_planos_ativos()] == ["100 Mega"]
+    lidas = len(consultas)
+    for _ in range(20):
+        service.obter_plano(1)
+        service.listar_planos_ativos()
+    assert len(consultas) == lidas
+
+    # Outro processo: camada local vazia, lê do backend remoto
+    cache.local.limpar()
+    assert service.obter_plano(1).valor_mensal == 99.9
+    assert len(consultas) == lidas
+
+    service.atualizar_plano(1, PlanoUpdate(valor_mensal=119.9))
+    assert service.obter_plano(1).valor_mensal == 119.9
+    assert service.listar_planos_ativos()[0].valor_mensal == 119.9
+
+
+def test_invalidacao_com_redis_fora_e_aplicada_na_volta(monkeypatch):
+    remoto = BackendMemoria()
+    camadas = CacheEmCamadas(backend=remoto, local_ttl=0)
+    camadas.definir("plano:1", {"valor": 99.9}, tags=("plano:1",))
+    camadas.definir("planos:ativos", [1])
+
+    def fora(*args):
+        raise ConnectionError("recusado")
+
+    monkeypatch.setattr(remoto, "invalidar_tags", fora)
+    monkeypatch.setattr(remoto, "remover", fora)
+    camadas.invalidar("plano:1")
+    camadas.remover("planos:ativos")
+    monkeypatch.undo()
+    assert remoto.obter("plano:1") is not None
+
+    camadas._remoto_indisponivel_ate = 0.0  # passou o intervalo de reconexão
+    assert camadas.obter("plano:1") is None
+    assert camadas.obter("planos:ativos") is None
+
+
+def test_single_flight():
+    camadas = CacheEmCamadas(backend=BackendMemoria())
+    chamadas = []
+
+    @camadas.em_cache("lento")
+    def lento(x):
+        chamadas.append(x)
+        time.sleep(0.2)
+        return {"x": x}
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(lento(7))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert chamadas == [7]
+    assert resultados == [{"x": 7}] * 8
+
+
+def test_sem_redis_usa_so_a_camada_local(capsys):
+    class BackendFora:
+        def __getattr__(self, nome):
+            def falhar(*args):
+                raise ConnectionError("recusado")
+            return falhar
+
+    camadas = CacheEmCamadas(backend=BackendFora())
+    chamadas = []
+
+    @camadas.em_cache("cliente", tags=("cliente:{cliente_id}",))
+    def obter_cliente(cliente_id):
+        chamadas.append(cliente_id)
+        return {"id": cliente_id}
+
+    assert obter_cliente(42) == {"id": 42}
+    assert obter_cliente(42) == {"id": 42}
+    assert chamadas == [42]
+    assert camadas.estatisticas["erros_remoto"] == 1
+    assert "cache remoto indisponível" in capsys.readouterr().out
+
+    camadas.invalidar("cliente:42")
+    obter_cliente(42)
+    assert chamadas == [42, 42]
+
+
+def test_local_apenas_respeita_o_ttl_local():
+    camadas = CacheEmCamadas(backend=BackendMemoria(), local_ttl=0)
+    chamadas = []
+
+    @camadas.em_cache("servidor", ttl=60, local_apenas=True)
+    def obter_servidor(servidor_id):
+        chamadas.append(servidor_id)
+        return {"id": servidor_id}
+
+    obter_servidor(1)
+    obter_servidor(1)
+    assert chamadas == [1, 1]
+
+
+def test_redis_invalida_tag_e_chaves_juntas():
+    from crm_core.cache.redis import RedisCache
+
+    redis_cache = RedisCache()
+    try:
+        redis_cache.client.ping()
+    except Exception:
+        pytest.skip("Redis indisponível")
+    backend = BackendRedis(redis_cache, prefixo="crm:teste:")
+    backend.definir("a", b"1", 60, tags=("t1",))
+    backend.definir("b", b"2", 60, tags=("t1", "t2"))
+    backend.definir("c", b"3", 60, tags=("t2",))
+
+    backend.invalidar_tags(["t1"])
+    assert backend.obter("a") is None and backend.obter("b") is None
+    assert backend.obter("c") == b"3"
+    backend.invalidar_tags(["t2"])
+    assert backend.obter("c") is None
+    assert not redis_cache.client.exists(backend._tag("t1"), backend._tag("t2"))
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from crm_core.cache.arquivos import CacheArquivos, chave_conteudo
+from crm_core.utils.etag import etag_de_chave, resposta_arquivo_com_etag
+from crm_modules.contratos.infrastructure.pdf.servico import chave_pdf_contrato
+
+
+def test_remove_os_menos_usados_ao_passar_do_limite(tmp_path):
+    cache = CacheArquivos(str(tmp_path), max_bytes=250)
+    for nome in ("a", "b"):
+        cache.gravar(chave_conteudo(nome), b"x" * 100)
+    # "a" volta a ser usado: "b" passa a ser o mais antigo
+    os.utime(cache.caminho(chave_conteudo("b")), (1, 1))
+    assert cache.obter(chave_conteudo("a")) is not None
+
+    cache.gravar(chave_conteudo("c"), b"x" * 100)
+
+    assert cache.obter(chave_conteudo("b")) is None
+    assert cache.obter(chave_conteudo("a")) is not None
+    assert cache.obter(chave_conteudo("c")) is not None
+    assert cache.metricas()["removidos"] == 1
+
+
+def test_gera_uma_vez_por_chave(tmp_path):
+    cache = CacheArquivos(str(tmp_path))
+    geracoes = []
+
+    def gerar():
+        geracoes.append(1)
+        time.sleep(0.05)
+        return b"%PDF-1.4"
+
+    threads = [threading.Thread(target=cache.obter_ou_gerar, args=("ab" * 32, gerar)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(geracoes) == 1
+    assert cache.caminho("ab" * 32).read_bytes() == b"%PDF-1.4"
+    assert cache._gerando == {}
+
+
+def test_gera_uma_vez_por_chave_entre_corrotinas(tmp_path):
+    cache = CacheArquivos(str(tmp_path))
+    geracoes = []
+
+    async def gerar():
+        geracoes.append(1)
+        await asyncio.sleep(0.05)
+        return b"%PDF-1.4"
+
+    async def cenario():
+        return await asyncio.gather(*(cache.obter_ou_gerar_async("ef" * 32, gerar) for _ in range(5)))
+
+    caminhos = asyncio.run(cenario())
+    assert len(geracoes) == 1
+    assert set(caminhos) == {cache.caminho("ef" * 32)}
+    assert cache._gerando_async == {}
+
+
+def test_falha_nao_libera_geracao_simultanea(tmp_path):
+    cache = CacheArquivos(str(tmp_path))
+    em_execucao, maximo = [], []
+
+    def gerar():
+        em_execucao.append(1)
+        maximo.append(len(em_execucao))
+        time.sleep(0.05)
+        em_execucao.pop()
+        raise RuntimeError("falhou")
+
+    def tentar():
+        try:
+            cache.obter_ou_gerar("cd" * 32, gerar)
+        except RuntimeError:
+            pass
+
+    threads = [threading.Thread(target=tentar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.03)
+    for thread in threads:
+        thread.join()
+
+    assert len(maximo) == 4 and max(maximo) == 1
+    assert cache._gerando == {}
+
+
+def test_chave_muda_com_o_contrato():
+    cliente = SimpleNamespace(nome="Ana", cpf="1")
+    contrato = SimpleNamespace(id=1, titulo="Plano", data_atualizacao="2026-01-01", cliente=cliente)
+    chave = chave_pdf_contrato(contrato)
+    assert chave == chave_pdf_contrato(contrato)
+
+    contrato.data_atualizacao = "2026-02-01"
+    assert chave_pdf_contrato(contrato) != chave
+    assert chave_pdf_contrato(contrato, "<p>{{cliente_nome}}</p>") != chave_pdf_contrato(contrato)
+
+
+def test_arquivo_com_etag_304_e_range(tmp_path):
+    cache = CacheArquivos(str(tmp_path))
+    chave = chave_conteudo("contrato", 1)
+    caminho = cache.gravar(chave, b"0123456789")
+
+    app = FastAPI()
+
+    @app.get("/pdf")
+    def pdf(request: Request):
+        return resposta_arquivo_com_etag(request, caminho, etag_de_chave(chave), "application/pdf", "c.pdf")
+
+    client = TestClient(app)
+    resposta = client.get("/pdf")
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] == etag_de_chave(chave)
+    assert resposta.content == b"0123456789"
+
+    assert client.get("/pdf", headers={"If-None-Match": resposta.headers["etag"]}).status_code == 304
+
+    parcial = client.get("/pdf", headers={"Range": "bytes=2-4"})
+    assert parcial.status_code == 206
+    assert parcial.content == b"234"
@@ -24,3 +24,35 @@ def test_listar_clientes_ativos(db_session):
     service = ClienteService(db_session)
     clientes = service.listar_clientes_ativos()
     assert isinstance(clientes, list)
+
+
+def test_listagem_nao_consulta_por_cliente(db_session):
+    from sqlalchemy import event
+
+    service = ClienteService(db_session)
+    for _ in range(3):
+        token_int = uuid.uuid4().int
+        service.criar_cliente(ClienteCreate(
+            nome="Maria Souza",
+            email=f"maria_{token_int % 10**8}@example.com",
+            telefone="123456789",
+            cpf=f"{token_int % 10**11:011d}",
+            endereco="Rua B, 45"
+        ))
+
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        clientes = service.listar_clientes_ativos()
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+
+    assert len(clientes) >= 3
+    # clientes + produtos (selectinload) + arquivos + planos, em lotes de 500
+    lotes = -(-len(clientes) // 500)
+    assert len(consultas) <= 1 + 3 * lotes
@@ -0,0 +1,74 @@
+import pytest
+
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.clientes.repository import ClienteRepository
+from crm_modules.clientes.search import indice_clientes, normalizar, tokens_busca
+
+
+@pytest.fixture()
+def sessao(engine_teste, sessao_teste):
+    with engine_teste.begin() as conn:
+        indice_clientes.criar_estrutura(conn)
+    return sessao_teste
+
+
+def _cliente(**kwargs):
+    dados = dict(telefone="11999999999", endereco="Rua das Flores, 10", status_contrato="nenhum")
+    dados.update(kwargs)
+    return ClienteModel(**dados)
+
+
+def test_normalizacao_remove_acentos():
+    assert normalizar("João Conceição") == "joao conceicao"
+    assert tokens_busca("123.456.789-00") == ["12345678900"]
+
+
+def test_busca_por_prefixo_sem_acento(sessao):
+    sessao.add_all([
+        _cliente(nome="João da Silva", email="joao@example.com", cpf="111.222.333-44", username="jsilva"),
+        _cliente(nome="Maria Souza", email="maria@example.com", cpf="555.666.777-88", bairro="São João"),
+    ])
+    sessao.commit()
+    repo = ClienteRepository(sessao)
+
+    ids, total = repo.search_ids("joa sil")
+    assert total == 1
+    assert repo.get_by_ids(ids)[0].nome == "João da Silva"
+
+    _, total = repo.search_ids("111.222")
+    assert total == 1
+
+    ids, total = repo.search_ids("joao", field="endereco")
+    assert total == 1
+    assert repo.get_by_ids(ids)[0].nome == "Maria Souza"
+
+
+def test_indice_acompanha_atualizacao(sessao):
+    cliente = _cliente(nome="Pedro Alves", email="contato1@example.com", cpf="99988877766")
+    sessao.add(cliente)
+    sessao.commit()
+    repo = ClienteRepository(sessao)
+    assert repo.search_ids("pedro")[1] == 1
+
+    cliente.nome = "Paulo Alves"
+    sessao.commit()
+    assert repo.search_ids("pedro")[1] == 0
+    assert repo.search_ids("paulo")[1] == 1
+
+    sessao.delete(cliente)
+    sessao.commit()
+    assert repo.search_ids("paulo")[1] == 0
+
+
+def test_sem_indice_gravar_nao_cria_estrutura(sessao_teste):
+    sessao_teste.add(_cliente(nome="Ana Lúcia", email="ana@example.com", cpf="12312312312"))
+    sessao_teste.commit()
+    assert not indice_clientes.disponivel(sessao_teste.connection())
+    assert ClienteRepository(sessao_teste).search_ids("lucia") is None
+
+
+def test_reconstruir_indice(sessao):
+    sessao.add(_cliente(nome="Ana Lúcia", email="ana@example.com", cpf="12312312312"))
+    sessao.commit()
+    assert indice_clientes.reconstruir(sessao.connection()) == 1
+    assert ClienteRepository(sessao).search_ids("lucia")[1] == 1
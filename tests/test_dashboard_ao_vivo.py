@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+
+from crm_core.events.bus import EventBus
+from crm_core.events.events import ContratoStatusChangedEvent, FaturaPaidEvent
+from crm_modules.dashboard.ao_vivo import PainelAoVivo
+
+
+def _mensagem(texto: str):
+    evento, dados = texto.strip().split("\n")
+    return evento.removeprefix("event: "), json.loads(dados.removeprefix("data: "))
+
+
+def test_eventos_juntados_num_calculo_para_todas_as_conexoes():
+    bus = EventBus()
+    contratos = {"assinado": 0}
+    chamadas = {"contratos": 0, "faturamento": 0}
+
+    def calcular_contratos():
+        chamadas["contratos"] += 1
+        return {"assinado": contratos["assinado"], "total": 3}
+
+    def calcular_faturamento():
+        chamadas["faturamento"] += 1
+        return {"faturas_pendentes": 2}
+
+    painel = PainelAoVivo(bus, {"contratos": calcular_contratos, "faturamento": calcular_faturamento}, janela=0.05)
+
+    async def cenario():
+        abas = [painel.assinar() for _ in range(5)]
+        snapshots = [_mensagem(await anext(aba)) for aba in abas]
+        assert snapshots[0] == ("snapshot", {"contratos": {"assinado": 0, "total": 3},
+                                             "faturamento": {"faturas_pendentes": 2}})
+
+        def publicar():
+            contratos["assinado"] = 10
+            for i in range(10):
+                bus.publish(ContratoStatusChangedEvent(i, i, "assinado"))
+
+        thread = threading.Thread(target=publicar)
+        thread.start()
+        thread.join()
+        deltas = [_mensagem(await asyncio.wait_for(anext(aba), 2)) for aba in abas]
+        for aba in abas:
+            await aba.aclose()
+        return deltas
+
+    deltas = asyncio.run(cenario())
+    assert deltas == [("delta", {"contratos": {"assinado": 10}})] * 5
+    assert chamadas == {"contratos": 2, "faturamento": 1}
+    assert painel.conexoes == 0
+
+
+def test_sem_conexoes_recalcula_so_ao_abrir():
+    bus = EventBus()
+    chamadas = []
+    painel = PainelAoVivo(bus, {"faturamento": lambda: chamadas.append(1) or {"n": len(chamadas)}}, janela=0.01)
+
+    async def abrir():
+        aba = painel.assinar()
+        mensagem = _mensagem(await anext(aba))
+        await aba.aclose()
+        return mensagem
+
+    asyncio.run(abrir())
+    for i in range(50):
+        bus.publish(FaturaPaidEvent(i, 1, 10.0))
+    assert asyncio.run(abrir()) == ("snapshot", {"faturamento": {"n": 2}})
+
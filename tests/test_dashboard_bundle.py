@@ -0,0 +1,63 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from crm_core.utils.etag import resposta_json_com_etag
+from crm_modules.dashboard.metricas import ConsolidadorMetricas
+from crm_modules.dashboard.service import DashboardService
+
+
+def _contar_consultas(session):
+    consultas = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    return consultas
+
+
+def test_bundle_igual_aos_widgets_com_menos_consultas(sessao_dashboard, hoje):
+    session = sessao_dashboard
+    ConsolidadorMetricas(session).consolidar(agora=hoje)
+    service = DashboardService(session)
+    consultas = _contar_consultas(session)
+
+    bundle = DashboardService.get_bundle.sem_cache(service, top_clientes=10)
+    assert len(consultas) <= 5
+
+    assert bundle["summary"] == DashboardService.get_summary.sem_cache(service)
+    assert bundle["charts"]["revenue"] == service.get_revenue_chart_data()
+    assert bundle["charts"]["clients"] == service.get_clients_chart()
+    assert bundle["charts"]["orders_status"] == DashboardService.get_orders_chart_data.sem_cache(service)
+    assert bundle["charts"]["contracts_status"] == DashboardService.get_contracts_status_chart.sem_cache(service)
+    assert bundle["charts"]["top_clients"] == service.get_top_clients_chart(limit=10)
+    assert bundle["charts"]["revenue_by_plan"] == DashboardService.get_revenue_by_plan_chart.sem_cache(service)
+
+
+def test_bundle_sem_consolidacao_conta_status_uma_vez(sessao_dashboard):
+    session = sessao_dashboard
+    consultas = _contar_consultas(session)
+    bundle = DashboardService.get_bundle.sem_cache(DashboardService(session))
+
+    assert bundle["summary"]["total_clients"] == 2
+    assert bundle["summary"]["pending_orders"] == 1
+    assert bundle["charts"]["orders_status"]["datasets"][0]["data"] == [1, 0, 0]
+    assert sum("status_servico" in sql and "GROUP BY" in sql for sql in consultas) == 1
+
+
+def test_etag_e_304():
+    app = FastAPI()
+    dados = {"valor": 1}
+
+    @app.get("/bundle")
+    def bundle(request: Request):
+        return resposta_json_com_etag(request, dados)
+
+    client = TestClient(app)
+    resposta = client.get("/bundle")
+    etag = resposta.headers["etag"]
+    assert resposta.status_code == 200 and resposta.json() == {"valor": 1}
+
+    assert client.get("/bundle", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/bundle", headers={"If-None-Match": f'"outro", W/{etag}'}).status_code == 304
+
+    dados["valor"] = 2
+    resposta = client.get("/bundle", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200 and resposta.headers["etag"] != etag
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from crm_core.events.bus import DESCARTAR_ANTIGO, DESCARTAR_NOVO, EventBus
+from crm_core.events.events import ClientCreatedEvent
+
+
+def test_erro_no_handler_nao_chega_a_quem_publica():
+    bus = EventBus()
+    recebidos = []
+
+    def quebra(evento):
+        raise RuntimeError("falhou")
+
+    assinatura = bus.subscribe("ClientCreatedEvent", quebra)
+    bus.subscribe(ClientCreatedEvent, lambda evento: recebidos.append(evento.data["client_id"]))
+
+    bus.publish(ClientCreatedEvent(1, "Ana"))
+
+    assert recebidos == [1]
+    assert assinatura.metricas()["erros"] == 1
+    assert "falhou" in assinatura.metricas()["ultimo_erro"]
+
+
+def test_handler_em_fila_roda_fora_de_quem_publica():
+    bus = EventBus()
+    threads = []
+
+    def lento(evento):
+        time.sleep(0.1)
+        threads.append(threading.current_thread().name)
+
+    bus.subscribe(ClientCreatedEvent, lento, em_fila=True)
+    inicio = time.monotonic()
+    bus.publish(ClientCreatedEvent(1, "Ana"))
+    assert time.monotonic() - inicio < 0.05
+
+    assert bus.aguardar(timeout=2)
+    assert threads and threads[0] != threading.current_thread().name
+    metricas = bus.metricas()[0]
+    assert metricas["entregues"] == 1 and metricas["duracao"]["max_ms"] >= 100
+    bus.parar()
+
+
+def test_lotes_e_handler_async():
+    bus = EventBus()
+    lotes = []
+    assincronos = []
+
+    async def registrar(evento):
+        assincronos.append(evento.data["client_id"])
+
+    bus.subscribe(ClientCreatedEvent, lambda eventos: lotes.append(len(eventos)), lote=500, espera_lote=0.2)
+    bus.subscribe(ClientCreatedEvent, registrar)
+    for i in range(1200):
+        bus.publish(ClientCreatedEvent(i, "x"))
+
+    assert bus.aguardar(timeout=5)
+    assert sum(lotes) == 1200 and max(lotes) <= 500 and len(lotes) <= 4
+    assert sorted(assincronos) == list(range(1200))
+    bus.parar()
+
+
+def test_politicas_de_fila_cheia():
+    bus = EventBus()
+    liberar = threading.Event()
+    novos, antigos = [], []
+
+    def esperar_e_guardar(destino):
+        def handler(evento):
+            liberar.wait(2)
+            destino.append(evento.data["client_id"])
+        return handler
+
+    novo = bus.subscribe(ClientCreatedEvent, esperar_e_guardar(novos), em_fila=True, max_fila=2, politica=DESCARTAR_NOVO)
+    antigo = bus.subscribe(ClientCreatedEvent, esperar_e_guardar(antigos), em_fila=True, max_fila=2,
+                           politica=DESCARTAR_ANTIGO)
+    bus.publish(ClientCreatedEvent(0, "x"))
+    time.sleep(0.1)  # o worker pega o primeiro e fica esperando
+    for i in range(1, 6):
+        bus.publish(ClientCreatedEvent(i, "x"))
+    liberar.set()
+
+    assert bus.aguardar(timeout=2)
+    assert novos == [0, 1, 2] and novo.metricas()["descartados"] == 3
+    assert antigos == [0, 4, 5] and antigo.metricas()["descartados"] == 3
+    bus.parar()
@@ -0,0 +1,67 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from crm_core.utils.exceptions import ValidationException
+from crm_core.utils.exportacao import exportar
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.faturamento.api import COLUNAS_EXPORTACAO_FATURAS
+from crm_modules.faturamento.models import FaturaModel
+from crm_modules.faturamento.repository import FaturamentoRepository
+
+
+@pytest.fixture()
+def fabrica(fabrica_teste):
+    session = fabrica_teste()
+    cliente = ClienteModel(nome="Ana Lima", email="ana@example.com", cpf="12345678901",
+                           telefone="11999999999", endereco="Rua C, 1")
+    session.add(cliente)
+    session.flush()
+    session.add_all([
+        FaturaModel(cliente_id=cliente.id, numero_fatura=f"FAT-{i:04d}", valor_total=100.0 + i,
+                    data_vencimento=date(2024, 1 + i % 12, 10), status="pago" if i % 3 == 0 else "pendente")
+        for i in range(250)
+    ])
+    session.commit()
+    session.close()
+    return fabrica_teste
+
+
+def _baixar(fabrica, **filtros):
+    app = FastAPI()
+
+    @app.get("/exportar")
+    def rota():
+        return exportar(
+            "csv", "faturas", COLUNAS_EXPORTACAO_FATURAS,
+            lambda session: FaturamentoRepository(session).query_exportacao_faturas(**filtros),
+            lote=50, session_factory=fabrica,
+        )
+
+    resposta = TestClient(app).get("/exportar")
+    assert resposta.status_code == 200
+    assert resposta.headers["content-disposition"] == "attachment; filename=faturas.csv"
+    return list(csv.reader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+
+
+def test_exporta_todas_as_linhas_em_lotes(fabrica):
+    linhas = _baixar(fabrica)
+    assert linhas[0][:4] == ["ID", "Número", "Cliente ID", "Cliente"]
+    assert len(linhas) == 251
+    assert linhas[1][1] == "FAT-0249"
+    assert {linha[3] for linha in linhas[1:]} == {"Ana Lima"}
+
+
+def test_exportacao_aplica_filtros(fabrica):
+    linhas = _baixar(fabrica, status="pago", vencimento_ate=date(2024, 6, 30))
+    assert len(linhas) > 1
+    assert all(linha[8] == "pago" for linha in linhas[1:])
+
+
+def test_formato_invalido():
+    with pytest.raises(ValidationException):
+        exportar("pdf", "faturas", COLUNAS_EXPORTACAO_FATURAS, lambda session: None)
@@ -0,0 +1,43 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from crm_modules.servidores.fanout import consultar_servidores, mesclar
+
+SERVIDORES = [
+    SimpleNamespace(id=1, nome="Centro", ip="10.0.0.1", tipo_conexao="mikrotik"),
+    SimpleNamespace(id=2, nome="Bairro", ip="10.0.0.2", tipo_conexao="mikrotik"),
+    SimpleNamespace(id=3, nome="OLT", ip="10.0.0.3", tipo_conexao="huawei"),
+    SimpleNamespace(id=4, nome="Serra", ip="10.0.0.4", tipo_conexao="mikrotik"),
+]
+
+
+def test_consulta_em_paralelo_com_timeout_e_erro_por_servidor():
+    liberar = threading.Event()
+
+    def operacao(servidor):
+        if servidor.id == 2:
+            raise ConnectionRefusedError("conexão recusada")
+        if servidor.id == 4:
+            liberar.wait(5)
+            return []
+        time.sleep(0.2)
+        return [{"name": f"cliente{servidor.id}"}]
+
+    inicio = time.monotonic()
+    resultados = consultar_servidores(SERVIDORES, operacao, timeout=0.5)
+    decorrido = time.monotonic() - inicio
+    liberar.set()
+
+    # Dois servidores de 0,2s em paralelo e um travado limitado pelo timeout
+    assert decorrido < 1.0
+    assert [r.ok for r in resultados] == [True, False, True, False]
+    assert resultados[1].erro == "conexão recusada"
+    assert "Tempo esgotado" in resultados[3].erro
+
+    mesclado = mesclar(resultados)
+    assert mesclado["itens"] == [
+        {"name": "cliente1", "servidor_id": 1, "servidor_nome": "Centro"},
+        {"name": "cliente3", "servidor_id": 3, "servidor_nome": "OLT"},
+    ]
+    assert [e["servidor_id"] for e in mesclado["erros"]] == [2, 4]
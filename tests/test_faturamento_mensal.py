@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.faturamento.models import FaturaModel
+from crm_modules.faturamento.service import FaturamentoService, data_vencimento_no_mes
+from crm_modules.planos.models import PlanoModel
+
+
+@pytest.fixture()
+def session(sessao_teste):
+    session = sessao_teste
+    plano = PlanoModel(nome="100 Mega", velocidade_download=100, velocidade_upload=50, valor_mensal=99.9)
+    session.add(plano)
+    session.flush()
+    session.add_all([
+        ClienteModel(nome=f"Cliente {i}", email=f"c{i}@example.com", cpf=f"{i:011d}", telefone="11999999999",
+                     endereco="Rua A, 1", plano_id=plano.id, valor_mensal=99.9, dia_vencimento=dia,
+                     ativo=i != 4)
+        for i, dia in enumerate([5, 10, 30, 31, 15], start=1)
+    ])
+    session.commit()
+    return session
+
+
+def test_vencimento_em_mes_curto_vai_para_o_ultimo_dia():
+    assert data_vencimento_no_mes(2025, 2, 31) == date(2025, 2, 28)
+    assert data_vencimento_no_mes(2024, 2, 30) == date(2024, 2, 29)
+    assert data_vencimento_no_mes(2024, 3, 31) == date(2024, 3, 31)
+
+
+def test_gera_em_lote_sem_duplicar(session):
+    # Fatura avulsa vencendo no mês não impede a mensal; a mensal cancelada sim (número único)
+    session.add_all([
+        FaturaModel(cliente_id=2, numero_fatura="AVULSA-1", valor_total=50.0, data_vencimento=date(2025, 2, 10)),
+        FaturaModel(cliente_id=5, numero_fatura="FAT-2025-02-5", valor_total=99.9,
+                    data_vencimento=date(2025, 2, 15), ativo=False),
+    ])
+    session.commit()
+
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: comandos.append(args[2]))
+    resumo = FaturamentoService(repository_session=session).gerar_faturas_mensais(2, 2025, lote=2)
+
+    assert resumo["clientes_faturaveis"] == 4
+    assert resumo["faturas_criadas"] == 3
+    assert resumo["ja_existentes"] == 1
+    assert resumo["vencimentos_ajustados"] == 1
+    # Clientes, faturas existentes e dois lotes de INSERT
+    assert len([c for c in comandos if c.lstrip().upper().startswith(("SELECT", "INSERT"))]) == 4
+
+    vencimentos = dict(session.query(FaturaModel.numero_fatura, FaturaModel.data_vencimento).all())
+    assert vencimentos["FAT-2025-02-3"] == date(2025, 2, 28)
+    assert vencimentos["FAT-2025-02-2"] == date(2025, 2, 10)
+    assert "FAT-2025-02-4" not in vencimentos
+
+    segunda = FaturamentoService(repository_session=session).gerar_faturas_mensais(2, 2025)
+    assert segunda["faturas_criadas"] == 0
+    assert segunda["ja_existentes"] == 4
+
+
+def test_banco_sem_returning_rele_os_ids(session, monkeypatch):
+    # Ex.: MySQL: INSERT sem RETURNING/ON CONFLICT e ids relidos por numero_fatura
+    monkeypatch.setattr(session.get_bind().dialect, "name", "mysql")
+    comandos = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: comandos.append(args[2]))
+    resumo = FaturamentoService(repository_session=session).gerar_faturas_mensais(2, 2025, lote=3)
+
+    criadas = dict(session.query(FaturaModel.numero_fatura, FaturaModel.id).all())
+    assert resumo["faturas_criadas"] == 4
+    assert resumo["faturas"] == [criadas[f"FAT-2025-02-{i}"] for i in (1, 2, 3, 5)]
+    inserts = [c.upper() for c in comandos if c.lstrip().upper().startswith("INSERT")]
+    assert inserts and not any("RETURNING" in c or "ON CONFLICT" in c for c in inserts)
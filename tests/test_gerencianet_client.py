@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from crm_core.utils.exceptions import ValidationException
+from crm_modules.faturamento.gerencianet_client import GerencianetClient
+from crm_modules.faturamento.gerencianet_mock import ServidorGerencianetFalso
+
+
+@pytest.fixture()
+def servidor():
+    with ServidorGerencianetFalso() as falso:
+        yield falso
+
+
+def _cliente(servidor, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return GerencianetClient("id", "segredo", base_url=servidor.url, **kwargs)
+
+
+def _gerar(cliente):
+    return cliente.gerar_boleto("Ana", "123.456.789-01", "ana@example.com", 99.9, date(2026, 11, 10), "FAT-1")
+
+
+def test_reaproveita_conexao_e_token(servidor):
+    cliente = _cliente(servidor)
+    assert servidor.requisicoes == 0  # nada de autenticar no construtor
+
+    boleto = _gerar(cliente)
+    for _ in range(5):
+        assert cliente.consultar_boleto(boleto["charge_id"])["status"] == "waiting"
+    assert cliente.cancelar_boleto(boleto["charge_id"]) is True
+
+    assert boleto["linha_digitavel"]
+    assert servidor.tokens_emitidos == 1
+    assert servidor.conexoes == 1
+    cliente.fechar()
+
+
+def test_repete_5xx_so_quando_e_seguro(servidor):
+    cliente = _cliente(servidor, max_tentativas=3)
+    boleto = _gerar(cliente)
+
+    servidor.falhar(503, 502)
+    assert cliente.consultar_boleto(boleto["charge_id"])["charge_id"] == boleto["charge_id"]
+
+    # Criar cobrança não é idempotente: um 5xx não é repetido
+    servidor.falhar(503)
+    with pytest.raises(ValidationException):
+        _gerar(cliente)
+    assert len(servidor.cobrancas) == 1
+
+    servidor.falhar(503, 503, 503)
+    with pytest.raises(ValidationException):
+        cliente.consultar_boleto(boleto["charge_id"])
+    cliente.fechar()
+
+
+def test_renova_token_revogado_e_perto_de_expirar(servidor):
+    cliente = _cliente(servidor)
+    boleto = _gerar(cliente)
+    servidor.revogar_tokens()
+    cliente.consultar_boleto(boleto["charge_id"])
+    assert servidor.tokens_emitidos == 2
+
+    # Validade menor que a margem de renovação: cada chamada pede token novo
+    servidor.validade_token = int(cliente.token_margem / 2)
+    cliente._invalidar_token()
+    cliente.consultar_boleto(boleto["charge_id"])
+    cliente.consultar_boleto(boleto["charge_id"])
+    assert servidor.tokens_emitidos == 4
+    cliente.fechar()
+
+
+def test_timeout_de_leitura(servidor):
+    servidor.latencia = 0.3
+    cliente = _cliente(servidor, timeout=(1, 0.05), max_tentativas=2)
+    with pytest.raises(ValidationException):
+        _gerar(cliente)
+    cliente.fechar()
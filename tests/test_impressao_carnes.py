@@ -0,0 +1,82 @@
+import io
+import time
+import zipfile
+from datetime import date
+
+import pytest
+
+from crm_core.cache.arquivos import CacheArquivos
+from crm_core.cache.backends import BackendMemoria
+from crm_core.cache.camadas import CacheEmCamadas
+from crm_core.utils.exceptions import ValidationException
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.contratos.infrastructure.pdf.servico import ServicoPDF
+from crm_modules.faturamento.carne_models import CarneModel, ParcelaModel
+from crm_modules.faturamento.impressao import CONCLUIDO, ImpressaoCarnes
+
+
+@pytest.fixture()
+def db(sessao_teste):
+    sessao = sessao_teste
+    for n, bairro in enumerate(["Centro", "Centro", "Boa Vista"], start=1):
+        cliente = ClienteModel(nome=f"Cliente {n}", email=f"c{n}@example.com", telefone="123", cpf=f"{n:011d}",
+                               endereco="Rua A", bairro=bairro)
+        carne = CarneModel(cliente=cliente, numero_carne=f"CARNE-{n}", valor_total=300, quantidade_parcelas=3,
+                           valor_parcela=100, data_inicio=date(2026, 1, 1), data_primeiro_vencimento=date(2026, 1, 10))
+        for mes in (1, 2, 3):
+            carne.parcelas.append(ParcelaModel(numero_parcela=mes, valor=100, data_vencimento=date(2026, mes, 10),
+                                               status="pago" if mes == 1 else "pendente"))
+        sessao.add(carne)
+    sessao.commit()
+    return sessao
+
+
+def _aguardar(impressao, lote):
+    for _ in range(200):
+        if impressao.obter(lote.id).status in (CONCLUIDO, "erro"):
+            break
+        time.sleep(0.05)
+    return impressao.obter(lote.id)
+
+
+def test_lote_zip_com_um_pdf_por_carne(db, tmp_path):
+    estado = CacheEmCamadas(backend=BackendMemoria(), local_ttl=0)
+
+    def instancia():
+        return ImpressaoCarnes(servico=ServicoPDF(workers=0), carnes_por_pedaco=1,
+                               cache=CacheArquivos(str(tmp_path / "cache")),
+                               cache_zip=CacheArquivos(str(tmp_path / "cache"), extensao=".zip"), estado=estado)
+
+    impressao, outro_worker = instancia(), instancia()
+    lote = impressao.criar_lote(db, formato="zip", mes_vencimento="2026-02", bairro="centro")
+    assert lote.total == 2
+
+    lote = _aguardar(impressao, lote)
+    assert lote.status == CONCLUIDO
+    assert lote.resumo()["progresso"] == 100.0
+    assert outro_worker.obter(lote.id).resumo() == lote.resumo()
+    caminho, _ = outro_worker.arquivo(lote.id)
+    with zipfile.ZipFile(io.BytesIO(caminho.read_bytes())) as zip_:
+        assert sorted(zip_.namelist()) == ["carne_CARNE-1.pdf", "carne_CARNE-2.pdf"]
+        assert zip_.read("carne_CARNE-1.pdf").startswith(b"%PDF")
+    assert not list((tmp_path / "cache").glob("tmp-*"))
+    impressao.parar()
+
+
+def test_lote_pdf_no_pool_de_processos_e_filtro_vazio(db, tmp_path):
+    servico = ServicoPDF(workers=1, max_fila=2, timeout=60)
+    impressao = ImpressaoCarnes(servico=servico, cache=CacheArquivos(str(tmp_path / "cache")))
+    try:
+        lote = _aguardar(impressao, impressao.criar_lote(db, formato="pdf"))
+        assert lote.status == CONCLUIDO
+        assert lote.total == 3
+        caminho, _ = impressao.arquivo(lote.id)
+        assert caminho.read_bytes().startswith(b"%PDF")
+
+        with pytest.raises(ValidationException):
+            impressao.criar_lote(db, mes_vencimento="2025-12")
+        with pytest.raises(ValidationException):
+            impressao.criar_lote(db, formato="docx")
+    finally:
+        impressao.parar()
+        servico.parar()
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.dashboard import metricas
+from crm_modules.dashboard.metricas import ConsolidadorMetricas
+from crm_modules.dashboard.models import DashboardKPI, MetricHistory
+from crm_modules.dashboard.service import DashboardService
+from crm_modules.faturamento.models import PagamentoModel
+
+
+def _linha(session, metrica, periodo, inicio: date):
+    return session.query(MetricHistory).filter_by(
+        metric_type=metrica, period=periodo, timestamp=datetime.combine(inicio, datetime.min.time())).one()
+
+
+def test_consolida_fluxos_situacoes_e_kpis(sessao_dashboard, hoje):
+    session = sessao_dashboard
+    ConsolidadorMetricas(session).consolidar(agora=hoje)
+
+    mes = metricas.inicio_mes(hoje.date())
+    mes_passado = metricas.inicio_mes(mes - timedelta(days=1))
+    assert _linha(session, metricas.RECEITA_PAGA, metricas.MENSAL, mes).value == 100.0
+    assert _linha(session, metricas.RECEITA_PAGA, metricas.MENSAL, mes_passado).value == 80.0
+    assert metricas.metadados(_linha(session, metricas.RECEITA_POR_PLANO, metricas.DIARIO, hoje.date())) == {"1": 100.0}
+
+    resumo = DashboardService.get_summary.sem_cache(DashboardService(session))
+    assert resumo["total_clients"] == 2
+    assert resumo["active_contracts"] == 2
+    assert resumo["monthly_revenue"] == 100.0
+    assert resumo["pending_orders"] == 1
+    assert resumo["avg_ticket_value"] == 100.0
+
+    grafico = DashboardService.get_top_clients_chart(DashboardService(session))
+    assert grafico["labels"] == ["Bruno", "Ana"]
+
+
+def test_atualiza_a_partir_da_marca_dagua(sessao_dashboard, hoje):
+    session = sessao_dashboard
+    ConsolidadorMetricas(session).consolidar(agora=hoje)
+
+    # Pagamento de hoje entra; registro anterior à marca d'água não é relido
+    session.add(PagamentoModel(fatura_id=1, valor_pago=20.0, metodo_pagamento="pix", data_pagamento=hoje))
+    session.commit()
+    ConsolidadorMetricas(session).consolidar(agora=hoje + timedelta(hours=1))
+
+    mes = metricas.inicio_mes(hoje.date())
+    assert _linha(session, metricas.RECEITA_PAGA, metricas.MENSAL, mes).value == 120.0
+    assert _linha(session, metricas.RECEITA_PAGA, metricas.SEMANAL, metricas.inicio_semana(hoje.date())).value == 120.0
+    assert session.query(MetricHistory).filter_by(metric_type=metricas.RECEITA_PAGA,
+                                                  period=metricas.DIARIO).count() == 2
+
+    # Pagamento lançado agora com data do mês passado (antes da marca d'água) também entra
+    mes_passado = metricas.inicio_mes(mes - timedelta(days=1))
+    session.add(PagamentoModel(fatura_id=1, valor_pago=5.0, metodo_pagamento="pix",
+                               data_pagamento=datetime.combine(mes_passado, datetime.min.time())))
+    session.commit()
+    ConsolidadorMetricas(session).consolidar(agora=hoje + timedelta(hours=2))
+    assert _linha(session, metricas.RECEITA_PAGA, metricas.MENSAL, mes_passado).value == 85.0
+
+    # Cancelamentos vêm da diferença para a foto de um dia anterior
+    session.get(ClienteModel, 1).status_servico = "cancelado"
+    session.commit()
+    ConsolidadorMetricas(session).consolidar(agora=hoje + timedelta(days=1))
+    assert metricas.metadados(metricas.ultima_foto(session, metricas.CLIENTES_STATUS))["cancelado"] == 1
+    amanha = (hoje + timedelta(days=1)).date()
+    assert _linha(session, metricas.CANCELAMENTOS, metricas.DIARIO, amanha).value == 1
+    assert session.query(MetricHistory).filter_by(metric_type=metricas.MARCA_DAGUA).count() == 1
+
+
+def test_kpis_desatualizados_voltam_ao_calculo_ao_vivo(sessao_dashboard, hoje):
+    ConsolidadorMetricas(sessao_dashboard).consolidar(agora=hoje)
+    service = DashboardService(sessao_dashboard)
+    assert service._kpis()
+    consolidado = DashboardService.get_summary.sem_cache(service)
+
+    for kpi in sessao_dashboard.query(DashboardKPI):
+        kpi.updated_at = datetime.utcnow() - timedelta(days=2)
+    sessao_dashboard.commit()
+    assert service._kpis() == {}
+    ao_vivo = DashboardService.get_summary.sem_cache(service)
+    assert ao_vivo["avg_ticket_value"] == 0.0
+    assert ao_vivo["monthly_revenue"] == consolidado["monthly_revenue"] == 100.0
+
+    # As fotos de situação são da mesma consolidação: também não valem mais
+    sessao_dashboard.add(ClienteModel(nome="Carla", email="carla@example.com", cpf="3", telefone="3",
+                                      endereco="Rua C", plano_id=1))
+    sessao_dashboard.commit()
+    bundle = DashboardService.get_bundle.sem_cache(service)
+    assert bundle["summary"]["total_clients"] == 3
+    assert sum(bundle["charts"]["contracts_status"]["datasets"][0]["data"]) == 3
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from crm_core.outbox import CONCLUIDO, MORTO, PENDENTE, DespachanteOutbox, OutboxModel, registrar, reprocessar, tratador
+from crm_core.utils.exceptions import ValidationException
+from crm_modules.clientes.schemas import ClienteCreate
+from crm_modules.clientes.models import ClienteModel
+from crm_modules.clientes.service import ClienteService
+from crm_modules.faturamento import outbox as faturamento_outbox
+from crm_modules.faturamento.carne_models import CarneModel, ParcelaModel
+from crm_modules.faturamento.gerencianet_client import GerencianetClient
+from crm_modules.faturamento.gerencianet_mock import ServidorGerencianetFalso
+
+chamadas = []
+falhar = {"ativo": True}
+
+
+@tratador("teste.instavel", sensiveis=("senha",))
+def _instavel(db, payload):
+    chamadas.append(payload["n"])
+    if falhar["ativo"]:
+        raise RuntimeError("fora do ar")
+
+
+@pytest.fixture()
+def fabrica(fabrica_teste):
+    chamadas.clear()
+    falhar["ativo"] = True
+    return fabrica_teste
+
+
+def test_mensagem_so_existe_se_o_commit_acontecer(fabrica):
+    db = fabrica()
+    registrar(db, "teste.instavel", {"n": 1})
+    db.rollback()
+    assert db.query(OutboxModel).count() == 0
+
+    registrar(db, "teste.instavel", {"n": 1}, chave="cliente:1")
+    registrar(db, "teste.instavel", {"n": 2}, chave="cliente:1")
+    db.commit()
+    registrar(db, "teste.instavel", {"n": 3}, chave="cliente:1")
+    db.commit()
+
+    mensagens = db.query(OutboxModel).all()
+    assert len(mensagens) == 1
+    assert json.loads(mensagens[0].payload) == {"n": 3}
+    db.close()
+
+
+def test_falhas_viram_mensagem_morta_e_reprocessar_conclui(fabrica):
+    despachante = DespachanteOutbox(fabrica, max_tentativas=3, backoff_base=0, backoff_max=0)
+    db = fabrica()
+    mensagem = registrar(db, "teste.instavel", {"n": 7, "senha": "s3gredo"})
+    db.commit()
+
+    despachante.drenar()
+    db.refresh(mensagem)
+    assert chamadas == [7, 7, 7]
+    assert mensagem.status == MORTO
+    assert mensagem.tentativas == 3
+    assert "fora do ar" in mensagem.ultimo_erro
+    pendente = registrar(db, "teste.instavel", {"n": 8})
+    db.commit()
+    assert pendente.status == PENDENTE
+    with pytest.raises(ValidationException):
+        reprocessar(db, pendente.id)
+    db.delete(pendente)
+    db.commit()
+
+    falhar["ativo"] = False
+    reprocessar(db, mensagem.id)
+    despachante.drenar()
+    db.refresh(mensagem)
+    assert mensagem.status == CONCLUIDO
+    assert json.loads(mensagem.payload) == {"n": 7}
+    despachante.parar()
+    db.close()
+
+
+def test_backoff_exponencial_limitado():
+    despachante = DespachanteOutbox(lambda: None, backoff_base=5, backoff_max=60)
+    assert 4 <= despachante.atraso(1) <= 6
+    assert 16 <= despachante.atraso(3) <= 24
+    assert 48 <= despachante.atraso(10) <= 72
+
+
+def test_concorrencia_limitada_por_destino(fabrica):
+    ativos, maximo = {}, {}
+    lock = threading.Lock()
+
+    @tratador("teste.lento")
+    def _lento(db, payload):
+        destino = payload["destino"]
+        with lock:
+            ativos[destino] = ativos.get(destino, 0) + 1
+            maximo[destino] = max(maximo.get(destino, 0), ativos[destino])
+        time.sleep(0.05)
+        with lock:
+            ativos[destino] -= 1
+
+    despachante = DespachanteOutbox(fabrica, workers=8, concorrencia={"roteador": 1}, concorrencia_padrao=3)
+    db = fabrica()
+    for _ in range(4):
+        registrar(db, "teste.lento", {"destino": "roteador:1"}, destino="roteador:1")
+        registrar(db, "teste.lento", {"destino": "api"}, destino="api")
+    db.commit()
+
+    resultado = despachante.drenar()
+    assert resultado[CONCLUIDO] == 8
+    assert maximo == {"roteador:1": 1, "api": 3}
+    despachante.parar()
+    db.close()
+
+
+def test_dois_despachantes_nao_reservam_a_mesma_mensagem(fabrica):
+    falhar["ativo"] = False
+    db = fabrica()
+    for n in range(20):
+        registrar(db, "teste.instavel", {"n": n})
+    db.commit()
+
+    despachantes = [DespachanteOutbox(fabrica, lote=20, workers=4) for _ in range(2)]
+    threads = [threading.Thread(target=d.drenar) for d in despachantes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(chamadas) == list(range(20))
+    assert {m.tentativas for m in db.query(OutboxModel)} == {1}
+    for despachante in despachantes:
+        despachante.parar()
+    db.close()
+
+
+def test_cadastro_de_cliente_enfileira_sincronizacao_mikrotik(fabrica):
+    db = fabrica()
+    cliente = ClienteService(db).criar_cliente(ClienteCreate(
+        nome="Ana", email="ana@example.com", telefone="123456789", cpf="12345678901", endereco="Rua A, 1",
+        username="ana.pppoe", password="abc123",
+    ))
+
+    mensagem = db.query(OutboxModel).one()
+    assert mensagem.tipo == "mikrotik.sincronizar_cliente"
+    assert mensagem.destino == "mikrotik:padrao"
+    assert mensagem.chave_idempotencia == f"mikrotik.sincronizar_cliente:{cliente.id}"
+    assert json.loads(mensagem.payload)["username"] == "ana.pppoe"
+    db.close()
+
+
+def test_boleto_sem_resposta_nao_e_gerado_de_novo(fabrica, monkeypatch):
+    db = fabrica()
+    carne = CarneModel(cliente=ClienteModel(nome="Ana", email="ana@example.com", telefone="1", cpf="12345678901",
+                                            endereco="Rua A"),
+                       numero_carne="CARNE-1", valor_total=100, quantidade_parcelas=1, valor_parcela=100,
+                       data_inicio=date(2026, 1, 1), data_primeiro_vencimento=date(2026, 1, 10))
+    carne.parcelas.append(ParcelaModel(numero_parcela=1, valor=100, data_vencimento=date(2026, 1, 10)))
+    db.add(carne)
+    db.flush()
+    faturamento_outbox.enfileirar_boleto_parcela(db, carne.parcelas[0].id)
+    db.commit()
+
+    with ServidorGerencianetFalso() as servidor:
+        cliente = GerencianetClient("id", "segredo", base_url=servidor.url, timeout=(1, 0.1), backoff_base=0)
+        cliente._get_headers()
+        servidor.latencia = 0.3  # a cobrança é criada, mas a resposta chega depois do timeout
+        monkeypatch.setattr(faturamento_outbox, "obter_cliente_gerencianet", lambda: cliente)
+        despachante = DespachanteOutbox(fabrica, max_tentativas=5, backoff_base=0, backoff_max=0)
+
+        despachante.drenar()
+        mensagem = db.query(OutboxModel).one()
+        assert mensagem.status == MORTO and "sem resposta" in mensagem.ultimo_erro
+
+        reprocessar(db, mensagem.id)
+        despachante.drenar()
+        db.expire_all()
+        assert db.query(OutboxModel).one().status == MORTO
+        time.sleep(0.4)
+        assert len(servidor.cobrancas) == 1
+        cliente.fechar()
+    db.close()
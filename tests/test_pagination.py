@@ -0,0 +1,72 @@
+import pytest
+
+from crm_core.db.pagination import count_cache
+from crm_core.utils.exceptions import ValidationException
+from crm_modules.produtos.models import ProdutoModel
+from crm_modules.produtos.repository import ProdutoRepository
+
+
+@pytest.fixture()
+def repo(sessao_teste):
+    session = sessao_teste
+    # Preços repetidos e nulos para exercitar o desempate por id
+    precos = [10.0, 20.0, 10.0, None, 30.0, 20.0, None, 10.0]
+    session.add_all([
+        ProdutoModel(nome=f"Produto {i}", tipo="servico", preco=p or 0, preco_custo=p,
+                     categoria="geral", unidade="un")
+        for i, p in enumerate(precos)
+    ])
+    session.commit()
+    count_cache.clear()
+    return ProdutoRepository(session)
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_keyset_percorre_todos_sem_repetir(repo, sort_order):
+    vistos, cursor = [], None
+    while True:
+        pagina = repo.get_produtos_keyset(sort_by="preco_custo", sort_order=sort_order, cursor=cursor, limit=3)
+        vistos.extend(p.id for p in pagina.items)
+        assert pagina.total == 8
+        if not pagina.has_more:
+            break
+        cursor = pagina.next_cursor
+
+    assert sorted(vistos) == list(range(1, 9))
+    assert len(vistos) == len(set(vistos))
+    # Nulos ficam no fim em ambas as direções
+    ultimos = {p.id for p in repo.session.query(ProdutoModel).filter(ProdutoModel.preco_custo.is_(None))}
+    assert set(vistos[-2:]) == ultimos
+
+
+def test_total_em_cache_e_descartado_ao_gravar(repo):
+    assert repo.get_produtos_keyset(limit=2).total == 8
+    repo.session.add(ProdutoModel(nome="Novo", tipo="servico", preco=5.0, categoria="geral", unidade="un"))
+    repo.session.commit()
+    assert repo.get_produtos_keyset(limit=2).total == 9
+
+
+def test_cursor_de_outra_ordenacao_e_rejeitado(repo):
+    pagina = repo.get_produtos_keyset(sort_by="nome", limit=2)
+    with pytest.raises(ValidationException):
+        repo.get_produtos_keyset(sort_by="preco_custo", cursor=pagina.next_cursor, limit=2)
+    with pytest.raises(ValidationException):
+        repo.get_produtos_keyset(sort_by="nome", cursor="lixo", limit=2)
+
+
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_paginas_por_offset_seguem_a_ordem_do_cursor(repo, sort_order):
+    # A página 1 vem do cursor e as seguintes do OFFSET: empates devem cair na mesma ordem
+    keyset, cursor = [], None
+    while True:
+        pagina = repo.get_produtos_keyset(sort_by="preco_custo", sort_order=sort_order, cursor=cursor, limit=3)
+        keyset.extend(p.id for p in pagina.items)
+        if not pagina.has_more:
+            break
+        cursor = pagina.next_cursor
+
+    offset = []
+    for page in (1, 2, 3):
+        itens, _ = repo.get_produtos_com_filtros(sort_by="preco_custo", sort_order=sort_order, page=page, per_page=3)
+        offset.extend(p.id for p in itens)
+    assert offset == keyset
@@ -0,0 +1,47 @@
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from crm_modules.contratos.infrastructure.pdf.generator import ambiente_templates, compilar_template
+from crm_modules.contratos.infrastructure.pdf.servico import (
+    FilaPDFCheia,
+    ServicoPDF,
+    TempoPDFEsgotado,
+    renderizar_contrato,
+)
+
+
+def _contrato():
+    cliente = SimpleNamespace(nome="Ana", cpf="12345678901", cnpj=None, rua="Rua A", endereco=None, numero="1",
+                              bairro="Centro", cidade="Recife", estado="PE")
+    return SimpleNamespace(id=7, titulo="Plano 100 MB", valor_contrato=99.9, data_vigencia_inicio=date(2026, 1, 1),
+                           data_vigencia_fim=None, cliente=cliente)
+
+
+def test_templates_compilados_uma_vez():
+    ambiente = ambiente_templates()
+    assert ambiente.get_template("base.html") is ambiente.get_template("base.html")
+    assert compilar_template("Contrato {{ contrato_id }}") is compilar_template("Contrato {{ contrato_id }}")
+
+
+def test_pdf_gerado_no_pool_de_processos():
+    servico = ServicoPDF(workers=1, max_fila=2, timeout=60)
+    try:
+        pdf = servico.renderizar(renderizar_contrato, _contrato())
+    finally:
+        servico.parar()
+    assert pdf.startswith(b"%PDF")
+
+
+def test_fila_cheia_e_tempo_esgotado():
+    servico = ServicoPDF(workers=1, max_fila=0, timeout=60)
+    try:
+        with pytest.raises(TempoPDFEsgotado):
+            servico.renderizar(time.sleep, 1, timeout=0.2)
+        # O pedido que estourou o tempo continua no worker e ocupa a única vaga
+        with pytest.raises(FilaPDFCheia):
+            servico.submeter(time.sleep, 0)
+    finally:
+        servico.parar()
@@ -0,0 +1,73 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from crm_core.config.settings import settings
+from crm_modules.faturamento.pix import crc16, payload_pix, pix_parcela, qr_png, qr_svg
+
+
+@pytest.fixture()
+def pix_configurado(monkeypatch):
+    monkeypatch.setattr(settings, "pix_chave", "123.456.789-01")
+    monkeypatch.setattr(settings, "pix_tipo_chave", "cpf")
+    monkeypatch.setattr(settings, "pix_beneficiario", "João da Silva")
+    monkeypatch.setattr(settings, "pix_cidade", "Recife")
+
+
+def test_crc16_do_exemplo_do_manual_do_br_code():
+    assert crc16("123456789") == "29B1"
+    exemplo = ("00020126580014br.gov.bcb.pix0136123e4567-e12b-12d1-a456-426655440000"
+               "5204000053039865802BR5913Fulano de Tal6008BRASILIA62070503***6304")
+    assert crc16(exemplo) == "1D3D"
+
+
+def test_payload_das_configuracoes(pix_configurado):
+    payload = payload_pix(99.9, "CARNE1P2")
+    assert payload.startswith("000201" + "2633" + "0014br.gov.bcb.pix" + "011112345678901")
+    assert "540599.90" in payload
+    assert "5913JOAO DA SILVA" in payload and "6006RECIFE" in payload
+    assert "62120508CARNE1P2" in payload
+    assert payload[-8:-4] == "6304" and payload[-4:] == crc16(payload[:-4])
+
+
+def test_sem_chave_nao_ha_payload(monkeypatch):
+    monkeypatch.setattr(settings, "pix_chave", "")
+    parcela = SimpleNamespace(carne_id=1, numero_parcela=1, valor=10.0, pix_copia_cola="antigo")
+    assert payload_pix(10.0) is None
+    assert pix_parcela(parcela) is None
+    assert parcela.pix_copia_cola == "antigo"
+
+
+def test_payload_gravado_na_parcela_e_qr_memorizado(pix_configurado):
+    parcela = SimpleNamespace(carne_id=3, numero_parcela=2, valor=50.0, pix_copia_cola=None)
+    payload = pix_parcela(parcela)
+    assert parcela.pix_copia_cola == payload
+
+    parcela.valor = 55.0
+    assert pix_parcela(parcela) != payload
+    assert parcela.pix_copia_cola == pix_parcela(parcela)
+
+    assert qr_svg(payload) is qr_svg(payload)
+    assert qr_svg(payload).startswith("<svg")
+    assert qr_png(payload) is qr_png(payload)
+    assert qr_png(payload).startswith(b"\x89PNG")
+
+
+def test_boleto_grava_o_pix_ao_ser_criado_e_a_impressao_so_le(pix_configurado, sessao_teste):
+    from crm_modules.clientes.models import ClienteModel
+    from crm_modules.faturamento.boleto_service import BoletoService
+    from crm_modules.faturamento.carne_models import BoletoModel
+    from crm_modules.faturamento.pix import payload_boleto
+
+    sessao_teste.add(ClienteModel(id=1, nome="Ana", email="ana@example.com", cpf="1", telefone="1", endereco="Rua A"))
+    sessao_teste.commit()
+    service = BoletoService(sessao_teste, gerencianet_client=SimpleNamespace(connected=False))
+    criado = service.gerar_boleto_direto(cliente_id=1, valor=80.0, data_vencimento=date(2026, 1, 10))
+
+    boleto = sessao_teste.get(BoletoModel, criado.id)
+    assert boleto.pix_copia_cola == payload_pix(80.0, f"BOLETO{boleto.id}")
+
+    boleto.valor = 90.0
+    assert payload_boleto(boleto) == payload_pix(90.0, f"BOLETO{boleto.id}")
+    assert boleto.pix_copia_cola == payload_pix(80.0, f"BOLETO{boleto.id}")
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+from crm_modules.mikrotik.pool import RouterOSPool
+from crm_modules.mikrotik.reconciliacao import (
+    ReconciliadorPPPoE,
+    SecretDesejado,
+    calcular_diferencas,
+)
+
+
+class Promessa:
+    def __init__(self, erro=None):
+        self.erro = erro
+
+    def get(self):
+        if self.erro:
+            raise RuntimeError(self.erro)
+        return []
+
+
+class FakeSecrets:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.comandos = []
+        self.leituras = 0
+
+    def get(self, **filtros):
+        self.leituras += 1
+        return [dict(s) for s in self.secrets]
+
+    def add_async(self, **campos):
+        self.comandos.append(("add", campos))
+        return Promessa("already have such name" if campos["name"] == "duplicado" else None)
+
+    def set_async(self, **campos):
+        self.comandos.append(("set", campos))
+        return Promessa()
+
+    def remove_async(self, **campos):
+        self.comandos.append(("remove", campos))
+        return Promessa()
+
+
+class FakeApi:
+    def __init__(self, secrets):
+        self.recurso = FakeSecrets(secrets)
+
+    def get_resource(self, caminho):
+        assert caminho == "/ppp/secret"
+        return self.recurso
+
+
+def _secrets():
+    return [
+        {"id": "*1", "name": "ana", "profile": "plano_100", "disabled": "false"},
+        {"id": "*2", "name": "bruno", "profile": "default", "disabled": "false"},
+        {"id": "*3", "name": "carla", "profile": "plano_50", "disabled": "false"},
+        {"id": "*4", "name": "antigo", "profile": "default", "disabled": "false"},
+    ]
+
+
+def _desejados():
+    return {
+        "ana": SecretDesejado("ana", "plano_100"),
+        "bruno": SecretDesejado("bruno", "plano_200"),
+        "carla": SecretDesejado("carla", "plano_50", disabled=True),
+        "davi": SecretDesejado("davi", "plano_50", password="s3nha"),
+        "duplicado": SecretDesejado("duplicado", "default", password="x"),
+        "elisa": SecretDesejado("elisa", "default"),
+        "inativo": SecretDesejado("inativo", "default", disabled=True, criar_se_ausente=False),
+    }
+
+
+def test_calcula_apenas_as_diferencas():
+    diferencas = calcular_diferencas(_desejados(), _secrets())
+
+    acoes = {(a.acao, a.name): a.campos for a in diferencas.alteracoes}
+    assert acoes[("atualizar", "bruno")] == {"profile": "plano_200"}
+    assert acoes[("atualizar", "carla")] == {"disabled": "yes"}
+    assert acoes[("criar", "davi")]["password"] == "s3nha"
+    assert ("criar", "duplicado") in acoes
+    assert diferencas.em_dia == 1
+    assert diferencas.extras == ["antigo"]
+    assert diferencas.sem_senha == ["elisa"]
+    assert not any(a.acao == "remover" for a in diferencas.alteracoes)
+
+
+def test_sem_bloqueio_desejado_mantem_o_do_roteador():
+    secrets = [{"id": "*1", "name": "ana", "profile": "default", "disabled": "true"}]
+    desejados = {
+        "ana": SecretDesejado("ana", "default", disabled=None),
+        "davi": SecretDesejado("davi", "default", disabled=None, password="s3nha"),
+    }
+    diferencas = calcular_diferencas(desejados, secrets)
+
+    assert diferencas.em_dia == 1
+    assert [(a.acao, a.name) for a in diferencas.alteracoes] == [("criar", "davi")]
+    assert "disabled" not in diferencas.alteracoes[0].campos
+
+
+def _reconciliar(api, **kwargs):
+    pool = RouterOSPool(conectar=lambda *args: (SimpleNamespace(disconnect=lambda: None), api))
+    servidor = SimpleNamespace(id=1, nome="Borda", ip="10.0.0.1", usuario="admin", senha="x")
+    try:
+        return ReconciliadorPPPoE(pool=pool, lote=2).reconciliar([servidor], {1: _desejados()}, **kwargs)
+    finally:
+        pool.fechar_todas()
+
+
+def test_dry_run_nao_altera_o_roteador():
+    api = FakeApi(_secrets())
+    resumo = _reconciliar(api, dry_run=True)
+
+    assert api.recurso.leituras == 1
+    assert api.recurso.comandos == []
+    assert resumo["total_alteracoes"] == 4
+    assert resumo["servidores"][0]["alteracoes"][2]["campos"]["password"] == "***"
+
+
+def test_aplica_alteracoes_em_lote_e_reporta_erros():
+    api = FakeApi(_secrets())
+    resumo = _reconciliar(api, remover_extras=True)
+
+    servidor = resumo["servidores"][0]
+    assert api.recurso.leituras == 1
+    assert ("remove", {"id": "*4"}) in api.recurso.comandos
+    assert len(api.recurso.comandos) == 5
+    assert servidor["aplicadas"] == 4
+    assert servidor["erros"] == [{"acao": "criar", "name": "duplicado", "erro": "already have such name"}]
@@ -0,0 +1,105 @@
+import pytest
+
+from crm_modules.mikrotik.pool import PoolEsgotadoError, RouterOSPool
+
+
+class FakeApi:
+    def __init__(self, roteador):
+        self.roteador = roteador
+        self.quebrada = False
+
+    def get_resource(self, caminho):
+        api = self
+
+        class Recurso:
+            def get(self, **filtros):
+                if api.quebrada:
+                    raise ConnectionResetError("socket fechado")
+                return [{"name": api.roteador, "caminho": caminho}]
+
+        return Recurso()
+
+
+class FakePoolApi:
+    def __init__(self):
+        self.desconectada = False
+
+    def disconnect(self):
+        self.desconectada = True
+
+
+class FakeRoteador:
+    def __init__(self):
+        self.logins = 0
+        self.apis = []
+
+    def conectar(self, host, porta, usuario, senha):
+        self.logins += 1
+        api = FakeApi(host)
+        self.apis.append(api)
+        return FakePoolApi(), api
+
+
+@pytest.fixture()
+def roteador():
+    return FakeRoteador()
+
+
+@pytest.fixture()
+def pool(roteador):
+    pool = RouterOSPool(max_conexoes=2, idle_timeout=300, keepalive=60, acquire_timeout=0.1,
+                        conectar=roteador.conectar)
+    yield pool
+    pool.fechar_todas()
+
+
+def test_reutiliza_conexao_autenticada(pool, roteador):
+    for _ in range(5):
+        with pool.conexao("10.0.0.1", "admin", "x") as api:
+            api.get_resource("/ppp/secret").get()
+    assert roteador.logins == 1
+
+
+def test_limite_de_conexoes_por_roteador(pool, roteador):
+    with pool.conexao("10.0.0.1", "admin", "x"), pool.conexao("10.0.0.1", "admin", "x"):
+        with pytest.raises(PoolEsgotadoError):
+            with pool.conexao("10.0.0.1", "admin", "x"):
+                pass
+        # Outro roteador tem seu próprio limite
+        with pool.conexao("10.0.0.2", "admin", "x"):
+            pass
+    assert roteador.logins == 3
+
+
+def test_reconecta_quando_socket_cai(pool, roteador):
+    with pool.conexao("10.0.0.1", "admin", "x"):
+        pass
+    roteador.apis[0].quebrada = True
+
+    resultado = pool.executar("10.0.0.1", "admin", "x", lambda api: api.get_resource("/ppp/active").get())
+
+    assert resultado[0]["caminho"] == "/ppp/active"
+    assert roteador.logins == 2
+    assert pool.estatisticas()["admin@10.0.0.1:8728"]["ociosas"] == 1
+
+
+def test_manutencao_descarta_ociosas_quebradas_e_expiradas(pool, roteador):
+    with pool.conexao("10.0.0.1", "admin", "x"), pool.conexao("10.0.0.1", "admin", "x"):
+        pass
+    pool.keepalive = 0
+    roteador.apis[0].quebrada = True
+    pool.manter()
+    assert pool.estatisticas()["admin@10.0.0.1:8728"]["ociosas"] == 1
+
+    pool.idle_timeout = 0
+    pool.manter()
+    assert pool.estatisticas()["admin@10.0.0.1:8728"]["ociosas"] == 0
+
+
+def test_troca_de_senha_descarta_conexoes(pool, roteador):
+    with pool.conexao("10.0.0.1", "admin", "antiga"):
+        pass
+    with pool.conexao("10.0.0.1", "admin", "nova"):
+        pass
+    assert roteador.logins == 2
+    assert pool.verificar("10.0.0.1", "admin", "nova")
@@ -0,0 +1,54 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from passlib.hash import pbkdf2_sha256
+
+from crm_core.config.settings import settings
+from crm_core.security import auth_utils
+from crm_core.security.auth_utils import obter_hash_senha, verificar_senha
+from crm_modules.usuarios.models import Usuario
+from crm_modules.usuarios.service import UsuarioService
+
+
+def test_login_refaz_hash_com_custo_antigo(sessao_teste):
+    antigo = pbkdf2_sha256.using(rounds=1000).hash("senha123456")
+    sessao_teste.add(Usuario(username="ana", email="ana@example.com", senha_hash=antigo, nome_completo="Ana"))
+    sessao_teste.commit()
+
+    service = UsuarioService(repository_session=sessao_teste)
+    service.autenticar("ana", "senha123456")
+    atualizado = sessao_teste.query(Usuario).one().senha_hash
+    assert atualizado != antigo
+    assert f"${settings.senha_pbkdf2_rounds}$" in atualizado
+    assert verificar_senha("senha123456", atualizado)
+
+    service.autenticar("ana", "senha123456")
+    assert sessao_teste.query(Usuario).one().senha_hash == atualizado
+    with pytest.raises(ValueError):
+        service.autenticar("ana", "outra")
+
+
+def test_hash_limitado_ao_pool_de_senhas(monkeypatch):
+    senha_hash = obter_hash_senha("x" * 100)
+    assert verificar_senha("x" * 72, senha_hash)
+
+    ativos, maximo = [], []
+    lock = threading.Lock()
+    original = auth_utils._gerar_hash
+
+    def gerar_hash(senha):
+        with lock:
+            ativos.append(1)
+            maximo.append(len(ativos))
+        time.sleep(0.02)
+        with lock:
+            ativos.pop()
+        return original(senha)
+
+    monkeypatch.setattr(auth_utils, "_gerar_hash", gerar_hash)
+    # Mais threads de requisição que o pool: o excedente espera na fila
+    with ThreadPoolExecutor(max_workers=settings.senha_hash_max_paralelo * 3) as threads:
+        list(threads.map(obter_hash_senha, ["senha"] * settings.senha_hash_max_paralelo * 3))
+    assert max(maximo) <= settings.senha_hash_max_paralelo
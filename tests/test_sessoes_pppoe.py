@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crm_core.events.bus import EventBus
+from crm_modules.mikrotik.pool import RouterOSPool
+from crm_modules.mikrotik.sessoes import IndiceSessoesPPPoE
+
+
+class FakeRoteadores:
+    def __init__(self):
+        self.ativos = {
+            "10.0.0.1": [{"id": "*1", "name": "ana", "address": "100.64.0.10"}],
+            "10.0.0.2": [{"id": "*7", "name": "bruno", "address": "100.64.1.20"}],
+        }
+        self.fora_do_ar = set()
+        self.leituras = 0
+
+    def conectar(self, host, porta, usuario, senha):
+        roteadores = self
+
+        class Recurso:
+            def get(self, **filtros):
+                if host in roteadores.fora_do_ar:
+                    raise ConnectionRefusedError("sem rota")
+                roteadores.leituras += 1
+                return [dict(s) for s in roteadores.ativos[host]]
+
+        api = SimpleNamespace(get_resource=lambda caminho: Recurso())
+        return SimpleNamespace(disconnect=lambda: None), api
+
+
+class FakeRedis:
+    def __init__(self):
+        self.dados = {}
+
+    def get(self, chave):
+        return self.dados.get(chave)
+
+    def set(self, chave, valor, expire=None):
+        self.dados[chave] = valor
+
+
+SERVIDORES = [
+    SimpleNamespace(id=1, nome="Centro", ip="10.0.0.1", usuario="admin", senha="x"),
+    SimpleNamespace(id=2, nome="Bairro", ip="10.0.0.2", usuario="admin", senha="x"),
+]
+
+
+@pytest.fixture()
+def roteadores():
+    return FakeRoteadores()
+
+
+@pytest.fixture()
+def criar_indice(roteadores):
+    pool = RouterOSPool(acquire_timeout=0.1, conectar=roteadores.conectar)
+    indices = []
+
+    def criar(**kwargs):
+        indice = IndiceSessoesPPPoE(pool=pool, listar_servidores=lambda: SERVIDORES,
+                                    intervalo=3600, max_idade=60, **kwargs)
+        indices.append(indice)
+        return indice
+
+    yield criar
+    for indice in indices:
+        indice.parar()
+    pool.fechar_todas()
+
+
+def test_consulta_usa_o_indice_sem_reler_o_roteador(criar_indice, roteadores):
+    indice = criar_indice()
+
+    assert indice.obter("ana")["address"] == "100.64.0.10"
+    assert indice.obter("bruno")["servidor_id"] == 2
+    assert indice.obter("carla") is None
+    assert len(indice.sessoes(servidor_id=1)) == 1
+    assert roteadores.leituras == 2
+
+    roteadores.ativos["10.0.0.1"] = []
+    assert indice.obter("ana") is not None
+    assert indice.obter("ana", atualizar=True) is None
+    assert roteadores.leituras == 4
+
+
+def test_roteador_fora_do_ar_mantem_ultimo_snapshot(criar_indice, roteadores):
+    indice = criar_indice()
+    indice.atualizar()
+    roteadores.fora_do_ar.add("10.0.0.2")
+    roteadores.ativos["10.0.0.1"].append({"id": "*2", "name": "carla"})
+
+    estado = indice.atualizar()
+
+    assert indice.obter("bruno") is not None
+    assert indice.obter("carla") is not None
+    bairro = next(s for s in estado["servidores"] if s["servidor_id"] == 2)
+    assert "sem rota" in bairro["erro"]
+    assert bairro["atualizado_em"] is not None
+
+
+def test_publica_logins_conectados_e_desconectados(criar_indice, roteadores):
+    bus = EventBus()
+    recebidos = []
+    bus.subscribe("SessoesPPPoEChangedEvent", lambda evento: recebidos.append(evento.data))
+    indice = criar_indice(event_bus=bus)
+
+    indice.atualizar()
+    indice.atualizar()
+    roteadores.ativos["10.0.0.1"] = [{"id": "*2", "name": "carla"}]
+    indice.atualizar()
+
+    assert recebidos == [
+        {"conectados": ["ana", "bruno"], "desconectados": []},
+        {"conectados": ["carla"], "desconectados": ["ana"]},
+    ]
+
+
+def test_remover_sessao_derrubada(criar_indice):
+    indice = criar_indice()
+    indice.atualizar()
+    indice.remover_sessao(1, "*1")
+    assert indice.obter("ana") is None
+    assert indice.obter("bruno") is not None
+
+
+def test_processo_novo_parte_do_espelho_no_redis(criar_indice, roteadores):
+    redis = FakeRedis()
+    criar_indice(redis_client=redis).atualizar()
+    assert roteadores.leituras == 2
+
+    outro = criar_indice(redis_client=redis)
+    assert outro.obter("bruno")["address"] == "100.64.1.20"
+    assert roteadores.leituras == 2
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from crm_core.security.auth_utils import criar_access_token, criar_token_stream
+from crm_core.security.dependencies import obter_usuario_atual, obter_usuario_stream
+from crm_core.security.usuario_cache import CacheUsuarios, UsuarioSnapshot, usuario_cache
+
+
+class FakeBanco:
+    def __init__(self):
+        self.usuarios = {
+            1: UsuarioSnapshot(1, "ana", "ana@example.com", "Ana Lima", "admin", True),
+            2: UsuarioSnapshot(2, "bruno", "bruno@example.com", "Bruno Souza", "tecnico", True),
+        }
+        self.consultas = 0
+
+    def carregar(self, usuario_id):
+        self.consultas += 1
+        return self.usuarios.get(usuario_id)
+
+
+def test_lru_com_ttl_e_invalidacao():
+    banco = FakeBanco()
+    cache = CacheUsuarios(ttl=60, max_itens=1, carregar=banco.carregar)
+
+    assert cache.obter(1).nome == "Ana Lima"
+    assert cache.obter(1) is cache.em_cache(1)
+    assert banco.consultas == 1
+
+    cache.obter(2)
+    assert cache.em_cache(1) is None  # saiu pelo limite do LRU
+    cache.invalidar(2)
+    assert cache.em_cache(2) is None
+    assert cache.obter(3) is None
+
+    expirado = CacheUsuarios(ttl=0, carregar=banco.carregar)
+    expirado.obter(1)
+    expirado.obter(1)
+    assert banco.consultas == 5
+    with pytest.raises(AttributeError):
+        expirado.obter(1).outro_campo = 1
+
+
+@pytest.fixture()
+def banco(monkeypatch):
+    banco = FakeBanco()
+    monkeypatch.setattr(usuario_cache, "carregar", banco.carregar)
+    usuario_cache.limpar()
+    yield banco
+    usuario_cache.limpar()
+
+
+def test_dependencia_usa_o_cache(banco):
+    app = FastAPI()
+
+    @app.get("/eu")
+    def eu(usuario=Depends(obter_usuario_atual)):
+        return {"id": usuario.id, "role": usuario.role}
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {criar_access_token(2)}"}
+
+    assert client.get("/eu", headers=headers).json() == {"id": 2, "role": "tecnico"}
+    assert client.get("/eu", headers=headers).status_code == 200
+    assert banco.consultas == 1
+
+    banco.usuarios[2].ativo = False
+    usuario_cache.invalidar(2)
+    assert client.get("/eu", headers=headers).status_code == 401
+    assert banco.consultas == 2
+
+
+def test_token_de_stream_so_abre_stream(banco):
+    app = FastAPI()
+
+    @app.get("/eu")
+    def eu(usuario=Depends(obter_usuario_atual)):
+        return {"id": usuario.id}
+
+    @app.get("/stream")
+    def stream(usuario=Depends(obter_usuario_stream)):
+        return {"id": usuario.id}
+
+    client = TestClient(app)
+    token = criar_token_stream(1)
+    acesso = criar_access_token(1)
+
+    assert client.get("/stream", params={"token": token}).json() == {"id": 1}
+    assert client.get("/stream", headers={"Authorization": f"Bearer {acesso}"}).json() == {"id": 1}
+    assert client.get("/stream", params={"token": acesso}).status_code == 401
+    assert client.get("/eu", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.get("/stream").status_code == 401